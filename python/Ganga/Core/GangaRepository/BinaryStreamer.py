@@ -0,0 +1,637 @@
+"""
+A compact, versioned binary serialisation of Ganga object trees used by the 'LocalBinary' repository type.
+
+The stream has exactly the same structure as the XML written by VStreamer: classes tagged with their
+category, name and Schema version, attributes, sequences (loaded as GangaLists) and values. Rather than
+printing values with repr() and eval-ing them on load, literals (None, bools, numbers, strings and lists,
+tuples and dicts of these) are stored natively. Anything else is stored as its repr() and evaluated on
+load exactly as it is for XML. Class, category and attribute names and short strings are only written
+once per file and referred to by number afterwards.
+
+Existing XML data files can be transcoded without loading any plugins, see convert_repository.
+"""
+from __future__ import print_function, absolute_import
+
+import os
+import struct
+import shutil
+import xml.parsers.expat
+from ast import literal_eval
+from cStringIO import StringIO
+
+from Ganga.Core.exceptions import GangaException
+from Ganga.Utility.logging import getLogger
+from Ganga.Utility.Plugin import PluginManagerError, allPlugins
+
+from Ganga.GPIDev.Base.Objects import GangaObject
+from Ganga.GPIDev.Base.Proxy import isType, getName
+from Ganga.GPIDev.Lib.GangaList.GangaList import GangaList
+from Ganga.GPIDev.Schema import Version
+
+from .GangaRepository import SchemaVersionError
+from .VStreamer import XMLFileError, EmptyGangaObject, ValueDecoder, unescape
+from .VStreamer import from_file as xml_from_file
+
+logger = getLogger()
+
+# Every file starts with the magic string followed by a single byte format version
+_magic = 'GBIN'
+_format_version = 1
+
+# Strings up to this length are added to the table of strings which can be referred to by number
+_max_interned_length = 64
+
+# Structure of the stream
+_CLASS = 'C'
+_CLASS_END = 'E'
+_ATTRIBUTE = 'A'
+_SEQUENCE = 'S'
+_SEQUENCE_END = 'Z'
+_REPR = 'R'
+
+# Native values
+_NONE = 'N'
+_TRUE = 'T'
+_FALSE = 'F'
+_INT = 'I'
+_LONG = 'L'
+_FLOAT = 'D'
+_STR = 's'
+_UNICODE = 'u'
+_LIST = 'l'
+_TUPLE = 't'
+_DICT = 'd'
+
+_double = struct.Struct('!d')
+
+_scalar_types = (type(None), bool, int, long, float, str, unicode)
+
+
+def _is_literal(value):
+    """
+    Returns True if value can be written natively, i.e. it's made up only of literals
+    Args:
+        value (object): value to be written
+    """
+    value_type = type(value)
+    if value_type in _scalar_types:
+        return True
+    if value_type in (list, tuple):
+        return all(_is_literal(v) for v in value)
+    if value_type is dict:
+        return all(_is_literal(k) and _is_literal(v) for k, v in value.iteritems())
+    return False
+
+
+class BinaryFileError(XMLFileError):
+
+    """ Raised when a binary data file can't be written or read.
+    This derives from XMLFileError so that the repository falls back to the backup data file exactly as it does for XML
+    """
+
+    def __str__(self):
+        if self.excpt:
+            err = '(%s:%s)' % (type(self.excpt), self.excpt)
+        else:
+            err = ''
+        return "BinaryFileError: %s %s" % (self.message, err)
+
+
+class BinaryWriter(object):
+
+    """ Writes the elements of the binary stream to a buffer """
+
+    def __init__(self, out=None):
+        """
+        Args:
+            out (file): file-like object to write to, defaults to an in-memory buffer
+        """
+        self.out = out if out is not None else StringIO()
+        self._strings = {}
+        self.out.write(_magic + chr(_format_version))
+
+    def getvalue(self):
+        """ Return the contents of the in-memory buffer """
+        return self.out.getvalue()
+
+    def write_varint(self, n):
+        """ Write a non-negative integer using 7 bits per byte """
+        chars = []
+        while n > 0x7f:
+            chars.append(chr((n & 0x7f) | 0x80))
+            n >>= 7
+        chars.append(chr(n))
+        self.out.write(''.join(chars))
+
+    def write_string(self, s):
+        """ Write a byte string, short strings which have been written before are written as a reference """
+        idx = self._strings.get(s)
+        if idx is not None:
+            self.write_varint(idx + 1)
+            return
+        self.write_varint(0)
+        self.write_varint(len(s))
+        self.out.write(s)
+        if len(s) <= _max_interned_length:
+            self._strings[s] = len(self._strings)
+
+    def write_native(self, value):
+        """ Write a value for which _is_literal is True """
+        value_type = type(value)
+        out = self.out
+        if value is None:
+            out.write(_NONE)
+        elif value_type is bool:
+            out.write(_TRUE if value else _FALSE)
+        elif value_type is int:
+            out.write(_INT)
+            # zig-zag encoding so that small negative numbers stay small
+            self.write_varint(value << 1 if value >= 0 else ((-value) << 1) - 1)
+        elif value_type is long:
+            out.write(_LONG)
+            self.write_string(str(value))
+        elif value_type is float:
+            out.write(_FLOAT)
+            out.write(_double.pack(value))
+        elif value_type is str:
+            out.write(_STR)
+            self.write_string(value)
+        elif value_type is unicode:
+            out.write(_UNICODE)
+            self.write_string(value.encode('utf-8'))
+        elif value_type is dict:
+            out.write(_DICT)
+            self.write_varint(len(value))
+            for k, v in value.iteritems():
+                self.write_native(k)
+                self.write_native(v)
+        else:
+            out.write(_LIST if value_type is list else _TUPLE)
+            self.write_varint(len(value))
+            for v in value:
+                self.write_native(v)
+
+    def write_value(self, value):
+        """ Write any value, values which aren't literals are written as their repr() """
+        if _is_literal(value):
+            self.write_native(value)
+        else:
+            self.write_repr(repr(value))
+
+    def write_repr(self, repr_str):
+        """ Write the repr() of a value which is evaluated when it is loaded """
+        self.out.write(_REPR)
+        self.write_string(repr_str)
+
+    def begin_class(self, name, category, major, minor):
+        self.out.write(_CLASS)
+        self.write_string(name)
+        self.write_string(category)
+        self.write_varint(major)
+        self.write_varint(minor)
+
+    def end_class(self):
+        self.out.write(_CLASS_END)
+
+    def begin_attribute(self, name):
+        self.out.write(_ATTRIBUTE)
+        self.write_string(name)
+
+    def begin_sequence(self):
+        self.out.write(_SEQUENCE)
+
+    def end_sequence(self):
+        self.out.write(_SEQUENCE_END)
+
+
+##########################################################################
+# A visitor to write the object tree in the binary format.
+# This makes the same decisions as VStreamer about what is written and how
+
+
+class BinaryStreamer(BinaryWriter):
+    # Arguments:
+    # out: file-like output stream to write to
+    # selection: list of names of properties of the root object which should not be written
+    # e.g. ['subjobs'] - will not write subjobs
+
+    def __init__(self, out=None, selection=None):
+        super(BinaryStreamer, self).__init__(out)
+        self.level = 0
+        self.selection = selection if selection is not None else []
+
+    def nodeBegin(self, node):
+        self.level += 1
+        s = node._schema
+        self.begin_class(s.name, s.category, s.version.major, s.version.minor)
+
+    def nodeEnd(self, node):
+        self.end_class()
+        self.level -= 1
+
+    def showAttribute(self, node, name):
+        return (self.level > 1 or name not in self.selection) and not node._schema.getItem(name)['transient']
+
+    def simpleAttribute(self, node, name, value, sequence):
+        if self.showAttribute(node, name):
+            self.begin_attribute(name)
+            if sequence:
+                self.begin_sequence()
+                for v in value:
+                    self.acceptOptional(v)
+                self.end_sequence()
+            elif isinstance(value, GangaObject):
+                self.acceptOptional(value)
+            else:
+                self.write_value(value)
+
+    def sharedAttribute(self, node, name, value, sequence):
+        self.simpleAttribute(node, name, value, sequence)
+
+    def acceptOptional(self, s):
+        if s is None:
+            self.write_native(None)
+        elif isinstance(s, str):
+            self.write_native(s)
+        elif hasattr(s, 'accept'):
+            s.accept(self)
+        elif isType(s, (list, tuple, GangaList)):
+            self.begin_sequence()
+            for sub_s in s:
+                self.acceptOptional(sub_s)
+            self.end_sequence()
+        else:
+            self.write_value(s)
+
+    def componentAttribute(self, node, name, subnode, sequence):
+        if self.showAttribute(node, name):
+            self.begin_attribute(name)
+            if sequence:
+                self.begin_sequence()
+                for s in subnode:
+                    self.acceptOptional(s)
+                self.end_sequence()
+            else:
+                self.acceptOptional(subnode)
+
+
+##########################################################################
+# Binary loader
+
+
+class BinaryLoader(object):
+
+    """ Job object tree loader for the binary format.
+    This constructs the same object tree as the XML loaders, with the same errors for unknown plugins or incompatible schema versions
+    """
+
+    __slots__ = ('data', 'pos', 'errors', 'decoder', '_strings', '_readers')
+
+    def __init__(self, decoder=None):
+        """
+        Args:
+            decoder (ValueDecoder): decoder used for values stored by their repr(), defaults to one shared between loaders
+        """
+        self.data = ''
+        self.pos = 0
+        self.errors = []  # list of exception objects in case of data errors
+        self.decoder = decoder if decoder is not None else _value_decoder
+        self._strings = []
+        self._readers = {_CLASS: self._read_class,
+                         _SEQUENCE: self._read_sequence,
+                         _REPR: self._read_repr,
+                         _NONE: lambda skip: None,
+                         _TRUE: lambda skip: True,
+                         _FALSE: lambda skip: False,
+                         _INT: self._read_int,
+                         _LONG: self._read_long,
+                         _FLOAT: self._read_float,
+                         _STR: self._read_str,
+                         _UNICODE: self._read_unicode,
+                         _LIST: self._read_list,
+                         _TUPLE: self._read_tuple,
+                         _DICT: self._read_dict}
+
+    def parse(self, data):
+        """ Load an object from the string data
+        Args:
+            data (str): contents of a binary data file
+        """
+        if data[:len(_magic)] != _magic:
+            raise AssertionError("not a binary data file")
+        version = ord(data[len(_magic)])
+        if version != _format_version:
+            raise AssertionError("unsupported binary format version %s" % version)
+
+        self.data = data
+        self.pos = len(_magic) + 1
+        obj = self._read_item(False)
+
+        if self.pos != len(data):
+            self.errors.append(AssertionError('multiple objects in binary data file'))
+
+        # Raise Exception if object is incomplete
+        for attr, item in obj._schema.allItems():
+            if not hasattr(obj, attr):
+                raise AssertionError("incomplete binary data file")
+        return obj, self.errors
+
+    def _read_op(self):
+        op = self.data[self.pos]
+        self.pos += 1
+        return op
+
+    def _read_item(self, skip):
+        """ Read the next class, sequence or value. When skip is True the item is read but not constructed """
+        op = self._read_op()
+        try:
+            reader = self._readers[op]
+        except KeyError:
+            raise AssertionError("corrupt binary data file, unknown element %r at %s" % (op, self.pos - 1))
+        return reader(skip)
+
+    def _read_varint(self):
+        data = self.data
+        pos = self.pos
+        byte = ord(data[pos])
+        pos += 1
+        n = byte & 0x7f
+        shift = 7
+        while byte & 0x80:
+            byte = ord(data[pos])
+            pos += 1
+            n |= (byte & 0x7f) << shift
+            shift += 7
+        self.pos = pos
+        return n
+
+    def _read_string(self):
+        idx = self._read_varint()
+        if idx:
+            return self._strings[idx - 1]
+        length = self._read_varint()
+        s = self.data[self.pos:self.pos + length]
+        if len(s) != length:
+            raise AssertionError("truncated binary data file")
+        self.pos += length
+        if length <= _max_interned_length:
+            self._strings.append(s)
+        return s
+
+    def _read_class(self, skip):
+        name = self._read_string()
+        category = self._read_string()
+        version = Version(self._read_varint(), self._read_varint())
+
+        obj = None
+        skip_attributes = skip
+        if not skip:
+            try:
+                cls = allPlugins.find(category, name)
+            except PluginManagerError as e:
+                self.errors.append(e)
+                obj = EmptyGangaObject()
+                skip_attributes = True
+            else:
+                if not cls._schema.version.isCompatible(version):
+                    self.errors.append(SchemaVersionError('Incompatible schema of %s, repository is %s.%s currently in use is %s.%s' %
+                                                          (name, version.major, version.minor, cls._schema.version.major, cls._schema.version.minor)))
+                    obj = EmptyGangaObject()
+                    skip_attributes = True
+                else:
+                    obj = cls.getNew()
+
+        while True:
+            op = self._read_op()
+            if op == _CLASS_END:
+                break
+            if op != _ATTRIBUTE:
+                raise AssertionError("corrupt binary data file, unexpected element %r in class %s" % (op, name))
+            aname = self._read_string()
+            value = self._read_item(skip_attributes)
+            if not skip_attributes:
+                try:
+                    obj.setSchemaAttribute(aname, value)
+                except Exception as err:
+                    raise GangaException("ERROR in loading binary data, failed to set attribute %s for class %s: %s" % (aname, getName(obj), err))
+        return obj
+
+    def _read_sequence(self, skip):
+        items = []
+        while self.data[self.pos] != _SEQUENCE_END:
+            items.append(self._read_item(skip))
+        self.pos += 1
+        if skip:
+            return None
+        try:
+            # Values read from disk have no proxies and are already sanitised so skip the GangaList schema defaults
+            alist = GangaList.getNew()
+            alist.setSchemaAttribute('_list', items)
+            alist.setSchemaAttribute('_is_preparable', False)
+        except Exception as err:
+            raise GangaException("ERROR in loading binary data, failed to construct a sequence(list) properly: %s" % err)
+        return alist
+
+    def _read_repr(self, skip):
+        repr_str = self._read_string()
+        if skip:
+            return None
+        try:
+            return self.decoder.decode(repr_str)
+        except Exception as err:
+            raise GangaException("ERROR in loading binary data, failed to correctly parse attribute value: \'%s\' (%s)" % (repr_str, err))
+
+    def _read_int(self, skip):
+        n = self._read_varint()
+        return -((n + 1) >> 1) if n & 1 else n >> 1
+
+    def _read_long(self, skip):
+        return long(self._read_string())
+
+    def _read_float(self, skip):
+        value = _double.unpack_from(self.data, self.pos)[0]
+        self.pos += _double.size
+        return value
+
+    def _read_str(self, skip):
+        return self._read_string()
+
+    def _read_unicode(self, skip):
+        return self._read_string().decode('utf-8')
+
+    def _read_list(self, skip):
+        return [self._read_item(skip) for _ in xrange(self._read_varint())]
+
+    def _read_tuple(self, skip):
+        return tuple(self._read_list(skip))
+
+    def _read_dict(self, skip):
+        value = {}
+        for _ in xrange(self._read_varint()):
+            k = self._read_item(skip)
+            value[k] = self._read_item(skip)
+        return value
+
+# Shared between loaders so that common values are decoded once
+_value_decoder = ValueDecoder()
+
+
+##########################################################################
+# Transcoding XML written by VStreamer
+
+
+class XMLTranscoder(BinaryWriter):
+
+    """ Converts the XML written by VStreamer into the binary format without constructing any objects.
+    This means a repository can be converted without the plugins of the objects it contains being loaded
+    """
+
+    def __init__(self, out=None):
+        super(XMLTranscoder, self).__init__(out)
+        self._value = None
+
+    def transcode_file(self, fobj):
+        """ Transcode the XML in the file object fobj
+        Args:
+            fobj (file): file object containing the XML
+        """
+        p = xml.parsers.expat.ParserCreate()
+        p.buffer_text = True
+        p.StartElementHandler = self._start_element
+        p.EndElementHandler = self._end_element
+        p.CharacterDataHandler = self._char_data
+        p.ParseFile(fobj)
+
+    def _start_element(self, name, attrs):
+        if name == 'class':
+            major, minor = [int(v) for v in attrs['version'].split('.')]
+            self.begin_class(attrs['name'].encode('utf-8'), attrs['category'].encode('utf-8'), major, minor)
+        elif name == 'attribute':
+            self.begin_attribute(attrs['name'].encode('utf-8'))
+        elif name == 'sequence':
+            self.begin_sequence()
+        elif name == 'value':
+            self._value = []
+
+    def _end_element(self, name):
+        if name == 'class':
+            self.end_class()
+        elif name == 'sequence':
+            self.end_sequence()
+        elif name == 'value':
+            # expat hands back unicode, the XML itself only ever contains the ascii repr() of the value
+            repr_str = unescape(''.join(self._value)).encode('utf-8')
+            self._value = None
+            try:
+                value = literal_eval(repr_str)
+            except (ValueError, SyntaxError):
+                self.write_repr(repr_str)
+                return
+            if _is_literal(value):
+                self.write_native(value)
+            else:
+                self.write_repr(repr_str)
+
+    def _char_data(self, data):
+        if self._value is not None:
+            self._value.append(data)
+
+
+def xml_to_binary(fobj):
+    """ Return the binary form of the XML data file in the file object fobj
+    Args:
+        fobj (file): file object containing the XML written by VStreamer
+    """
+    transcoder = XMLTranscoder()
+    transcoder.transcode_file(fobj)
+    return transcoder.getvalue()
+
+
+def convert_repository(src_root, dest_root, data_file_name='data'):
+    """ Copy a LocalXML repository to a new LocalBinary repository converting all of the data files.
+    The index files are copied as they are, the consolidated index store and master indexes are rebuilt on startup.
+    Returns the number of data files which were converted
+    Args:
+        src_root (str): '6.0' directory of the XML repository, e.g. gangadir/repository/user/LocalXML/6.0
+        dest_root (str): '6.0' directory of the new repository, e.g. gangadir/repository/user/LocalBinary/6.0
+        data_file_name (str): name of the data files, normally 'data'
+    """
+    data_files = (data_file_name, data_file_name + '~')
+    rebuilt_files = ('index.store', 'master.idx')
+    n_converted = 0
+    for registry_name in sorted(os.listdir(src_root)):
+        src_registry = os.path.join(src_root, registry_name)
+        # Only the registry folders are copied, the session files remain with the old repository
+        if not os.path.isdir(src_registry):
+            continue
+        for dirpath, dirnames, filenames in os.walk(src_registry):
+            dest_dir = os.path.join(dest_root, os.path.relpath(dirpath, src_root))
+            if not os.path.isdir(dest_dir):
+                os.makedirs(dest_dir)
+            for fn in filenames:
+                if fn in rebuilt_files:
+                    continue
+                src_fn = os.path.join(dirpath, fn)
+                dest_fn = os.path.join(dest_dir, fn)
+                if fn in data_files:
+                    try:
+                        with open(src_fn, 'r') as fobj:
+                            data = xml_to_binary(fobj)
+                    except Exception as err:
+                        logger.warning("Failed to convert %s, copying it unchanged: %s" % (src_fn, err))
+                        shutil.copy2(src_fn, dest_fn)
+                        continue
+                    with open(dest_fn, 'wb') as fobj:
+                        fobj.write(data)
+                    shutil.copystat(src_fn, dest_fn)
+                    n_converted += 1
+                else:
+                    shutil.copy2(src_fn, dest_fn)
+    return n_converted
+
+
+def to_file(j, fobj=None, ignore_subs=''):
+    _ignore_subs = [ignore_subs] if not isinstance(ignore_subs, list) else ignore_subs
+    try:
+        sio = StringIO()
+        j.accept(BinaryStreamer(out=sio, selection=_ignore_subs))
+        fobj.write(sio.getvalue())
+    except Exception as err:
+        logger.error("Binary to-file error for file:\n%s" % (err))
+        raise BinaryFileError(err, "to-file error")
+
+# load object (job) from file f
+# if len(errors) > 0 the object was not loaded correctly, see VStreamer.from_file
+# Files which are still XML (e.g. written before the repository was switched to the binary format) are loaded as XML
+
+
+def from_file(f):
+    data = f.read()
+    if not data.startswith(_magic):
+        return xml_from_file(StringIO(data))
+    try:
+        return BinaryLoader().parse(data)
+    except Exception as err:
+        logger.error("Binary from-file error for file:\n%s" % err)
+        raise BinaryFileError(err, "from-file error")
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="Convert a LocalXML Ganga repository to the LocalBinary format. "
+                                     "Afterwards set '[Configuration]repositorytype = LocalBinary' and move or link "
+                                     "gangadir/workspace/<user>/LocalXML to gangadir/workspace/<user>/LocalBinary")
+    parser.add_argument('src', help="the XML repository, e.g. ~/gangadir/repository/<user>/LocalXML")
+    parser.add_argument('dest', help="the new repository, e.g. ~/gangadir/repository/<user>/LocalBinary")
+    args = parser.parse_args()
+
+    src_root = os.path.join(os.path.expanduser(args.src), '6.0')
+    dest_root = os.path.join(os.path.expanduser(args.dest), '6.0')
+    if os.path.exists(dest_root):
+        parser.error("%s already exists" % dest_root)
+    n_converted = convert_repository(src_root, dest_root)
+    print("Converted %s data files from %s to %s" % (n_converted, src_root, dest_root))
+
+
+if __name__ == '__main__':
+    main()
@@ -110,6 +110,22 @@ class GangaRepository(object):
         """
         raise NotImplementedError
 
+    def flush_parallel(self, ids, n_threads):
+        """flush_parallel(ids, n_threads) --> None
+        Writes the objects specified by the ids to the persistency layer, using up to n_threads threads.
+        Each object is locked whilst it is written and marked as flushed, so the caller must not hold the locks of
+        these objects. By default the objects are written one at a time
+        Raise KeyError
+        Raise RepositoryError
+        Args:
+            ids (list): The object keys which we want to iterate over from the objects dict
+            n_threads (int): The maximum number of threads the repository may use
+        """
+        for this_id in ids:
+            with self.objects[this_id].const_lock:
+                self.flush([this_id])
+                self.objects[this_id]._setFlushed()
+
     def lock(self, ids):
         """lock(ids) --> bool
         Locks the specified IDs against modification from other Ganga sessions
@@ -7,10 +7,12 @@ from Ganga.Core.GangaRepository import GangaRepository, RepositoryError, Inacces
 from Ganga.Utility.Plugin import PluginManagerError
 import os
 import os.path
+import sys
 import time
 import errno
 import copy
 import threading
+import Queue
 
 from Ganga.Core.GangaRepository.SessionLock import SessionLockManager, dry_run_unix_locks
 from Ganga.Core.GangaRepository.FixedLock import FixedLockManager
@@ -24,6 +26,11 @@ from Ganga.Core.GangaRepository.VStreamer import to_file as xml_to_file
 from Ganga.Core.GangaRepository.VStreamer import from_file as xml_from_file
 from Ganga.Core.GangaRepository.VStreamer import XMLFileError
 
+from Ganga.Core.GangaRepository.BinaryStreamer import to_file as binary_to_file
+from Ganga.Core.GangaRepository.BinaryStreamer import from_file as binary_from_file
+
+from Ganga.Core.GangaRepository.IndexStore import IndexStore, IndexStoreError, SET_RECORD, DEL_RECORD
+
 from Ganga.GPIDev.Base.Objects import Node
 from Ganga.Core.GangaRepository.SubJobXMLList import SubJobXMLList
 
@@ -76,18 +83,31 @@ def check_app_hash(obj):
             logger.warning('re-prepare() the application). Otherwise, please file a bug report at:')
             logger.warning('https://github.com/ganga-devs/ganga/issues/')
 
-def safe_save(fn, _obj, to_file, ignore_subs=''):
+def _get_file_lock(fn):
+    """
+    Return the lock guarding writes to the file fn.
+    Files are spread over a fixed number of locks so that threads writing different files rarely wait on each other
+    Args:
+        fn (str): Full path of the file which is to be written
+    """
+    return _file_locks[hash(os.path.abspath(fn)) % len(_file_locks)]
+
+# Locks used by _get_file_lock - See issue #185
+_file_locks = tuple(threading.Lock() for _ in range(64))
+
+def safe_save(fn, _obj, to_file, ignore_subs='', written=None):
     """Try to save the XML for this object in as safe a way as possible
     Args:
         fn (str): This is the name of the file we are to save the object to
         _obj (GangaObject): This is the object which we want to save to the file
         to_file (str): This is the method we want to use to save the to the file
         ignore_subs (str): This is the name(s) of the attribute of _obj we want to ignore in writing to disk
+        written (list): If given the name of the file is appended to this list once it has been written
     """
 
-    # Add a global lock to make absolutely sure we don't have multiple threads writing files
+    # Lock the file to make absolutely sure we don't have multiple threads writing it
     # See Github Issue 185
-    with safe_save.lock:
+    with _get_file_lock(fn):
 
         obj = stripProxy(_obj)
         check_app_hash(obj)
@@ -111,8 +131,29 @@ def safe_save(fn, _obj, to_file, ignore_subs=''):
 
             os.rename(new_name, fn)
 
-# Global lock for above function - See issue #185
-safe_save.lock = threading.Lock()
+    if written is not None:
+        written.append(fn)
+
+def fsync_files(filenames):
+    """
+    Force the given files and the directories holding them to disk, each is only synced once
+    Args:
+        filenames (list): Full paths of the files which have been written
+    """
+    to_sync = set(filenames)
+    to_sync.update(set(os.path.dirname(fn) for fn in to_sync))
+    for fn in sorted(to_sync):
+        try:
+            fd = os.open(fn, os.O_RDONLY)
+        except OSError as err:
+            logger.debug("fsync_files: %s" % err)
+            continue
+        try:
+            os.fsync(fd)
+        except OSError as err:
+            logger.debug("fsync_files: %s" % err)
+        finally:
+            os.close(fd)
 
 def rmrf(name, count=0):
     """
@@ -206,6 +247,13 @@ class GangaRepositoryLocal(GangaRepository):
         self._cache_load_timestamp = {}
         self.printed_explanation = False
         self._fully_loaded = {}
+        self._index_store = None
+        # time the listing of the repository was last compared with the objects found from the index store
+        self._last_listing_check = 0.
+        # the _foreign_token the objects were last checked against
+        self._foreign_seen = None
+        self._packed_subjobs = False
+        self._fsync_flush = False
 
     def startup(self):
         """ Starts a repository and reads in a directory structure.
@@ -226,8 +274,17 @@ class GangaRepositoryLocal(GangaRepository):
         elif "Pickle" in self.registry.type:
             self.to_file = pickle_to_file
             self.from_file = pickle_from_file
+        elif "Binary" in self.registry.type:
+            self.to_file = binary_to_file
+            self.from_file = binary_from_file
         else:
             raise RepositoryError(self, "Unknown Repository type: %s" % self.registry.type)
+        if getConfig('Registry')['EnableIndexStore']:
+            self._index_store = IndexStore(os.path.join(self.root, 'index.store'))
+        else:
+            self._index_store = None
+        self._packed_subjobs = getConfig('Registry')['PackedSubjobs']
+        self._fsync_flush = getConfig('Registry')['FsyncFlush']
         if getConfig('Configuration')['lockingStrategy'] == "UNIX":
             # First test the UNIX locks are working as expected
             try:
@@ -248,7 +305,8 @@ class GangaRepositoryLocal(GangaRepository):
         self.sessionlock.startup()
         # Load the list of files, this time be verbose and print out a summary
         # of errors
-        self.update_index(True, True)
+        self.update_index(None, True, True)
+        self._last_listing_check = time.time()
         logger.debug("GangaRepositoryLocal Finished Startup")
 
     def shutdown(self):
@@ -263,10 +321,16 @@ class GangaRepositoryLocal(GangaRepository):
                 self.index_write(k, True)
             except Exception as err:
                 logger.error("Warning: problem writing index object with id %s" % k)
-        try:
-            self._write_master_cache(True)
-        except Exception as err:
-            logger.warning("Warning: Failed to write master index due to: %s" % err)
+        if self._index_store is not None:
+            self._append_index_store([self._make_index_store_record(k) for k in self._fully_loaded if k in self._cached_cat])
+            self._compact_index_store()
+        else:
+            if self._fully_loaded:
+                self._mark_foreign_change()
+            try:
+                self._write_master_cache(True)
+            except Exception as err:
+                logger.warning("Warning: Failed to write master index due to: %s" % err)
         self.sessionlock.shutdown()
 
     def get_fn(self, this_id):
@@ -287,7 +351,7 @@ class GangaRepositoryLocal(GangaRepository):
             self.saved_idxpaths[this_id] = os.path.join(self.root, "%ixxx" % int(this_id * 0.001), "%i.index" % this_id)
         return self.saved_idxpaths[this_id]
 
-    def index_load(self, this_id):
+    def index_load(self, this_id, store_entry=None, ctime=None):
         """ load the index file for this object if necessary
             Loads if never loaded or timestamp changed. Creates object if necessary
             Returns True if this object has been changed, False if not
@@ -296,20 +360,28 @@ class GangaRepositoryLocal(GangaRepository):
             Raise PluginManagerError if the class name is not found
         Args:
             this_id (int): This is the id for which we want to load the index file from disk
+            store_entry (tuple): (category, classname, cache, ctime) for this object as read from the index store, used instead of the index file
+            ctime (float): The ctime of the index file if it has just been looked at, saving another stat
         """
         #logger.debug("Loading index %s" % this_id)
         fn = self.get_idxfn(this_id)
-        # index timestamp changed
-        fn_ctime = os.stat(fn).st_ctime
-        cache_time = self._cache_load_timestamp.get(this_id, 0)
+        if store_entry is not None:
+            # Entries replayed from the index store are always newer than what we hold
+            cat, cls, cache, fn_ctime = store_entry
+            cache_time = None
+        else:
+            # index timestamp changed
+            fn_ctime = ctime if ctime is not None else os.stat(fn).st_ctime
+            cache_time = self._cache_load_timestamp.get(this_id, 0)
         if cache_time != fn_ctime:
             logger.debug("%s != %s" % (cache_time, fn_ctime))
-            try:
-                with open(fn, 'r') as fobj:
-                    cat, cls, cache = pickle_from_file(fobj)[0]
-            except Exception as x:
-                logger.warning("index_load Exception: %s" % x)
-                raise IOError("Error on unpickling: %s %s" %(getName(x), x))
+            if store_entry is None:
+                try:
+                    with open(fn, 'r') as fobj:
+                        cat, cls, cache = pickle_from_file(fobj)[0]
+                except Exception as x:
+                    logger.warning("index_load Exception: %s" % x)
+                    raise IOError("Error on unpickling: %s %s" %(getName(x), x))
             if this_id in self.objects:
                 obj = self.objects[this_id]
                 setattr(obj, "_registry_refresh", True)
@@ -424,6 +496,219 @@ class GangaRepositoryLocal(GangaRepository):
         finally:
             rmrf(os.path.join(self.root, 'master.idx'))
 
+    def _read_index_store(self):
+        """
+        Read the consolidated index store in one sequential pass
+        Returns a dict of id: (category, classname, cache, ctime) or None if the store can't be used
+        """
+        try:
+            entries = self._index_store.load()
+        except IndexStoreError as err:
+            logger.warning("Index store for '%s' could not be read, rebuilding it from the index files" % self.registry.name)
+            logger.debug("Error: %s" % err)
+            return None
+        if entries is None:
+            logger.debug("No index store found for '%s', rebuilding it from the index files" % self.registry.name)
+            return None
+        logger.debug("Read %s entries from the index store" % len(entries))
+        return entries
+
+    def _index_ctime(self, this_id):
+        """
+        Returns the ctime of the index file of an object, -1 if it has none
+        Args:
+            this_id (int): This is the id of the object
+        """
+        try:
+            return os.stat(self.get_idxfn(this_id)).st_ctime
+        except OSError:
+            return -1
+
+    def _check_index_store(self, entries):
+        """
+        Compare the entries read from the index store with the objects and index files on disk, which sessions not
+        using the store (or an older Ganga) may have added, changed or removed. Each index file is looked at once.
+        Returns a dict of id: store entry, or None if the index file of the object has to be read instead,
+        a dict of id: ctime of the index files which have to be read, and whether the store differs from what is on disk
+        Args:
+            entries (dict): dict of id: (category, classname, cache, ctime) as read from the index store
+        """
+        listing = self.get_index_listing()
+        objs = {}
+        ctimes = {}
+        for this_id in listing:
+            entry = entries.get(this_id)
+            ctime = self._index_ctime(this_id)
+            if entry is not None and ctime == entry[3]:
+                objs[this_id] = entry
+            else:
+                objs[this_id] = None
+                if ctime != -1:
+                    ctimes[this_id] = ctime
+        n_stale = objs.values().count(None) + len(set(entries) - set(listing))
+        if n_stale:
+            logger.debug("Index store for '%s' differs from the repository for %s objects, it will be rebuilt" % (self.registry.name, n_stale))
+        return objs, ctimes, n_stale > 0
+
+    def _trust_index_store(self, entries):
+        """
+        Take the entries read from the index store as they are, as no session has changed the repository without the
+        store since it was checked. Only the ids after the last one in the store, up to the last id handed out, are
+        looked for on disk, e.g. objects written by a session which stopped before recording them in the store.
+        Returns a dict of id: store entry, or None if the index file of the object has to be read instead,
+        and whether any object was found outside the store
+        Args:
+            entries (dict): dict of id: (category, classname, cache, ctime) as read from the index store
+        """
+        objs = dict(entries)
+        first = max(entries) + 1 if entries else 0
+        try:
+            count = max(self.sessionlock.count, self.sessionlock.cnt_read())
+        except (ValueError, OSError) as err:
+            logger.debug("_trust_index_store: %s" % err)
+            count = self.sessionlock.count
+        for this_id in range(first, count):
+            if os.path.isdir(os.path.dirname(self.get_fn(this_id))):
+                objs[this_id] = None
+        return objs, len(objs) != len(entries)
+
+    def _foreign_marker_fn(self):
+        """ The file which sessions not using the index store append to whenever they change the repository """
+        return os.path.join(self.root, 'index.store.foreign')
+
+    def _foreign_token(self):
+        """ Returns what identifies the changes marked by _mark_foreign_change so far, None if there have been none """
+        try:
+            stat = os.stat(self._foreign_marker_fn())
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_size)
+
+    def _mark_foreign_change(self):
+        """
+        Let the sessions using the index store know that objects have been written or removed without it, by appending
+        a byte to the marker file, so that they don't have to list the repository to find out
+        """
+        try:
+            fd = os.open(self._foreign_marker_fn(), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, '.')
+            finally:
+                os.close(fd)
+        except OSError as err:
+            logger.debug("_mark_foreign_change: %s" % err)
+
+    def _foreign_changed(self):
+        """ Returns True if a session not using the index store has changed the repository since it was last checked """
+        token = self._foreign_token()
+        if token == self._foreign_seen:
+            return False
+        logger.debug("Registry '%s' has been changed without the index store, rescanning repository" % self.registry.name)
+        self._foreign_seen = token
+        return True
+
+    def _listing_differs(self):
+        """
+        Returns True if the listing of the repository doesn't match the objects known from the index store, which is
+        checked once every [Registry]IndexStoreListingCheck seconds if that is set. This is only needed to find the
+        objects added or removed by versions of Ganga which don't mark the changes they make without the store
+        """
+        interval = getConfig('Registry')['IndexStoreListingCheck']
+        if interval <= 0:
+            return False
+        now = time.time()
+        if now - self._last_listing_check < interval:
+            return False
+        self._last_listing_check = now
+        try:
+            listing = self.get_index_listing()
+        except RepositoryError as err:
+            logger.debug("_listing_differs: %s" % err)
+            return False
+        return set(listing) != set(self.objects) | set(self.incomplete_objects)
+
+    def _read_index_store_changes(self):
+        """
+        Replay the records which other sessions (or we) have appended to the index store since it was last read
+        Returns a tuple of (dict of changed id: (category, classname, cache, ctime), set of removed ids)
+        or None if the store has been replaced or can't be read, in which case a full rescan is needed
+        """
+        try:
+            records = self._index_store.read_changes()
+        except IndexStoreError as err:
+            logger.debug("Failed to read index store changes: %s" % err)
+            return None
+        if records is None:
+            logger.debug("Index store for '%s' has been replaced, rescanning repository" % self.registry.name)
+            return None
+        changed = {}
+        removed = set()
+        for record in records:
+            this_id = record[1]
+            if record[0] == SET_RECORD:
+                changed[this_id] = tuple(record[2:])
+                removed.discard(this_id)
+            elif record[0] == DEL_RECORD:
+                changed.pop(this_id, None)
+                removed.add(this_id)
+        logger.debug("Replayed %s index store records" % len(records))
+        return changed, removed
+
+    def _make_index_store_record(self, this_id):
+        """
+        Construct an index store record for "this_id" from the cached index entries
+        Args:
+            this_id (int): This is the id of the object whose index entry we want to store
+        """
+        ctime = self._index_ctime(this_id)
+        return IndexStore.make_set_record(this_id, self._cached_cat[this_id], self._cached_cls[this_id], self._cached_obj[this_id], ctime)
+
+    def _append_index_store(self, records):
+        """
+        Append records to the index store, errors are not fatal as the index files can be used to rebuild the store
+        Args:
+            records (list): Records as constructed by IndexStore.make_set_record/make_del_record
+        """
+        if self._index_store is None:
+            return
+        try:
+            self._index_store.append(records)
+        except IndexStoreError as err:
+            logger.warning("Failed to update the index store for '%s'" % self.registry.name)
+            logger.debug("Error: %s" % err)
+
+    def _rebuild_index_store(self, mark):
+        """
+        Write a new index store from the index entries which have been read from the per-object index files
+        Args:
+            mark (tuple): The _foreign_token the objects were checked against, kept as the mark of the store
+        """
+        entries = {}
+        for this_id in self.objects:
+            if this_id in self.incomplete_objects or this_id not in self._cached_cat:
+                continue
+            entries[this_id] = (self._cached_cat[this_id], self._cached_cls[this_id], self._cached_obj[this_id], self._cache_load_timestamp[this_id])
+        try:
+            self._index_store.rewrite(entries, mark)
+        except IndexStoreError as err:
+            logger.warning("Failed to rebuild the index store for '%s'" % self.registry.name)
+            logger.debug("Error: %s" % err)
+
+    def _compact_index_store(self):
+        """
+        Rewrite the index store with only the live entries once it has accumulated many superseded records.
+        This is only done when no other session is appending to the store.
+        """
+        if not self._index_store.needs_compacting(len(self.objects)):
+            return
+        if len(self.get_other_sessions()) > 0:
+            return
+        try:
+            logger.debug("Compacting index store for '%s'" % self.registry.name)
+            self._index_store.compact()
+        except IndexStoreError as err:
+            logger.debug("Failed to compact the index store: %s" % err)
+
     def _clear_stored_cache(self):
         """
         clear the master cache(s) which have been stored in memory
@@ -527,7 +812,12 @@ class GangaRepositoryLocal(GangaRepository):
     def update_index(self, this_id=None, verbose=False, firstRun=False):
         """ Update the list of available objects
         Raise RepositoryError
-        TODO avoid updating objects which haven't changed as this causes un-needed I/O
+        When the index store is in use, only the changes appended to it since the last call are replayed
+        rather than rescanning the whole repository. Sessions not using the store append to a marker file whenever
+        they change the repository. On startup the store is used as it is if the marker hasn't changed since the
+        store was last checked, otherwise it is compared once with the listing of the repository and the index files
+        and rebuilt. After that the repository is rescanned when the marker changes, and the index file of "this_id"
+        is always checked.
         Args:
             this_id (int): This is the id we want to explicitly check the index on disk for
             verbose (bool): Should we be verbose
@@ -535,11 +825,41 @@ class GangaRepositoryLocal(GangaRepository):
         """
         # First locate and load the index files
         logger.debug("updating index...")
-        objs = self.get_index_listing()
+        objs = None
+        ctimes = {}
+        store_changes = None
+        rebuild_store = False
+        if self._index_store is not None:
+            if firstRun:
+                # Taken before anything is read, so that changes made meanwhile are found next time
+                self._foreign_seen = self._foreign_token()
+                objs = self._read_index_store()
+                if objs is not None:
+                    if self._index_store.mark == self._foreign_seen:
+                        objs, rebuild_store = self._trust_index_store(objs)
+                    else:
+                        objs, ctimes, rebuild_store = self._check_index_store(objs)
+            else:
+                store_changes = self._read_index_store_changes()
+                if store_changes is not None and (self._foreign_changed() or self._listing_differs()):
+                    # Objects have been changed by a session not using the store, rescan the repository
+                    store_changes = None
+                if store_changes is not None:
+                    objs = store_changes[0]
+                    if this_id is not None and this_id not in objs and os.path.isdir(os.path.dirname(self.get_fn(this_id))):
+                        # The object asked for may have been written by a session not using the store, check its index file
+                        objs[this_id] = None
+        from_store = objs is not None
+        if not from_store:
+            objs = self.get_index_listing()
         changed_ids = []
-        deleted_ids = set(self.objects.keys())
+        if store_changes is not None:
+            # Only ids removed by a record in the store are gone, everything else is untouched
+            deleted_ids = set(i for i in store_changes[1] if i in self.objects and i not in self.sessionlock.locked)
+        else:
+            deleted_ids = set(self.objects.keys())
         summary = []
-        if firstRun:
+        if firstRun and not from_store:
             self._read_master_cache()
         logger.debug("Iterating over Items")
 
@@ -560,7 +880,7 @@ class GangaRepositoryLocal(GangaRepository):
             # Now we treat unlocked IDs
             try:
                 # if this succeeds, all is well and we are done
-                if self.index_load(this_id):
+                if self.index_load(this_id, objs[this_id] if from_store else None, ctimes.get(this_id)):
                     changed_ids.append(this_id)
                 continue
             except IOError as err:
@@ -589,6 +909,8 @@ class GangaRepositoryLocal(GangaRepository):
                             # otherwise just go about fixing it
                             if not self.isObjectLoaded(self.objects[this_id]):
                                 self.index_write(this_id)
+                                if self._index_store is None:
+                                    self._mark_foreign_change()
                             else:
                                 self.objects[this_id]._setDirty()
                         #self.unlock([this_id])
@@ -635,7 +957,16 @@ class GangaRepositoryLocal(GangaRepository):
                 self.printed_explanation = True
         logger.debug("updated index done")
 
-        if len(changed_ids) != 0:
+        if self._index_store is not None:
+            if firstRun and (not from_store or rebuild_store):
+                self._rebuild_index_store(self._foreign_seen)
+            elif not from_store:
+                # Rescanned after the store was replaced, re-read it so that we follow its changes again
+                try:
+                    self._index_store.load()
+                except IndexStoreError as err:
+                    logger.debug("Failed to re-read index store: %s" % err)
+        elif len(changed_ids) != 0:
             isShutdown = not firstRun
             self._write_master_cache(isShutdown)
 
@@ -683,12 +1014,13 @@ class GangaRepositoryLocal(GangaRepository):
 
         return ids
 
-    def _safe_flush_xml(self, this_id):
+    def _safe_flush_xml(self, this_id, written=None):
         """
         Flush XML to disk whilst checking for relavent SubJobXMLList which handles subjobs now
         flush for "this_id" in the self.objects list
         Args:
             this_id (int): This is the id of the object we want to flush to disk
+            written (list): If given the names of the files written are appended to this list
         """
 
         fn = self.get_fn(this_id)
@@ -705,10 +1037,18 @@ class GangaRepositoryLocal(GangaRepository):
 
                 if hasattr(getattr(obj, self.sub_split), 'flush'):
                     # I've been read from disk in the new SubJobXMLList format I know how to flush
-                    getattr(obj, self.sub_split).flush()
+                    getattr(obj, self.sub_split).flush(written=written)
                 else:
                     # I have been constructed in this session, I don't know how to flush!
-                    if hasattr(getattr(obj, self.sub_split)[0], "_dirty"):
+                    # status changes of the subjobs of a previous splitting no longer apply
+                    SubJobXMLList.getStatusLog(os.path.dirname(fn)).remove()
+                    container = SubJobXMLList.getContainer(os.path.dirname(fn))
+                    packed = self._packed_subjobs or container.exists()
+                    if packed:
+                        # The SubJobXMLList below writes the dirty subjobs to the container
+                        if not container.exists():
+                            container.rewrite([])
+                    elif hasattr(getattr(obj, self.sub_split)[0], "_dirty"):
                         split_cache = getattr(obj, self.sub_split)
                         for i in range(len(split_cache)):
                             if not split_cache[i]._dirty:
@@ -719,7 +1059,7 @@ class GangaRepositoryLocal(GangaRepository):
                                 os.makedirs(os.path.dirname(sfn))
                             else:
                                 logger.debug("Using Folder: %s" % os.path.dirname(sfn))
-                            safe_save(sfn, split_cache[i], self.to_file)
+                            safe_save(sfn, split_cache[i], self.to_file, written=written)
                             split_cache[i]._setFlushed()
                     # Now generate an index file to take advantage of future non-loading goodness
                     tempSubJList = SubJobXMLList(os.path.dirname(fn), self.registry, self.dataFileName, False, obj)
@@ -729,24 +1069,35 @@ class GangaRepositoryLocal(GangaRepository):
                     for sj in getattr(obj, self.sub_split):
                         job_dict[sj.id] = stripProxy(sj)
                     tempSubJList._reset_cachedJobs(job_dict)
-                    tempSubJList.flush(ignore_disk=True)
+                    tempSubJList.flush(ignore_disk=True, written=written)
                     del tempSubJList
-
-                safe_save(fn, obj, self.to_file, self.sub_split)
+                    if packed:
+                        split_cache = getattr(obj, self.sub_split)
+                        for sj in split_cache:
+                            stripProxy(sj)._setFlushed()
+                        # drop the subjobs of a previous splitting
+                        if len(container) > len(split_cache):
+                            container.truncate(len(split_cache))
+
+                safe_save(fn, obj, self.to_file, self.sub_split, written)
+                # a packed job has no subjob folders at all
+                is_packed = SubJobXMLList.getContainer(os.path.dirname(fn)).exists()
                 # clean files not in subjobs anymore... (bug 64041)
                 for idn in os.listdir(os.path.dirname(fn)):
                     split_cache = getattr(obj, self.sub_split)
-                    if idn.isdigit() and int(idn) >= len(split_cache):
+                    if idn.isdigit() and (int(idn) >= len(split_cache) or is_packed):
                         rmrf(os.path.join(os.path.dirname(fn), idn))
             else:
 
                 logger.debug("not has_children")
 
-                safe_save(fn, obj, self.to_file, "")
+                safe_save(fn, obj, self.to_file, "", written)
                 # clean files leftover from sub_split
                 for idn in os.listdir(os.path.dirname(fn)):
                     if idn.isdigit():
                         rmrf(os.path.join(os.path.dirname(fn), idn))
+                SubJobXMLList.getContainer(os.path.dirname(fn)).remove()
+                SubJobXMLList.getStatusLog(os.path.dirname(fn)).remove()
             if this_id not in self.incomplete_objects:
                 self.index_write(this_id)
         else:
@@ -762,17 +1113,103 @@ class GangaRepositoryLocal(GangaRepository):
         Args:
             ids (list): List of integers, used as keys to objects in the self.objects dict
         """
+        self._flush_batch(ids, 1)
+
+    def flush_parallel(self, ids, n_threads):
+        """
+        flush the set of "ids" to disk as a single batch written by up to n_threads threads
+        Each object is locked by the thread writing it so the caller must not hold the locks of these objects
+        Args:
+            ids (list): List of integers, used as keys to objects in the self.objects dict
+            n_threads (int): Maximum number of threads to write the objects with
+        """
+        self._flush_batch(ids, n_threads)
+
+    def _flush_batch(self, ids, n_threads):
+        """
+        flush the set of "ids" to disk, the index store is updated and the files are synced once for the whole batch
+        Args:
+            ids (list): List of integers, used as keys to objects in the self.objects dict
+            n_threads (int): Maximum number of threads to write the objects with
+        """
         logger.debug("Flushing: %s" % ids)
 
         #import traceback
         #traceback.print_stack()
+        store_records = []
+        written = [] if self._fsync_flush else None
+        try:
+            if n_threads > 1 and len(ids) > 1:
+                self._flush_ids_parallel(ids, store_records, written, n_threads)
+            else:
+                self._flush_ids(ids, store_records, written)
+        finally:
+            self._append_index_store(store_records)
+            if self._index_store is None and ids:
+                self._mark_foreign_change()
+            if written:
+                # Sync the whole batch once rather than after each file
+                if self._index_store is not None:
+                    written.append(self._index_store.fn)
+                fsync_files(written)
+
+    def _flush_ids_parallel(self, ids, store_records, written, n_threads):
+        """
+        flush the set of "ids" to disk from a bounded number of threads
+        Every id which fails is logged and the first error, with its traceback, is raised once all of the threads
+        have finished
+        Args:
+            ids (list): List of integers, used as keys to objects in the self.objects dict
+            store_records (list): Index store records for the flushed objects are appended to this list
+            written (list): If given the names of the files written are appended to this list
+            n_threads (int): Maximum number of threads to use
+        """
+        pending = Queue.Queue()
+        for this_id in ids:
+            pending.put(this_id)
+        errors = []
+
+        def _flush_worker():
+            while True:
+                try:
+                    this_id = pending.get_nowait()
+                except Queue.Empty:
+                    return
+                try:
+                    with self.objects[this_id].const_lock:
+                        self._flush_ids([this_id], store_records, written)
+                except Exception as err:
+                    # Keep the traceback of the worker to raise the error with it
+                    errors.append((this_id, sys.exc_info()))
+
+        threads = [threading.Thread(target=_flush_worker, name='%s_flush_%s' % (self.registry.name, i)) for i in range(min(n_threads, len(ids)))]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        if errors:
+            for this_id, exc_info in errors:
+                logger.error("Failed to flush id '%s' of '%s': %s" % (this_id, self.registry.name, exc_info[1]))
+            exc_info = errors[0][1]
+            raise exc_info[0], exc_info[1], exc_info[2]
+
+    def _flush_ids(self, ids, store_records, written=None):
+        """
+        flush the set of "ids" to disk, collecting the index store records for the flushed objects
+        Args:
+            ids (list): List of integers, used as keys to objects in the self.objects dict
+            store_records (list): Index store records for the flushed objects are appended to this list
+            written (list): If given the names of the files written are appended to this list
+        """
         for this_id in ids:
             if this_id in self.incomplete_objects:
                 logger.debug("Should NEVER re-flush an incomplete object, it's now 'bad' respect this!")
                 continue
             try:
                 logger.debug("safe_flush: %s" % this_id)
-                self._safe_flush_xml(this_id)
+                self._safe_flush_xml(this_id, written)
 
                 self._cache_load_timestamp[this_id] = time.time()
                 self._cached_cls[this_id] = getName(self.objects[this_id])
@@ -785,6 +1222,9 @@ class GangaRepositoryLocal(GangaRepository):
                     logger.debug("Index write failed")
                     pass
 
+                if self._index_store is not None:
+                    store_records.append(self._make_index_store_record(this_id))
+
                 if this_id not in self._fully_loaded:
                     self._fully_loaded[this_id] = self.objects[this_id]
 
@@ -792,7 +1232,7 @@ class GangaRepositoryLocal(GangaRepository):
                 sub_attr_dirty = getattr(subobj_attr, '_dirty', False)
                 if sub_attr_dirty:
                     if hasattr(subobj_attr, 'flush'):
-                        subobj_attr.flush()
+                        subobj_attr.flush(written=written)
 
                 self.objects[this_id]._setFlushed()
 
@@ -1115,6 +1555,9 @@ class GangaRepositoryLocal(GangaRepository):
         Args:
             ids (list): The object keys which we want to iterate over from the objects dict
         """
+        self._append_index_store([IndexStore.make_del_record(this_id) for this_id in ids])
+        if self._index_store is None and ids:
+            self._mark_foreign_change()
         for this_id in ids:
             # First remove the index, so that it is gone if we later have a
             # KeyError
@@ -1187,6 +1630,9 @@ class GangaRepositoryLocal(GangaRepository):
         Args:
             obj (GangaObject): The object we want to know if it was loaded into memory
         """
+        this_id = getattr(obj, '_registry_id', None)
+        if this_id is not None and self.objects.get(this_id) is obj:
+            return self._fully_loaded.get(this_id) is obj
         try:
             _id = next(id_ for id_, o in self._fully_loaded.items() if o is obj)
             return True
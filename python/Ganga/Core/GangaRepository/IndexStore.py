@@ -0,0 +1,332 @@
+"""
+A single append-only file holding the index entries of every object in a GangaRepositoryLocal.
+
+Rather than stat-ing and unpickling one '.index' file per object on startup the repository replays
+this file in one sequential pass. Each record is framed with a magic string, the payload length and
+a crc32 checksum so that a torn write (e.g. a crash whilst appending) only costs the damaged record.
+The per-object '.index' files are still written and remain the source used to rebuild this store.
+
+As the store is only ever appended to it also acts as a journal of changes between sessions sharing a
+repository: a session remembers how far it has read and only replays the records appended since.
+Appending and rewriting hold a lock on a '.lock' file next to the store, so that records appended by
+one session can't be lost whilst another one compacts the store.
+
+A mark record holds a token chosen by the user of the store, e.g. what the store was last checked against,
+and is kept when the store is compacted.
+"""
+
+import os
+import errno
+import fcntl
+import struct
+import tempfile
+import threading
+import zlib
+from contextlib import contextmanager
+
+try:
+    import cPickle as pickle
+except:
+    import pickle
+
+from Ganga.Core.exceptions import GangaException
+from Ganga.Utility.logging import getLogger
+
+logger = getLogger()
+
+# Record types stored in the index store
+SET_RECORD = 'set'
+DEL_RECORD = 'del'
+MARK_RECORD = 'mark'
+
+
+class IndexStoreError(GangaException):
+
+    """ Raised when the index store can't be read or written """
+
+    def __init__(self, message):
+        GangaException.__init__(self, message)
+        self.message = message
+
+    def __str__(self):
+        return "IndexStoreError: %s" % self.message
+
+
+class IndexStore(object):
+
+    """
+    Append-only store of (id, category, classname, index cache, index ctime) entries.
+    Records are appended with O_APPEND so that several sessions can share the same store.
+    """
+
+    _magic = 'GIX1'
+    _header = struct.Struct('!4sIi')
+
+    __slots__ = ('fn', 'n_records', 'offset', 'inode', 'mark', '_lock')
+
+    def __init__(self, fn):
+        """
+        Args:
+            fn (str): Full path of the file backing this store
+        """
+        super(IndexStore, self).__init__()
+        self.fn = fn
+        self.n_records = 0
+        # Position up to which the store has been read and the inode it was read from
+        self.offset = 0
+        self.inode = None
+        # The token of the last mark record read, None if there is none
+        self.mark = None
+        # fcntl locks are held by the process, this serialises the threads of this session
+        self._lock = threading.Lock()
+
+    def exists(self):
+        """ Returns True if the store has been created on disk """
+        return os.path.isfile(self.fn)
+
+    @staticmethod
+    def make_set_record(this_id, category, classname, cache, ctime):
+        """
+        Construct a record which (re-)defines the index entry for this_id
+        Args:
+            this_id (int): Registry id of the object
+            category (str): Plugin category of the object
+            classname (str): Name of the class of the object
+            cache (dict): The index cache of the object
+            ctime (float): ctime of the '.index' file this entry corresponds to
+        """
+        return (SET_RECORD, this_id, category, classname, cache, ctime)
+
+    @staticmethod
+    def make_del_record(this_id):
+        """
+        Construct a record which removes the index entry for this_id
+        Args:
+            this_id (int): Registry id of the object
+        """
+        return (DEL_RECORD, this_id)
+
+    @staticmethod
+    def make_mark_record(token):
+        """
+        Construct a record which sets the mark of the store
+        Args:
+            token (object): Any picklable value
+        """
+        return (MARK_RECORD, token)
+
+    def _read_marks(self, records):
+        """ Keep the token of the last mark record among records """
+        for record in records:
+            if record[0] == MARK_RECORD:
+                self.mark = record[1]
+
+    def _encode(self, record):
+        """
+        Frame a single record ready to be written to disk
+        Args:
+            record (tuple): record as returned by make_set_record or make_del_record
+        """
+        payload = pickle.dumps(record, 2)
+        return self._header.pack(self._magic, len(payload), zlib.crc32(payload)) + payload
+
+    def read(self, offset=0):
+        """
+        Read all valid records from offset onwards.
+        Returns a list of records and the offset of the end of the last complete record
+        Damaged records are skipped by searching for the next record header
+        Args:
+            offset (int): offset in bytes from which to start reading
+        """
+        try:
+            with open(self.fn, 'rb') as fobj:
+                fobj.seek(offset)
+                data = fobj.read()
+        except IOError as err:
+            if err.errno == errno.ENOENT:
+                return [], offset
+            raise IndexStoreError("Failed to read index store %s: %s" % (self.fn, err))
+
+        records = []
+        pos = 0
+        end = 0
+        header_size = self._header.size
+        while pos + header_size <= len(data):
+            magic, length, crc = self._header.unpack_from(data, pos)
+            payload = data[pos + header_size:pos + header_size + length]
+            if magic == self._magic and len(payload) == length and zlib.crc32(payload) == crc:
+                try:
+                    records.append(pickle.loads(payload))
+                except Exception as err:
+                    logger.debug("Skipping unreadable index store record: %s" % err)
+                pos += header_size + length
+                end = pos
+                continue
+            if magic == self._magic and len(payload) < length:
+                # Incomplete tail, possibly still being written by another session
+                break
+            logger.debug("Corrupt record in index store %s at offset %s" % (self.fn, offset + pos))
+            next_pos = data.find(self._magic, pos + 1)
+            if next_pos == -1:
+                break
+            pos = next_pos
+            end = pos
+
+        return records, offset + end
+
+    def load(self):
+        """
+        Replay the whole store and return the live entries as a dict of id: (category, classname, cache, ctime)
+        Returns None if the store doesn't exist
+        """
+        try:
+            inode = os.stat(self.fn).st_ino
+        except OSError:
+            return None
+        records, offset = self.read()
+        entries = {}
+        self.apply(records, entries)
+        self.mark = None
+        self._read_marks(records)
+        self.n_records = len(records)
+        self.offset = offset
+        self.inode = inode
+        return entries
+
+    def read_changes(self):
+        """
+        Read the records which have been appended since the store was last loaded or read.
+        Returns None if the store has been removed or replaced (e.g. compacted by another session)
+        since then, in which case it has to be loaded again
+        """
+        try:
+            stat = os.stat(self.fn)
+        except OSError:
+            return None
+        if self.inode is None or stat.st_ino != self.inode or stat.st_size < self.offset:
+            return None
+        if stat.st_size == self.offset:
+            return []
+        records, self.offset = self.read(self.offset)
+        self._read_marks(records)
+        self.n_records += len(records)
+        return records
+
+    @staticmethod
+    def apply(records, entries):
+        """
+        Apply records to a dict of entries as returned by load
+        Args:
+            records (list): records as returned by read
+            entries (dict): dict of id: (category, classname, cache, ctime) which is updated in place
+        """
+        for record in records:
+            if record[0] == SET_RECORD:
+                entries[record[1]] = tuple(record[2:])
+            elif record[0] == DEL_RECORD:
+                entries.pop(record[1], None)
+
+    @contextmanager
+    def locked(self):
+        """
+        Hold the lock which serialises appending to the store with rewriting it, across sessions.
+        If the filesystem doesn't support locking the store is used without it
+        """
+        with self._lock:
+            fd = None
+            try:
+                dirname = os.path.dirname(self.fn)
+                if not os.path.isdir(dirname):
+                    os.makedirs(dirname)
+                fd = os.open(self.fn + '.lock', os.O_RDWR | os.O_CREAT, 0o644)
+                fcntl.lockf(fd, fcntl.LOCK_EX)
+            except (IOError, OSError) as err:
+                logger.debug("Using index store %s without locking it: %s" % (self.fn, err))
+                if fd is not None:
+                    os.close(fd)
+                    fd = None
+            try:
+                yield
+            finally:
+                if fd is not None:
+                    try:
+                        fcntl.lockf(fd, fcntl.LOCK_UN)
+                    finally:
+                        os.close(fd)
+
+    def append(self, records):
+        """
+        Append records to the store in a single write
+        Args:
+            records (list): records as returned by make_set_record or make_del_record
+        """
+        if not records:
+            return
+        data = ''.join(self._encode(record) for record in records)
+        with self.locked():
+            try:
+                fd = os.open(self.fn, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    os.write(fd, data)
+                finally:
+                    os.close(fd)
+            except OSError as err:
+                raise IndexStoreError("Failed to append to index store %s: %s" % (self.fn, err))
+        self.n_records += len(records)
+
+    def rewrite(self, entries, mark=None):
+        """
+        Atomically replace the store with one record per live entry
+        Args:
+            entries (dict): dict of id: (category, classname, cache, ctime)
+            mark (object): The token of the mark of the new store, no mark if None
+        """
+        with self.locked():
+            self._rewrite(entries, mark)
+
+    def compact(self):
+        """
+        Replace the store with one record per live entry, returns the number of entries or None if there is no store.
+        The records are read and the store replaced whilst holding the lock, so no record appended by another session
+        is lost
+        """
+        with self.locked():
+            entries = self.load()
+            if entries is not None:
+                self._rewrite(entries, self.mark)
+        return None if entries is None else len(entries)
+
+    def _rewrite(self, entries, mark=None):
+        """ Replace the store, the lock must be held """
+        records = [self.make_set_record(this_id, *entry) for this_id, entry in sorted(entries.items())]
+        if mark is not None:
+            records.insert(0, self.make_mark_record(mark))
+        new_name = None
+        try:
+            # A unique name in the same directory, so that the rename is atomic and sessions don't share it
+            fd, new_name = tempfile.mkstemp(prefix=os.path.basename(self.fn) + '.', suffix='.new', dir=os.path.dirname(self.fn))
+            with os.fdopen(fd, 'wb') as fobj:
+                fobj.write(''.join(self._encode(record) for record in records))
+                fobj.flush()
+                os.fsync(fobj.fileno())
+            os.chmod(new_name, 0o644)
+            os.rename(new_name, self.fn)
+            new_name = None
+            stat = os.stat(self.fn)
+        except (IOError, OSError) as err:
+            raise IndexStoreError("Failed to rewrite index store %s: %s" % (self.fn, err))
+        finally:
+            if new_name is not None and os.path.exists(new_name):
+                os.remove(new_name)
+        self.n_records = len(records)
+        self.offset = stat.st_size
+        self.inode = stat.st_ino
+        self.mark = mark
+
+    def needs_compacting(self, n_entries):
+        """
+        Returns True when most of the records in the store have been superseded
+        Args:
+            n_entries (int): number of live entries in the store
+        """
+        return self.n_records > 2 * n_entries + 100
@@ -1,6 +1,7 @@
 from __future__ import division
 
 import functools
+from contextlib import nested
 from Ganga.Utility.logging import getLogger
 
 from Ganga.Core.exceptions import (GangaException,
@@ -92,7 +93,7 @@ def makeRepository(registry):
     Args:
         registry (Registry): This maps the Registry type to the correct Repository
     """
-    if registry.type in ["LocalXML", "LocalPickle"]:
+    if registry.type in ["LocalXML", "LocalPickle", "LocalBinary"]:
         from Ganga.Core.GangaRepository.GangaRepositoryXML import GangaRepositoryLocal
         return GangaRepositoryLocal(registry)
     elif registry.type in ["SQLite"]:
@@ -279,7 +280,7 @@ class Registry(object):
     Base class providing a dict-like locked and lazy-loading interface to a Ganga repository
     """
 
-    __slots__ = ('name', 'doc', '_hasStarted', '_needs_metadata', 'metadata', '_read_lock', '_flush_lock', '_parent', 'repository', '_objects', '_incomplete_objects', 'flush_thread', 'type', 'location')
+    __slots__ = ('name', 'doc', '_hasStarted', '_needs_metadata', 'metadata', '_read_lock', '_flush_lock', '_parent', 'repository', '_objects', '_incomplete_objects', 'flush_thread', '_flush_metrics', 'type', 'location')
 
     def __init__(self, name, doc):
         """Registry constructor, giving public name and documentation
@@ -302,6 +303,7 @@ class Registry(object):
         self._incomplete_objects = None
 
         self.flush_thread = None
+        self._flush_metrics = {'batches': 0, 'objects': 0, 'seconds': 0.}
 
     def hasStarted(self):
         """
@@ -398,6 +400,10 @@ class Registry(object):
         Args:
             _obj (GangaObject): This is the object we want to match in the objects repo
         """
+        # Objects in the registry know their own id
+        this_id = getattr(obj, '_registry_id', None)
+        if this_id is not None and self._objects.get(this_id) is obj:
+            return this_id
         try:
             return next(id_ for id_, o in self._objects.items() if o is obj)
         except StopIteration:
@@ -486,7 +492,6 @@ class Registry(object):
             logger.debug('deleting the object %d from the registry %s', this_id, self.name)
             self.repository.delete([this_id])
 
-    @synchronised_flush_lock
     def _flush(self, objs):
         """
         Flush a set of objects to the persistency layer immediately
@@ -502,9 +507,22 @@ class Registry(object):
         if not isType(objs, (list, tuple, GangaList)):
             objs = [objs]
 
+        self._flush_batch(objs, 1)
+
+    @synchronised_flush_lock
+    def _flush_batch(self, objs, n_threads):
+        """
+        Flush the dirty objects among objs to the persistency layer as a single batch.
+        Each object is only written once however many times it appears in objs.
+
+        Args:
+            objs (list): a list of objects to flush
+            n_threads (int): the maximum number of threads the repository may write the objects with
+        """
         if self.hasStarted() is not True:
             raise RegistryAccessError("Cannot flush to a disconnected repository!")
 
+        to_flush = {}
         for obj in objs:
             # check if the object is dirty, if not do nothing
             if not obj._dirty:
@@ -513,20 +531,46 @@ class Registry(object):
             if not self.has_loaded(obj):
                 continue
 
-            with obj.const_lock:
-                # flush the object
-                obj_id = self.find(obj)
-                self.repository.flush([obj_id])
-                obj._setFlushed()
+            to_flush[self.find(obj)] = obj
+
+        if not to_flush:
+            return
+
+        ids = sorted(to_flush)
+        t0 = time.time()
+        if n_threads > 1 and len(ids) > 1:
+            # The repository locks each object in the thread writing it and marks it flushed under that lock
+            self.repository.flush_parallel(ids, n_threads)
+        else:
+            with nested(*[to_flush[this_id].const_lock for this_id in ids]):
+                self.repository.flush(ids)
+                # Whilst still locked, so that no change made after the write is marked as flushed
+                for this_id in ids:
+                    to_flush[this_id]._setFlushed()
+        t1 = time.time()
+
+        self._flush_metrics['batches'] += 1
+        self._flush_metrics['objects'] += len(ids)
+        self._flush_metrics['seconds'] += t1 - t0
+        logger.debug("Flushed %s objects of registry '%s' in %.3f sec" % (len(ids), self.name, t1 - t0))
+
+    def getFlushMetrics(self):
+        """
+        Returns a dict of the number of batches and objects flushed since startup, the time spent flushing them
+        and the resulting rate of objects flushed per second
+        """
+        metrics = dict(self._flush_metrics)
+        metrics['objects_per_second'] = metrics['objects'] / metrics['seconds'] if metrics['seconds'] > 0 else 0.
+        return metrics
 
     def flush_all(self):
         """
         This will attempt to flush all the jobs in the registry.
-        It does this via ``_flush`` so the same conditions apply.
+        The dirty objects are written as one batch, with the same conditions as ``_flush``,
+        by as many threads as the Registry FlushThreads option allows.
         """
         if self.hasStarted():
-            for _obj in self.values():
-                self._flush(_obj)
+            self._flush_batch(self.values(), getConfig('Registry')['FlushThreads'])
 
         if self.metadata and self.metadata.hasStarted():
             self.metadata.flush_all()
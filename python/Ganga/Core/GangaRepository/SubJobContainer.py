@@ -0,0 +1,296 @@
+"""
+A single container file holding the data files of all of the subjobs of a job.
+
+This replaces the '<job>/<i>/data' and 'data~' files of each subjob when the packed layout is used.
+Each subjob's data is stored as a record framed with a magic string, the subjob index, the length and a crc32
+checksum. Records are only ever appended, an offset table (itself stored as a record) maps each subjob index
+to its current record and to its previous record, which takes the place of the 'data~' backup.
+The header at the start of the file points at the current offset table and is the only part of the file
+which is overwritten in place, so an interrupted write leaves the previous state of the container intact.
+Superseded records are dropped when the container is compacted.
+"""
+
+import os
+import errno
+import struct
+import zlib
+
+from Ganga.Core.exceptions import GangaException
+from Ganga.Utility.logging import getLogger
+
+logger = getLogger()
+
+
+class SubJobContainerError(GangaException):
+
+    """ Raised when the subjob container can't be read or written """
+
+    def __init__(self, message):
+        GangaException.__init__(self, message)
+        self.message = message
+
+    def __str__(self):
+        return "SubJobContainerError: %s" % self.message
+
+
+class SubJobContainer(object):
+
+    """
+    Container file of subjob data indexed by subjob number.
+    The offset table is cached and only read again when the file has been changed on disk.
+    """
+
+    _magic = 'GSJP'
+    _record_magic = 'GSJR'
+    # magic, offset of the offset table
+    _header = struct.Struct('!4sQ')
+    # magic, subjob index, length of the payload, crc32 of the payload
+    _record_header = struct.Struct('!4sIIi')
+    # offset and length of the current record, offset and length of the previous record
+    _entry = struct.Struct('!QIQI')
+    # subjob index used for the records holding the offset table
+    _table_index = 0xffffffff
+
+    __slots__ = ('fn', '_table', '_table_key')
+
+    def __init__(self, fn):
+        """
+        Args:
+            fn (str): Full path of the container file
+        """
+        super(SubJobContainer, self).__init__()
+        self.fn = fn
+        self._table = []
+        self._table_key = None
+
+    def exists(self):
+        """ Returns True if the container has been created on disk """
+        return os.path.isfile(self.fn)
+
+    def __len__(self):
+        """ Number of subjobs in the container, 0 if it doesn't exist """
+        return len(self._read_table())
+
+    def _frame(self, index, payload):
+        """
+        Frame a single record ready to be written to disk
+        Args:
+            index (int): index of the subjob or _table_index
+            payload (str): the data to be stored
+        """
+        return self._record_header.pack(self._record_magic, index, len(payload), zlib.crc32(payload)) + payload
+
+    def _pack_table(self, entries):
+        return ''.join(self._entry.pack(*entry) for entry in entries)
+
+    def _unpack_table(self, payload):
+        size = self._entry.size
+        return [self._entry.unpack_from(payload, pos) for pos in xrange(0, len(payload), size)]
+
+    def _read_record(self, fobj, offset, length, index):
+        """
+        Read and check the record at offset, returns None if it's damaged
+        Args:
+            fobj (file): the open container
+            offset (int): offset of the record header
+            length (int): expected length of the payload
+            index (int): expected index of the record
+        """
+        fobj.seek(offset)
+        data = fobj.read(self._record_header.size + length)
+        if len(data) != self._record_header.size + length:
+            return None
+        magic, record_index, record_length, crc = self._record_header.unpack_from(data)
+        payload = data[self._record_header.size:]
+        if magic != self._record_magic or record_index != index or record_length != length or zlib.crc32(payload) != crc:
+            return None
+        return payload
+
+    def _read_table(self):
+        """ Return the offset table, re-reading it only if the container has changed on disk """
+        try:
+            stat = os.stat(self.fn)
+        except OSError:
+            self._table = []
+            self._table_key = None
+            return self._table
+        key = (stat.st_ino, stat.st_size, stat.st_mtime)
+        if key == self._table_key:
+            return self._table
+
+        try:
+            with open(self.fn, 'rb') as fobj:
+                header = fobj.read(self._header.size)
+                if len(header) != self._header.size:
+                    raise SubJobContainerError("Subjob container %s is truncated" % self.fn)
+                magic, table_offset = self._header.unpack(header)
+                if magic != self._magic:
+                    raise SubJobContainerError("%s is not a subjob container" % self.fn)
+                fobj.seek(table_offset)
+                table_header = fobj.read(self._record_header.size)
+                table_length = None
+                if len(table_header) == self._record_header.size:
+                    table_length = self._record_header.unpack(table_header)[2]
+                payload = None
+                if table_length is not None:
+                    payload = self._read_record(fobj, table_offset, table_length, self._table_index)
+        except IOError as err:
+            raise SubJobContainerError("Failed to read subjob container %s: %s" % (self.fn, err))
+
+        if payload is None:
+            logger.warning("Offset table of subjob container %s is damaged, rebuilding it" % self.fn)
+            table = self._scan()
+        else:
+            table = self._unpack_table(payload)
+
+        self._table = table
+        self._table_key = key
+        return table
+
+    def _scan(self):
+        """ Rebuild the offset table by reading every record in the container """
+        with open(self.fn, 'rb') as fobj:
+            data = fobj.read()
+        table = []
+        pos = self._header.size
+        header_size = self._record_header.size
+        while pos + header_size <= len(data):
+            magic, index, length, crc = self._record_header.unpack_from(data, pos)
+            payload = data[pos + header_size:pos + header_size + length]
+            if magic == self._record_magic and len(payload) == length and zlib.crc32(payload) == crc:
+                if index != self._table_index:
+                    if index >= len(table):
+                        table.extend([(0, 0, 0, 0)] * (index + 1 - len(table)))
+                    table[index] = (pos, length, table[index][0], table[index][1])
+                pos += header_size + length
+                continue
+            next_pos = data.find(self._record_magic, pos + 1)
+            if next_pos == -1:
+                break
+            pos = next_pos
+        return table
+
+    def read(self, index, backup=False):
+        """
+        Return the data stored for a subjob
+        Args:
+            index (int): index of the subjob
+            backup (bool): return the data the subjob had before it was last written rather than the current data
+        """
+        table = self._read_table()
+        if index < 0 or index >= len(table):
+            raise SubJobContainerError("Subjob %s not found in %s" % (index, self.fn))
+        entry = table[index]
+        offset, length = (entry[2], entry[3]) if backup else (entry[0], entry[1])
+        if offset == 0:
+            raise SubJobContainerError("No %sdata for subjob %s in %s" % ('backup ' if backup else '', index, self.fn))
+        try:
+            with open(self.fn, 'rb') as fobj:
+                payload = self._read_record(fobj, offset, length, index)
+        except IOError as err:
+            raise SubJobContainerError("Failed to read subjob %s from %s: %s" % (index, self.fn, err))
+        if payload is None:
+            raise SubJobContainerError("Data for subjob %s in %s is damaged" % (index, self.fn))
+        return payload
+
+    def write(self, payloads):
+        """
+        Store new data for some of the subjobs, only these records are written
+        Args:
+            payloads (dict): dict of subjob index: data
+        """
+        if not payloads:
+            return
+        if not self.exists():
+            self.rewrite([])
+
+        table = list(self._read_table())
+        try:
+            with open(self.fn, 'r+b') as fobj:
+                fobj.seek(0, os.SEEK_END)
+                pos = fobj.tell()
+                chunks = []
+                for index in sorted(payloads):
+                    if index >= len(table):
+                        table.extend([(0, 0, 0, 0)] * (index + 1 - len(table)))
+                    record = self._frame(index, payloads[index])
+                    table[index] = (pos, len(payloads[index]), table[index][0], table[index][1])
+                    chunks.append(record)
+                    pos += len(record)
+                chunks.append(self._frame(self._table_index, self._pack_table(table)))
+                fobj.write(''.join(chunks))
+                fobj.flush()
+                # Only point at the new table once it's completely written
+                fobj.seek(0)
+                fobj.write(self._header.pack(self._magic, pos))
+        except IOError as err:
+            raise SubJobContainerError("Failed to write to subjob container %s: %s" % (self.fn, err))
+
+        self._table_key = None
+        if self.needs_compacting(table):
+            self.compact()
+
+    def rewrite(self, payloads):
+        """
+        Atomically replace the container with one holding only the given data
+        Args:
+            payloads (list): data for each subjob in order of their index
+        """
+        new_name = self.fn + '.new'
+        table = []
+        chunks = []
+        pos = self._header.size
+        for index, payload in enumerate(payloads):
+            record = self._frame(index, payload)
+            table.append((pos, len(payload), 0, 0))
+            chunks.append(record)
+            pos += len(record)
+        chunks.append(self._frame(self._table_index, self._pack_table(table)))
+        try:
+            with open(new_name, 'wb') as fobj:
+                fobj.write(self._header.pack(self._magic, pos))
+                fobj.write(''.join(chunks))
+            os.rename(new_name, self.fn)
+        except (IOError, OSError) as err:
+            raise SubJobContainerError("Failed to write subjob container %s: %s" % (self.fn, err))
+        self._table_key = None
+
+    def needs_compacting(self, table=None):
+        """
+        Returns True when most of the container is taken up by superseded records
+        Args:
+            table (list): offset table of the container, read from disk if not given
+        """
+        if table is None:
+            table = self._read_table()
+        try:
+            size = os.stat(self.fn).st_size
+        except OSError:
+            return False
+        live = self._header.size + (len(table) + 1) * self._record_header.size + len(table) * self._entry.size
+        for entry in table:
+            live += entry[1] + entry[3] + (self._record_header.size if entry[2] else 0)
+        return size > 2 * live + 1024 * 1024
+
+    def compact(self):
+        """ Rewrite the container dropping all superseded records and offset tables """
+        logger.debug("Compacting subjob container %s" % self.fn)
+        self.rewrite([self.read(i) for i in range(len(self))])
+
+    def truncate(self, n_subjobs):
+        """
+        Drop the subjobs with an index of n_subjobs or more
+        Args:
+            n_subjobs (int): number of subjobs to keep
+        """
+        self.rewrite([self.read(i) for i in range(min(n_subjobs, len(self)))])
+
+    def remove(self):
+        """ Remove the container from disk """
+        try:
+            os.unlink(self.fn)
+        except OSError as err:
+            if err.errno != errno.ENOENT:
+                raise SubJobContainerError("Failed to remove subjob container %s: %s" % (self.fn, err))
+        self._table = []
+        self._table_key = None
@@ -0,0 +1,264 @@
+"""
+An append-only log of the status changes of the subjobs of a job.
+
+Moving a subjob between states such as 'running' and 'completing' only changes its status and a few timestamps.
+Rather than rewriting the whole data file of the subjob and the subjob index, the change is recorded as one short
+line in '<job>/subjobs.status' and is applied on top of the subjob data and the subjob index when they're read.
+The entries of a subjob are dropped once the subjob has been written to disk in full.
+
+Each line holds the subjob index, the new status, the time the line was written and the timestamps which changed:
+    3 running @1451649600.000000 running=2016-01-01T12:00:00.000000 backend_running=2016-01-01T11:59:58.000000
+A line which wasn't completely written is ignored. Lines written by older versions have no '@' time.
+
+Appending and rewriting the log hold an exclusive flock on it. The log is only ever replaced by renaming a new file
+over it, so a writer which was waiting for the lock checks that it still holds the file at the path of the log.
+"""
+
+import os
+import errno
+import fcntl
+import datetime
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+
+from Ganga.Core.exceptions import GangaException
+from Ganga.Utility.logging import getLogger
+
+logger = getLogger()
+
+_time_format = '%Y-%m-%dT%H:%M:%S.%f'
+
+
+class SubJobStatusLogError(GangaException):
+
+    """ Raised when the subjob status log can't be written """
+
+    def __init__(self, message):
+        GangaException.__init__(self, message)
+        self.message = message
+
+    def __str__(self):
+        return "SubJobStatusLogError: %s" % self.message
+
+
+class SubJobStatusLog(object):
+
+    """
+    Log of the status changes of the subjobs of a job indexed by subjob number.
+    The log is read incrementally, only lines appended since it was last read are parsed.
+    """
+
+    __slots__ = ('fn', '_entries', '_offset', '_inode', '_lock')
+
+    def __init__(self, fn):
+        """
+        Args:
+            fn (str): Full path of the log file
+        """
+        super(SubJobStatusLog, self).__init__()
+        self.fn = fn
+        self._entries = {}
+        self._offset = 0
+        self._inode = None
+        # flock only excludes other open files, this lock also guards the entries within the process
+        self._lock = threading.RLock()
+
+    def exists(self):
+        """ Returns True if the log has been created on disk """
+        return os.path.isfile(self.fn)
+
+    @staticmethod
+    def _format(index, status, timestamps, logged):
+        """
+        Format a single line of the log
+        Args:
+            index (int): index of the subjob
+            status (str): new status of the subjob
+            timestamps (dict): dict of timestamp name: datetime which changed along with the status
+            logged (float): time.time() the change was recorded at
+        """
+        fields = [str(index), status, '@%.6f' % logged]
+        for name in sorted(timestamps):
+            fields.append('%s=%s' % (name, timestamps[name].strftime(_time_format)))
+        return ' '.join(fields) + '\n'
+
+    def _parse(self, line):
+        """
+        Apply a single line of the log to the entries
+        Args:
+            line (str): line of the log without the trailing newline
+        """
+        try:
+            fields = line.split(' ')
+            index = int(fields[0])
+            status = fields[1]
+            logged = 0.
+            timestamps = {}
+            for field in fields[2:]:
+                if field.startswith('@'):
+                    logged = float(field[1:])
+                    continue
+                name, value = field.split('=', 1)
+                timestamps[name] = datetime.datetime.strptime(value, _time_format)
+        except (IndexError, ValueError) as err:
+            logger.debug("Ignoring damaged line in subjob status log %s: %s" % (self.fn, err))
+            return
+        if index in self._entries:
+            self._entries[index][1].update(timestamps)
+            self._entries[index] = (status, self._entries[index][1], max(logged, self._entries[index][2]))
+        else:
+            self._entries[index] = (status, timestamps, logged)
+
+    @contextmanager
+    def _locked(self):
+        """ Hold the log open for appending under an exclusive flock, creating it if needed """
+        with self._lock:
+            while True:
+                fobj = open(self.fn, 'a')
+                try:
+                    fcntl.flock(fobj.fileno(), fcntl.LOCK_EX)
+                    try:
+                        current = os.fstat(fobj.fileno()).st_ino == os.stat(self.fn).st_ino
+                    except OSError:
+                        current = False
+                except:
+                    fobj.close()
+                    raise
+                if current:
+                    break
+                # The log was replaced or removed while waiting for the lock
+                fobj.close()
+            try:
+                yield fobj
+            finally:
+                fobj.close()
+
+    def read(self):
+        """ Return a dict of subjob index: (status, dict of timestamps, time logged) holding the latest state recorded for each subjob """
+        with self._lock:
+            return self._read()
+
+    def _read(self):
+        """ read() without taking the lock """
+        try:
+            stat = os.stat(self.fn)
+        except OSError:
+            self._reset()
+            return self._entries
+
+        if stat.st_ino != self._inode or stat.st_size < self._offset:
+            # The log has been rewritten, start again
+            self._entries = {}
+            self._offset = 0
+            self._inode = stat.st_ino
+
+        if stat.st_size == self._offset:
+            return self._entries
+
+        try:
+            with open(self.fn, 'r') as fobj:
+                fobj.seek(self._offset)
+                data = fobj.read()
+        except IOError as err:
+            logger.debug("Failed to read subjob status log %s: %s" % (self.fn, err))
+            return self._entries
+
+        # Only consume complete lines, a partially written line is read again once it's complete
+        end = data.rfind('\n') + 1
+        for line in data[:end].splitlines():
+            if line:
+                self._parse(line)
+        self._offset += end
+        return self._entries
+
+    def append(self, index, status, timestamps):
+        """
+        Record a status change of a subjob
+        Args:
+            index (int): index of the subjob
+            status (str): new status of the subjob
+            timestamps (dict): dict of timestamp name: datetime which changed along with the status
+        """
+        try:
+            with self._locked() as fobj:
+                fobj.write(self._format(index, status, timestamps, time.time()))
+        except (IOError, OSError) as err:
+            raise SubJobStatusLogError("Failed to write to subjob status log %s: %s" % (self.fn, err))
+
+    def discard(self, indices, before=None):
+        """
+        Drop the entries of subjobs which have since been written to disk in full
+        Args:
+            indices (list): indices of the subjobs which have been written
+            before (float): Only drop entries last logged before this time.time(), i.e. before the subjobs were written
+        """
+        indices = set(indices)
+        with self._lock:
+            if not self.exists():
+                self._reset()
+                return
+            try:
+                with self._locked() as fobj:
+                    # Take in the lines appended since the last read, another session may have appended to the log
+                    entries = self._read()
+                    remaining = dict((index, entry) for index, entry in entries.iteritems()
+                                     if index not in indices or (before is not None and entry[2] >= before))
+                    if len(remaining) == len(entries):
+                        return
+                    if not remaining:
+                        self._remove()
+                        return
+                    self._rewrite(remaining)
+            except (IOError, OSError) as err:
+                raise SubJobStatusLogError("Failed to rewrite subjob status log %s: %s" % (self.fn, err))
+
+    def _rewrite(self, entries):
+        """
+        Replace the log with one line per subjob, the caller holds the lock
+        Args:
+            entries (dict): dict of subjob index: (status, dict of timestamps, time logged)
+        """
+        dirname, basename = os.path.split(self.fn)
+        fd, new_name = tempfile.mkstemp(prefix=basename + '.', suffix='.new', dir=dirname)
+        try:
+            with os.fdopen(fd, 'w') as fobj:
+                for index in sorted(entries):
+                    fobj.write(self._format(index, *entries[index]))
+            os.chmod(new_name, 0o644)
+            os.rename(new_name, self.fn)
+        except:
+            try:
+                os.unlink(new_name)
+            except OSError:
+                pass
+            raise
+        self._inode = None
+
+    def remove(self):
+        """ Remove the log from disk """
+        with self._lock:
+            if not self.exists():
+                self._reset()
+                return
+            try:
+                with self._locked():
+                    self._remove()
+            except (IOError, OSError) as err:
+                raise SubJobStatusLogError("Failed to remove subjob status log %s: %s" % (self.fn, err))
+
+    def _remove(self):
+        """ remove() without taking the lock """
+        try:
+            os.unlink(self.fn)
+        except OSError as err:
+            if err.errno != errno.ENOENT:
+                raise SubJobStatusLogError("Failed to remove subjob status log %s: %s" % (self.fn, err))
+        self._reset()
+
+    def _reset(self):
+        """ Forget everything read from the log """
+        self._entries = {}
+        self._offset = 0
+        self._inode = None
@@ -5,11 +5,17 @@ from Ganga.Core.GangaRepository.GangaRepository import RepositoryError
 from Ganga.Core.exceptions import GangaException
 from Ganga.GPIDev.Base.Proxy import stripProxy
 from Ganga.Core.GangaRepository.VStreamer import XMLFileError
+from Ganga.Core.GangaRepository.SubJobContainer import SubJobContainer, SubJobContainerError
+from Ganga.Core.GangaRepository.SubJobStatusLog import SubJobStatusLog, SubJobStatusLogError
+from Ganga.Utility.Config import getConfig
+import datetime
 import errno
 import copy
 import threading
 import shutil
+import time
 from os import listdir, path, stat
+from cStringIO import StringIO
 
 logger = getLogger()
 
@@ -71,9 +77,21 @@ class SubJobXMLList(GangaObject):
 
         self._subjob_master_index_name = "subjobs.idx"
 
+        # Container holding all of the subjobs when they're stored in the packed layout
+        self._container = None
+        # Log of the status changes not yet written to the data of the subjobs
+        self._status_log = None
+        # Timing of the subjobs stored in the index, see JobTimeAggregate
+        self._timeAggregate = None
+
         if jobDirectory == '' and registry is None:
             return
 
+        container = SubJobXMLList.getContainer(jobDirectory)
+        if container.exists():
+            self._container = container
+        self._status_log = SubJobXMLList.getStatusLog(jobDirectory)
+
         self._subjobIndexData = {}
         if parent:
             self._setParent(parent)
@@ -101,6 +119,9 @@ class SubJobXMLList(GangaObject):
         obj._load_backup = copy.deepcopy(self._load_backup, memo)
         obj._cached_filenames = copy.deepcopy(self._cached_filenames, memo)
         obj._stored_len = copy.deepcopy(self._stored_len, memo)
+        obj._container = self._container
+        obj._status_log = self._status_log
+        obj._timeAggregate = None
 
         ## Manually define unsafe/uncopyable objects
         obj._definedParent = None
@@ -114,6 +135,10 @@ class SubJobXMLList(GangaObject):
         """
         self._cachedJobs = obj
 
+    def isPacked(self):
+        """Are the subjobs stored in a single container file rather than a directory each? True/False"""
+        return self._container is not None
+
     def isLoaded(self, subjob_id):
         """Has the subjob been loaded? True/False
         Args:
@@ -139,6 +164,13 @@ class SubJobXMLList(GangaObject):
                 if self._subjobIndexData is None:
                     self._subjobIndexData = {}
                 else:
+                    self._timeAggregate = self.__readTimeAggregate(index_file_obj)
+                    # Status changes recorded since the index was written
+                    for subjob_id, (status, timestamps, _logged) in self._status_log.read().iteritems():
+                        if self._subjobIndexData.get(subjob_id) is not None:
+                            self._subjobIndexData[subjob_id]['status'] = status
+                        if self._timeAggregate is not None:
+                            self._timeAggregate.update(subjob_id, status, timestamps)
                     for subjob_id in self._subjobIndexData:
                         index_data = self._subjobIndexData.get(subjob_id)
                         ## CANNOT PERFORM REASONABLE DISK CHECKING ON AFS
@@ -175,6 +207,26 @@ class SubJobXMLList(GangaObject):
             self._setDirty()
         return
 
+    def __readTimeAggregate(self, index_file_obj):
+        """Read the timing of the subjobs which follows their index data in the index file, None if it isn't there
+        Args:
+            index_file_obj (file): The index file, positioned after the index data
+        """
+        from Ganga.Core.GangaRepository.PickleStreamer import from_file
+        from Ganga.GPIDev.Lib.Job.JobTimeAggregate import JobTimeAggregate
+        try:
+            return JobTimeAggregate.fromDict(from_file(index_file_obj)[0])
+        except EOFError:
+            # an index written before the timing was stored
+            return None
+        except Exception as err:
+            logger.debug("Cannot read the timing of the subjobs: %s" % err)
+            return None
+
+    def getTimeAggregate(self):
+        """Return the JobTimeAggregate of the subjobs read from the index, None if the index doesn't hold one"""
+        return self._timeAggregate
+
     def write_subJobIndex(self, ignore_disk=False):
         """interface for writing the index which captures errors and alerts the user vs throwing uncaught exception
         Args:
@@ -203,27 +255,41 @@ class SubJobXMLList(GangaObject):
             if sj_id in self._cachedJobs:
                 this_cache = self._registry.getIndexCache(self.__getitem__(sj_id))
                 all_caches[sj_id] = this_cache
-                disk_location = self.__get_dataFile(sj_id)
-                all_caches[sj_id]['modified'] = stat(disk_location).st_ctime
+                all_caches[sj_id]['modified'] = self._getModifiedTime(sj_id)
             else:
                 if sj_id in self._subjobIndexData:
                     all_caches[sj_id] = self._subjobIndexData[sj_id]
                 else:
                     this_cache = self._registry.getIndexCache(self.__getitem__(sj_id))
                     all_caches[sj_id] = this_cache
-                    disk_location = self.__get_dataFile(sj_id)
-                    all_caches[sj_id]['modified'] = stat(disk_location).st_ctime
+                    all_caches[sj_id]['modified'] = self._getModifiedTime(sj_id)
 
         try:
             from Ganga.Core.GangaRepository.PickleStreamer import to_file
             index_file = path.join(self._jobDirectory, self._subjob_master_index_name)
             index_file_obj = open(index_file, "w")
             to_file(all_caches, index_file_obj)
+            # The timing of the subjobs follows their index data, readers of the index data alone ignore it
+            master_time = getattr(self._definedParent, 'time', None)
+            if getattr(master_time, '_aggregate', None) is not None:
+                self._timeAggregate = master_time._aggregate
+            if self._timeAggregate is not None:
+                to_file(self._timeAggregate.toDict(), index_file_obj)
             index_file_obj.close()
+            self._subjobIndexData = all_caches
         ## Once I work out what the other exceptions here are I'll add them
         except (IOError,) as err:
             logger.debug("cache write error: %s" % err)
 
+    def _getModifiedTime(self, index):
+        """Get the time the data of a subjob was last changed on disk
+        Args:
+            index (int): This is the index of the subjob we're interested in
+        """
+        if self._container is not None:
+            return stat(self._container.fn).st_ctime
+        return stat(self.__get_dataFile(index)).st_ctime
+
     def __iter__(self):
         """Return iterator for this class"""
         return SJXLIterator(self)
@@ -251,6 +317,10 @@ class SubJobXMLList(GangaObject):
 
     def __len__(self):
         """ return length or lookup the last modified time compare against self._stored_len[0] and if nothings changed return self._stored_len[1]"""
+        if self._container is not None:
+            # The container only re-reads its offset table if the file has changed
+            return len(self._container)
+
         try:
             this_time = stat(self._jobDirectory).st_ctime
         except OSError:
@@ -314,6 +384,14 @@ class SubJobXMLList(GangaObject):
             fqid = "unknown"
         return fqid
 
+    def _getStreamer(self):
+        """Return the to_file and from_file methods used for the subjob data files, these are binary in a LocalBinary repository and XML otherwise"""
+        if 'Binary' in getattr(self._registry, 'type', ''):
+            from Ganga.Core.GangaRepository.BinaryStreamer import to_file, from_file
+        else:
+            from Ganga.Core.GangaRepository.VStreamer import to_file, from_file
+        return to_file, from_file
+
     def _loadSubJobFromDisk(self, subjob_data):
         """Load the subjob file 'subjob_data' from disk. No Parsing
         Args:
@@ -372,47 +450,15 @@ class SubJobXMLList(GangaObject):
                 if index in self._cachedJobs:
                     return self._cachedJobs[index]
 
-                has_loaded_backup = False
-
                 # Now try to load the subjob
                 if len(self) < index:
                     raise GangaException("Subjob: %s does NOT exist" % index)
-                subjob_data = self.__get_dataFile(str(index))
-                try:
-                    sj_file = self._loadSubJobFromDisk(subjob_data)
-                except (XMLFileError, IOError) as x:
-                    logger.warning("Error loading XML file: %s" % x)
-                    try:
-                        logger.debug("Loading subjob #%s for job #%s from disk, recent changes may be lost" % (index, self.getMasterID()))
-                        subjob_data = self.__get_dataFile(str(index), True)
-                        sj_file = self._loadSubJobFromDisk(subjob_data)
-                        has_loaded_backup = True
-                    except (IOError, XMLFileError) as err:
-                        logger.debug("Error loading subjob XML:\n%s" % err)
-
-                        if isinstance(x, IOError) and x.errno == errno.ENOENT:
-                            raise IOError("Subobject %s not found: %s" % (index, x))
-                        else:
-                            raise RepositoryError(self,"IOError on loading subobject %s: %s" % (index, x))
-
-                from Ganga.Core.GangaRepository.VStreamer import from_file
-
-                # load the subobject into a temporary object
-                try:
-                    loaded_sj = from_file(sj_file)[0]
-                except (IOError, XMLFileError) as err:
-
-                    try:
-                        logger.warning("Loading subjob #%s for job #%s from backup, recent changes may be lost" % (index, self.getMasterID()))
-                        subjob_data = self.__get_dataFile(str(index), True)
-                        sj_file = self._loadSubJobFromDisk(subjob_data)
-                        loaded_sj = from_file(sj_file)[0]
-                        has_loaded_backup = True
-                    except (IOError, XMLFileError) as err:
-                        logger.debug("Failed to Load XML for job: %s using: %s" % (index, subjob_data))
-                        logger.debug("Err:\n%s" % err)
-                        raise
+                if self._container is not None:
+                    loaded_sj, has_loaded_backup = self._loadSubJobFromContainer(index)
+                else:
+                    loaded_sj, has_loaded_backup = self._loadSubJobFromFiles(index)
 
+                self._applyStatusLog(index, loaded_sj)
                 loaded_sj._setParent( self._definedParent )
                 if has_loaded_backup:
                     loaded_sj._setDirty()
@@ -422,6 +468,125 @@ class SubJobXMLList(GangaObject):
 
         return self._cachedJobs[index]
 
+    def _loadSubJobFromFiles(self, index):
+        """Load and parse a subjob from its own data file, falling back to the backup data file
+        Returns the subjob and whether it was loaded from the backup
+        Args:
+            index (int): The index corresponding to the subjob object we want
+        """
+        has_loaded_backup = False
+        subjob_data = self.__get_dataFile(str(index))
+        try:
+            sj_file = self._loadSubJobFromDisk(subjob_data)
+        except (XMLFileError, IOError) as x:
+            logger.warning("Error loading XML file: %s" % x)
+            try:
+                logger.debug("Loading subjob #%s for job #%s from disk, recent changes may be lost" % (index, self.getMasterID()))
+                subjob_data = self.__get_dataFile(str(index), True)
+                sj_file = self._loadSubJobFromDisk(subjob_data)
+                has_loaded_backup = True
+            except (IOError, XMLFileError) as err:
+                logger.debug("Error loading subjob XML:\n%s" % err)
+
+                if isinstance(x, IOError) and x.errno == errno.ENOENT:
+                    raise IOError("Subobject %s not found: %s" % (index, x))
+                else:
+                    raise RepositoryError(self,"IOError on loading subobject %s: %s" % (index, x))
+
+        from_file = self._getStreamer()[1]
+
+        # load the subobject into a temporary object
+        try:
+            loaded_sj = from_file(sj_file)[0]
+        except (IOError, XMLFileError) as err:
+
+            try:
+                logger.warning("Loading subjob #%s for job #%s from backup, recent changes may be lost" % (index, self.getMasterID()))
+                subjob_data = self.__get_dataFile(str(index), True)
+                sj_file = self._loadSubJobFromDisk(subjob_data)
+                loaded_sj = from_file(sj_file)[0]
+                has_loaded_backup = True
+            except (IOError, XMLFileError) as err:
+                logger.debug("Failed to Load XML for job: %s using: %s" % (index, subjob_data))
+                logger.debug("Err:\n%s" % err)
+                raise
+
+        return loaded_sj, has_loaded_backup
+
+    def _loadSubJobFromContainer(self, index):
+        """Load and parse a subjob from the container of a packed job, falling back to the data it had before it was last written
+        Returns the subjob and whether it was loaded from the backup
+        Args:
+            index (int): The index corresponding to the subjob object we want
+        """
+        from_file = self._getStreamer()[1]
+        logger.debug("Loading subjob #%s from: %s" % (index, self._container.fn))
+
+        has_loaded_backup = self._load_backup is True
+        try:
+            loaded_sj = from_file(StringIO(self._container.read(index, has_loaded_backup)))[0]
+        except (SubJobContainerError, XMLFileError) as err:
+            if has_loaded_backup:
+                raise RepositoryError(self, "Error on loading subobject %s: %s" % (index, err))
+            logger.warning("Loading subjob #%s for job #%s from backup, recent changes may be lost" % (index, self.getMasterID()))
+            logger.debug("Err:\n%s" % err)
+            try:
+                loaded_sj = from_file(StringIO(self._container.read(index, True)))[0]
+            except (SubJobContainerError, XMLFileError) as backup_err:
+                logger.debug("Failed to Load backup for job: %s using: %s" % (index, self._container.fn))
+                logger.debug("Err:\n%s" % backup_err)
+                raise RepositoryError(self, "Error on loading subobject %s: %s" % (index, err))
+            has_loaded_backup = True
+
+        return loaded_sj, has_loaded_backup
+
+    def _applyStatusLog(self, index, subjob):
+        """Apply the status changes recorded in the status log to a subjob which has just been loaded
+        Args:
+            index (int): The index of the subjob
+            subjob (Job): The subjob as it was loaded from disk
+        """
+        if self._status_log is None:
+            return
+        entry = self._status_log.read().get(index)
+        if entry is None:
+            return
+        status, timestamps, logged = entry
+        # An entry left behind when the session stopped between writing the subjob and dropping its entries is older
+        # than the data, which has since moved on to later timestamps
+        recorded = timestamps.values()
+        if logged:
+            recorded.append(datetime.datetime.fromtimestamp(logged))
+        current = [stamp for stamp in subjob.time.timestamps.values() if stamp is not None]
+        if recorded and current and max(recorded) <= max(current):
+            logger.debug("Ignoring stale status log entry of subjob %s" % index)
+            if self._subjobIndexData.get(index) is not None:
+                self._subjobIndexData[index]['status'] = subjob.status
+            return
+        subjob.setSchemaAttribute('status', status)
+        subjob.time.timestamps.update(timestamps)
+
+    def recordStatus(self, index, status, timestamps):
+        """Record a status change of a subjob in the status log rather than rewriting its data and the subjob index
+        Returns True if the change was recorded, the subjob doesn't then need to be flushed for this change
+        Args:
+            index (int): The index of the subjob
+            status (str): The new status of the subjob
+            timestamps (dict): The timestamps of the subjob which changed along with the status
+        """
+        if self._status_log is None or not getConfig('Registry')['SubjobStatusLog']:
+            return False
+        # Only subjobs which have been written to disk before can be brought up to date from the log
+        if self._subjobIndexData.get(index) is None:
+            return False
+        try:
+            self._status_log.append(index, status, timestamps)
+        except SubJobStatusLogError as err:
+            logger.debug("recordStatus: %s" % err)
+            return False
+        self._subjobIndexData[index]['status'] = status
+        return True
+
     def _setParent(self, parentObj):
         """Set the parent of self and any objects in memory we control
         Args:
@@ -497,35 +662,71 @@ class SubJobXMLList(GangaObject):
                 sj_statuses.append(self.__getitem__(i).status)
         return sj_statuses
 
-    def flush(self, ignore_disk=False):
-        """Flush all subjobs to disk using XML methods
+    def flush(self, ignore_disk=False, written=None):
+        """Flush all dirty subjobs to disk using the XML (or binary) methods, either to their own data files or to the container of a packed job
         Args:
             ignore_disk (bool): Optional flag to force the class to ignore all on-disk data when flushing
+            written (list): If given the names of the files written are appended to this list
         """
         from Ganga.Core.GangaRepository.GangaRepositoryXML import safe_save
 
-        from Ganga.Core.GangaRepository.VStreamer import to_file
+        to_file = self._getStreamer()[0]
 
         if ignore_disk:
             range_limit = self._cachedJobs.keys()
         else:
             range_limit = range(len(self))
 
+        # Entries of the status log made from now on aren't in the data written here
+        flush_started = time.time()
+
+        # Data of the dirty subjobs to be written to the container of a packed job
+        payloads = {}
+        # Indices of the subjobs written in full
+        flushed = []
+
         for index in range_limit:
             if index in self._cachedJobs:
                 ## If it ain't dirty skip it
                 if not self._cachedJobs[index]._dirty:
                     continue
 
-                subjob_data = self.__get_dataFile(str(index))
                 subjob_obj = self._cachedJobs[index]
 
                 if subjob_obj is subjob_obj._getRoot():
                     raise GangaException(self, "Subjob parent not set correctly in flush.")
 
-                safe_save( subjob_data, subjob_obj, to_file )
+                flushed.append(index)
 
-        self.write_subJobIndex(ignore_disk)
+                if self._container is not None:
+                    sio = StringIO()
+                    to_file(subjob_obj, sio)
+                    payloads[index] = sio.getvalue()
+                else:
+                    subjob_data = self.__get_dataFile(str(index))
+                    safe_save( subjob_data, subjob_obj, to_file, written=written )
+
+        if payloads:
+            # Only the records of the dirty subjobs are written
+            try:
+                self._container.write(payloads)
+                if written is not None:
+                    written.append(self._container.fn)
+            except SubJobContainerError as err:
+                raise RepositoryError(self, "Error flushing subjobs of job %s: %s" % (self.getMasterID(), err))
+
+        if self._status_log is not None and flushed:
+            # The data of these subjobs now includes their latest status
+            try:
+                self._status_log.discard(flushed, before=flush_started)
+            except SubJobStatusLogError as err:
+                raise RepositoryError(self, "Error flushing subjobs of job %s: %s" % (self.getMasterID(), err))
+
+        # The index only needs rewriting when the data of a subjob has changed,
+        # status changes alone are read from the status log
+        index_file = path.join(self._jobDirectory, self._subjob_master_index_name)
+        if flushed or ignore_disk or len(self._subjobIndexData) != len(self) or not path.isfile(index_file):
+            self.write_subJobIndex(ignore_disk)
 
     def _setFlushed(self):
         """ Like Node only descend into objects which aren't in the Schema"""
@@ -578,8 +779,28 @@ class SubJobXMLList(GangaObject):
 
         if not path.isdir(jobDirectory):
             return False
-        else:
-            return bool(SubJobXMLList.countSubJobDirs(jobDirectory, datafileName, True))
+
+        container = SubJobXMLList.getContainer(jobDirectory)
+        if container.exists():
+            return bool(len(container))
+
+        return bool(SubJobXMLList.countSubJobDirs(jobDirectory, datafileName, True))
+
+    @staticmethod
+    def getStatusLog(jobDirectory):
+        """Return the log of the status changes of the subjobs of the job stored in jobDirectory, the log may not exist on disk
+        Args:
+            jobDirectory (str): dir on disk which contains the data of the job
+        """
+        return SubJobStatusLog(path.join(jobDirectory, "subjobs.status"))
+
+    @staticmethod
+    def getContainer(jobDirectory):
+        """ Return the SubJobContainer used to store the subjobs of the job in jobDirectory when it uses the packed layout
+        Args:
+            jobDirectory (str): dir on disk of the master job
+        """
+        return SubJobContainer(path.join(jobDirectory, "subjobs.pack"))
 
     @staticmethod
     def countSubJobDirs(jobDirectory, datafileName, checkDataFiles):
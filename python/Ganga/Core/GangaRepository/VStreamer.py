@@ -17,12 +17,13 @@ from Ganga.GPIDev.Lib.GangaList.GangaList import makeGangaList
 from .GangaRepository import SchemaVersionError
 
 import xml.sax.saxutils
+import xml.parsers.expat
 import copy
+from ast import literal_eval
 from cStringIO import StringIO
 
 logger = getLogger()
 
-_cached_eval_strings = {}
 
 ##########################################################################
 # Ganga Project. http://cern.ch/ganga
@@ -86,8 +87,7 @@ def to_file(j, fobj=None, ignore_subs=[]):
 def _raw_from_file(f):
     # logger.debug('----------------------------')
     ###logger.debug('Parsing file: %s',f.name)
-    xml_content = f.read()
-    obj, errors = Loader().parse(xml_content)
+    obj, errors = StreamingLoader().parse_file(f)
     return obj, errors
 
 def from_file(f):
@@ -272,182 +272,229 @@ class EmptyGangaObject(GangaObject):
         super(EmptyGangaObject, self).__init__()
 
 
-class Loader(object):
+##########################################################################
+# Streaming XML Parser.
+
+
+class ValueDecoder(object):
 
-    """ Job object tree loader.
+    """ Decodes the repr() strings stored in <value> elements.
+    Literals (strings, numbers, containers of literals, None, True, False) are decoded safely with literal_eval,
+    anything else (e.g. datetime or File objects) falls back to eval within the config_scope.
+    Only immutable results are cached so they can be shared without copying, and the cache is bounded.
     """
 
-    def __init__(self):
+    # Results of these types can be safely shared between objects
+    _immutable_types = (str, unicode, int, long, float, bool, type(None))
+
+    def __init__(self, max_cache_size=10000, max_cached_length=256):
+        """
+        Args:
+            max_cache_size (int): Number of decoded values kept before the cache is emptied
+            max_cached_length (int): Values with a longer repr than this aren't cached
+        """
+        self.max_cache_size = max_cache_size
+        self.max_cached_length = max_cached_length
+        self._cache = {}
+
+    def decode(self, s):
+        """
+        Returns the python object represented by the string s
+        Args:
+            s (str): The unescaped content of a <value> element
+        """
+        try:
+            return self._cache[s]
+        except KeyError:
+            pass
+
+        try:
+            val = literal_eval(s)
+        except (ValueError, SyntaxError):
+            # This is ugly and classes which use this are bad, but this needs to be fixed in another PR
+            # TODO Make the scope of objects a lot better than whatever is in the config
+            # eval builds a new object on each call so there's no need to copy the result
+            return eval(s, config_scope)
+
+        if isinstance(val, self._immutable_types) and len(s) <= self.max_cached_length:
+            if len(self._cache) >= self.max_cache_size:
+                self._cache.clear()
+            self._cache[s] = val
+        return val
+
+    def clear(self):
+        """ Empty the cache of decoded values """
+        self._cache.clear()
+
+# Shared between loaders so that common values (e.g. status strings) are decoded once
+_value_decoder = ValueDecoder()
+
+
+class StreamingLoader(object):
+
+    """ Job object tree loader which parses the XML incrementally from a file object.
+    This produces the same object tree as Loader but uses bound methods as handlers rather than
+    closures and decodes values with the bounded, literal_eval based ValueDecoder.
+    """
+
+    __slots__ = ('stack', 'ignore_count', 'errors', 'value_construct', 'sequence_start', 'decoder', '_start_handlers', '_end_handlers')
+
+    def __init__(self, decoder=None):
+        """
+        Args:
+            decoder (ValueDecoder): decoder used for <value> elements, defaults to one shared between loaders
+        """
         self.stack = None  # we construct object tree using this stack
         # ignore nested XML elements in case of data errors at a higher level
         self.ignore_count = 0
         self.errors = []  # list of exception objects in case of data errors
-        # buffer for <value> elements (evaled as python expressions)
+        # buffer of CDATA chunks for <value> elements
         self.value_construct = None
-        # buffer for building sequences (FIXME: what about nested sequences?)
+        # stack positions where the sequences being built begin
         self.sequence_start = []
+        self.decoder = decoder if decoder is not None else _value_decoder
+        self._start_handlers = {'root': self._start_root,
+                                'class': self._start_class,
+                                'attribute': self._start_attribute,
+                                'value': self._start_value,
+                                'sequence': self._start_sequence}
+        self._end_handlers = {'attribute': self._end_attribute,
+                              'value': self._end_value,
+                              'sequence': self._end_sequence}
+
+    def _make_parser(self):
+        """ Construct an expat parser with this loader's handlers """
+        p = xml.parsers.expat.ParserCreate()
+        p.buffer_text = True
+        p.StartElementHandler = self._start_element
+        p.EndElementHandler = self._end_element
+        p.CharacterDataHandler = self._char_data
+        return p
+
+    def parse_file(self, fobj):
+        """ Parse and load an object from the file object fobj, reading it in chunks
+        Args:
+            fobj (file): file object containing the XML
+        """
+        self._make_parser().ParseFile(fobj)
+        return self._finish()
 
     def parse(self, s):
-        """ Parse and load object from string s using internal XML parser (expat).
+        """ Parse and load an object from the string s
+        Args:
+            s (str): string containing the XML
         """
-        import xml.parsers.expat
-
-        # 3 handler functions
-        def start_element(name, attrs):
-            #logger.debug('Start element: name=%s attrs=%s', name, attrs) #FIXME: for 2.4 use CurrentColumnNumber and CurrentLineNumber
-            # if higher level element had error, ignore the corresponding part
-            # of the XML tree as we go down
-            if self.ignore_count:
-                self.ignore_count += 1
-                return
-
-            # initialize object stack
-            if name == 'root':
-                assert self.stack is None, "duplicated <root> element"
-                self.stack = []
-                return
-
-            assert not self.stack is None, "missing <root> element"
-
-            # load a class, make empty object and push it as the current object
-            # on the stack
-            if name == 'class':
-                try:
-                    cls = allPlugins.find(attrs['category'], attrs['name'])
-                except PluginManagerError as e:
-                    self.errors.append(e)
-                    #self.errors.append('Unknown class: %(name)s'%attrs)
-                    obj = EmptyGangaObject()
-                    # ignore all elemenents until the corresponding ending
-                    # element (</class>) is reached
-                    self.ignore_count = 1
-                else:
-                    version = Version(*[int(v) for v in attrs['version'].split('.')])
-                    if not cls._schema.version.isCompatible(version):
-                        attrs['currversion'] = '%s.%s' % (cls._schema.version.major, cls._schema.version.minor)
-                        self.errors.append(SchemaVersionError('Incompatible schema of %(name)s, repository is %(version)s currently in use is %(currversion)s' % attrs))
-                        obj = EmptyGangaObject()
-                        # ignore all elemenents until the corresponding ending
-                        # element (</class>) is reached
-                        self.ignore_count = 1
-                    else:
-                        # Initialize and cache a c class instance to use as a classs factory
-                        obj = cls.getNew()
-                self.stack.append(obj)
-
-            # push the attribute name on the stack
-            if name == 'attribute':
-                self.stack.append(attrs['name'])
-
-            # start value_contruct mode and initialize the value buffer
-            if name == 'value':
-                self.value_construct = ''
-
-            # save a marker where the sequence begins on the stack
-            if name == 'sequence':
-                self.sequence_start.append(len(self.stack))
-
-        def end_element(name):
-            #logger.debug('End element: name=%s', name)
-
-            # if higher level element had error, ignore the corresponding part
-            # of the XML tree as we go up
-            if self.ignore_count:
-                self.ignore_count -= 1
-                return
-
-            # when </attribute> is seen the current object, attribute name and
-            # value should be on top of the stack
-            if name == 'attribute':
-                value = self.stack.pop()
-                aname = self.stack.pop()
-                obj = self.stack[-1]
-                # update the object's attribute
-                try:
-                    obj.setSchemaAttribute(aname, value)
-                except:
-                    raise GangaException("ERROR in loading XML, failed to set attribute %s for class %s" % (aname, _getName(obj)))
-                #logger.info("Setting: %s = %s" % (aname, value))
-
-            # when </value> is seen the value_construct buffer (CDATA) should
-            # be a python expression (e.g. quoted string)
-            if name == 'value':
-                try:
-                    # unescape the special characters
-                    s = unescape(self.value_construct)
-                    #logger.debug('string value: %s',s)
-                    if s not in _cached_eval_strings:
-                        # This is ugly and classes which use this are bad, but this needs to be fixed in another PR
-                        # TODO Make the scope of objects a lot better than whatever is in the config
-                        # This is a dictionary constructed from eval-ing things in the Config. Why does should it do this?
-                        # Anyway, lets save the result for speed
-                        _cached_eval_strings[s] = eval(s, config_scope)
-                    eval_str = _cached_eval_strings[s]
-                    if not isinstance(eval_str, str):
-                        val = copy.deepcopy(eval_str)
-                    else:
-                        val = eval_str
-                    #logger.debug('evaled value: %s type=%s',repr(val),type(val))
-                    self.stack.append(val)
-                    self.value_construct = None
-                except:
-                    raise GangaException("ERROR in loading XML, failed to correctly parse attribute value: \'%s\'" % str(self.value_construct))
-
-            # when </sequence> is seen we remove last items from stack (as indicated by sequence_start)
-            # we make a GangaList from these items and put it on stack
-            if name == 'sequence':
-                pos = self.sequence_start.pop()
-                try:
-                    alist = makeGangaList(self.stack[pos:])
-                except:
-                    raise GangaException("ERROR in loading XML, failed to construct a sequence(list) properly")
-                del self.stack[pos:]
-                self.stack.append(alist)
-
-            # when </class> is seen we finish initializing the new object
-            # by setting remaining attributes to their default values
-            # the object stays on the stack (will be removed by </attribute> or
-            # is a root object)
-            if name == 'class':
-                obj = self.stack[-1]
-                cls = obj.__class__
-                if isinstance(cls, GangaObject):
-                    for attr, item in cls._schema.allItems():
-                        if attr not in obj._data:
-                            if item.getProperties()['getter'] is None:
-                                try:
-                                    setattr(obj, attr, self._schema.getDefaultValue(attr))
-                                except:
-                                    raise GangaException("ERROR in loading XML, failed to set default attribute %s for class %s" % (attr, _getName(obj)))
-                pass
-
-        def char_data(data):
-            # char_data may be called many times in one CDATA section so we need to build up
-            # the full buffer for <value>CDATA</value> section incrementally
-            if self.value_construct is not None:
-                ###logger.debug('char_data: append=%s',data)
-                # FIXME: decode data
-                self.value_construct += data
-
-        # start parsing using callbacks
-        p = xml.parsers.expat.ParserCreate()
-
-        p.StartElementHandler = start_element
-        p.EndElementHandler = end_element
-        p.CharacterDataHandler = char_data
+        self._make_parser().Parse(s, True)
+        return self._finish()
 
-        p.Parse(s)
+    def _finish(self):
+        """ Check the object which has been loaded and return it with the list of errors """
+        if self.stack is None:
+            raise AssertionError("missing <root> element")
 
         if len(self.stack) != 1:
             self.errors.append(AssertionError('multiple objects inside <root> element'))
 
         obj = self.stack[-1]
 
-        #logger.info("obj.__dict__: %s" % obj.__dict__)
-
         # Raise Exception if object is incomplete
         for attr, item in obj._schema.allItems():
             if not hasattr(obj, attr):
                 raise AssertionError("incomplete XML file")
         return obj, self.errors
 
+    def _start_element(self, name, attrs):
+        # if higher level element had error, ignore the corresponding part
+        # of the XML tree as we go down
+        if self.ignore_count:
+            self.ignore_count += 1
+            return
+
+        if name != 'root':
+            assert self.stack is not None, "missing <root> element"
+
+        handler = self._start_handlers.get(name)
+        if handler is not None:
+            handler(attrs)
+
+    def _end_element(self, name):
+        # if higher level element had error, ignore the corresponding part
+        # of the XML tree as we go up
+        if self.ignore_count:
+            self.ignore_count -= 1
+            return
+
+        handler = self._end_handlers.get(name)
+        if handler is not None:
+            handler()
+
+    def _char_data(self, data):
+        # char_data may still be called more than once for a long CDATA section
+        if self.value_construct is not None:
+            self.value_construct.append(data)
+
+    def _start_root(self, attrs):
+        assert self.stack is None, "duplicated <root> element"
+        self.stack = []
+
+    def _start_class(self, attrs):
+        # load a class, make empty object and push it as the current object on the stack
+        try:
+            cls = allPlugins.find(attrs['category'], attrs['name'])
+        except PluginManagerError as e:
+            self.errors.append(e)
+            obj = EmptyGangaObject()
+            # ignore all elemenents until the corresponding ending element (</class>) is reached
+            self.ignore_count = 1
+        else:
+            version = Version(*[int(v) for v in attrs['version'].split('.')])
+            if not cls._schema.version.isCompatible(version):
+                attrs['currversion'] = '%s.%s' % (cls._schema.version.major, cls._schema.version.minor)
+                self.errors.append(SchemaVersionError('Incompatible schema of %(name)s, repository is %(version)s currently in use is %(currversion)s' % attrs))
+                obj = EmptyGangaObject()
+                # ignore all elemenents until the corresponding ending element (</class>) is reached
+                self.ignore_count = 1
+            else:
+                obj = cls.getNew()
+        self.stack.append(obj)
+
+    def _start_attribute(self, attrs):
+        self.stack.append(attrs['name'])
+
+    def _start_value(self, attrs):
+        self.value_construct = []
+
+    def _start_sequence(self, attrs):
+        self.sequence_start.append(len(self.stack))
+
+    def _end_attribute(self):
+        # the current object, attribute name and value should be on top of the stack
+        value = self.stack.pop()
+        aname = self.stack.pop()
+        obj = self.stack[-1]
+        try:
+            obj.setSchemaAttribute(aname, value)
+        except Exception as err:
+            raise GangaException("ERROR in loading XML, failed to set attribute %s for class %s: %s" % (aname, getName(obj), err))
+
+    def _end_value(self):
+        # the value_construct buffer (CDATA) should be a python expression (e.g. quoted string)
+        value_str = ''.join(self.value_construct)
+        try:
+            self.stack.append(self.decoder.decode(unescape(value_str)))
+        except Exception as err:
+            raise GangaException("ERROR in loading XML, failed to correctly parse attribute value: \'%s\' (%s)" % (value_str, err))
+        self.value_construct = None
+
+    def _end_sequence(self):
+        # remove the items of the sequence from the stack and replace them with a GangaList
+        pos = self.sequence_start.pop()
+        try:
+            # Values read from disk have no proxies and are already sanitised so skip the GangaList schema defaults
+            alist = GangaList.getNew()
+            alist.setSchemaAttribute('_list', self.stack[pos:])
+            alist.setSchemaAttribute('_is_preparable', False)
+        except Exception as err:
+            raise GangaException("ERROR in loading XML, failed to construct a sequence(list) properly: %s" % err)
+        del self.stack[pos:]
+        self.stack.append(alist)
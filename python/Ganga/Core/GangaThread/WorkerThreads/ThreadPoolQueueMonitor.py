@@ -227,11 +227,11 @@ class ThreadPoolQueueMonitor(object):
                 logger.warning("Queue System is frozen not adding any more System processes!")
             return
 
-        self._monitoring_threadpool.add_function(worker_code,
-                                                 args=args,
-                                                 kwargs=kwargs,
-                                                 priority=priority,
-                                                 name=name)
+        return self._monitoring_threadpool.add_function(worker_code,
+                                                        args=args,
+                                                        kwargs=kwargs,
+                                                        priority=priority,
+                                                        name=name)
 
     def addProcess(self,
                    command,
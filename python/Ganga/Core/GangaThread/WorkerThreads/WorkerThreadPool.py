@@ -1,5 +1,6 @@
 #!/usr/bin/env python
 import Queue
+import threading
 import traceback
 import collections
 from Ganga.Core.exceptions import GangaException, GangaTypeError
@@ -12,11 +13,47 @@ from Ganga.GPIDev.Base.Proxy import getName
 from collections import namedtuple
 
 logger = getLogger()
-QueueElement = namedtuple('QueueElement',  ['priority', 'command_input', 'callback_func', 'fallback_func', 'name'])
+QueueElement = namedtuple('QueueElement',  ['priority', 'command_input', 'callback_func', 'fallback_func', 'name', 'completion'])
 CommandInput = namedtuple('CommandInput',  ['command', 'timeout', 'env', 'cwd', 'shell', 'python_setup', 'eval_includes', 'update_env'])
 FunctionInput = namedtuple('FunctionInput', ['function', 'args', 'kwargs'])
 
 
+class TaskCompletion(object):
+
+    """
+    Completion of a task added to a WorkerThreadPool.
+    This can be waited on to know when the task has finished rather than polling the status of the worker threads.
+    """
+    __slots__ = ['_event', 'result', 'error', 'cancelled']
+
+    def __init__(self):
+        self._event = threading.Event()
+        self.result = None
+        self.error = None
+        self.cancelled = False
+
+    def done(self):
+        """
+        Returns True once the task has finished or has been removed from the queue without being run
+        """
+        return self._event.is_set()
+
+    def wait(self, timeout=None):
+        """
+        Wait for the task to finish, returns True if it has
+        Args:
+            timeout (float): the longest time in seconds to wait for, None to wait until the task finishes
+        """
+        self._event.wait(timeout)
+        return self._event.is_set()
+
+    def _finish(self, result=None, error=None, cancelled=False):
+        self.result = result
+        self.error = error
+        self.cancelled = cancelled
+        self._event.set()
+
+
 class WorkerThreadPool(object):
 
     """
@@ -107,6 +144,8 @@ class WorkerThreadPool(object):
                 thread.unregister()
                 continue
 
+            result = None
+            error = None
             try:
                 if isinstance(item.command_input, FunctionInput):
                     these_args = item.command_input.args
@@ -116,6 +155,7 @@ class WorkerThreadPool(object):
                 else:
                     result = execute(*item.command_input)
             except Exception as e:
+                error = e
                 if issubclass(type(e), GangaException):
                     logger.error("%s" % e)
                 else:
@@ -157,6 +197,8 @@ class WorkerThreadPool(object):
                 thread._timeout = 'N/A'
                 self.__queue.task_done()
                 thread.unregister()
+                if item.completion is not None:
+                    item.completion._finish(result, error)
 
             thread.gangaName = oldname
 
@@ -173,13 +215,16 @@ class WorkerThreadPool(object):
             if not self._shutdown:
                 logger.warning("Cannot Add Process as Queue is frozen!")
             return
+        completion = TaskCompletion()
         self.__queue.put(QueueElement(priority=priority,
                                       command_input=FunctionInput(
                                           function, args, kwargs),
                                       callback_func=FunctionInput(
                                           callback_func, callback_args, callback_kwargs),
-                                      fallback_func=FunctionInput(fallback_func, fallback_args, fallback_kwargs), name=name
+                                      fallback_func=FunctionInput(fallback_func, fallback_args, fallback_kwargs), name=name,
+                                      completion=completion
                                       ))
+        return completion
 
     def add_process(self,
                     command, timeout=None, env=None, cwd=None, shell=False,
@@ -195,13 +240,16 @@ class WorkerThreadPool(object):
             if self._shutdown:
                 logger.warning("Cannot Add Process as Queue is frozen!")
             return
+        completion = TaskCompletion()
         self.__queue.put(QueueElement(priority=priority,
                                       command_input=CommandInput(
                                           command, timeout, env, cwd, shell, python_setup, eval_includes, update_env),
                                       callback_func=FunctionInput(
                                           callback_func, callback_args, callback_kwargs),
-                                      fallback_func=FunctionInput(fallback_func, fallback_args, fallback_kwargs), name=name
+                                      fallback_func=FunctionInput(fallback_func, fallback_args, fallback_kwargs), name=name,
+                                      completion=completion
                                       ))
+        return completion
 
     def map(self, function, *iterables):
         if not isinstance(function, collections.Callable):
@@ -218,8 +266,20 @@ class WorkerThreadPool(object):
         """
         Purges the thread pools queue.
         """
+        self._cancel_queued(self.__queue.queue)
         self.__queue.queue = []
 
+    @staticmethod
+    def _cancel_queued(items):
+        """
+        Finish the completions of tasks which are removed from the queue without being run so nothing waits on them forever
+        Args:
+            items (list): the QueueElements which won't be run
+        """
+        for item in items:
+            if isinstance(item, QueueElement) and item.completion is not None:
+                item.completion._finish(cancelled=True)
+
     def get_queue(self):
         """
         Returns the current state of the multiprocess queue that the local DIRAC server is working through.
@@ -258,6 +318,8 @@ class WorkerThreadPool(object):
             # w.unregister()
             #del w
         self.__worker_threads = []
+        # Nothing is left to run anything which is still queued
+        self._cancel_queued(self.__queue.queue)
         return
 
     def _start_worker_threads(self):
@@ -18,7 +18,9 @@ from Ganga.Utility.logging import getLogger, requires_shutdown, final_shutdown
 from Ganga.Utility.Config import setConfigOption
 from Ganga.Core.MonitoringComponent.Local_GangaMC_Service import getStackTrace, _purge_actions_queue,\
     stop_and_free_thread_pool
+from Ganga.Core.MonitoringComponent.StatusFileWatcher import shutdownStatusFileWatcher
 from Ganga.GPIDev.Lib.Tasks import stopTasks
+from Ganga.Lib.Localhost.LocalScheduler import shutdownLocalScheduler
 from Ganga.GPIDev.Credentials import CredentialStore
 from Ganga.Core.GangaRepository.SessionLock import removeGlobalSessionFiles, removeGlobalSessionFileHandlers
 
@@ -63,6 +65,18 @@ def _ganga_run_exitfuncs():
     except Exception as err:
         logger.exception("Exception raised while stopping Tasks: %s" % err)
 
+    # Drop the Local jobs which haven't started yet
+    try:
+        shutdownLocalScheduler()
+    except Exception as err:
+        logger.exception("Exception raised while stopping the Local scheduler: %s" % err)
+
+    # Stop watching the status files of the jobs
+    try:
+        shutdownStatusFileWatcher()
+    except Exception as err:
+        logger.exception("Exception raised while stopping the status file watcher: %s" % err)
+
     # purge the monitoring queues
     try:
         _purge_actions_queue()
@@ -18,6 +18,10 @@ from Ganga.GPIDev.Base.Proxy import isType, stripProxy, getName, getRuntimeGPIOb
 
 from Ganga.GPIDev.Lib.Job.Job import lazyLoadJobStatus, lazyLoadJobBackend
 
+from Ganga.Core.GangaRepository.Registry import Registry
+from Ganga.Core.MonitoringComponent.MonitoringScheduler import ActiveJobs, MonitoringScheduler, active_states
+from Ganga.Core.MonitoringComponent.StatusFileWatcher import getStatusFileWatcher
+
 # Setup logging ---------------
 from Ganga.Utility.logging import getLogger, log_unknown_exception, log_user_exception
 
@@ -475,7 +479,7 @@ class JobRegistry_Monitor(GangaThread):
     minPollRate = 1.
     global_count = 0
 
-    __slots__ = ('registry_slice', '__sleepCounter', '__updateTimeStamp', 'progressCallback', 'callbackHookDict', 'clientCallbackDict', 'alive', 'enabled', 'steps', 'activeBackends', 'updateJobStatus', 'errors', 'updateDict_ts', '__mainLoopCond', '__cleanUpEvent', '__monStepsTerminatedEvent', 'stopIter', '_runningNow')
+    __slots__ = ('registry_slice', '__sleepCounter', '__updateTimeStamp', 'progressCallback', 'callbackHookDict', 'clientCallbackDict', 'alive', 'enabled', 'steps', 'activeBackends', 'updateJobStatus', 'errors', 'updateDict_ts', '__mainLoopCond', '__cleanUpEvent', '__monStepsTerminatedEvent', 'stopIter', '_runningNow', '_activeJobs', '_scheduler')
 
     def __init__(self, registry_slice):
         GangaThread.__init__(self, name="JobRegistry_Monitor")
@@ -498,6 +502,13 @@ class JobRegistry_Monitor(GangaThread):
 
         self.updateDict_ts = SynchronisedObject(UpdateDict())
 
+        # jobs which need monitoring, kept up to date by jobStatusChanged
+        self._activeJobs = ActiveJobs()
+        # when each backend is next due to be checked
+        self._scheduler = MonitoringScheduler()
+        # check a backend as soon as the status file of one of its jobs is written
+        getStatusFileWatcher().addListener(self.statusFileChanged)
+
         # Create the default backend update method and add to callback hook.
         self.makeUpdateJobStatusFunction()
 
@@ -564,20 +575,21 @@ class JobRegistry_Monitor(GangaThread):
                 self.__monStep()
 
                 # delay here the monitoring steps according to the
-                # configuration
+                # configuration, waking early when a backend is due to be checked
                 while self.__sleepCounter > 0.0:
                     log.debug("Wait Condition")
                     self.progressCallback(self.__sleepCounter)
-                    for i in range(int(self.uPollRate * 20)):
-                        if self.enabled:
-                            self.__mainLoopCond.wait(self.uPollRate * 0.05)
+                    if self.enabled:
+                        wait_start = time.time()
+                        self.__mainLoopCond.wait(self.__timeToWait())
+                        self.__sleepCounter -= time.time() - wait_start
                     if not self.enabled:
                         if not self.alive:  # stopped?
                             self.__cleanUp()
                         # disabled, break to the outer while
                         break
-                    else:
-                        self.__sleepCounter -= self.uPollRate
+                    if self.__timeToWait() <= 0.0:
+                        self.__sleepCounter = 0.0
 
                 else:
                     log.debug("Run on Demand")
@@ -636,6 +648,67 @@ class JobRegistry_Monitor(GangaThread):
         self.__updateTimeStamp = time.time()
         self.__sleepCounter = config['base_poll_rate']
 
+    def __timeToWait(self):
+        """
+        The time the main loop should wait for before the next monitoring step, the time left from base_poll_rate unless
+        a backend is due to be checked sooner. Steps are never closer together than minPollRate
+        """
+        wait = self.__sleepCounter
+        next_check = self._scheduler.next_check()
+        if next_check is not None:
+            wait = min(wait, max(next_check, self.__updateTimeStamp + self.minPollRate) - time.time())
+        return max(wait, 0.0)
+
+    def jobStatusChanged(self, job):
+        """
+        Called when a job changes status so that the jobs which need monitoring don't have to be found by checking every
+        job in the registry and so that the backend of the job is checked again at its poll rate
+        Args:
+            job (Job): the job, or subjob, which has changed status
+        """
+        try:
+            backend_name = getName(job.backend)
+        except Exception as err:
+            log.debug("jobStatusChanged: %s" % err)
+            return
+
+        if job.master is not None:
+            self._scheduler.changed(backend_name)
+            return
+
+        objects = stripProxy(self.registry_slice).objects
+        if isinstance(objects, Registry):
+            if job._getRegistry() is not objects:
+                return
+        elif job.id not in objects:
+            return
+
+        newly_active = job.status in active_states
+        if self._activeJobs.seeded:
+            self._activeJobs.update(job.id, backend_name, job.status)
+        self._scheduler.changed(backend_name, reschedule=newly_active)
+
+        # wake the main loop so that it waits for the new check time, if it's busy it will pick it up when it next waits
+        if newly_active and self.__mainLoopCond.acquire(False):
+            try:
+                self.__mainLoopCond.notifyAll()
+            finally:
+                self.__mainLoopCond.release()
+
+    def statusFileChanged(self, backend_name):
+        """
+        Called by the StatusFileWatcher when the status file of a job has been written so that its backend is checked
+        as soon as the minimum poll rate allows
+        Args:
+            backend_name (str): name of the class of the backend of the job
+        """
+        self._scheduler.expedite(backend_name)
+        if self.__mainLoopCond.acquire(False):
+            try:
+                self.__mainLoopCond.notifyAll()
+            finally:
+                self.__mainLoopCond.release()
+
     def runMonitoring(self, jobs=None, steps=1, timeout=300):
         """
         Enable/Run the monitoring loop and wait for the monitoring steps completion.
@@ -701,6 +774,9 @@ class JobRegistry_Monitor(GangaThread):
                 self.makeUpdateJobStatusFunction()
 
             log.debug("Enable Loop, Clear Iterators and setCallbackHook")
+            # find the jobs to monitor again and check every backend which has any straight away
+            self._activeJobs.invalidate()
+            self._scheduler.reset()
             # enable mon loop
             self.enabled = True
             # set how many steps to run
@@ -739,6 +815,9 @@ class JobRegistry_Monitor(GangaThread):
 
         with self.__mainLoopCond:
             log.debug('Monitoring loop lock acquired. Enabling mon loop')
+            # jobs may have changed while the monitoring was disabled so find the jobs to monitor again
+            self._activeJobs.invalidate()
+            self._scheduler.reset()
             self.enabled = True
             # infinite loops
             self.steps = -1
@@ -814,6 +893,8 @@ class JobRegistry_Monitor(GangaThread):
         else:
             self.alive = False
 
+        getStatusFileWatcher().removeListener(self.statusFileChanged)
+
         self.__mainLoopCond.acquire()
         if self.enabled:
             log.info('Stopping the monitoring component...')
@@ -938,13 +1019,14 @@ class JobRegistry_Monitor(GangaThread):
         else:
             log.error("%s not found in client callback dictionary." % getName(clientFunc))
 
-    def __defaultActiveBackendsFunc(self):
-        log.debug("__defaultActiveBackendsFunc")
-        active_backends = {}
-        # FIXME: this is not thread safe: if the new jobs are added then
-        # iteration exception is raised
+    def __findActiveJobs(self):
+        """
+        Fill the set of jobs which need monitoring by checking every job in the registry slice.
+        This is only needed when the monitoring is started, after that the set is kept up to date by jobStatusChanged
+        """
+        log.debug("__findActiveJobs")
+        found = []
         fixed_ids = self.registry_slice.ids()
-        #log.debug("Registry: %s" % str(self.registry_slice))
         log.debug("Running over fixed_ids: %s" % str(fixed_ids))
         for i in fixed_ids:
             try:
@@ -952,18 +1034,34 @@ class JobRegistry_Monitor(GangaThread):
 
                 job_status = lazyLoadJobStatus(j)
 
-                if job_status in ['submitted', 'running'] or (j.master and (job_status in ['submitting'])):
-                    if self.enabled is True and self.alive is True:
-                        backend_obj = lazyLoadJobBackend(j)
-                        backend_name = getName(backend_obj)
-                        active_backends.setdefault(backend_name, [])
-                        active_backends[backend_name].append(j)
+                if job_status in active_states:
+                    found.append((i, getName(lazyLoadJobBackend(j)), job_status))
             except RegistryKeyError as err:
                 log.debug("RegistryKeyError: The job was most likely removed")
                 log.debug("RegError %s" % str(err))
             except RegistryLockError as err:
                 log.debug("RegistryLockError: The job was most likely removed")
                 log.debug("Reg LockError%s" % str(err))
+        self._activeJobs.reset(found)
+
+    def __defaultActiveBackendsFunc(self):
+        log.debug("__defaultActiveBackendsFunc")
+        if not self._activeJobs.seeded:
+            self.__findActiveJobs()
+
+        active_backends = {}
+        for backend_name, job_ids in self._activeJobs.backends().iteritems():
+            for i in job_ids:
+                try:
+                    j = self.registry_slice(i)
+                except (RegistryKeyError, RegistryLockError) as err:
+                    log.debug("The job was most likely removed: %s" % err)
+                    j = None
+                if j is None:
+                    self._activeJobs.discard(i)
+                    continue
+                if self.enabled is True and self.alive is True:
+                    active_backends.setdefault(backend_name, []).append(stripProxy(j))
 
         summary = '{'
         for backend, these_jobs in active_backends.iteritems():
@@ -984,6 +1082,7 @@ class JobRegistry_Monitor(GangaThread):
         # timeout mechanism may have acquired the lock to impose delay.
         lock.acquire()
         self._runningNow = True
+        check_failed = True
 
         try:
             log.debug("[Update Thread %s] Lock acquired for %s" % (currentThread, getName(backendObj)))
@@ -1020,6 +1119,7 @@ class JobRegistry_Monitor(GangaThread):
 
                 if self.enabled is False and self.alive is False:
                     log.debug("NOT enabled, leaving")
+                    check_failed = False
                     return
 
                 block_size = config['numParallelJobs']
@@ -1062,6 +1162,7 @@ class JobRegistry_Monitor(GangaThread):
                     raise all_exceptions[0]
 
                 resubmit_if_required(jobList_fromset)
+                check_failed = False
 
             except BackendError as x:
                 self._handleError(x, x.backend_name, 0)
@@ -1088,6 +1189,8 @@ class JobRegistry_Monitor(GangaThread):
             lock.release()
             log.debug("[Update Thread %s] Lock released for %s." % (currentThread, getName(backendObj)))
             self._runningNow = False
+            # queue the next check of the backend, backing off if this one failed
+            self._scheduler.completed(getName(backendObj), failed=check_failed)
 
         log.debug("Finishing _checkBackend")
         return
@@ -1106,11 +1209,12 @@ class JobRegistry_Monitor(GangaThread):
         summary += '}'
         log.debug("Active Backends: %s" % summary)
 
-        for jList in activeBackends.values():
+        # Only the backends which are due are checked, the others are left until their next check time
+        for b_name in self._scheduler.due([name for name, jList in activeBackends.iteritems() if jList]):
 
+            jList = activeBackends[b_name]
             #log.debug("backend: %s" % str(jList))
             backendObj = jList[0].backend
-            b_name = getName(backendObj)
             if b_name in config:
                 pRate = config[b_name]
             else:
@@ -1122,7 +1226,9 @@ class JobRegistry_Monitor(GangaThread):
             #       This requires backends to hold relevant information on its
             #       credential requirements.
             #log.debug("addEntry: %s, %s, %s, %s" % (str(backendObj), str(self._checkBackend), str(jList), str(pRate)))
-            self.updateDict_ts.addEntry(backendObj, self._checkBackend, jList, pRate)
+            if not self.updateDict_ts.addEntry(backendObj, self._checkBackend, jList, pRate):
+                # The backend is busy, try again at its next check time
+                self._scheduler.completed(b_name)
             summary = str([stripProxy(x).getFQID('.') for x in jList])
             log.debug("jList: %s" % str(summary))
 
@@ -0,0 +1,299 @@
+"""
+Scheduling of the backend checks made by the monitoring loop.
+
+Rather than walking every job in the registry on each pass of the monitoring loop, the jobs which need monitoring are
+kept in an ActiveJobs set which is updated whenever a job changes status. The backends these jobs run on are checked
+according to a MonitoringScheduler which holds a priority queue of the time each backend is next due to be checked.
+
+The interval between the checks of a backend adapts to what the checks find:
+  - a check which sees a job change status brings the interval back to the poll rate configured for the backend
+  - a check which sees no change grows the interval by 'backend_poll_growth', up to 'max_backend_poll_rate'
+  - a check which fails backs off by 'backend_poll_backoff' each time, up to 'max_backend_poll_rate'
+A backend is checked within its configured poll rate of a job being submitted to it.
+A backend is checked at once when the StatusFileWatcher sees the status file of one of its jobs being written.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+
+from Ganga.Utility.Config import getConfig
+
+# The statuses of a top level job which need the backend to be monitored
+active_states = ('submitted', 'running')
+
+
+class ActiveJobs(object):
+
+    """
+    The top level jobs which need monitoring grouped by the name of their backend.
+    """
+
+    __slots__ = ('_lock', '_backends', '_by_id', 'seeded')
+
+    def __init__(self):
+        super(ActiveJobs, self).__init__()
+        self._lock = threading.Lock()
+        # backend name: set of job ids
+        self._backends = {}
+        # job id: backend name
+        self._by_id = {}
+        # True once the set has been filled from the jobs being monitored
+        self.seeded = False
+
+    def update(self, job_id, backend_name, status):
+        """
+        Add or remove a job according to its status
+        Args:
+            job_id (int): id of the job in its registry
+            backend_name (str): name of the class of the backend of the job
+            status (str): the status of the job
+        """
+        with self._lock:
+            self._discard(job_id)
+            if status in active_states:
+                self._backends.setdefault(backend_name, set()).add(job_id)
+                self._by_id[job_id] = backend_name
+
+    def discard(self, job_id):
+        """
+        Remove a job which no longer needs monitoring
+        Args:
+            job_id (int): id of the job in its registry
+        """
+        with self._lock:
+            self._discard(job_id)
+
+    def _discard(self, job_id):
+        backend_name = self._by_id.pop(job_id, None)
+        if backend_name is not None:
+            ids = self._backends[backend_name]
+            ids.discard(job_id)
+            if not ids:
+                del self._backends[backend_name]
+
+    def invalidate(self):
+        """ Mark the set as needing to be filled again from the jobs being monitored """
+        self.seeded = False
+
+    def reset(self, jobs):
+        """
+        Replace the contents of the set
+        Args:
+            jobs (list): list of (job id, backend name, status) of all of the jobs being monitored
+        """
+        with self._lock:
+            self._backends = {}
+            self._by_id = {}
+            for job_id, backend_name, status in jobs:
+                if status in active_states:
+                    self._backends.setdefault(backend_name, set()).add(job_id)
+                    self._by_id[job_id] = backend_name
+            self.seeded = True
+
+    def backends(self):
+        """ Return a dict of backend name: sorted list of the ids of the jobs which need monitoring """
+        with self._lock:
+            return dict((name, sorted(ids)) for name, ids in self._backends.iteritems())
+
+    def __len__(self):
+        return len(self._by_id)
+
+
+class _BackendSchedule(object):
+
+    """ The checking interval of a single backend """
+
+    __slots__ = ('name', 'base_interval', 'interval', 'failures', 'changed', 'queued', 'checking', 'expedited')
+
+    def __init__(self, name, base_interval):
+        super(_BackendSchedule, self).__init__()
+        self.name = name
+        self.base_interval = base_interval
+        self.interval = base_interval
+        # number of checks in a row which have failed
+        self.failures = 0
+        # True if a job on the backend has changed status since it was last checked
+        self.changed = False
+        # True if the backend is in the queue
+        self.queued = False
+        # True while the backend is being checked
+        self.checking = False
+        # True if the backend is due again as soon as the check in progress completes
+        self.expedited = False
+
+
+class MonitoringScheduler(object):
+
+    """
+    Priority queue of (next check time, backend) used to decide which backends the monitoring loop should check.
+    Each backend is only ever queued or being checked once.
+    """
+
+    __slots__ = ('_lock', '_queue', '_schedules', '_counter', '_clock')
+
+    def __init__(self, clock=time.time):
+        """
+        Args:
+            clock (function): returns the current time in seconds
+        """
+        super(MonitoringScheduler, self).__init__()
+        self._lock = threading.Lock()
+        # heap of (time, counter, backend name)
+        self._queue = []
+        # backend name: _BackendSchedule
+        self._schedules = {}
+        self._counter = itertools.count()
+        self._clock = clock
+
+    @staticmethod
+    def _base_interval(backend_name):
+        """
+        The poll rate configured for a backend
+        Args:
+            backend_name (str): name of the class of the backend
+        """
+        config = getConfig('PollThread')
+        if backend_name in config:
+            return config[backend_name]
+        return config['default_backend_poll_rate']
+
+    def _schedule(self, backend_name):
+        if backend_name not in self._schedules:
+            self._schedules[backend_name] = _BackendSchedule(backend_name, self._base_interval(backend_name))
+        return self._schedules[backend_name]
+
+    def _push(self, entry, when):
+        heapq.heappush(self._queue, (when, next(self._counter), entry.name))
+        entry.queued = True
+
+    def _remove(self, entry):
+        self._queue = [item for item in self._queue if item[2] != entry.name]
+        heapq.heapify(self._queue)
+        entry.queued = False
+
+    def due(self, backend_names):
+        """
+        Return the backends which are due to be checked now, backends which aren't queued are due at once.
+        A backend which is returned isn't due again until its check has been reported with completed()
+        Args:
+            backend_names (list): names of the backends which have jobs that need monitoring
+        """
+        now = self._clock()
+        with self._lock:
+            for name in backend_names:
+                entry = self._schedule(name)
+                if not entry.queued and not entry.checking:
+                    self._push(entry, now)
+            due = []
+            while self._queue and self._queue[0][0] <= now:
+                entry = self._schedules[heapq.heappop(self._queue)[2]]
+                entry.queued = False
+                # A backend without jobs to check is queued again once it has some
+                if entry.name in backend_names:
+                    entry.checking = True
+                    entry.changed = False
+                    due.append(entry.name)
+            return due
+
+    def completed(self, backend_name, failed=False):
+        """
+        Record the outcome of a check of a backend and queue its next check
+        Args:
+            backend_name (str): name of the backend which was checked
+            failed (bool): True if the check raised an error
+        """
+        config = getConfig('PollThread')
+        with self._lock:
+            entry = self._schedule(backend_name)
+            if failed:
+                entry.failures += 1
+                entry.interval *= config['backend_poll_backoff']
+            elif entry.changed:
+                entry.failures = 0
+                entry.interval = entry.base_interval
+            else:
+                entry.failures = 0
+                entry.interval *= config['backend_poll_growth']
+            entry.interval = max(entry.base_interval, min(entry.interval, config['max_backend_poll_rate']))
+            entry.changed = False
+            entry.checking = False
+            next_check = self._clock()
+            if not entry.expedited:
+                next_check += entry.interval
+            entry.expedited = False
+            if not entry.queued:
+                self._push(entry, next_check)
+
+    def changed(self, backend_name, reschedule=False):
+        """
+        Record that a job on a backend has changed status
+        Args:
+            backend_name (str): name of the backend of the job
+            reschedule (bool): check the backend again within its base interval, e.g. when a job has just been submitted to it
+        """
+        with self._lock:
+            entry = self._schedule(backend_name)
+            entry.changed = True
+            if not reschedule:
+                return
+            entry.interval = entry.base_interval
+            if entry.checking:
+                # The backend is queued again when the check in progress completes
+                return
+            next_check = self._clock() + entry.base_interval
+            if entry.queued:
+                if min(item[0] for item in self._queue if item[2] == backend_name) <= next_check:
+                    return
+                self._remove(entry)
+            self._push(entry, next_check)
+
+    def expedite(self, backend_name):
+        """
+        Make a backend due to be checked now, e.g. as the status file of one of its jobs has been written.
+        If the backend is being checked it is due again once the check in progress completes
+        Args:
+            backend_name (str): name of the backend
+        """
+        with self._lock:
+            entry = self._schedule(backend_name)
+            entry.changed = True
+            entry.interval = entry.base_interval
+            if entry.checking:
+                entry.expedited = True
+                return
+            if entry.queued:
+                self._remove(entry)
+            self._push(entry, self._clock())
+
+    def reset(self):
+        """
+        Make every backend due to be checked now, used when the monitoring is (re)started.
+        Checks which were queued when the monitoring was stopped are dropped without completing so these are forgotten
+        """
+        with self._lock:
+            now = self._clock()
+            self._queue = []
+            for entry in self._schedules.itervalues():
+                entry.interval = entry.base_interval
+                entry.failures = 0
+                entry.checking = False
+                entry.expedited = False
+                self._push(entry, now)
+
+    def interval(self, backend_name):
+        """
+        The current interval between checks of a backend
+        Args:
+            backend_name (str): name of the backend
+        """
+        with self._lock:
+            return self._schedule(backend_name).interval
+
+    def next_check(self):
+        """ The time of the next check which is due, None if no checks are queued """
+        with self._lock:
+            if not self._queue:
+                return None
+            return self._queue[0][0]
@@ -0,0 +1,419 @@
+"""
+Notification of changes to the status files which jobs write to their output workspaces.
+
+The Localhost and Batch backends find out what their jobs are doing by reading the __jobstatus__ file in the output
+workspace of each job. Rather than reading every status file on every check, a backend asks the StatusFileWatcher
+whether the status file of a job has changed since it was last read.
+
+Where inotify is available the output workspaces are watched: a change to a status file marks it as changed and makes
+the backend of the job due to be checked by the monitoring loop at once, so a job finishing is seen within the minimum
+poll rate of the loop and the checks of jobs which aren't doing anything don't read any files. The times the
+__heartbeat__ files are touched are also recorded from these events.
+
+Workspaces on network filesystems, whose files are written on other hosts and so don't raise any events here, and all
+workspaces when inotify isn't available, fall back to polling: the status file is only read when a stat of it shows
+that it has changed.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import threading
+import time
+
+from Ganga.Core.GangaThread import GangaThread
+from Ganga.Utility.Config import getConfig
+from Ganga.Utility.logging import getLogger
+
+logger = getLogger()
+
+status_file_name = '__jobstatus__'
+heartbeat_file_name = '__heartbeat__'
+
+# inotify(7) constants
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_Q_OVERFLOW = 0x00004000
+_IN_IGNORED = 0x00008000
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = 0o2000000
+
+_watch_mask = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+
+# wd, mask, cookie, length of the name which follows
+_event_header = struct.Struct('iIII')
+
+# Filesystems whose files may be written by other hosts
+_remote_filesystems = ('nfs', 'nfs4', 'afs', 'cifs', 'smbfs', 'smb3', 'lustre', 'gpfs', 'ceph', 'glusterfs', 'panfs',
+                       '9p', 'beegfs', 'cvmfs', 'eos')
+
+
+class Inotify(object):
+
+    """
+    Minimal wrapper of the inotify calls of libc
+    """
+
+    __slots__ = ('_libc', '_fd')
+
+    def __init__(self):
+        """ Raises OSError if inotify isn't available """
+        super(Inotify, self).__init__()
+        libc_name = ctypes.util.find_library('c')
+        if libc_name is None:
+            raise OSError(errno.ENOSYS, 'libc not found')
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, 'inotify_init1'):
+            raise OSError(errno.ENOSYS, 'inotify is not supported')
+        self._fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+
+    def fileno(self):
+        return self._fd
+
+    def add_watch(self, path, mask):
+        """
+        Watch a directory, returns the watch descriptor
+        Args:
+            path (str): The directory
+            mask (int): The events to watch for
+        """
+        if isinstance(path, unicode):
+            path = path.encode('utf-8')
+        wd = self._libc.inotify_add_watch(self._fd, path, mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        return wd
+
+    def rm_watch(self, wd):
+        """
+        Stop watching a directory
+        Args:
+            wd (int): The watch descriptor returned by add_watch
+        """
+        self._libc.inotify_rm_watch(self._fd, wd)
+
+    def read_events(self):
+        """ Return the list of (wd, mask, name) of the events which are waiting to be read """
+        try:
+            data = os.read(self._fd, 65536)
+        except OSError as err:
+            if err.errno in (errno.EAGAIN, errno.EINTR):
+                return []
+            raise
+        events = []
+        offset = 0
+        while offset + _event_header.size <= len(data):
+            wd, mask, _cookie, length = _event_header.unpack_from(data, offset)
+            offset += _event_header.size
+            name = data[offset:offset + length].rstrip('\0')
+            offset += length
+            events.append((wd, mask, name))
+        return events
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def _isRemote(path, mounts_file='/proc/mounts'):
+    """
+    Return whether a path is on a network filesystem, according to the mount point it is under
+    Args:
+        path (str): The path
+        mounts_file (str): The table of the mounted filesystems
+    """
+    path = os.path.realpath(path)
+    best, best_type = '', ''
+    try:
+        with open(mounts_file) as mounts:
+            for line in mounts:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                mount_point = fields[1].replace('\\040', ' ')
+                if (path == mount_point or path.startswith(mount_point.rstrip('/') + '/')) and len(mount_point) > len(best):
+                    best, best_type = mount_point, fields[2]
+    except IOError:
+        # Not knowing what the filesystem is, events can't be relied on
+        return True
+    return best_type in _remote_filesystems or best_type.startswith('fuse')
+
+
+def _statusStat(directory):
+    """ What a stat of the status file in a directory tells about its content, None if it doesn't exist """
+    try:
+        stat = os.stat(os.path.join(directory, status_file_name))
+    except OSError:
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime)
+
+
+class _WatchedDirectory(object):
+
+    """ The state of the status file of one output workspace """
+
+    __slots__ = ('backend_name', 'wd', 'changed', 'stat', 'heartbeat')
+
+    def __init__(self, backend_name):
+        super(_WatchedDirectory, self).__init__()
+        self.backend_name = backend_name
+        # inotify watch descriptor, None if the directory is polled
+        self.wd = None
+        # True if an event has been seen for the status file since it was last read
+        self.changed = False
+        # the last _statusStat of a polled status file
+        self.stat = None
+        # the time an event was last seen for the heartbeat file
+        self.heartbeat = None
+
+
+class _EventThread(GangaThread):
+
+    """ Reads the inotify events and passes them on to the watcher """
+
+    __slots__ = ('_watcher',)
+
+    def __init__(self, watcher):
+        GangaThread.__init__(self, name='StatusFileWatcher', critical=False)
+        self._watcher = watcher
+
+    def run(self):
+        while not self.should_stop():
+            if not self._watcher._readEvents(timeout=1.):
+                break
+
+
+class StatusFileWatcher(object):
+
+    """
+    Keeps track of which of the status files in the output workspaces of the jobs being monitored have changed
+    """
+
+    __slots__ = ('_lock', '_directories', '_wds', '_inotify', '_thread', '_listeners')
+
+    def __init__(self, useEvents=True):
+        """
+        Args:
+            useEvents (bool): Watch the workspaces with inotify if it's available, rather than always polling
+        """
+        super(StatusFileWatcher, self).__init__()
+        self._lock = threading.Lock()
+        # directory: _WatchedDirectory
+        self._directories = {}
+        # watch descriptor: list of the directories watched by it
+        self._wds = {}
+        self._inotify = None
+        if useEvents:
+            try:
+                self._inotify = Inotify()
+            except (OSError, AttributeError) as err:
+                logger.debug("Status files will be polled as inotify isn't available: %s" % err)
+        self._thread = None
+        self._listeners = []
+
+    @property
+    def usingEvents(self):
+        """ Whether any changes are found from inotify events """
+        return self._inotify is not None
+
+    def addListener(self, listener):
+        """
+        Register a function to be called with the name of the backend of a job whose status file has changed
+        Args:
+            listener (function): The function, which is called from the thread reading the events
+        """
+        with self._lock:
+            if listener not in self._listeners:
+                self._listeners.append(listener)
+
+    def removeListener(self, listener):
+        """
+        Unregister a function registered with addListener
+        Args:
+            listener (function): The function
+        """
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def statusChanged(self, directory, backend_name):
+        """
+        Return whether the status file in an output workspace may have changed since this was last called for it.
+        The first call for a workspace starts watching it and is always True, so the status file must be read after
+        each call which returns True
+        Args:
+            directory (str): The output workspace of the job
+            backend_name (str): Name of the class of the backend of the job
+        """
+        with self._lock:
+            entry = self._directories.get(directory)
+            if entry is None:
+                self._directories[directory] = entry = self._watch(directory, backend_name)
+                entry.stat = _statusStat(directory)
+                return True
+            if entry.wd is not None and self._thread is not None and self._thread.is_alive():
+                changed = entry.changed
+                entry.changed = False
+                return changed
+        stat = _statusStat(directory)
+        with self._lock:
+            changed = stat != entry.stat
+            entry.stat = stat
+        return changed
+
+    def lastModified(self, directory, file_name=heartbeat_file_name):
+        """
+        Return the time a file in a watched output workspace was last modified, None if it doesn't exist.
+        For the heartbeat file of a workspace which is being watched this is known from the events
+        Args:
+            directory (str): The output workspace of the job
+            file_name (str): The name of the file in the workspace
+        """
+        with self._lock:
+            entry = self._directories.get(directory)
+            if file_name == heartbeat_file_name and entry is not None and entry.heartbeat is not None:
+                return entry.heartbeat
+        try:
+            modified = os.path.getmtime(os.path.join(directory, file_name))
+        except OSError:
+            return None
+        if file_name == heartbeat_file_name and entry is not None and entry.wd is not None:
+            with self._lock:
+                if entry.heartbeat is None:
+                    entry.heartbeat = modified
+        return modified
+
+    def forget(self, directory):
+        """
+        Stop watching an output workspace, e.g. once its job has finished
+        Args:
+            directory (str): The output workspace of the job
+        """
+        with self._lock:
+            entry = self._directories.pop(directory, None)
+            if entry is None or entry.wd is None:
+                return
+            directories = self._wds.get(entry.wd, [])
+            if directory in directories:
+                directories.remove(directory)
+            if not directories:
+                self._wds.pop(entry.wd, None)
+                self._inotify.rm_watch(entry.wd)
+
+    def _watch(self, directory, backend_name):
+        """ Start watching a directory, the lock must be held """
+        entry = _WatchedDirectory(backend_name)
+        if self._inotify is None or _isRemote(directory):
+            return entry
+        try:
+            wd = self._inotify.add_watch(directory, _watch_mask)
+        except OSError as err:
+            # e.g. the directory doesn't exist yet or there are too many watches (ENOSPC)
+            logger.debug("Polling the status file in %s: %s" % (directory, err))
+            return entry
+        # Several directories could be the same one, in which case they share the watch
+        self._wds.setdefault(wd, []).append(directory)
+        entry.wd = wd
+        if self._thread is None:
+            self._thread = _EventThread(self)
+            self._thread.start()
+        return entry
+
+    def _readEvents(self, timeout):
+        """
+        Wait up to timeout seconds for inotify events and handle them. Returns False if the events can't be read anymore
+        Args:
+            timeout (float): The time to wait in seconds
+        """
+        inotify = self._inotify
+        if inotify is None:
+            return False
+        try:
+            readable = select.select([inotify], [], [], timeout)[0]
+        except (select.error, ValueError) as err:
+            if getattr(err, 'args', None) and err.args[0] == errno.EINTR:
+                return True
+            logger.debug("Stopped reading status file events: %s" % err)
+            return False
+        if not readable:
+            return True
+
+        now = time.time()
+        backends = set()
+        with self._lock:
+            for wd, mask, name in inotify.read_events():
+                if mask & _IN_Q_OVERFLOW:
+                    # Events have been lost so every status file may have changed
+                    for entry in self._directories.itervalues():
+                        entry.changed = True
+                        backends.add(entry.backend_name)
+                    continue
+                for directory in self._wds.get(wd, ()):
+                    entry = self._directories.get(directory)
+                    if entry is None:
+                        continue
+                    if name == status_file_name:
+                        # The backend only needs telling once until the status file is read again
+                        if not entry.changed:
+                            backends.add(entry.backend_name)
+                        entry.changed = True
+                    elif name == heartbeat_file_name:
+                        entry.heartbeat = now
+                if mask & _IN_IGNORED:
+                    # The directory has been removed, along with its job
+                    for directory in self._wds.pop(wd, ()):
+                        self._directories.pop(directory, None)
+            listeners = list(self._listeners)
+
+        for backend_name in backends:
+            for listener in listeners:
+                try:
+                    listener(backend_name)
+                except Exception as err:
+                    logger.debug("Status file listener failed: %s" % err)
+        return True
+
+    def close(self):
+        """ Stop watching all of the workspaces """
+        with self._lock:
+            thread, self._thread = self._thread, None
+            inotify, self._inotify = self._inotify, None
+            self._directories = {}
+            self._wds = {}
+        if thread is not None:
+            thread.stop()
+            thread.join(2.)
+        if inotify is not None:
+            inotify.close()
+
+
+_watcher_lock = threading.Lock()
+_watcher = None
+
+
+def getStatusFileWatcher():
+    """ Return the watcher shared by the backends and the monitoring loop """
+    global _watcher
+    with _watcher_lock:
+        if _watcher is None:
+            _watcher = StatusFileWatcher(getConfig('PollThread')['status_file_events'])
+        return _watcher
+
+
+def shutdownStatusFileWatcher():
+    """ Stop watching the status files when Ganga shuts down, the next session starts a new watcher """
+    global _watcher
+    with _watcher_lock:
+        watcher, _watcher = _watcher, None
+    if watcher is not None:
+        watcher.close()
@@ -19,6 +19,7 @@ from Ganga.Utility.logic import implies
 from Ganga.Core.exceptions import GangaException, IncompleteJobSubmissionError
 
 import os
+import functools
 import itertools
 import time
 from collections import defaultdict
@@ -67,28 +68,22 @@ class IBackend(GangaObject):
         """
         pass
 
-    def _parallel_submit(self, b, sj, sc, master_input_sandbox, fqid, logger):
-
-        try:
-            sj.updateStatus('submitting')
-            if b.submit(sc, master_input_sandbox):
-                sj.updateStatus('submitted')
-                sj.info.increment()
-            else:
-                raise IncompleteJobSubmissionError(fqid, 'submission failed')
-        except Exception as err:
-            #from Ganga.Utility.logging import log_user_exception
-            sj.updateStatus('failed')
-
-            #from Ganga.Core.exceptions import GangaException
-            #if isinstance(err, GangaException):
-            #    logger.error("%s" % err)
-            #    #log_user_exception(logger, debug=True)
-            #else:
-            #    #log_user_exception(logger, debug=False)
-            logger.error("Parallel Job Submission Failed: %s" % err)
-        finally:
-            pass
+    @staticmethod
+    def _submit_subjob(sj, sc, master_input_sandbox):
+        """ Submit a single subjob with its own backend, returns True if it was submitted
+        Args:
+            sj (Job): the subjob to submit
+            sc (StandardJobConfig): the config of the subjob
+            master_input_sandbox (list): the files of the input sandbox shared by all of the subjobs
+        """
+        b = stripProxy(sj.backend)
+        sj.updateStatus('submitting')
+        if b.submit(sc, master_input_sandbox):
+            sj.updateStatus('submitted')
+            # sj._commit() # PENDING: TEMPORARY DISABLED
+            stripProxy(sj.info).increment()
+            return True
+        return False
 
     def master_submit(self, rjobs, subjobconfigs, masterjobconfig, keep_going=False, parallel_submit=False):
         """  Submit   the  master  job  and  all   its  subjobs.   The
@@ -149,15 +144,14 @@ class IBackend(GangaObject):
 
         if parallel_submit:
 
-            from Ganga.Core.GangaThread.WorkerThreads import getQueues
-
-            threads_before = getQueues().totalNumIntThreads()
+            from Ganga.GPIDev.Adapters.SubmissionEngine import SubmissionEngine
 
+            tasks = []
             for sc, sj in zip(subjobconfigs, rjobs):
 
                 b = sj.backend
 
-                # Must check for credentials here as we cannot handle missing credentials on Queues by design!
+                # Must check for credentials here as we cannot handle missing credentials in the submission threads by design!
                 if hasattr(b, 'credential_requirements') and b.credential_requirements is not None:
                     from Ganga.GPIDev.Credentials.CredentialStore import credential_store
                     try:
@@ -165,25 +159,34 @@ class IBackend(GangaObject):
                     except GangaKeyError:
                         credential_store.create(b.credential_requirements)
 
-                fqid = sj.getFQID('.')
-                # FIXME would be nice to move this to the internal threads not user ones
-                getQueues()._monitoring_threadpool.add_function(self._parallel_submit, (b, sj, sc, master_input_sandbox, fqid, logger))
-
-            def subjob_status_check(rjobs):
-                has_submitted = True
-                for sj in rjobs:
-                    if sj.status not in ["submitted","failed","completed","running","completing"]:
-                        has_submitted = False
-                        break
-                return has_submitted
+                tasks.append((sj.getFQID('.'), functools.partial(self._submit_subjob, sj, sc, master_input_sandbox)))
 
-            while not subjob_status_check(rjobs):
-                import time
-                time.sleep(1.)
+            master = self.getJobObject()
+            engine = SubmissionEngine('Submitting job %s' % master.getFQID('.'), getName(self))
+            logger.info("submitting %s subjobs of job %s to %s backend in parallel", len(tasks), master.getFQID('.'), getName(self))
 
-            for i in rjobs:
-                if i.status in ["new", "failed"]:
+            # Results are handled in the order of the subjobs, as they are when they're submitted one at a time
+            for result in engine.run(tasks, keep_going):
+                if not result.attempted:
+                    continue
+                fqid = result.name
+                if result.error is None and result.result:
+                    incomplete = 1
+                    continue
+                if result.error is not None:
+                    if isType(result.error, GangaException):
+                        logger.error("%s" % result.error)
+                    else:
+                        logger.error("Submission of job %s failed: %s" % (fqid, result.error))
+                    error = IncompleteJobSubmissionError(fqid, str(result.error))
+                else:
+                    error = IncompleteJobSubmissionError(fqid, 'submission failed')
+                if handleError(error):
                     return 0
+
+            if incomplete_subjobs:
+                raise IncompleteJobSubmissionError(incomplete_subjobs, 'submission failed')
+
             return 1
 
         for sc, sj in zip(subjobconfigs, rjobs):
@@ -191,13 +194,8 @@ class IBackend(GangaObject):
             fqid = sj.getFQID('.')
             logger.info("submitting job %s to %s backend", fqid, getName(sj.backend))
             try:
-                b = stripProxy(sj.backend)
-                sj.updateStatus('submitting')
-                if b.submit(sc, master_input_sandbox):
-                    sj.updateStatus('submitted')
-                    # sj._commit() # PENDING: TEMPORARY DISABLED
+                if self._submit_subjob(sj, sc, master_input_sandbox):
                     incomplete = 1
-                    stripProxy(sj.info).increment()
                 else:
                     if handleError(IncompleteJobSubmissionError(fqid, 'submission failed')):
                         return 0
@@ -447,6 +445,8 @@ class IBackend(GangaObject):
         # are not locked by an active session of ganga
 
         queues = getQueues()
+        # completions of the monitoring tasks run in the queues, waited on before returning
+        completions = []
 
         for j in jobs:
             ## All subjobs should have same backend
@@ -502,7 +502,7 @@ class IBackend(GangaObject):
                             subjobs_to_monitor.append(j.subjobs[sj_id])
                         if multiThreadMon:
                             if queues.totalNumIntThreads() < getConfig("Queues")['NumWorkerThreads']:
-                                queues._addSystem(j.backend.updateMonitoringInformation, args=(subjobs_to_monitor,), name="Backend Monitor")
+                                completions.append(queues._addSystem(j.backend.updateMonitoringInformation, args=(subjobs_to_monitor,), name="Backend Monitor"))
                         else:
                             j.backend.updateMonitoringInformation(subjobs_to_monitor)
                     except Exception as err:
@@ -521,24 +521,17 @@ class IBackend(GangaObject):
                 logger.debug('Monitoring jobs: %s', repr([jj._repr() for jj in simple_jobs[this_backend]]))
                 if multiThreadMon:
                     if queues.totalNumIntThreads() < getConfig("Queues")['NumWorkerThreads']:
-                        queues._addSystem(stripProxy(simple_jobs[this_backend][0].backend).updateMonitoringInformation,
-                                          args=(simple_jobs[this_backend],), name="Backend Monitor")
+                        completions.append(queues._addSystem(stripProxy(simple_jobs[this_backend][0].backend).updateMonitoringInformation,
+                                                             args=(simple_jobs[this_backend],), name="Backend Monitor"))
                 else:
                     stripProxy(simple_jobs[this_backend][0].backend).updateMonitoringInformation(simple_jobs[this_backend])
 
         logger.debug("Finished Monitoring request")
 
-        if not multiThreadMon:
-            return
-
-        loop = True
-        while loop:
-            for stat in queues._monitoring_threadpool.worker_status():
-                loop = False;
-                if stat[0] is not None and stat[0].startswith("Backend Monitor"):
-                    loop = True;
-                    break;
-            time.sleep(1.)
+        # Wait for the monitoring tasks which were queued, tasks which couldn't be queued return None
+        for completion in completions:
+            if completion is not None:
+                completion.wait()
 
     @staticmethod
     def updateMonitoringInformation(jobs):
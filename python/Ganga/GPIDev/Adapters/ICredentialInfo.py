@@ -12,6 +12,7 @@ import Ganga.Utility.logging
 
 from Ganga.Core.exceptions import CredentialsError
 from Ganga.GPIDev.Credentials.CredentialStore import credential_store
+from Ganga.GPIDev.Credentials.CredentialService import credential_service
 
 from Ganga.Utility.Config import getConfig
 
@@ -22,12 +23,12 @@ def cache(method):
     The cache decorator can be applied to any method in an ``ICredentialInfo` subclass.
     It stores the return value of the function in the ``self.cache`` dictionary
     with the key being the name of the function.
-    The cache is invalidated if ``os.path.getmtime(self.location)`` returns
-    greater than ``self.cache['mtime']``, i.e. if the file has changed on disk
+    The cache is invalidated if ``os.path.getmtime(self.location)`` differs
+    from ``self.cache['mtime']``, i.e. if the file has changed on disk
 
     Not having to call the external commands comes at the cost of calling ``stat()``
-    every time a parameter is accessed but this is still a saving of many orders of
-    magnitude.
+    at most once every ``[Credentials]AtomicDelay`` seconds, the time of the last
+    check being kept in ``self.cache['ccheck']``.
 
     Args:
         method (function): This is the method which we're wrapping
@@ -38,33 +39,17 @@ def cache(method):
 
         with self.cache_lock:
 
-            if 'mtime' in self.cache:
-                time_before = self.cache['mtime']
-            else:
-                time_before = -1
-
-            if 'ccheck' in self.cache:
-                check_time = self.cache['cceck']
-            else:
-                check_time = time.time()
-
             # If the mtime has been changed, clear the cache
             if credential_store.enable_caching and os.path.exists(self.location):
-                if time.time() - check_time > getConfig('Credentials')['AtomicDelay']:
+                check_time = time.time()
+                if check_time - self.cache.get('ccheck', 0) > getConfig('Credentials')['AtomicDelay']:
                     mtime = os.path.getmtime(self.location)
-                    if mtime > self.cache['mtime']:
+                    if mtime != self.cache.get('mtime'):
                         self.cache = {'mtime': mtime}
+                    self.cache['ccheck'] = check_time
             else:
                 self.cache = {'mtime': 0}
 
-            time_after = self.cache['mtime']
-
-            if time_before != time_after:
-                for k in self.cache.keys():    
-                    del self.cache[k]
-
-            self.cache['mtime'] = time_after
-
             # If entry is missing from cache, repopulate it
             # This will run if the cache was just cleared
             if method.func_name not in self.cache:
@@ -204,9 +189,20 @@ class ICredentialInfo(object):
         """
         Returns the time left
         """
+        if credential_store.enable_caching:
+            # The expiry time is kept by the service, which only reads it again once the file has changed
+            return credential_service.time_left(self)
         time_left = self.expiry_time() - datetime.now()
         return max(time_left, timedelta())
 
+    def clear_cache(self):
+        # type: () -> None
+        """
+        Forget the cached values, so that they are read from the credential file again
+        """
+        with self.cache_lock:
+            self.cache = {'mtime': 0}
+
     def check_requirements(self, query):
         # type: (ICredentialRequirement) -> bool
         """
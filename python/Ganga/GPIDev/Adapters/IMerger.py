@@ -63,15 +63,22 @@ class IMerger(IPostProcessor):
         'files': SimpleItem(defvalue=[], typelist=[str], sequence=1, doc='A list of files to merge.'),
         'ignorefailed': SimpleItem(defvalue=False, doc='Jobs that are in the failed or killed states will be excluded from the merge when this flag is set to True.'),
         'overwrite': SimpleItem(defvalue=False, doc='The default behaviour for this Merger object. Will overwrite output files.'),
+        'incremental': SimpleItem(defvalue=False, doc='Merge the output of each subjob as soon as it completes rather than that of all of the subjobs once the job has finished.'),
     })
     order = 1
 
+    # whether incremental merges append each file to the partial result (appendfiles) rather than merging the partial
+    # result and the file into a new partial result (mergefiles), see Ganga.Lib.Mergers.IncrementalMerge
+    incremental_append = False
+
     __slots__ = list()
 
     def execute(self, job, newstatus):
         """
         Execute
         """
+        if self.incremental and hasattr(self, 'mergefiles'):
+            return self._executeIncremental(job, newstatus)
         if (len(job.subjobs) != 0):
             try:
                 return self.merge(job.subjobs, job.outputdir)
@@ -81,6 +88,57 @@ class IMerger(IPostProcessor):
         else:
             return True
 
+    def _executeIncremental(self, job, newstatus):
+        """
+        Fold the output of a subjob which has completed into the partial result of the merge, or finish the merge of
+        a master job
+        Args:
+            job (Job): The job whose status is changing
+            newstatus (str): The status it is changing to
+        """
+        from Ganga.Lib.Mergers.IncrementalMerge import foldJob, finishMerge
+        if job.master is not None:
+            if newstatus == 'completed':
+                try:
+                    foldJob(self, job, job.master.outputdir, self.ignorefailed)
+                except (PostProcessException, IOError, OSError) as e:
+                    # the subjob is folded when the master job finishes, where the merge fails if it still can't be
+                    logger.warning('The output of job %s could not be merged yet: %s', job.fqid, e)
+            return True
+        if len(job.subjobs) != 0:
+            try:
+                return finishMerge(self, job.subjobs, job.outputdir, self.ignorefailed, self.overwrite)
+            except PostProcessException as e:
+                logger.error("%s" % e)
+                return self.failure
+        return True
+
+    def appendfiles(self, accumulator, file_list):
+        """
+        Append files to the partial result of an incremental merge, creating it if needed.
+        Implemented by the mergers which set incremental_append
+        Args:
+            accumulator (str): The path of the partial result
+            file_list (list): The paths of the files to append
+        """
+        raise NotImplementedError
+
+    def finishfiles(self, accumulator):
+        """
+        Complete the partial result of an incremental merge which was appended to before it becomes the merged file
+        Args:
+            accumulator (str): The path of the partial result
+        """
+        pass
+
+    def incrementalOutput(self, outputfile):
+        """
+        The name of the file which an incremental merge of outputfile produces
+        Args:
+            outputfile (str): The name of the files merged
+        """
+        return outputfile
+
     def merge(self, jobs, outputdir=None, ignorefailed=None, overwrite=None):
 
         if ignorefailed == None:
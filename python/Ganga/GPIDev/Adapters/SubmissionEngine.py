@@ -0,0 +1,195 @@
+"""
+Parallel preparation and submission of the subjobs of a job.
+
+A SubmissionEngine runs a list of tasks, such as submitting each subjob, from a bounded set of threads dedicated to it
+and collects the result of each task in order. It waits for its threads to finish rather than polling the status of
+the subjobs so submitting N subjobs costs O(N).
+
+Tasks for a backend share limits across all of the jobs being submitted at the same time:
+    [Submission]BackendMaxThreads   largest number of tasks running against a backend at once
+    [Submission]BackendMaxRate      largest number of tasks started against a backend per second
+"""
+
+import threading
+import time
+import Queue
+from collections import namedtuple
+
+from Ganga.Utility.Config import getConfig
+from Ganga.Utility.logging import getLogger
+
+logger = getLogger()
+
+# The outcome of a single task:
+#   name:      name of the task, e.g. the fqid of the subjob
+#   attempted: False if the task wasn't run because an earlier task failed and keep_going wasn't set
+#   result:    the value returned by the task
+#   error:     the exception raised by the task, None if it didn't raise
+SubmissionResult = namedtuple('SubmissionResult', ['name', 'attempted', 'result', 'error'])
+
+
+class _RateLimiter(object):
+
+    """ Spaces out the start of tasks so that no more than rate are started each second """
+
+    __slots__ = ('_interval', '_next', '_lock')
+
+    def __init__(self, rate):
+        """
+        Args:
+            rate (float): largest number of tasks started per second
+        """
+        super(_RateLimiter, self).__init__()
+        self._interval = 1. / rate
+        self._next = 0.
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """ Wait until the next task may start """
+        with self._lock:
+            now = time.time()
+            start = max(now, self._next)
+            self._next = start + self._interval
+        if start > now:
+            time.sleep(start - now)
+
+
+_limits_lock = threading.Lock()
+# backend name: BoundedSemaphore limiting the tasks running against the backend at once
+_backend_slots = {}
+# backend name: _RateLimiter, None if the backend isn't rate limited
+_backend_rates = {}
+
+
+def _getBackendLimits(backend_name):
+    """
+    Return the semaphore and rate limiter shared by all of the tasks for a backend
+    Args:
+        backend_name (str): name of the class of the backend
+    """
+    config = getConfig('Submission')
+    with _limits_lock:
+        if backend_name not in _backend_slots:
+            max_threads = config['BackendMaxThreads'].get(backend_name, config['MaxThreads'])
+            _backend_slots[backend_name] = threading.BoundedSemaphore(max(int(max_threads), 1))
+            rate = config['BackendMaxRate'].get(backend_name)
+            _backend_rates[backend_name] = _RateLimiter(float(rate)) if rate else None
+        return _backend_slots[backend_name], _backend_rates[backend_name]
+
+
+class SubmissionEngine(object):
+
+    """
+    Runs tasks from a bounded number of threads and collects their results in order
+    """
+
+    __slots__ = ('_description', '_backend_name', '_num_threads', '_progress_interval', '_lock', '_done', '_failed')
+
+    def __init__(self, description, backend_name=None, num_threads=None, progress_interval=None):
+        """
+        Args:
+            description (str): what the tasks do, used for the progress messages e.g. 'Submitting job 3'
+            backend_name (str): name of the backend the tasks run against, None for tasks which don't use a backend
+            num_threads (int): number of threads to run the tasks from, [Submission]MaxThreads if None
+            progress_interval (float): seconds between progress messages, [Submission]ProgressInterval if None
+        """
+        super(SubmissionEngine, self).__init__()
+        config = getConfig('Submission')
+        self._description = description
+        self._backend_name = backend_name
+        self._num_threads = num_threads if num_threads is not None else config['MaxThreads']
+        self._progress_interval = progress_interval if progress_interval is not None else config['ProgressInterval']
+        self._lock = threading.Lock()
+        self._done = 0
+        self._failed = 0
+
+    def run(self, tasks, keep_going=True):
+        """
+        Run the tasks and return a list of SubmissionResult in the same order as the tasks.
+        A task fails if it raises or returns a false value
+        Args:
+            tasks (list): list of (name, callable taking no arguments)
+            keep_going (bool): carry on running the remaining tasks after one has failed
+        """
+        results = [SubmissionResult(name, False, None, None) for name, _ in tasks]
+        if not tasks:
+            return results
+
+        if self._backend_name is not None:
+            slots, rate_limiter = _getBackendLimits(self._backend_name)
+        else:
+            slots, rate_limiter = None, None
+
+        pending = Queue.Queue()
+        for index in range(len(tasks)):
+            pending.put(index)
+        stop = threading.Event()
+
+        def worker():
+            while not stop.is_set():
+                try:
+                    index = pending.get_nowait()
+                except Queue.Empty:
+                    return
+                name, task = tasks[index]
+                if slots is not None:
+                    slots.acquire()
+                try:
+                    if stop.is_set():
+                        return
+                    if rate_limiter is not None:
+                        rate_limiter.wait()
+                    try:
+                        result, error = task(), None
+                    except Exception as err:
+                        logger.debug("%s: task %s failed: %s" % (self._description, name, err))
+                        result, error = None, err
+                finally:
+                    if slots is not None:
+                        slots.release()
+                results[index] = SubmissionResult(name, True, result, error)
+                failed = error is not None or not result
+                with self._lock:
+                    self._done += 1
+                    if failed:
+                        self._failed += 1
+                if failed and not keep_going:
+                    stop.set()
+
+        num_threads = max(1, min(int(self._num_threads), len(tasks)))
+        threads = [threading.Thread(target=worker, name='%s_%s' % (self._description, i)) for i in range(num_threads)]
+        start = time.time()
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+
+        last_report = start
+        for thread in threads:
+            if not self._progress_interval or self._progress_interval <= 0:
+                # No progress to report, a zero timeout would only spin
+                thread.join()
+                continue
+            while thread.is_alive():
+                thread.join(self._progress_interval)
+                if time.time() - last_report >= self._progress_interval:
+                    last_report = time.time()
+                    self._report(len(tasks), start)
+
+        if len(tasks) > 1:
+            self._report(len(tasks), start)
+        return results
+
+    def _report(self, total, start):
+        """
+        Log the progress of the tasks
+        Args:
+            total (int): the number of tasks
+            start (float): the time the tasks were started
+        """
+        with self._lock:
+            done, failed = self._done, self._failed
+        elapsed = max(time.time() - start, 1e-6)
+        message = "%s: %d/%d done (%.1f/s)" % (self._description, done, total, done / elapsed)
+        if failed:
+            message += ", %d failed" % failed
+        logger.info(message)
@@ -45,7 +45,17 @@ def _getName(obj):
 
 logger = getLogger()
 
-do_not_copy = ['_index_cache_dict', '_parent', '_registry', '_data_dict', '_lock', '_proxyObject']
+do_not_copy = ['_index_cache_dict', '_parent', '_registry', '_data_dict', '_lock', '_proxyObject', '_proxy_list_cache']
+
+# Changed each time an object is given a new parent, the roots cached before then are out of date
+_tree_generation = [0]
+_tree_generation_lock = threading.Lock()
+
+
+def _reparented():
+    """Invalidate all of the cached roots, must be called once the parent of an object has changed"""
+    with _tree_generation_lock:
+        _tree_generation[0] += 1
 
 def synchronised(f):
     """
@@ -72,13 +82,14 @@ class Node(object):
     thread-safe usage.
     """
     __metaclass__ = abc.ABCMeta
-    __slots__ = ('_parent', '_lock', '_dirty')
+    __slots__ = ('_parent', '_lock', '_dirty', '_root_cache')
 
     def __init__(self, parent=None):
         super(Node, self).__init__()
         self._parent = parent
         self._lock = threading.RLock()  # Don't write from out of thread when modifying an object
         self._dirty = False  # dirty flag is true if the object has been modified locally and its contents is out-of-sync with its repository
+        self._root_cache = None  # (tree generation, root) of the last root found
 
     def __deepcopy__(self, memo=None):
         cls = self.__class__
@@ -114,6 +125,8 @@ class Node(object):
             with parent.const_lock: # This will lock the _new_ root object
                 setattr(self, '_parent', parent)
             # Finally the new and then old root objects will be unlocked
+        # The roots of this object and of everything below it may have changed
+        _reparented()
 
     @property
     @contextmanager
@@ -137,48 +150,36 @@ class Node(object):
         if parent does not exist then the root is the 'self' object
         cond is an optional function which may cut the search path: when it
         returns True, then the parent is returned as root
+        The root found without a cond is cached until an object is next given a new parent
         """
 
-        self_parent = self._getParent()
-        if self_parent is None:
-            return self
-        obj = self_parent
-
-        if cond is None:
-            while True:
+        if cond is not None:
+            obj = self._getParent()
+            if obj is None:
+                return self
+            while not cond(obj):
                 parent = obj._getParent()
-                if parent is not None:
-                    obj = parent
-                else:
-                    break
-                return obj
-        else:
-                                                    
-            if cond(obj):
-                return obj
-                                                                                  
-            escape = False
-            while True:
-                parent = obj._getObject()
-                if parent is None or cond(obj):
+                if parent is None:
                     break
                 obj = parent
             return obj
 
-        if cond is None:
-            while obj._getParent() is not None:
-                obj = obj._getParent()
-            return obj
-        else:
-
-            if cond(obj):
-                return obj
-
-            while obj._getParent() is not None:
-                if cond(obj):
-                    break
-                obj = obj._getParent()
-            return obj
+        # The generation is read before the tree is walked so a parent changed during the walk invalidates the result
+        generation = _tree_generation[0]
+        try:
+            cached = self._root_cache
+        except AttributeError:
+            cached = None
+        if cached is not None and cached[0] == generation:
+            return cached[1]
+
+        obj = self
+        parent = obj._getParent()
+        while parent is not None:
+            obj = parent
+            parent = obj._getParent()
+        self._root_cache = (generation, obj)
+        return obj
 
     # accept a visitor pattern
     @abc.abstractmethod
@@ -247,6 +248,9 @@ class Node(object):
 def synchronised_get_descriptor(get_function):
     """
     This decorator should only be used on ``__get__`` method of the ``Descriptor``.
+    A value which is already in the ``_data`` of the object is returned without taking the lock, a dict lookup can't see
+    a value half written and a value is only ever replaced whole. Everything else, getters, the index cache and loading
+    from disk, is done under the lock of the root object.
     Args:
         get_function (function): Function we intend to wrap with the soft/read lock
     """
@@ -255,6 +259,12 @@ def synchronised_get_descriptor(get_function):
         if obj is None:
             return get_function(self, obj, type_or_value)
 
+        if not self._getter_name:
+            try:
+                return obj._data_dict[self._name]
+            except (KeyError, AttributeError):
+                pass
+
         with obj._getRoot()._lock:
             return get_function(self, obj, type_or_value)
 
@@ -258,6 +258,9 @@ def stripProxy(obj):
     Args:
         obj (object): This may be an instance or a class
     """
+    if isinstance(obj, GPIProxyObject):
+        # the common case, read the implementation without going through the __getattribute__ of the proxy
+        return object.__getattribute__(obj, implRef)
     if isinstance(obj, (list, tuple)):
         return type(obj)(stripProxy(_) for _ in obj)
     elif isinstance(obj, dict):
@@ -273,6 +276,8 @@ def addProxy(obj):
     Args:
         obj (GangaObject): This may be a Ganga object which you're wanting to add a proxy to
     """
+    if isinstance(obj, GPIProxyObject):
+        return obj
     if isType(obj, GangaObject):
         if not isProxy(obj):
             if hasattr(obj, proxyObject):
@@ -384,39 +389,58 @@ class ProxyDataDescriptor(object):
             # return Schema.make_helper(getattr(getattr(cls, implRef), getName(self)))
             return getattr(stripProxy(cls), getName(self))
 
+        name = self._name
         raw_obj = stripProxy(obj)
         try:
-            val = getattr(raw_obj, getName(self))
+            val = getattr(raw_obj, name)
         except Exception as err:
-            if getName(self) in raw_obj.__dict__:
-                val = raw_obj.__dict__[getName(self)]
+            if name in raw_obj.__dict__:
+                val = raw_obj.__dict__[name]
             else:
-                val = getattr(raw_obj, getName(self))
+                val = getattr(raw_obj, name)
 
         # wrap proxy
-        item = raw_obj._schema[getName(self)]
+        item = raw_obj._schema[name]
 
         if item['proxy_get']:
             return getattr(raw_obj, item['proxy_get'])()
 
-        if isType(item, ComponentItem):
+        # the values read from the raw object and the schema items are never proxies, so isinstance is enough
+        if isinstance(item, ComponentItem):
             disguiser = self.disguiseComponentObject
         else:
             disguiser = self.disguiseAttribute
 
         ## FIXME Add GangaList?
-        if item['sequence'] and isType(val, list):
-            from Ganga.GPIDev.Lib.GangaList.GangaList import makeGangaList
-            val = makeGangaList(val, disguiser)
+        if item['sequence'] and isinstance(val, list):
+            val = self._wrapList(raw_obj, val, disguiser)
 
         returnable = disguiser(val)
         
 
-        if isType(returnable, GangaObject):
+        if isinstance(returnable, GangaObject):
             return addProxy(returnable)
         else:
             return returnable
 
+    def _wrapList(self, raw_obj, val, disguiser):
+        """
+        Return a new GangaList shown for a plain list attribute, the elements wrapped the last time are reused while the
+        list holds the same objects. The GangaList itself is never reused as the caller may change it
+        Args:
+            raw_obj (GangaObject): The object which holds the attribute
+            val (list): The value of the attribute
+            disguiser (function): Wraps the elements of the list
+        """
+        from Ganga.GPIDev.Lib.GangaList.GangaList import makeGangaList
+        cache = raw_obj.__dict__.setdefault('_proxy_list_cache', {})
+        cached = cache.get(self._name)
+        if cached is not None and cached[0] is val and len(cached[1]) == len(val) and all(a is b for a, b in zip(cached[1], val)):
+            return makeGangaList(cached[2])
+        elements = [disguiser(element) for element in val]
+        cache[self._name] = (val, list(val), elements)
+        return makeGangaList(elements)
+
     @staticmethod
     def _check_type(obj, val, attr_name):
         item = stripProxy(obj)._schema[attr_name]
@@ -1114,8 +1138,9 @@ Setting a [protected] or a unexisting property raises AttributeError.""")
         else:
             implInstance = stripProxy(self)
 
-            if '_attribute_filter__get__' in dir(implInstance) and \
-                    not isType(implInstance, ObjectMetaclass) and \
+            # the filter is a method so looking at the class is enough, dir() of the instance is far slower
+            if hasattr(type(implInstance), '_attribute_filter__get__') and \
+                    not isinstance(implInstance, ObjectMetaclass) and \
                     implInstance._schema.hasItem(name) and \
                     not implInstance._schema.getItem(name)['hidden']:
                         returnable = addProxy(implInstance._attribute_filter__get__(name))
@@ -1125,7 +1150,8 @@ Setting a [protected] or a unexisting property raises AttributeError.""")
                 except AttributeError:
                     raise GangaAttributeError("Object '%s' does not have attribute: '%s'" % (getName(self), name))
 
-        if isType(returnable, GangaObject):
+        # a proxy is returned as it is
+        if isinstance(returnable, GangaObject):
             return addProxy(returnable)
         else:
             return returnable
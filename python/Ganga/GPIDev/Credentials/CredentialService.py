@@ -0,0 +1,288 @@
+"""
+Expiry times of the credentials in use, kept in memory and checked in the background.
+
+Finding the time left on a credential runs an external command (e.g. voms-proxy-info or arc-proxy), while the validity of
+the credentials is checked whenever a job is prepared or submitted and on each loop of the monitoring. The
+CredentialService reads the expiry time of a credential once and only reads it again when the file of the credential has
+changed, which a stat of the file shows, so checking the validity of a credential doesn't run any command.
+
+For each credential in use a refresher thread looks at its file every [Credentials]RefreshInterval seconds, and when it
+is about to expire, so that a credential renewed outside of Ganga is picked up and the listeners are told of:
+  - 'expiring' once the credential has less than [Credentials]ExpiryWarning seconds left
+  - 'expired' once it has no time left
+  - 'renewed' once a credential which was expiring or expired has been renewed
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from Ganga.Core.GangaThread import GangaThread
+from Ganga.Utility.Config import getConfig
+from Ganga.Utility.logging import getLogger
+
+logger = getLogger()
+
+
+def _fileStat(location):
+    """ What a stat of the file of a credential tells about its content, None if there is no such file """
+    try:
+        stat = os.stat(location)
+    except (OSError, TypeError):
+        return None
+    return (stat.st_ino, stat.st_size, stat.st_mtime)
+
+
+def _seconds(delta):
+    """ The number of seconds in a timedelta """
+    return delta.days * 86400. + delta.seconds + delta.microseconds / 1e6
+
+
+class _CredentialState(object):
+
+    """ What is known about the expiry of one credential """
+
+    __slots__ = ('credential', 'lock', 'stat', 'expiry', 'queried', 'notified', 'refresher')
+
+    def __init__(self, credential):
+        super(_CredentialState, self).__init__()
+        self.credential = credential
+        # held while the expiry time is read
+        self.lock = threading.Lock()
+        # the _fileStat of the file when the expiry time was read
+        self.stat = None
+        # the expiry time as a datetime, None until it has been read
+        self.expiry = None
+        # the time.time() the expiry time was read at
+        self.queried = 0.
+        # the last event raised for the credential, None, 'expiring' or 'expired'
+        self.notified = None
+        # the _Refresher of the credential
+        self.refresher = None
+
+
+class _Refresher(GangaThread):
+
+    """ Checks the file of one credential in the background """
+
+    __slots__ = ('_service', '_location', '_wakeup')
+
+    def __init__(self, service, location):
+        GangaThread.__init__(self, name='CredentialRefresher', critical=False)
+        self._service = service
+        self._location = location
+        self._wakeup = threading.Event()
+
+    def run(self):
+        while not self.should_stop():
+            self._wakeup.wait(self._service._waitTime(self._location))
+            self._wakeup.clear()
+            if self.should_stop():
+                break
+            try:
+                if not self._service._refresh(self._location):
+                    break
+            except Exception as err:
+                logger.debug("Cannot check the credential at %s: %s" % (self._location, err))
+
+    def stop(self):
+        GangaThread.stop(self)
+        self._wakeup.set()
+
+
+class CredentialService(object):
+
+    """
+    Keeps the expiry times of the credentials in use, answering validity checks without running any command
+    """
+
+    __slots__ = ('_lock', '_states', '_listeners', '_background')
+
+    def __init__(self, background=True):
+        """
+        Args:
+            background (bool): Start a refresher thread for each credential, rather than only checking its file when
+                its expiry time is asked for
+        """
+        super(CredentialService, self).__init__()
+        self._lock = threading.Lock()
+        # location of the credential: _CredentialState
+        self._states = {}
+        self._listeners = []
+        self._background = background
+
+    def addListener(self, listener):
+        """
+        Register a function to be called as listener(event, credential, time_left) when a credential is 'expiring',
+        has 'expired' or has been 'renewed'
+        Args:
+            listener (function): The function, which may be called from a refresher thread
+        """
+        with self._lock:
+            if listener not in self._listeners:
+                self._listeners.append(listener)
+
+    def removeListener(self, listener):
+        """
+        Unregister a function registered with addListener
+        Args:
+            listener (function): The function
+        """
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def expiry_time(self, credential):
+        """
+        Return the time a credential expires at, which is only read from the credential again if its file has changed
+        Args:
+            credential (ICredentialInfo): The credential
+        """
+        state = self._state(credential)
+        self._update(state)
+        self._notify(state)
+        return state.expiry
+
+    def time_left(self, credential):
+        """
+        Return the time left on a credential as a timedelta
+        Args:
+            credential (ICredentialInfo): The credential
+        """
+        return max(self.expiry_time(credential) - datetime.now(), timedelta())
+
+    def is_valid(self, credential):
+        """
+        Return whether a credential has any time left
+        Args:
+            credential (ICredentialInfo): The credential
+        """
+        return self.time_left(credential) > timedelta()
+
+    def refresh(self, credential):
+        """
+        Read the expiry time of a credential again, e.g. once it has been renewed
+        Args:
+            credential (ICredentialInfo): The credential
+        """
+        state = self._state(credential)
+        self._update(state, force=True)
+        self._notify(state)
+
+    def forget(self, credential):
+        """
+        Stop checking a credential, e.g. once it has been removed from the store
+        Args:
+            credential (ICredentialInfo): The credential
+        """
+        with self._lock:
+            state = self._states.pop(credential.location, None)
+        if state is not None and state.refresher is not None:
+            state.refresher.stop()
+
+    def locations(self):
+        """ The locations of the credentials being checked """
+        with self._lock:
+            return sorted(self._states.keys())
+
+    def stop(self):
+        """ Stop checking all of the credentials """
+        with self._lock:
+            states, self._states = self._states, {}
+        for state in states.itervalues():
+            if state.refresher is not None:
+                state.refresher.stop()
+
+    def _state(self, credential):
+        """ The state of a credential, which starts to be checked the first time """
+        location = credential.location
+        with self._lock:
+            state = self._states.get(location)
+            if state is None:
+                state = self._states[location] = _CredentialState(credential)
+                if self._background:
+                    state.refresher = _Refresher(self, location)
+                    state.refresher.start()
+            return state
+
+    def _update(self, state, force=False):
+        """ Read the expiry time of a credential if it hasn't been or its file has changed """
+        location = state.credential.location
+        stat = _fileStat(location)
+        with state.lock:
+            now = time.time()
+            if state.expiry is not None and not force:
+                if stat is not None and stat == state.stat:
+                    return
+                # A credential which isn't a file, e.g. a kerberos keyring, can only be found to have changed by reading it
+                if stat is None and state.stat is None and now - state.queried < getConfig('Credentials')['AtomicDelay']:
+                    return
+            if stat is None and os.path.isabs(location):
+                # The file is missing so there's nothing to read, it has expired
+                expiry = datetime.now()
+            else:
+                state.credential.clear_cache()
+                expiry = state.credential.expiry_time()
+            state.expiry = expiry
+            state.stat = stat
+            state.queried = now
+
+    def _notify(self, state):
+        """ Tell the listeners if a credential has become expiring or expired or has been renewed """
+        with state.lock:
+            if state.expiry is None:
+                return
+            time_left = state.expiry - datetime.now()
+            if time_left <= timedelta():
+                event = 'expired'
+            elif _seconds(time_left) < getConfig('Credentials')['ExpiryWarning']:
+                event = 'expiring'
+            elif state.notified is not None:
+                event = 'renewed'
+            else:
+                return
+            if event == state.notified:
+                return
+            state.notified = event if event != 'renewed' else None
+
+        time_left = max(time_left, timedelta())
+        if event == 'expiring':
+            logger.warning('Credential at %s expires in %s', state.credential.location, time_left)
+        else:
+            logger.debug('Credential at %s has %s', state.credential.location, event)
+        with self._lock:
+            listeners = list(self._listeners)
+        for listener in listeners:
+            try:
+                listener(event, state.credential, time_left)
+            except Exception as err:
+                logger.debug("Credential listener failed: %s" % err)
+
+    def _waitTime(self, location):
+        """ The seconds the refresher of a credential waits before the next check """
+        interval = getConfig('Credentials')['RefreshInterval']
+        with self._lock:
+            state = self._states.get(location)
+        if state is None or state.expiry is None:
+            return interval
+        # Wake up in time to raise the next event
+        time_left = _seconds(state.expiry - datetime.now())
+        for point in (time_left - getConfig('Credentials')['ExpiryWarning'], time_left):
+            if point > 0:
+                return min(interval, point + 0.01)
+        return interval
+
+    def _refresh(self, location):
+        """ Check the file of a credential from its refresher, returns False if it's no longer being checked """
+        with self._lock:
+            state = self._states.get(location)
+        if state is None or state.refresher is not threading.current_thread():
+            return False
+        self._update(state)
+        self._notify(state)
+        return True
+
+
+# This is a global 'singleton'
+credential_service = CredentialService()
@@ -11,6 +11,7 @@ from Ganga.GPIDev.Schema import Schema, Version
 
 from Ganga.Core.exceptions import CredentialsError, GangaKeyError, GangaTypeError
 from Ganga.GPIDev.Adapters.ICredentialRequirement import ICredentialRequirement
+from Ganga.GPIDev.Credentials.CredentialService import credential_service
 
 from Ganga.Utility.Config import getConfig
 
@@ -102,6 +103,7 @@ class CredentialStore(GangaObject, collections.Mapping):
         """
 
         self.credentials.remove(credential_object)
+        credential_service.forget(credential_object)
 
     @export
     def __str__(self, interactive=False):
@@ -318,6 +320,7 @@ class CredentialStore(GangaObject, collections.Mapping):
         Remove all credentials in the system (without destorying them)
         """
         self.credentials = set()
+        credential_service.stop()
 
     def clean(self):
         # type: () -> None
@@ -6,6 +6,7 @@ from functools import wraps
 import Ganga.Utility.logging
 
 from .CredentialStore import credential_store, needed_credentials, get_needed_credentials
+from .CredentialService import credential_service
 from Ganga.Core.exceptions import CredentialsError, InvalidCredentialError
 
 logger = Ganga.Utility.logging.getLogger()
@@ -138,6 +138,16 @@ class MainConfigProxy(object):
         import Ganga.Utility.Config
         self.__dict__[implRef] = Ganga.Utility.Config.allConfigs
 
+    def __getattr__(self, p):
+        # the default values of a plugin which is loaded on first use, e.g. defaults_LCG, appear once it is loaded
+        prefix = 'defaults_'
+        if p.startswith(prefix):
+            from Ganga.Utility.Plugin import allPlugins
+            allPlugins.load(name=p[len(prefix):])
+            if p in type(self).__dict__:
+                return getattr(self, p)
+        raise AttributeError(p)
+
     def __getitem__(self, p):
         try:
             return getattr(self, p)
@@ -320,9 +330,23 @@ def createOptionProxy(section_name, option_name):
                 option_name, ConfigDescriptor(option_name))
 
 
+def _loadConfiguredPlugins():
+    """ Load the plugins declared lazily whose default values are set, e.g. in a [defaults_LCG] section of the
+    config files, so that the values are checked at bootstrap as those of the other plugins are.
+    """
+    from Ganga.Utility.Config.Config import unknownConfigFileValues, unknownGangarcFileValues, unknownUserConfigValues
+    from Ganga.Utility.Plugin import allPlugins
+    prefix = 'defaults_'
+    for values in (unknownConfigFileValues, unknownGangarcFileValues, unknownUserConfigValues):
+        for name in values.keys():
+            if name.startswith(prefix):
+                allPlugins.load(name=name[len(prefix):])
+
+
 def bootstrap():
     """ Create GPI proxies for all configuration sections.
     """
+    _loadConfiguredPlugins()
     for name in stripProxy(config):
         createSectionProxy(name)
     import Ganga.Utility.Config.Config
@@ -3,6 +3,7 @@ from __future__ import absolute_import
 import copy
 import errno
 import glob
+import functools
 import inspect
 import os
 import time
@@ -498,6 +499,9 @@ class Job(GangaObject):
                 assert(s.state not in self)
                 self[s.state] = s
 
+    # Frequent status changes of subjobs which are recorded in the status log of the master job
+    _status_log_states = ('running', 'completing')
+
     status_graph = {'new': Transitions(State('submitting', 'j.submit()', hook='monitorSubmitting_hook'),
                                        State('removed', 'j.remove()')),
         'submitting': Transitions(State('new', 'submission failed', hook='rollbackToNewState'),
@@ -559,6 +563,9 @@ class Job(GangaObject):
 
         fqid = self.getFQID('.')
         initial_status = self.status
+        # A subjob which is otherwise unchanged can record this status change in the status log of its master
+        was_dirty = self._dirty
+        initial_timestamps = dict(self.time.timestamps) if self.master is not None else None
         logger.debug('attempt to change job %s status from "%s" to "%s"', fqid, initial_status, newstatus)
         try:
             state = self.status_graph[initial_status][newstatus]
@@ -602,11 +609,41 @@ class Job(GangaObject):
 
 	final_status = self.status
 
+        if self.master is not None and not was_dirty and state.hook is None and final_status != initial_status \
+                and final_status in Job._status_log_states:
+            self._recordStatusChange(initial_timestamps)
+
         if final_status != initial_status and self.master is None:
             logger.info('job %s status changed to "%s"', self.getFQID('.'), final_status)
+        if final_status != initial_status:
+            self._notifyStatusChange()
         if update_master and self.master is not None:
             self.master.updateMasterJobStatus()
 
+    def _notifyStatusChange(self):
+        """Let the monitoring know that the status of this job has changed so it doesn't have to search for jobs to monitor"""
+        from Ganga.Core import monitoring_component
+        if monitoring_component is not None:
+            monitoring_component.jobStatusChanged(self)
+        # and that the event driven task loop updates the unit of the job
+        from Ganga.GPIDev.Lib.Tasks.TaskEvents import getTaskEvents
+        events = getTaskEvents()
+        if events is not None:
+            events.jobStatusChanged(self)
+
+    def _recordStatusChange(self, initial_timestamps):
+        """Record the status change of a subjob in the status log of its master rather than writing the whole subjob again.
+        The subjob is left clean when the change has been recorded
+        Args:
+            initial_timestamps (dict): The timestamps of the subjob before its status changed
+        """
+        subjobs = self.master.subjobs
+        if not hasattr(subjobs, 'recordStatus'):
+            return
+        timestamps = dict((name, value) for name, value in self.time.timestamps.iteritems() if initial_timestamps.get(name) != value)
+        if subjobs.recordStatus(self.id, self.status, timestamps):
+            self._setFlushed()
+
     def transition_update(self, new_status):
         """Propagate status transitions"""
 
@@ -833,6 +870,10 @@ class Job(GangaObject):
 
         super(Job, self)._auto__init__()
 
+        # Jobs built through getNew skip __init__ so make sure the creation time is recorded before the job is indexed
+        if 'new' not in self.time.timestamps:
+            self.time.newjob()
+
         # register the job (it will also commit it)
         # job gets its id now
         registry._add(self)
@@ -1205,11 +1246,10 @@ class Job(GangaObject):
         return jobmasterconfig
 
     @staticmethod
-    def _prepare_sj( rtHandler, i, app, sub_c, app_master_c, job_master_c, finished):
+    def _prepare_sj(rtHandler, app, sub_c, app_master_c, job_master_c):
         if app.is_prepared in [None, False]:
             app.prepare()
-        finished[i] = rtHandler.prepare(app, sub_c, app_master_c, job_master_c)
-        return
+        return rtHandler.prepare(app, sub_c, app_master_c, job_master_c)
 
     def _getJobSubConfig(self, subjobs):
 
@@ -1231,19 +1271,18 @@ class Job(GangaObject):
                     jobsubconfig = [rtHandler.prepare(sub_job.application, sub_conf, appmasterconfig, jobmasterconfig) for (sub_job, sub_conf) in zip(subjobs, appsubconfig)]
                 else:
 
-                    finished = {}
-
-                    from Ganga.Core.GangaThread.WorkerThreads import getQueues
-                    index=0
-                    for sub_j, sub_conf in zip(subjobs, appsubconfig):
-                        getQueues()._monitoring_threadpool.add_function(self._prepare_sj, (rtHandler, index, sub_j.application, sub_conf, appmasterconfig, jobmasterconfig, finished))
-                        index += 1
+                    from Ganga.GPIDev.Adapters.SubmissionEngine import SubmissionEngine
 
-                    while len(finished) != len(subjobs):
-                        time.sleep(0.25)
+                    tasks = [(sub_j.getFQID('.'), functools.partial(self._prepare_sj, rtHandler, sub_j.application, sub_conf, appmasterconfig, jobmasterconfig))
+                             for sub_j, sub_conf in zip(subjobs, appsubconfig)]
+                    results = SubmissionEngine('Preparing job %s' % self.getFQID('.')).run(tasks, keep_going=False)
 
-                    for index in finished.keys():
-                        jobsubconfig.insert(index, finished[index])
+                    for result in results:
+                        if result.error is not None:
+                            raise result.error
+                        if not result.attempted or not result.result:
+                            raise JobError('Failed to prepare subjob %s' % result.name)
+                    jobsubconfig = [result.result for result in results]
 
         else:
             #   I am a sub-job, lets calculate my config
@@ -1616,6 +1655,7 @@ class Job(GangaObject):
             sj.application.transition_update("removed")
         # delete subjobs
         self.subjobs = GangaList()
+        self.time.resetSubjobs()
 
     def remove(self, force=False):
         """Remove the job.
@@ -3,6 +3,7 @@ import datetime
 from Ganga.Core.exceptions import GangaTypeError
 from Ganga.GPIDev.Base import GangaObject
 from Ganga.GPIDev.Base.Proxy import stripProxy
+from Ganga.GPIDev.Lib.Job.JobTimeAggregate import JobTimeAggregate
 from Ganga.GPIDev.Schema import Schema, Version, SimpleItem
 
 import Ganga.Utility.Config
@@ -55,11 +56,16 @@ class JobTime(GangaObject):
        For a table display of the Job's timestamps use .time.display(). For
        timestamps details from the backend use .time.details()
 
+       The timestamps of a master job are worked out from those of its
+       subjobs, which are aggregated as the subjobs change status so the
+       subjobs are never loaded for them. For the number of subjobs in each
+       status and the min/mean/max runtime and waiting time of the subjobs
+       use .time.statistics()
+
 
     """
 
     timestamps = {}
-    sj_statlist = []
 
     _schema = Schema(Version(0, 0), {'timestamps': SimpleItem(defvalue={}, doc="Dictionary containing timestamps for job", summary_print='_timestamps_summary_print')
                                      })
@@ -80,17 +86,19 @@ class JobTime(GangaObject):
                       'waittime',
                       'submissiontime',
                       'details',
-                      'printdetails']
+                      'printdetails',
+                      'statistics']
 
     def __init__(self):
         super(JobTime, self).__init__()
         self.timestamps = {}
-        # this makes sure the contents of the list don't get copied when the
-        # Job does.
-        self.sj_statlist = []
+        # timing of the subjobs of a master job, found when first needed
+        self._aggregate = None
 
     def __deepcopy__(self, memo):
         obj = super(JobTime, self).__deepcopy__(memo)
+        # the copy works out the timing of its own subjobs
+        obj._aggregate = None
         # Lets not re-initialize the object as we lose history from previous submissions
         # obj.newjob()
         return obj
@@ -100,9 +108,32 @@ class JobTime(GangaObject):
         """
         t = datetime.datetime.utcnow()
         self.timestamps['new'] = t
-        # this makes sure the contents of the list don't get copied when the
-        # Job does.
-        self.sj_statlist = []
+        self._aggregate = None
+
+    def resetSubjobs(self):
+        """Forget the timing of the subjobs, once they have been removed.
+        """
+        self._aggregate = None
+
+    def getAggregate(self):
+        """Return the JobTimeAggregate of the subjobs of this master job.
+
+           It is read from the subjob index, only the subjobs of a job whose index predates it are loaded to build it.
+        """
+        if self._aggregate is None:
+            j = self.getJobObject()
+            subjobs = stripProxy(j.subjobs)
+            aggregate = None
+            if hasattr(subjobs, 'getTimeAggregate'):
+                aggregate = subjobs.getTimeAggregate()
+            if aggregate is None:
+                logger.debug("Building the timing of the subjobs of job %s", str(j.id))
+                aggregate = JobTimeAggregate()
+                for sj in subjobs:
+                    sj = stripProxy(sj)
+                    aggregate.update(sj.id, sj.status, sj.time.timestamps)
+            self._aggregate = aggregate
+        return self._aggregate
 
     def timenow(self, status):
         """Updates timestamps as job status changes.
@@ -150,11 +181,10 @@ class JobTime(GangaObject):
             logger.debug(
                 "j.time.timenow() caught subjob %d.%d in the '%s' status", j.master.id, j.id, status)
 
-            for written_status in j.time.timestamps.keys():
-                if written_status not in j.master.time.sj_statlist:
-                    j.master.time.sj_statlist.append(written_status)
-                    logger.debug(
-                        "written_status: '%s' written to sj_statlist", written_status)
+            if j.id is not None:
+                # 'resubmitted' isn't a status, it only stamps the time
+                sj_status = status if status in j.status_graph else None
+                j.master.time.getAggregate().update(j.id, sj_status, self.timestamps)
 
         # master job method
         if j.subjobs:  # identifies master job
@@ -165,38 +195,21 @@ class JobTime(GangaObject):
                 logger.debug(
                     "status: '%s' in ganga_master written to master timestamps.", status)
             else:
-                for state in self.sj_statlist:
+                aggregate = self.getAggregate()
+                for state in aggregate.names():
                     if state not in ganga_master:
-                        j.time.timestamps[
-                            state] = self.sjStatList_return(state)
+                        j.time.timestamps[state] = self.sjStatList_return(state)
                         logger.debug(
-                            "state: '%s' from sj_statlist to written to master timestamps.", state)
-                    else:
-                        pass
+                            "state: '%s' of the subjobs written to master timestamps.", state)
 
     def sjStatList_return(self, status):
-        list = []
+        """Returns the latest time a subjob recorded a 'final' or 'backend_final' timestamp, the earliest time for the others.
+        """
         final = ['backend_final', 'final']
-        j = self.getJobObject()
-        for sjs in j.subjobs:
-            try:
-                if isinstance(sjs.time.timestamps[status], datetime.datetime):
-                    list.append(sjs.time.timestamps[status])
-                else:
-                    logger.debug(
-                        'Attempt to add a non datetime object in the timestamp, job=%d, subjob=%d', j.id, sjs.id)
-            except KeyError:
-                logger.debug(
-                    "Status '%s' not found in timestamps of job %d.%d.", status, sjs.master.id, sjs.id)
-        list.sort()
-        try:
-            if status in final:
-                return list[-1]
-            return list[0]
-        except IndexError:
-            # change this to a more appropriate debug.
-            logger.debug(
-                "IndexError: ID: %d, Status: '%s', length of list: %d", j.id, status, len(list))
+        aggregate = self.getAggregate()
+        if status in final:
+            return aggregate.latest(status)
+        return aggregate.earliest(status)
 
     def display(self, format="%Y/%m/%d %H:%M:%S"):
         return self._display(format)
@@ -313,19 +326,16 @@ class JobTime(GangaObject):
                 # string = error
                 if not isinstance(subjob, int):
                     raise GangaTypeError("Subjob id requires type 'int'")
-                # subjob id supplied
-                for sj in j.subjobs:
-                    if sj.id == subjob:
-                        logger.debug(
-                            "Subjob: %d, Backend ID: %d", sj.id, sj.backend.id)
-                        detdict = sj.backend.timedetails()
-                        return detdict
-                    else:
-                        pass
-                if subjob >= len(j.subjobs):
+                # subjob id supplied, only that subjob is loaded
+                if subjob < 0 or subjob >= len(j.subjobs):
                     logger.warning(
                         "Index '%s' is out of range. Corresponding subjob does not exist.", str(subjob))
                     return None
+                sj = j.subjobs[subjob]
+                logger.debug(
+                    "Subjob: %d, Backend ID: %d", sj.id, sj.backend.id)
+                detdict = sj.backend.timedetails()
+                return detdict
 
             logger.debug(
                 "subjob arguement '%s' has failed to be caught and dealt with.", subjob)
@@ -360,10 +370,7 @@ class JobTime(GangaObject):
         # if master job, sum:
         j = self.getJobObject()
         if j.subjobs:
-            masterrun = datetime.timedelta(0, 0, 0)
-            for jobs in j.subjobs:
-                masterrun = masterrun + jobs.time.runtime()
-            return masterrun
+            return self.getAggregate().total('runtime')
         # all other jobs:
         return self.duration('backend_running', 'backend_final')
 
@@ -375,15 +382,12 @@ class JobTime(GangaObject):
         # master job:
         j = self.getJobObject()
         if j.subjobs:
-            start_list = []
-            end_list = []
-            for jobs in j.subjobs:
-                start_list.append(jobs.time.timestamps['submitted'])
-                end_list.append(jobs.time.timestamps['backend_running'])
-            start_list.sort()
-            end_list.sort()
-            start = start_list[0]
-            end = end_list[len(end_list) - 1]
+            aggregate = self.getAggregate()
+            start = aggregate.earliest('submitted')
+            end = aggregate.latest('backend_running')
+            if start is None or end is None:
+                logger.warning("Could not calculate waiting time: no subjob has been submitted and run.")
+                return None
             masterwait = end - start
             return masterwait
         # all other jobs:
@@ -396,17 +400,33 @@ class JobTime(GangaObject):
         """
         j = self.getJobObject()
         if j.subjobs:
-            start_list = []
-            end_list = []
-            for jobs in j.subjobs:
-                end_list.append(jobs.time.timestamps['submitted'])
-            end_list.sort()
             start = j.time.timestamps['submitting']
-            end = end_list[len(end_list) - 1]
+            end = self.getAggregate().latest('submitted')
+            if end is None:
+                logger.warning("Could not calculate submission time: no subjob has been submitted.")
+                return None
             mastersub = end - start
             return mastersub
         return self.duration('submitting', 'submitted')
 
+    def statistics(self):
+        """Method which returns the timing of the subjobs of a master job as a dictionary, None for other jobs.
+
+           'counts' holds the number of subjobs in each status, 'first_submitted' and 'last_final' the earliest
+           submission and latest end of a subjob, 'runtime' and 'waittime' the 'min', 'mean' and 'max' durations
+           of the subjobs which have them and their number 'n'. The subjobs aren't loaded.
+        """
+        j = self.getJobObject()
+        if not j.subjobs:
+            logger.debug("j.time.statistics(): job %s has no subjobs.", str(j.id))
+            return None
+        aggregate = self.getAggregate()
+        return {'counts': aggregate.counts(),
+                'first_submitted': aggregate.earliest('submitted'),
+                'last_final': aggregate.latest('final'),
+                'runtime': aggregate.durationStats('runtime'),
+                'waittime': aggregate.durationStats('waittime')}
+
     def duration(self, start, end):
         """Returns duration between two specified timestamps as timedelta object.
         """
@@ -0,0 +1,253 @@
+"""
+Timing of the subjobs of a master job, kept up to date as the subjobs change status so the master never has to load them.
+
+The JobTime of a master job used to look at the timestamps of every subjob whenever the master changed status, or when
+its runtime or waiting time was asked for, which loads every subjob from disk. The JobTimeAggregate is updated with the
+timestamps of a subjob each time the subjob changes status and holds:
+  - the earliest and latest time each timestamp (e.g. 'submitted', 'final') is at over the subjobs, as they are now, so
+    a resubmitted subjob no longer counts with the times of its previous run
+  - the number of subjobs in each status
+  - the runtime (backend_running to backend_final) and waiting time (submitted to backend_running) of each subjob,
+    with their total, min and max
+
+It is stored in the subjob index of the master job, along with the index data of the subjobs. Updates are idempotent,
+a subjob only holds its latest state, so the status changes recorded in the status log of the master job since the
+index was written are applied again when the index is loaded.
+"""
+
+import datetime
+import heapq
+import threading
+
+from Ganga.Utility.logging import getLogger
+
+logger = getLogger()
+
+# version of the data written to the subjob index
+_version = 2
+
+# name of a duration: (timestamp it starts from, timestamp it ends at)
+_durations = {'runtime': ('backend_running', 'backend_final'),
+              'waittime': ('submitted', 'backend_running')}
+
+_epoch = datetime.datetime(1970, 1, 1)
+
+
+def _seconds(start, end):
+    """ The number of seconds from start to end, ignoring microseconds as JobTime.duration does """
+    return (end.replace(microsecond=0) - start.replace(microsecond=0)).total_seconds()
+
+
+class _DurationStats(object):
+
+    """ The durations of the subjobs for one kind of duration """
+
+    __slots__ = ('values', 'total', 'min', 'max')
+
+    def __init__(self):
+        super(_DurationStats, self).__init__()
+        # subjob id: seconds
+        self.values = {}
+        self.total = 0.
+        self.min = None
+        self.max = None
+
+    def set(self, subjob_id, seconds):
+        """
+        Set the duration of a subjob, replacing the one it had
+        Args:
+            subjob_id (int): The id of the subjob
+            seconds (float): The duration in seconds
+        """
+        old = self.values.get(subjob_id)
+        if old == seconds:
+            return
+        self.values[subjob_id] = seconds
+        self.total += seconds - (old or 0.)
+        if old is not None and old in (self.min, self.max):
+            # the old value was the min or max, only now do the values have to be looked at
+            self.min = min(self.values.itervalues())
+            self.max = max(self.values.itervalues())
+        else:
+            self.min = seconds if self.min is None else min(self.min, seconds)
+            self.max = seconds if self.max is None else max(self.max, seconds)
+
+
+class _StampRange(object):
+
+    """ The earliest and latest time one timestamp is at over the subjobs """
+
+    __slots__ = ('values', '_early', '_late')
+
+    def __init__(self):
+        super(_StampRange, self).__init__()
+        # subjob id: datetime
+        self.values = {}
+        # heaps of (key, subjob id, datetime), the key being the seconds since _epoch, negated in _late.
+        # Items out of date as the subjob has moved on are only dropped once they reach the top
+        self._early = []
+        self._late = []
+
+    def set(self, subjob_id, value):
+        """
+        Set the time of the timestamp of a subjob, replacing the one it had
+        Args:
+            subjob_id (int): The id of the subjob
+            value (datetime): The time of the timestamp
+        """
+        if self.values.get(subjob_id) == value:
+            return
+        self.values[subjob_id] = value
+        if len(self._early) > 2 * len(self.values) + 16:
+            # Most of the items are out of date, start again
+            self._early = [((stamp - _epoch).total_seconds(), sj_id, stamp) for sj_id, stamp in self.values.iteritems()]
+            self._late = [(-key, sj_id, stamp) for key, sj_id, stamp in self._early]
+            heapq.heapify(self._early)
+            heapq.heapify(self._late)
+            return
+        key = (value - _epoch).total_seconds()
+        heapq.heappush(self._early, (key, subjob_id, value))
+        heapq.heappush(self._late, (-key, subjob_id, value))
+
+    def _top(self, heap):
+        """ The time at the top of a heap once the items which are out of date have been dropped """
+        while heap and self.values.get(heap[0][1]) != heap[0][2]:
+            heapq.heappop(heap)
+        return heap[0][2] if heap else None
+
+    def earliest(self):
+        """ The earliest time of the timestamp, None if no subjob has it """
+        return self._top(self._early)
+
+    def latest(self):
+        """ The latest time of the timestamp, None if no subjob has it """
+        return self._top(self._late)
+
+
+class JobTimeAggregate(object):
+
+    """
+    Aggregate timing and status counts of the subjobs of a master job
+    """
+
+    __slots__ = ('_lock', '_subjobs', '_ranges', '_counts', '_stats')
+
+    def __init__(self):
+        super(JobTimeAggregate, self).__init__()
+        self._lock = threading.Lock()
+        # subjob id: [status, {timestamp name: datetime}]
+        self._subjobs = {}
+        # timestamp name: _StampRange
+        self._ranges = {}
+        # status: number of subjobs
+        self._counts = {}
+        # duration name: _DurationStats
+        self._stats = dict((name, _DurationStats()) for name in _durations)
+
+    def update(self, subjob_id, status, timestamps):
+        """
+        Update the aggregate with the state of a subjob after its status has changed
+        Args:
+            subjob_id (int): The id of the subjob
+            status (str): The status of the subjob, None if it hasn't changed
+            timestamps (dict): The timestamps of the subjob, those which are missing keep the value they had
+        """
+        with self._lock:
+            record = self._subjobs.get(subjob_id)
+            if record is None:
+                record = self._subjobs[subjob_id] = [None, {}]
+            if status is not None and status != record[0]:
+                if record[0] is not None:
+                    self._counts[record[0]] -= 1
+                self._counts[status] = self._counts.get(status, 0) + 1
+                record[0] = status
+
+            for name, value in timestamps.iteritems():
+                if not isinstance(value, datetime.datetime):
+                    continue
+                record[1][name] = value
+                if name not in self._ranges:
+                    self._ranges[name] = _StampRange()
+                self._ranges[name].set(subjob_id, value)
+
+            for name, (start, end) in _durations.iteritems():
+                if start in record[1] and end in record[1] and record[1][end] >= record[1][start]:
+                    self._stats[name].set(subjob_id, _seconds(record[1][start], record[1][end]))
+
+    def names(self):
+        """ The names of the timestamps recorded by the subjobs """
+        with self._lock:
+            return self._ranges.keys()
+
+    def earliest(self, name):
+        """
+        The earliest time a subjob has a timestamp at, None if none has it
+        Args:
+            name (str): The name of the timestamp, e.g. 'submitted'
+        """
+        with self._lock:
+            return self._ranges[name].earliest() if name in self._ranges else None
+
+    def latest(self, name):
+        """
+        The latest time a subjob has a timestamp at, None if none has it
+        Args:
+            name (str): The name of the timestamp, e.g. 'final'
+        """
+        with self._lock:
+            return self._ranges[name].latest() if name in self._ranges else None
+
+    def counts(self):
+        """ Return a dict of status: number of subjobs in that status """
+        with self._lock:
+            return dict((status, n) for status, n in self._counts.iteritems() if n > 0)
+
+    def total(self, name):
+        """
+        The sum of a duration over the subjobs, as a timedelta
+        Args:
+            name (str): 'runtime' or 'waittime'
+        """
+        with self._lock:
+            return datetime.timedelta(seconds=self._stats[name].total)
+
+    def durationStats(self, name):
+        """
+        Return a dict with the 'min', 'mean' and 'max' timedelta and the number 'n' of subjobs of a duration,
+        the timedeltas are None if no subjob has the duration yet
+        Args:
+            name (str): 'runtime' or 'waittime'
+        """
+        with self._lock:
+            stats = self._stats[name]
+            n = len(stats.values)
+            if not n:
+                return {'n': 0, 'min': None, 'mean': None, 'max': None}
+            return {'n': n,
+                    'min': datetime.timedelta(seconds=stats.min),
+                    'mean': datetime.timedelta(seconds=stats.total / n),
+                    'max': datetime.timedelta(seconds=stats.max)}
+
+    def toDict(self):
+        """ Return the aggregate as a dict of builtin types, for writing to the subjob index """
+        with self._lock:
+            return {'version': _version,
+                    'subjobs': dict((subjob_id, (record[0], dict(record[1]))) for subjob_id, record in self._subjobs.iteritems())}
+
+    @staticmethod
+    def fromDict(data):
+        """
+        Return the aggregate written by toDict, None if the data can't be used
+        Args:
+            data (dict): The data read from the subjob index
+        """
+        if not isinstance(data, dict) or data.get('version') != _version:
+            return None
+        aggregate = JobTimeAggregate()
+        try:
+            for subjob_id, (status, timestamps) in data['subjobs'].iteritems():
+                aggregate.update(subjob_id, status, timestamps)
+        except (KeyError, TypeError, ValueError) as err:
+            logger.debug("Cannot read the timing of the subjobs: %s" % err)
+            return None
+        return aggregate
@@ -11,13 +11,14 @@ from Ganga.Utility.external.OrderedDict import OrderedDict as oDict
 from Ganga.Core.exceptions import GangaException
 from Ganga.Core.GangaRepository.Registry import Registry, RegistryKeyError, RegistryAccessError, RegistryFlusher
 
-from Ganga.GPIDev.Base.Proxy import stripProxy, isType
+from Ganga.GPIDev.Base.Proxy import stripProxy, isType, getName
 
 import Ganga.Utility.logging
 
 from Ganga.GPIDev.Lib.Job.Job import Job
 
 from .RegistrySlice import RegistrySlice
+from .SelectIndex import SelectIndex
 
 from .RegistrySliceProxy import RegistrySliceProxy, _wrap, _unwrap
 
@@ -34,6 +35,12 @@ class JobRegistry(Registry):
         self.stored_slice = JobRegistrySlice(self.name)
         self.stored_slice.objects = self
         self.stored_proxy = JobRegistrySliceProxy(self.stored_slice)
+        # Attributes which select can match from the index cache, along with their index cache keys
+        self._select_index = SelectIndex({'status': 'status',
+                                          'name': 'name',
+                                          'backend': 'select:backend',
+                                          'application': 'select:application',
+                                          'time_created': 'select:time_created'})
 
     def getSlice(self):
         return self.stored_slice
@@ -69,9 +76,24 @@ class JobRegistry(Registry):
                 for sj in obj.subjobs:
                     cache["subjobs:status"].append(sj.status)
 
+        # for the secondary indexes used by select
+        cache['select:backend'] = getName(obj.backend)
+        cache['select:application'] = getName(obj.application)
+        cache['select:time_created'] = obj.time.timestamps.get('new')
+
         #print("Cache: %s" % str(cache))
         return cache
 
+    def getSelectIndex(self):
+        """
+        Return the secondary indexes used by select, brought up to date with the jobs in the registry.
+        Returns None if the registry hasn't started
+        """
+        if not self.hasStarted():
+            return None
+        self._select_index.refresh(self._objects, self.repository.isObjectLoaded)
+        return self._select_index
+
     def startup(self):
         self._needs_metadata = True
         super(JobRegistry, self).startup()
@@ -19,6 +19,22 @@ logger = getLogger()
 
 config = Ganga.Utility.Config.getConfig('Display')
 
+
+def _component_select_name(item, value):
+    """
+    Return the name of the class a component attribute has to have to be selected by value
+    Args:
+        item (ComponentItem): the schema item of the attribute
+        value (object): the value passed to select for the attribute
+    """
+    from Ganga.GPIDev.Base.Filters import allComponentFilters
+
+    cfilter = allComponentFilters[item['category']]
+    filtered_value = cfilter(value, item)
+    if not filtered_value is None:
+        return getName(filtered_value)
+    return getName(value)
+
 class RegistrySlice(object):
 
     def __init__(self, name, display_prefix):
@@ -198,7 +214,22 @@ class RegistrySlice(object):
                 maxid = sys.maxsize
             select = select_by_range
 
+        # Patterns are only compiled once rather than for every object
+        patterns = {}
+        for a, attrvalue in attrs.iteritems():
+            if isinstance(attrvalue, str):
+                patterns[a] = re.compile(fnmatch.translate(attrvalue))
+
+        # Attributes still to be checked for each object which may be selected, None if every object has to be checked
+        to_check = None
+        if self.name != 'box' and hasattr(self.objects, 'getSelectIndex'):
+            select_index = self.objects.getSelectIndex()
+            if select_index is not None:
+                to_check = self._select_from_index(select_index, attrs, patterns)
+
         for this_id in self.objects.keys():
+            if to_check is not None and this_id not in to_check:
+                continue
             obj = self.objects[this_id]
             logger.debug("id, obj: %s, %s" % (this_id, obj))
             if select(int(this_id)):
@@ -208,7 +239,7 @@ class RegistrySlice(object):
                     name_str = obj._getRegistry()._getName(obj)
                 else:
                     name_str = ''
-                for a in attrs:
+                for a in (attrs if to_check is None else to_check[this_id]):
                     if self.name == 'box':
                         attrvalue = attrs[a]
                         if a == 'name':
@@ -237,6 +268,11 @@ class RegistrySlice(object):
                             if int(this_id) not in attrs['ids']:
                                 selected = False
                                 break
+                        elif a in ('created_after', 'created_before'):
+                            created = obj.time.timestamps.get('new')
+                            if created is None or (a == 'created_after' and created < attrs[a]) or (a == 'created_before' and created > attrs[a]):
+                                selected = False
+                                break
                         else:
                             try:
                                 item = obj._schema.getItem(a)
@@ -252,26 +288,16 @@ class RegistrySlice(object):
                                     ## TODO we need to distinguish between passing a Class type and a defined class instance
                                     ## If we passed a class type to select it should look only for classes which are of this type
                                     ## If we pass a class instance a compartison of the internal attributes should be performed
-                                    from Ganga.GPIDev.Base.Filters import allComponentFilters
-
-                                    cfilter = allComponentFilters[item['category']]
-                                    filtered_value = cfilter(attrs[a], item)
-                                    from Ganga.GPIDev.Base.Proxy import getName
-                                    if not filtered_value is None:
-                                        attrvalue = getName(filtered_value)
-                                    else:
-                                        attrvalue = getName(attrvalue)
+                                    attrvalue = _component_select_name(item, attrvalue)
 
                                     if getName(getattr(obj, a)) != attrvalue:
                                         selected = False
                                         break
                                 else:
                                     if isinstance(attrvalue, str):
-                                        regex = fnmatch.translate(attrvalue)
-                                        reobj = re.compile(regex)
                                         # Compare the type of the attribute
                                         # against attrvalue
-                                        if not reobj.match(str(getattr(obj, a))):
+                                        if not patterns[a].match(str(getattr(obj, a))):
                                             selected = False
                                     else:
                                         if getattr(obj, a) != attrvalue:
@@ -285,6 +311,51 @@ class RegistrySlice(object):
             else:
                 logger.debug("NOT Selected: %s" % this_id)
 
+    def _select_from_index(self, select_index, attrs, patterns):
+        """
+        Use the secondary indexes of the registry to find the objects which may be selected without loading them.
+        Returns a dict of id: attributes which still have to be checked on the object, objects which aren't in it can't be selected
+        Args:
+            select_index (SelectIndex): the secondary indexes of the registry
+            attrs (dict): the attributes to select on as passed to do_select
+            patterns (dict): the compiled patterns of the attributes which are matched as fnmatch patterns
+        """
+        from Ganga.GPIDev.Lib.Job.Job import Job
+
+        criteria = {}
+        for a, attrvalue in attrs.iteritems():
+            if not select_index.indexes(a) or not Job._schema.hasItem(a):
+                continue
+            item = Job._schema.getItem(a)
+            if item.isA(ComponentItem):
+                criteria[a] = _component_select_name(item, attrvalue)
+            elif a in patterns:
+                criteria[a] = patterns[a]
+            else:
+                try:
+                    hash(attrvalue)
+                except TypeError:
+                    continue
+                criteria[a] = attrvalue
+
+        to_check = select_index.select(criteria)
+
+        created = [a for a in ('created_after', 'created_before') if a in attrs]
+        direct = set()
+        if created:
+            matched, direct = select_index.select_range('time_created', attrs.get('created_after'), attrs.get('created_before'))
+            for this_id in to_check.keys():
+                if this_id not in matched and this_id not in direct:
+                    del to_check[this_id]
+
+        # Whatever the index couldn't answer is checked on the objects
+        for this_id, unresolved in to_check.iteritems():
+            for a in attrs:
+                if a in criteria or (a in created and this_id not in direct):
+                    continue
+                unresolved.add(a)
+        return to_check
+
     def copy(self, keep_going):
         this_slice = self.__class__("copy of %s" % self.name)
         for _id in self.objects.keys():
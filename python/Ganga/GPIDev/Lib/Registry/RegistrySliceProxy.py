@@ -58,7 +58,10 @@ class RegistrySliceProxy(object):
         jobs.select(status='new') select all jobs with new status;
         jobs.select(name='some') select all jobs with some name;
         jobs.select(application='Executable') select all jobs with Executable application;
-        jobs.select(backend='Local') select all jobs with Local backend.
+        jobs.select(backend='Local') select all jobs with Local backend;
+        jobs.select(created_after=datetime.datetime(2016, 1, 1)) select all jobs created since the start of 2016,
+        created_before can be used in the same way.
+        Selecting on status, name, application, backend and the creation time doesn't load jobs from disk.
         """
         unwrap_attrs = {}
         for a in attrs:
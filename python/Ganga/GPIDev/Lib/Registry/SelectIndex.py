@@ -0,0 +1,163 @@
+import threading
+
+from Ganga.Utility.logging import getLogger
+
+logger = getLogger()
+
+
+class SelectIndex(object):
+
+    """
+    Secondary indexes over the index caches of the objects in a registry.
+    These let a select be answered for objects which haven't been loaded without loading them.
+    The indexes are built from the index caches which are already stored with each object so they persist with the repository.
+    Objects which are loaded can change at any time so they aren't indexed, they are always checked directly.
+    """
+
+    def __init__(self, keys):
+        """
+        Args:
+            keys (dict): dict of select attribute: key of the index cache holding the value of the attribute
+        """
+        super(SelectIndex, self).__init__()
+        self._keys = keys
+        # id: index cache the entries of the object were made from, None for loaded objects
+        self._sources = {}
+        # attribute: {value: set of ids}
+        self._values = dict((attr, {}) for attr in keys)
+        # attribute: set of ids whose index cache doesn't hold the attribute
+        self._unknown = dict((attr, set()) for attr in keys)
+        # id: {attribute: value}
+        self._by_id = {}
+        # ids of the loaded objects
+        self._live = set()
+        self._lock = threading.Lock()
+
+    def indexes(self, attr):
+        """
+        Returns True if the attribute is indexed
+        Args:
+            attr (str): name of the select attribute
+        """
+        return attr in self._keys
+
+    def _drop(self, this_id):
+        """
+        Remove the entries of an object
+        Args:
+            this_id (int): id of the object
+        """
+        del self._sources[this_id]
+        self._live.discard(this_id)
+        for attr, value in self._by_id.pop(this_id, {}).iteritems():
+            ids = self._values[attr][value]
+            ids.discard(this_id)
+            if not ids:
+                del self._values[attr][value]
+        for unknown in self._unknown.itervalues():
+            unknown.discard(this_id)
+
+    def _add(self, this_id, source):
+        """
+        Add the entries of an object
+        Args:
+            this_id (int): id of the object
+            source (dict, None): index cache of the object, None if the object is loaded
+        """
+        self._sources[this_id] = source
+        if source is None:
+            self._live.add(this_id)
+            return
+        entries = {}
+        for attr, key in self._keys.iteritems():
+            if key not in source:
+                self._unknown[attr].add(this_id)
+                continue
+            value = source[key]
+            try:
+                self._values[attr].setdefault(value, set()).add(this_id)
+            except TypeError:
+                # Values which can't be hashed can't be looked up
+                self._unknown[attr].add(this_id)
+                continue
+            entries[attr] = value
+        self._by_id[this_id] = entries
+
+    def refresh(self, objects, is_loaded):
+        """
+        Bring the indexes up to date with the objects in the registry.
+        Only objects whose index cache has been replaced or which have been loaded, added or removed are re-indexed
+        Args:
+            objects (dict): dict of id: object of the registry
+            is_loaded (function): returns True if the object passed to it has been loaded
+        """
+        with self._lock:
+            for this_id in [i for i in self._sources if i not in objects]:
+                self._drop(this_id)
+            for this_id, obj in objects.items():
+                source = None if is_loaded(obj) else getattr(obj, '_index_cache_dict', None)
+                if this_id in self._sources:
+                    if self._sources[this_id] is source:
+                        continue
+                    self._drop(this_id)
+                self._add(this_id, source)
+
+    def _matching(self, attr, value):
+        """
+        Returns the ids of the indexed objects whose attribute matches the value
+        Args:
+            attr (str): name of the select attribute
+            value (object): value to match exactly, or a compiled regular expression the value has to match
+        """
+        values = self._values[attr]
+        if hasattr(value, 'match'):
+            matched = set()
+            for indexed_value, ids in values.iteritems():
+                if value.match(str(indexed_value)):
+                    matched.update(ids)
+            return matched
+        return set(values.get(value, ()))
+
+    def select(self, criteria):
+        """
+        Returns a dict of id: set of attributes which still have to be checked on the object, for each object which may be selected.
+        Objects missing from the dict can't match the criteria. Loaded objects have to be checked for all of the criteria.
+        Args:
+            criteria (dict): dict of attribute: value to match as taken by _matching, each attribute must be indexed
+        """
+        with self._lock:
+            candidates = None
+            for attr, value in criteria.iteritems():
+                ids = self._matching(attr, value) | self._unknown[attr]
+                candidates = ids if candidates is None else candidates & ids
+            if candidates is None:
+                candidates = set(self._by_id)
+            selected = {}
+            for this_id in candidates:
+                selected[this_id] = set(attr for attr in criteria if this_id in self._unknown[attr])
+            for this_id in self._live:
+                selected[this_id] = set(criteria)
+            return selected
+
+    def select_range(self, attr, minimum=None, maximum=None):
+        """
+        Returns the ids of the indexed objects whose attribute is within a range, along with the ids which have to be checked directly
+        Args:
+            attr (str): name of the select attribute
+            minimum (object): smallest value to select, unbounded if None
+            maximum (object): largest value to select, unbounded if None
+        """
+        with self._lock:
+            matched = set()
+            for this_id, entries in self._by_id.iteritems():
+                if attr not in entries:
+                    continue
+                value = entries[attr]
+                if value is None:
+                    continue
+                if minimum is not None and value < minimum:
+                    continue
+                if maximum is not None and value > maximum:
+                    continue
+                matched.add(this_id)
+            return matched, self._live | self._unknown[attr]
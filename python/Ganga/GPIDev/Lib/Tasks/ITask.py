@@ -101,6 +101,33 @@ class ITask(GangaObject):
         # update status and check
         self.updateStatus()
 
+    def updateEvents(self, events, dirty, rescan=False):
+        """Called by the event driven task loop, like update() but only the units whose jobs have changed status and
+        those which are pending are updated, see TaskEvents
+        Args:
+            events (TaskEvents): The dirty units and unit counters
+            dirty (dict): transform id: set of ids of the units whose jobs have changed status
+            rescan (bool): Whether to scan all of the units, e.g. once the task has been run
+        """
+
+        # if we're new, then do nothing
+        if self.status == "new":
+            return
+
+        for n, trf in enumerate(self.transforms):
+            if trf.status != "running":
+                continue
+
+            if trf.updateEvents(events, dirty.get(trf.getID(), set()), rescan) and not self.check_all_trfs:
+                # the units of the transforms which haven't been looked at are looked at in the next loop
+                for other in self.transforms[n + 1:]:
+                    if other.getID() in dirty:
+                        events.requeue(self.id, other.getID(), dirty[other.getID()])
+                break
+
+        # update status and check
+        self.updateStatus()
+
 # Public methods:
 #
 # - remove() a task
@@ -191,6 +218,10 @@ class ITask(GangaObject):
 
             finally:
                 self.updateStatus()
+                from Ganga.GPIDev.Lib.Tasks.TaskEvents import getTaskEvents
+                events = getTaskEvents()
+                if events is not None:
+                    events.touchTask(self.id)
         else:
             logger.info("Task is already completed!")
 
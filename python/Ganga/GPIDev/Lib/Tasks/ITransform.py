@@ -19,6 +19,14 @@ from Ganga.GPIDev.Lib.File.File import File
 
 logger = getLogger()
 
+
+def _touchTask(task):
+    """Have the event driven task loop look at all of the units of a task, see TaskEvents"""
+    from Ganga.GPIDev.Lib.Tasks.TaskEvents import getTaskEvents
+    events = getTaskEvents()
+    if events is not None and task is not None:
+        events.touchTask(task.id)
+
 class ITransform(GangaObject):
     _schema = Schema(Version(1, 0), {
         'status': SimpleItem(defvalue='new', protected=1, copyable=1, doc='Status - running, pause or completed', typelist=[str]),
@@ -177,6 +185,7 @@ class ITransform(GangaObject):
                         trf.resetUnit(u2.getID())
 
         self.updateStatus("running")
+        _touchTask(self._getParent())
 
     def getID(self):
         """Return the index of this trf in the parent task"""
@@ -200,6 +209,7 @@ class ITransform(GangaObject):
             task = self._getParent()
             if task:
                 task.updateStatus()
+                _touchTask(task)
         else:
             logger.warning("Transform is already completed!")
 
@@ -278,6 +288,78 @@ class ITransform(GangaObject):
                     self.updateStatus(state)
                 break
 
+    def updateEvents(self, events, dirty_units, rescan=False):
+        """Called by the parent task in the event driven task loop, like update() but only the units whose jobs have
+        changed status and those which are pending are updated, see TaskEvents
+        Args:
+            events (TaskEvents): The dirty units and unit counters
+            dirty_units (set): The ids of the units whose jobs have changed status
+            rescan (bool): Whether to scan all of the units, e.g. once the task has been run
+        """
+        if self.status == "pause" or self.status == "new":
+            return 0
+
+        # check for complete required units
+        task = self._getParent()
+        for trf_id in self.required_trfs:
+            if task.transforms[trf_id].status != "completed":
+                return 0
+
+        trf_id = self.getID()
+        if not dirty_units and not rescan and events.isIdle(task.id, trf_id):
+            return 0
+
+        # new units may be created once input data or the units of a required transform have changed
+        n_units = len(self.units)
+        if dirty_units or rescan:
+            self.createUnits()
+        if len(self.units) != n_units:
+            events.unitsAdded(self)
+        events.scan(self, force=rescan)
+
+        # from the counters, the number of jobs to submit isn't shown as finding it looks at the job of every unit
+        unit_status = events.counts(task.id, trf_id)
+        info_str = "Unit overview: %i units, %i new, %i hold, %i running, %i completed, %i bad." % (len(self.units), unit_status.get("new", 0), unit_status.get("hold", 0),
+                                                                                                    unit_status.get("running", 0), unit_status.get("completed", 0),
+                                                                                                    unit_status.get("bad", 0))
+        addInfoString(self, info_str)
+
+        # set the start time if not already set
+        if len(self.required_trfs) > 0 and self.units[0].start_time == 0:
+            for unit in self.units:
+                unit.start_time = time.time() + self.chain_delay * 60 - 1
+
+        units = [self.units[uid] for uid in sorted(set(dirty_units) | events.pendingUnits(task.id, trf_id)) if uid < len(self.units)]
+
+        # find submissions first, then check for download
+        submissions = [unit for unit in units if unit.checkForSubmission() or unit.checkForResubmission()]
+        others = [unit for unit in units if unit not in submissions]
+        for n, unit in enumerate(submissions + others):
+            aborted = unit.update() and self.abort_loop_on_submit
+            events.unitUpdated(unit)
+            if aborted:
+                logger.info("Unit %d of transform %d, Task %d has aborted the loop" % (
+                    unit.getID(), trf_id, task.id))
+                events.requeue(task.id, trf_id, [u.getID() for u in (submissions + others)[n + 1:]])
+                return 1
+
+        from Ganga.GPIDev.Lib.Tasks.TaskChainInput import TaskChainInput
+        # check for any TaskChainInput completions
+        for ds in self.inputdata:
+            if isType(ds, TaskChainInput) and ds.input_trf_id != -1:
+                if task.transforms[ds.input_trf_id].status != "completed":
+                    return 0
+
+        # update status and check
+        unit_status = events.counts(task.id, trf_id)
+        for state in ['running', 'hold', 'bad', 'completed']:
+            if unit_status.get(state, 0) > 0:
+                if state == 'hold':
+                    state = "running"
+                if state != self.status:
+                    self.updateStatus(state)
+                break
+
     def createUnits(self):
         """Create new units if required given the inputdata"""
 
@@ -402,6 +484,11 @@ class ITransform(GangaObject):
             self.units.append(unit)
             stripProxy(unit).id = len(self.units) - 1
 
+        from Ganga.GPIDev.Lib.Tasks.TaskEvents import getTaskEvents
+        events = getTaskEvents()
+        if events is not None:
+            events.unitsAdded(self)
+
 # Information methods
     def fqn(self):
         task = self._getParent()
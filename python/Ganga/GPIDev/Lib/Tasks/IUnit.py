@@ -85,8 +85,14 @@ class IUnit(GangaObject):
     def updateStatus(self, status):
         """Update status hook"""
         addInfoString(self, "Status change from '%s' to '%s'" % (self.status, status))
+        old_status = self.status
         self.status = status
 
+        from Ganga.GPIDev.Lib.Tasks.TaskEvents import getTaskEvents
+        events = getTaskEvents()
+        if events is not None:
+            events.unitStatusChanged(self, old_status, status)
+
     def createNewJob(self):
         """Create any jobs required for this unit"""
         pass
@@ -183,7 +189,6 @@ class IUnit(GangaObject):
         # check if submission is needed
         task = self._getParent()._getParent()
         trf = self._getParent()
-        maxsub = task.n_tosub()
 
         # check parent unit(s)
         req_ok = self.checkParentUnitsAreComplete()
@@ -192,7 +197,8 @@ class IUnit(GangaObject):
         if len(self.req_units) > 0 and req_ok and self.start_time == 0:
             self.start_time = time.time() + trf.chain_delay * 60 - 1
 
-        if req_ok and self.checkForSubmission() and maxsub > 0:
+        # the number of jobs which may be submitted is only found when needed as it looks at the jobs of every unit
+        if req_ok and self.checkForSubmission() and task.n_tosub() > 0:
 
             # create job and submit
             addInfoString( self, "Creating Job..." )
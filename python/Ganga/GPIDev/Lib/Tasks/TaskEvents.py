@@ -0,0 +1,285 @@
+"""
+Event driven updates of the tasks, used by the TaskRegistry when [Tasks]event_driven is set.
+
+Rather than every unit of every transform being updated each TaskLoopFrequency seconds, which looks at the job of
+every unit, the units are updated when the status of one of their jobs changes. The TaskEvents keeps:
+  - which unit each job belongs to, so a status change of a job marks the unit as dirty and wakes the task loop
+  - for each transform the number of units in each status, kept up to date as units change status, so that the status
+    of a transform is found without looking at its units
+  - for each transform the units which are pending, i.e. waiting to submit a job or whose job has finished but which
+    haven't completed yet (e.g. copying output), which are revisited every TaskLoopFrequency seconds
+
+A transform without dirty or pending units isn't looked at, so idle tasks cost nothing and busy ones only update the
+units whose jobs have changed. A transform is scanned in full when the task loop starts, when its task is run or when
+units are added to it.
+"""
+
+import collections
+import threading
+
+from Ganga.GPIDev.Base.Proxy import stripProxy
+from Ganga.GPIDev.Lib.Tasks.common import getJobByID
+from Ganga.Utility.logging import getLogger
+
+logger = getLogger()
+
+_final_job_states = ('completed', 'failed', 'killed')
+
+
+def _jobStatus(jid):
+    """ The status of a job, from the index cache if the job hasn't been loaded """
+    j = stripProxy(getJobByID(jid))
+    index_cache = getattr(j, '_index_cache', None)
+    if index_cache and 'status' in index_cache:
+        return index_cache['status']
+    return j.status
+
+
+def _unitKey(unit):
+    """ The (task id, transform id, unit id) of a unit, None if it isn't part of a task """
+    trf = unit._getParent()
+    if trf is None:
+        return None
+    task = trf._getParent()
+    if task is None:
+        return None
+    return task.id, trf.getID(), unit.getID()
+
+
+class _TransformState(object):
+
+    """ What is known about the units of one transform """
+
+    __slots__ = ('counts', 'pending', 'rescan')
+
+    def __init__(self):
+        super(_TransformState, self).__init__()
+        # unit status: number of units
+        self.counts = collections.Counter()
+        # ids of the units to revisit without an event
+        self.pending = set()
+        # whether the units must be scanned again before the next update
+        self.rescan = True
+
+
+class TaskEvents(object):
+
+    """
+    Dirty units and unit counters of the transforms, updated from the status changes of the jobs of the units
+    """
+
+    __slots__ = ('_lock', '_jobs', '_dirty', '_rescan', '_states', '_wakeup')
+
+    def __init__(self):
+        super(TaskEvents, self).__init__()
+        self._lock = threading.Lock()
+        # job id: (task id, transform id, unit id)
+        self._jobs = {}
+        # task id: {transform id: set of unit ids} of the units whose jobs have changed
+        self._dirty = {}
+        # ids of the tasks whose transforms are scanned in full at the next update
+        self._rescan = set()
+        # (task id, transform id): _TransformState
+        self._states = {}
+        # set when there is something to update
+        self._wakeup = threading.Event()
+
+    def jobStatusChanged(self, job):
+        """
+        Mark the unit of a job as dirty after the status of the job has changed
+        Args:
+            job (Job): The job, subjobs are ignored as units are updated from the status of their master jobs
+        """
+        if job.master is not None:
+            return
+        with self._lock:
+            key = self._jobs.get(job.id)
+            if key is None:
+                return
+            self._dirty.setdefault(key[0], {}).setdefault(key[1], set()).add(key[2])
+        self._wakeup.set()
+
+    def unitStatusChanged(self, unit, old_status, new_status):
+        """
+        Keep the counters of the transform of a unit up to date
+        Args:
+            unit (IUnit): The unit
+            old_status (str): Its status before the change
+            new_status (str): Its new status
+        """
+        key = _unitKey(unit)
+        if key is None:
+            # not part of a transform yet, it is counted when the units of the transform are scanned
+            return
+        with self._lock:
+            state = self._states.get(key[:2])
+            if state is None or state.rescan:
+                return
+            state.counts[old_status] -= 1
+            state.counts[new_status] += 1
+
+    def unitsAdded(self, trf):
+        """
+        Scan the units of a transform again before its next update, e.g. once units have been added to it
+        Args:
+            trf (ITransform): The transform
+        """
+        task = trf._getParent()
+        if task is None:
+            return
+        with self._lock:
+            self._states.setdefault((task.id, trf.getID()), _TransformState()).rescan = True
+
+    def touchTask(self, task_id):
+        """
+        Scan all of the transforms of a task at the next update, e.g. once it has been run
+        Args:
+            task_id (int): The id of the task
+        """
+        with self._lock:
+            self._rescan.add(task_id)
+        self._wakeup.set()
+
+    def wait(self, timeout):
+        """
+        Wait for something to update, returns whether there is
+        Args:
+            timeout (float): The most seconds to wait
+        """
+        self._wakeup.wait(timeout)
+        woken = self._wakeup.is_set()
+        self._wakeup.clear()
+        return woken
+
+    def wake(self):
+        """ Stop waiting, e.g. when the task loop is stopped """
+        self._wakeup.set()
+
+    def takeDirty(self):
+        """ Return and forget the dirty units and the tasks to scan in full, as (dirty, rescan) """
+        with self._lock:
+            dirty, self._dirty = self._dirty, {}
+            rescan, self._rescan = self._rescan, set()
+        return dirty, rescan
+
+    def requeue(self, task_id, trf_id, unit_ids):
+        """
+        Keep units dirty which couldn't be updated, e.g. after a submission aborted the loop of their transform
+        Args:
+            task_id (int): The id of the task
+            trf_id (int): The id of the transform
+            unit_ids (iterable): The ids of the units
+        """
+        with self._lock:
+            self._dirty.setdefault(task_id, {}).setdefault(trf_id, set()).update(unit_ids)
+
+    def isIdle(self, task_id, trf_id):
+        """
+        Return whether a transform has no pending units and doesn't need to be scanned
+        Args:
+            task_id (int): The id of the task
+            trf_id (int): The id of the transform
+        """
+        with self._lock:
+            state = self._states.get((task_id, trf_id))
+            return state is not None and not state.rescan and not state.pending
+
+    def scan(self, trf, force=False):
+        """
+        Count the units of a transform and find its pending units and the jobs of its units, if needed
+        Args:
+            trf (ITransform): The transform
+            force (bool): Scan the units even if they are known already
+        """
+        task = trf._getParent()
+        key = (task.id, trf.getID())
+        with self._lock:
+            state = self._states.setdefault(key, _TransformState())
+            if not force and not state.rescan:
+                return
+            state.counts.clear()
+            state.pending.clear()
+            for jid, job_key in self._jobs.items():
+                if job_key[:2] == key:
+                    del self._jobs[jid]
+        counts = collections.Counter(unit.status for unit in trf.units)
+        with self._lock:
+            state.counts.update(counts)
+            state.rescan = False
+        for unit in trf.units:
+            self.unitUpdated(unit)
+
+    def unitUpdated(self, unit):
+        """
+        Record the jobs of a unit and whether it is pending, after it has been updated
+        Args:
+            unit (IUnit): The unit
+        """
+        key = _unitKey(unit)
+        if key is None:
+            return
+        pending = False
+        if unit.active and unit.status not in ('completed', 'recreating'):
+            if not unit.active_job_ids:
+                pending = True
+            else:
+                try:
+                    pending = _jobStatus(unit.active_job_ids[-1]) in _final_job_states
+                except Exception as err:
+                    logger.debug("Cannot find the job of unit %s: %s" % (str(key), str(err)))
+        with self._lock:
+            for jid in unit.active_job_ids:
+                self._jobs[jid] = key
+            state = self._states.setdefault(key[:2], _TransformState())
+            if pending:
+                state.pending.add(key[2])
+            else:
+                state.pending.discard(key[2])
+
+    def pendingUnits(self, task_id, trf_id):
+        """
+        Return the ids of the pending units of a transform
+        Args:
+            task_id (int): The id of the task
+            trf_id (int): The id of the transform
+        """
+        with self._lock:
+            state = self._states.get((task_id, trf_id))
+            return set(state.pending) if state is not None else set()
+
+    def counts(self, task_id, trf_id):
+        """
+        Return the number of units in each status of a transform, as a dict
+        Args:
+            task_id (int): The id of the task
+            trf_id (int): The id of the transform
+        """
+        with self._lock:
+            state = self._states.get((task_id, trf_id))
+            if state is None:
+                return {}
+            return dict((status, n) for status, n in state.counts.items() if n > 0)
+
+
+_events = None
+
+
+def getTaskEvents():
+    """ Return the TaskEvents of the event driven task loop, None if the tasks are updated by polling """
+    return _events
+
+
+def startTaskEvents():
+    """ Start recording the events for the event driven task loop """
+    global _events
+    if _events is None:
+        _events = TaskEvents()
+    return _events
+
+
+def stopTaskEvents():
+    """ Stop recording the events, when the task loop stops """
+    global _events
+    events, _events = _events, None
+    if events is not None:
+        events.wake()
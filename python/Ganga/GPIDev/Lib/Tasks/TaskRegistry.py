@@ -76,6 +76,10 @@ class TaskRegistry(Registry):
                 logger.error("Exiting: err=%s" % str(err))
                 return
 
+        if config['event_driven']:
+            self._eventLoop(monitoring_component)
+            return
+
         logger.debug("Entering main loop")
 
         # Main loop
@@ -113,6 +117,48 @@ class TaskRegistry(Registry):
                     break
                 time.sleep(0.01)
 
+    def _eventLoop(self, monitoring_component):
+        """ The main loop when [Tasks]event_driven is set, where only the units whose jobs have changed status and
+        those which are pending are updated, see TaskEvents """
+        from Ganga.GPIDev.Lib.Tasks.TaskEvents import startTaskEvents
+        events = startTaskEvents()
+
+        # start by looking at all of the units
+        for tid in self.ids():
+            events.touchTask(tid)
+
+        logger.debug("Entering event driven main loop")
+
+        while self._main_thread is not None and not self._main_thread.should_stop():
+
+            if (config['ForceTaskMonitoring'] or monitoring_component.enabled) and not config['disableTaskMon']:
+                dirty, rescan = events.takeDirty()
+                for tid in self.ids():
+
+                    try:
+                        p = self[tid]
+                        p.updateEvents(events, dirty.get(tid, {}), tid in rescan)
+
+                    except Exception as x:
+                        logger.error(
+                            "Exception occurred in task monitoring loop: %s %s\nThe offending task was paused." % (x.__class__, x))
+                        type_, value_, traceback_ = sys.exc_info()
+                        logger.error("Full traceback:\n %s" % ' '.join(
+                            traceback.format_exception(type_, value_, traceback_)))
+                        p.pause()
+
+                    if self._main_thread.should_stop():
+                        break
+
+            logger.debug("TaskRegistry waiting for up to: %s seconds" % str(config['TaskLoopFrequency']))
+
+            # Wait interruptible for a job of a unit to change status, or to look at the pending units again
+            waited = 0.
+            while waited < config['TaskLoopFrequency'] and not self._main_thread.should_stop():
+                if events.wait(0.5):
+                    break
+                waited += 0.5
+
     def startup(self):
         """ Start a background thread that periodically run()s"""
         super(TaskRegistry, self).startup()
@@ -129,8 +175,10 @@ class TaskRegistry(Registry):
         super(TaskRegistry, self).shutdown()
 
     def stop(self):
+        from Ganga.GPIDev.Lib.Tasks.TaskEvents import stopTaskEvents
         if self._main_thread is not None:
             self._main_thread.stop()
+            stopTaskEvents()
             self._main_thread.join()
 
 from Ganga.GPIDev.Lib.Registry.RegistrySlice import RegistrySlice
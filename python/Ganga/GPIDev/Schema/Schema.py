@@ -173,28 +173,31 @@ class Schema(object):
     def createDefaultConfig(self):
         # create a configuration unit for default values of object properties
         # take the defaults from schema defaults
-        _self_name = self.name
-        config = Ganga.Utility.Config.makeConfig(defaultConfigSectionName(_self_name), "default attribute values for %s objects" % _self_name)
-
-        for name, item in self.allItems():
-            # and not item['sequence']: #FIXME: do we need it or not??
-            if not item['protected'] and not item['hidden']:
-                if item.hasProperty('typelist'):
-                    types = item['typelist']
-                    if types == []:
+        # a plugin loaded on first use makes its section after bootstrap
+        late = Config._after_bootstrap
+        with Config.lateConfig():
+            _self_name = self.name
+            config = Ganga.Utility.Config.makeConfig(defaultConfigSectionName(_self_name), "default attribute values for %s objects" % _self_name)
+
+            for name, item in self.allItems():
+                # and not item['sequence']: #FIXME: do we need it or not??
+                if not item['protected'] and not item['hidden']:
+                    if item.hasProperty('typelist'):
+                        types = item['typelist']
+                        if types == []:
+                            types = None
+                    else:
                         types = None
-                else:
-                    types = None
 
-                if item['sequence']:
-                    if not types is None:
-                        # bugfix 36398: allow to assign a list in the
-                        # configuration
-                        types.append('list')
-                if isinstance(item['defvalue'], dict):
-                    if not types is None:
-                        types.append('dict')
-                config.addOption(name, item['defvalue'], item['doc'], False, typelist=types)
+                    if item['sequence']:
+                        if not types is None:
+                            # bugfix 36398: allow to assign a list in the
+                            # configuration
+                            types.append('list')
+                    if isinstance(item['defvalue'], dict):
+                        if not types is None:
+                            types.append('dict')
+                    config.addOption(name, item['defvalue'], item['doc'], False, typelist=types)
 
 
         def prehook(name, x):
@@ -222,6 +225,10 @@ class Schema(object):
         config.attachUserHandler(prehook, None)
         config.attachSessionHandler(prehook, None)
 
+        if late:
+            from Ganga.GPIDev.Lib.Config.Config import createSectionProxy
+            createSectionProxy(config.name)
+
 
     def getDefaultValue(self, attr, make_copy=True):
         """ Get the default value of a schema item, both simple and component.
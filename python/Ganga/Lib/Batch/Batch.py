@@ -303,6 +303,9 @@ class Batch(IBackend):
     def kill(self):
         rc, soutfile = self.command(self.config['kill_str'] % (self.id))
 
+        from Ganga.Core.MonitoringComponent.StatusFileWatcher import getStatusFileWatcher
+        getStatusFileWatcher().forget(self.getJobObject().getOutputWorkspace().getPath())
+
         with open(soutfile) as sout_file:
             sout = sout_file.read()
         logger.debug('while killing job %s: rc = %d', self.getJobObject().getFQID('.'), rc)
@@ -459,20 +462,21 @@ class Batch(IBackend):
     def updateMonitoringInformation(jobs):
 
         import re
+        from Ganga.Core.MonitoringComponent.StatusFileWatcher import getStatusFileWatcher
         repid = re.compile(r'^PID: (?P<pid>\d+)', re.M)
         requeue = re.compile(r'^QUEUE: (?P<queue>\S+)', re.M)
         reactualCE = re.compile(r'^ACTUALCE: (?P<actualCE>\S+)', re.M)
         reexit = re.compile(r'^EXITCODE: (?P<exitcode>\d+)', re.M)
 
-        def get_last_alive(f):
-            """Time since the statusfile was last touched in seconds"""
-            import os.path
+        def get_last_alive(d):
+            """Time since the heartbeat file in the directory was last touched in seconds"""
             import time
             talive = 0
-            try:
-                talive = time.time() - os.path.getmtime(f)
-            except OSError as x:
-                logger.debug('Problem reading status file: %s (%s)', f, str(x))
+            modified = watcher.lastModified(d, '__heartbeat__')
+            if modified is None:
+                logger.debug('Problem reading heartbeat file in: %s', d)
+            else:
+                talive = time.time() - modified
 
             return talive
 
@@ -512,13 +516,16 @@ class Batch(IBackend):
             return pid, queue, actualCE, exitcode
 
         from Ganga.Utility.Config import getConfig
+        watcher = getStatusFileWatcher()
         for j in jobs:
             stripProxy(j)._getSessionLock()
             outw = j.getOutputWorkspace()
 
-            statusfile = os.path.join(outw.getPath(), '__jobstatus__')
-            heartbeatfile = os.path.join(outw.getPath(), '__heartbeat__')
-            pid, queue, actualCE, exitcode = get_status(statusfile)
+            # the status file is only read if it has changed since the last check
+            pid, queue, actualCE, exitcode = None, None, None, None
+            if watcher.statusChanged(outw.getPath(), getName(j.backend)):
+                statusfile = os.path.join(outw.getPath(), '__jobstatus__')
+                pid, queue, actualCE, exitcode = get_status(statusfile)
 
             if j.status == 'submitted':
                 if pid or queue:
@@ -543,13 +550,16 @@ class Batch(IBackend):
                         j.updateStatus('failed')
                 else:
                     # Job is still running. Check if alive
-                    time = get_last_alive(heartbeatfile)
+                    time = get_last_alive(outw.getPath())
                     config = getConfig(getName(j.backend))
                     if time > config['timeout']:
                         logger.warning(
                             'Job %s has disappeared from the batch system.', str(j.getFQID('.')))
                         j.updateStatus('failed')
 
+            if j.status not in ['submitted', 'running']:
+                watcher.forget(outw.getPath())
+
 #_________________________________________________________________________
 
 class LSF(Batch):
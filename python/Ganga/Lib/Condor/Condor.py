@@ -66,6 +66,7 @@ from Ganga.GPIDev.Base.Proxy import stripProxy
 from Ganga.GPIDev.Lib.File.FileBuffer import FileBuffer
 from Ganga.GPIDev.Schema import ComponentItem, Schema, SimpleItem, Version
 from Ganga.Utility.ColourText import Foreground, Effects
+from Ganga.Lib.Condor.CondorStatus import statusDict, takeSnapshot
 
 import Ganga.Utility.logging
 from Ganga.Utility.Config import getConfig
@@ -79,6 +80,19 @@ import time
 logger = Ganga.Utility.logging.getLogger()
 
 
+def _lastLines(path, size=4096):
+    """
+    Return the lines at the end of a file, an empty list if the file is empty, without reading all of it
+    Args:
+        path (str): The path of the file
+        size (int): The number of bytes at the end of the file to read
+    """
+    with open(path) as this_file:
+        this_file.seek(0, os.SEEK_END)
+        this_file.seek(max(0, this_file.tell() - size))
+        return this_file.read().splitlines(True)
+
+
 class Condor(IBackend):
 
     """Condor backend - submit jobs to a Condor pool.
@@ -119,20 +133,14 @@ class Condor(IBackend):
 
     _category = "backends"
     _name = "Condor"
-    statusDict = \
-        {
-            "0": "Unexpanded",
-            "1": "Idle",
-            "2": "Running",
-            "3": "Removed",
-            "4": "Completed",
-            "5": "Held"
-        }
+    statusDict = statusDict
 
     def __init__(self):
 
         # Add a volatile variable for recording the first time a job's stdout is checked
         self._stdout_check_time = 0
+        # and one for the global id of a job which was submitted with only its local id
+        self._global_id = ""
 
         super(Condor, self).__init__()
 
@@ -440,39 +448,10 @@ class Condor(IBackend):
         if not idList:
             return
 
-        queryCommand = " ".join\
-            ([
-                "condor_q -global" if getConfig(
-                    "Condor")["query_global_queues"] else "condor_q",
-                "-format \"%s \" GlobalJobId",
-                "-format \"%s \" RemoteHost",
-                "-format \"%d \" JobStatus",
-                "-format \"%f\\n\" RemoteUserCpu"
-            ])
-        status, output = commands.getstatusoutput(queryCommand)
-        if 0 != status:
-            logger.error("Problem retrieving status for Condor jobs")
+        snapshot = takeSnapshot(idList, getConfig("Condor")["query_global_queues"])
+        if snapshot is None:
             return
 
-        if ("All queues are empty" == output):
-            infoList = []
-        else:
-            infoList = output.split("\n")
-
-        allDict = {}
-        for infoString in infoList:
-            tmpList = infoString.split()
-            id, host, status, cputime = ("", "", "", "")
-            if 3 == len(tmpList):
-                id, status, cputime = tmpList
-            if 4 == len(tmpList):
-                id, host, status, cputime = tmpList
-            if id:
-                allDict[id] = {}
-                allDict[id]["status"] = Condor.statusDict[status]
-                allDict[id]["cputime"] = cputime
-                allDict[id]["host"] = host
-
         fg = Foreground()
         fx = Effects()
         status_colours = {'submitted': fg.orange,
@@ -485,25 +464,15 @@ class Condor(IBackend):
             if jobDict[id].status == "killed":
                 continue
 
-            localId = id.split("#")[-1]
-            globalId = id
-
-            if globalId == localId:
-                queryCommand = " ".join\
-                    ([
-                        "condor_q -global" if getConfig(
-                            "Condor")["query_global_queues"] else "condor_q",
-                        "-format \"%s\" GlobalJobId",
-                        id
-                    ])
-                status, output = commands.getstatusoutput(queryCommand)
-                if 0 == status:
-                    globalId = output
-
-            if globalId in allDict.keys():
-                status = allDict[globalId]["status"]
-                host = allDict[globalId]["host"]
-                cputime = allDict[globalId]["cputime"]
+            # The global id of a job submitted with only its local id is kept once found
+            globalId = jobDict[id].backend._global_id or snapshot.globalId(id)
+            if globalId and globalId != id:
+                jobDict[id].backend._global_id = globalId
+
+            if globalId in snapshot.queued:
+                status = snapshot.queued[globalId]["status"]
+                host = snapshot.queued[globalId]["host"]
+                cputime = snapshot.queued[globalId]["cputime"]
                 if status != jobDict[id].backend.status:
                     printStatus = True
                     stripProxy(jobDict[id])._getSessionLock()
@@ -520,7 +489,13 @@ class Condor(IBackend):
                 outDir = jobDict[id].getOutputWorkspace().getPath()
                 condorLogPath = "".join([outDir, "condorLog"])
                 checkExit = True
-                if os.path.isfile(condorLogPath):
+                if globalId in snapshot.finished:
+                    # The history shows that the job was terminated or aborted, so there's no need to search the log
+                    if snapshot.finished[globalId]["host"]:
+                        jobDict[id].backend.actualCE = snapshot.finished[globalId]["host"]
+                    if snapshot.finished[globalId]["cputime"]:
+                        jobDict[id].backend.cputime = snapshot.finished[globalId]["cputime"]
+                elif os.path.isfile(condorLogPath):
                     checkExit = False
                     for line in open(condorLogPath):
                         if -1 != line.find("terminated"):
@@ -535,8 +510,7 @@ class Condor(IBackend):
                     stdoutPath = "".join([outDir, "stdout"])
                     jobStatus = "failed"
                     if os.path.isfile(stdoutPath):
-                        with open(stdoutPath) as stdout:
-                            lineList = stdout.readlines()
+                        lineList = _lastLines(stdoutPath)
                         try:
                             exitLine = lineList[-1]
                             exitCode = exitLine.strip().split()[-1]
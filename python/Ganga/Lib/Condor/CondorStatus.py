@@ -0,0 +1,142 @@
+"""
+Snapshots of the status of Condor jobs for the monitoring of the Condor backend.
+
+Rather than running a query for each job, each monitoring cycle takes one snapshot: a single condor_q for all of the
+jobs in the queue, and a single condor_history for the monitored jobs which have left it. The snapshot is then looked
+up for every job, by its global id or by the local (cluster.proc) id it was submitted with.
+"""
+
+import commands
+
+import Ganga.Utility.logging
+
+logger = Ganga.Utility.logging.getLogger()
+
+statusDict = \
+    {
+        "0": "Unexpanded",
+        "1": "Idle",
+        "2": "Running",
+        "3": "Removed",
+        "4": "Completed",
+        "5": "Held"
+    }
+
+# One line per job of: global id, local id, tagged attributes and status.
+# The attributes which may be undefined are tagged as nothing is printed for them
+_jobFormat = " ".join\
+    ([
+        "-format \"%s \" GlobalJobId",
+        "-format \"%d.\" ClusterId",
+        "-format \"%d \" ProcId",
+        "-format \"host=%s \" {host}",
+        "-format \"cpu=%f \" RemoteUserCpu",
+        "-format \"%d\\n\" JobStatus"
+    ])
+
+
+def parseJobs(output):
+    """
+    Parse the output of condor_q or condor_history run with _jobFormat.
+    Returns a list of dicts of the 'id', 'localId', 'status', 'cputime' and 'host' of each job
+    Args:
+        output (str): The output of the command
+    """
+    jobs = []
+    for line in output.split("\n"):
+        tmpList = line.split()
+        if len(tmpList) < 3 or tmpList[-1] not in statusDict:
+            continue
+        tags = dict(item.split("=", 1) for item in tmpList[2:-1] if "=" in item)
+        jobs.append({"id": tmpList[0], "localId": tmpList[1], "status": statusDict[tmpList[-1]],
+                     "cputime": tags.get("cpu", ""), "host": tags.get("host", "")})
+    return jobs
+
+
+class CondorSnapshot(object):
+
+    """
+    The status of Condor jobs, as found by one condor_q and one condor_history
+    """
+
+    __slots__ = ("queued", "finished", "_globalIds")
+
+    def __init__(self):
+        super(CondorSnapshot, self).__init__()
+        # global id: job dict from parseJobs of the jobs in the queue and of the jobs which have left it
+        self.queued = {}
+        self.finished = {}
+        # local id: global id
+        self._globalIds = {}
+
+    def add(self, jobs, finished=False):
+        """
+        Add jobs to the snapshot
+        Args:
+            jobs (list): The job dicts returned by parseJobs
+            finished (bool): Whether the jobs have left the queue
+        """
+        table = self.finished if finished else self.queued
+        for job in jobs:
+            table[job["id"]] = job
+            self._globalIds.setdefault(job["localId"], job["id"])
+
+    def globalId(self, condorId):
+        """
+        Return the global id of a job, None if it isn't in the snapshot
+        Args:
+            condorId (str): The global id of the job, or the local id if its global id wasn't known when it was submitted
+        """
+        if condorId in self.queued or condorId in self.finished:
+            return condorId
+        if "#" in condorId:
+            return None
+        return self._globalIds.get(condorId)
+
+
+def _clusterId(condorId):
+    """ The cluster of a job from its global (schedd#cluster.proc#time) or local (cluster.proc) id """
+    elements = condorId.split("#")
+    localId = elements[1] if len(elements) > 1 else elements[0]
+    return localId.split(".")[0]
+
+
+def takeSnapshot(condorIds, globalQueues):
+    """
+    Return a CondorSnapshot of the status of the jobs, None if the queue couldn't be queried.
+    Args:
+        condorIds (list): The global or local ids of the jobs being monitored
+        globalQueues (bool): Query all of the queues of the pool rather than that of the local schedd
+    """
+    snapshot = CondorSnapshot()
+
+    queryCommand = " ".join\
+        ([
+            "condor_q -global" if globalQueues else "condor_q",
+            _jobFormat.format(host="RemoteHost")
+        ])
+    status, output = commands.getstatusoutput(queryCommand)
+    if 0 != status:
+        logger.error("Problem retrieving status for Condor jobs")
+        return None
+    if "All queues are empty" != output:
+        snapshot.add(parseJobs(output))
+
+    # The jobs which have left the queue are looked for together in the history
+    clusters = sorted(set(_clusterId(condorId) for condorId in condorIds if snapshot.globalId(condorId) is None))
+    clusters = [cluster for cluster in clusters if cluster.isdigit()]
+    if clusters:
+        constraint = " || ".join("ClusterId == %s" % cluster for cluster in clusters)
+        historyCommand = " ".join\
+            ([
+                "condor_history",
+                "-constraint '%s'" % constraint,
+                _jobFormat.format(host="LastRemoteHost")
+            ])
+        status, output = commands.getstatusoutput(historyCommand)
+        if 0 != status:
+            logger.debug("Problem retrieving history of Condor jobs: %s" % output)
+        else:
+            snapshot.add(parseJobs(output), finished=True)
+
+    return snapshot
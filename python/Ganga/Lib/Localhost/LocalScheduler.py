@@ -0,0 +1,285 @@
+"""
+Scheduler of the processes of the jobs run by the Local backend.
+
+Rather than every (sub)job starting its wrapper script as soon as it is submitted, the jobs are queued and at most
+[Local]max_running_jobs of them run at once, by default one per core. A job which is queued is reported as submitted
+and is started as soon as a running job finishes, and if [Local]min_free_memory is set while the machine has that much
+memory available. The jobs are identified by the path of their wrapper script.
+
+Each process which is started is waited for by a thread of its own, which frees its slot and starts the next queued
+job as soon as it exits. The return codes are kept until the monitoring has collected them.
+"""
+
+import collections
+import multiprocessing
+import os
+import signal
+import subprocess
+import threading
+
+from Ganga.Utility.Config import getConfig
+from Ganga.Utility.logging import getLogger
+
+logger = getLogger()
+
+def availableMemory(meminfo='/proc/meminfo'):
+    """
+    Return the memory available for starting new processes in MB, None if it isn't known
+    Args:
+        meminfo (str): The file listing the memory of the machine
+    """
+    values = {}
+    try:
+        with open(meminfo) as meminfo_file:
+            for line in meminfo_file:
+                fields = line.split()
+                if len(fields) >= 2 and fields[1].isdigit():
+                    values[fields[0].rstrip(':')] = int(fields[1])
+    except IOError:
+        return None
+    if 'MemAvailable' in values:
+        return values['MemAvailable'] // 1024
+    if 'MemFree' in values:
+        return (values['MemFree'] + values.get('Buffers', 0) + values.get('Cached', 0)) // 1024
+    return None
+
+
+def maxRunningJobs():
+    """ The number of jobs which may run at once according to the configuration, None if there is no limit """
+    limit = getConfig('Local')['max_running_jobs']
+    if limit < 0:
+        return None
+    if limit == 0:
+        try:
+            return multiprocessing.cpu_count()
+        except NotImplementedError:
+            return 1
+    return limit
+
+
+class _LocalTask(object):
+
+    """ A job process, queued or started """
+
+    __slots__ = ('key', 'args', 'process', 'finished')
+
+    def __init__(self, key, args):
+        super(_LocalTask, self).__init__()
+        self.key = key
+        self.args = args
+        # subprocess.Popen once started
+        self.process = None
+        # set once the process has exited and been reaped
+        self.finished = threading.Event()
+
+
+class LocalScheduler(object):
+
+    """
+    Queue of the job processes to run on this machine, of which a limited number run at once
+    """
+
+    __slots__ = ('_lock', '_queue', '_tasks', '_pids', '_running', '_max_running', '_min_free_memory', '_popen')
+
+    def __init__(self, max_running=None, min_free_memory=0, popen=subprocess.Popen):
+        """
+        Args:
+            max_running (int): Most processes to run at once, None for no limit
+            min_free_memory (int): Memory in MB which must be available to start a process while others are running
+            popen (class): Starts a process from a list of arguments, subprocess.Popen or a stand-in for it
+        """
+        super(LocalScheduler, self).__init__()
+        self._lock = threading.Lock()
+        # _LocalTask which are waiting to start
+        self._queue = collections.deque()
+        # key: _LocalTask, both queued and started until forgotten
+        self._tasks = {}
+        # pid: _LocalTask of every process started
+        self._pids = {}
+        # number of processes started which haven't finished
+        self._running = 0
+        self._max_running = max_running
+        self._min_free_memory = min_free_memory
+        self._popen = popen
+
+    def submit(self, key, args):
+        """
+        Queue a job process to be started once there is a free slot
+        Args:
+            key (str): Identifies the job, the path of its wrapper script
+            args (list): The command starting the process
+        """
+        with self._lock:
+            previous = self._tasks.get(key)
+            if previous is not None and previous.process is None:
+                # Already queued, e.g. by a resubmission
+                previous.args = args
+                return
+            task = _LocalTask(key, args)
+            self._tasks[key] = task
+            self._queue.append(task)
+            self._startQueued()
+
+    def isQueued(self, key):
+        """
+        Return whether a job is waiting for a slot
+        Args:
+            key (str): Identifies the job
+        """
+        with self._lock:
+            task = self._tasks.get(key)
+            return task is not None and task.process is None
+
+    def pid(self, key):
+        """
+        Return the pid of the process of a job, None if it hasn't been started
+        Args:
+            key (str): Identifies the job
+        """
+        with self._lock:
+            task = self._tasks.get(key)
+            if task is None or task.process is None:
+                return None
+            return task.process.pid
+
+    def returncode(self, pid):
+        """
+        Return whether a process started by the scheduler has finished and its return code, as (finished, returncode).
+        (False, None) is returned for processes which are running and for those which weren't started by the scheduler
+        Args:
+            pid (int): The pid of the process
+        """
+        with self._lock:
+            task = self._pids.get(pid)
+            if task is None or task.process.returncode is None:
+                return False, None
+            return True, task.process.returncode
+
+    def owns(self, pid):
+        """
+        Return whether a process was started by the scheduler, and so is reaped by it
+        Args:
+            pid (int): The pid of the process
+        """
+        with self._lock:
+            return pid in self._pids
+
+    def cancel(self, key):
+        """
+        Remove a job from the queue, returns True if it was queued and so will never be started
+        Args:
+            key (str): Identifies the job
+        """
+        with self._lock:
+            task = self._tasks.get(key)
+            if task is None or task.process is not None:
+                return False
+            del self._tasks[key]
+            self._queue.remove(task)
+            return True
+
+    def kill(self, key):
+        """
+        Kill the process group of a job which has been started and wait for it, returns False if the job wasn't started.
+        Raises OSError if the process couldn't be killed
+        Args:
+            key (str): Identifies the job
+        """
+        with self._lock:
+            task = self._tasks.get(key)
+            if task is None or task.process is None:
+                return False
+        # The wrapper script starts a new session and group, so this kills all of its processes
+        os.kill(-task.process.pid, signal.SIGKILL)
+        # the thread waiting for the process reaps it
+        task.finished.wait()
+        return True
+
+    def forget(self, key):
+        """
+        Drop what is known about a job once it has finished, or been killed
+        Args:
+            key (str): Identifies the job
+        """
+        with self._lock:
+            task = self._tasks.pop(key, None)
+            if task is None:
+                return
+            if task.process is None:
+                self._queue.remove(task)
+            elif task.process.returncode is not None:
+                self._pids.pop(task.process.pid, None)
+            # otherwise the process is dropped once it has been reaped
+
+    def __len__(self):
+        """ The number of jobs queued or running """
+        with self._lock:
+            return len(self._queue) + self._running
+
+    def _hasFreeSlot(self):
+        """ Whether another process may start now, the lock must be held """
+        if self._max_running is not None and self._running >= self._max_running:
+            return False
+        if self._min_free_memory > 0 and self._running > 0:
+            available = availableMemory()
+            if available is not None and available < self._min_free_memory:
+                return False
+        return True
+
+    def _startQueued(self):
+        """ Start queued processes while there are free slots, the lock must be held """
+        while self._queue and self._hasFreeSlot():
+            task = self._queue.popleft()
+            try:
+                task.process = self._popen(task.args)
+            except OSError as err:
+                logger.error('cannot start a job process: %s', str(err))
+                del self._tasks[task.key]
+                continue
+            self._pids[task.process.pid] = task
+            self._running += 1
+            waiter = threading.Thread(target=self._waitFor, args=(task,), name='LocalScheduler_%s' % task.process.pid)
+            waiter.daemon = True
+            waiter.start()
+
+    def _waitFor(self, task):
+        """ Wait for the process of a task to exit then start the next queued job, run by a thread per process """
+        try:
+            task.process.wait()
+        except OSError as err:
+            logger.debug('problem waiting for job process %s: %s', task.process.pid, str(err))
+        with self._lock:
+            self._running -= 1
+            if self._tasks.get(task.key) is not task:
+                # already forgotten by the monitoring
+                self._pids.pop(task.process.pid, None)
+            self._startQueued()
+        task.finished.set()
+
+
+_scheduler_lock = threading.Lock()
+_scheduler = None
+
+
+def getLocalScheduler():
+    """ Return the scheduler of the jobs of the Local backend """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = LocalScheduler(maxRunningJobs(), getConfig('Local')['min_free_memory'])
+        return _scheduler
+
+
+def shutdownLocalScheduler():
+    """
+    Drop the jobs which are still queued when Ganga shuts down, the processes which have started carry on running.
+    The queued jobs are queued again by the monitoring of the next session
+    """
+    global _scheduler
+    with _scheduler_lock:
+        scheduler, _scheduler = _scheduler, None
+    if scheduler is not None:
+        with scheduler._lock:
+            for task in scheduler._queue:
+                scheduler._tasks.pop(task.key, None)
+            scheduler._queue.clear()
@@ -11,8 +11,6 @@ import os.path
 import re
 import errno
 
-import subprocess
-
 import datetime
 import time
 
@@ -21,6 +19,7 @@ import Ganga.Utility.logging
 import Ganga.Utility.Config
 
 from Ganga.GPIDev.Base.Proxy import getName, stripProxy
+from Ganga.Lib.Localhost.LocalScheduler import getLocalScheduler
 
 logger = Ganga.Utility.logging.getLogger()
 config = Ganga.Utility.Config.getConfig('Local')
@@ -74,12 +73,21 @@ class Localhost(IBackend):
         return self.run(job.getInputWorkspace().getPath('__jobscript__'))
 
     def run(self, scriptpath):
-        try:
-            process = subprocess.Popen(["python", scriptpath, 'subprocess'])
-        except OSError as x:
-            logger.error('cannot start a job process: %s', str(x))
+        """
+        Queue the wrapper script of the job to be run once there is a free slot on this machine, see LocalScheduler
+        Args:
+            scriptpath (str): The path of the wrapper script
+        """
+        # the same job is looked up by the path from its input workspace
+        scriptpath = os.path.normpath(scriptpath)
+        scheduler = getLocalScheduler()
+        scheduler.submit(scriptpath, ["python", scriptpath, 'subprocess'])
+        pid = scheduler.pid(scriptpath)
+        if pid is None and not scheduler.isQueued(scriptpath):
+            # the process failed to start
             return 0
-        self.wrapper_pid = process.pid
+        # the pid of a job which is queued is found by the monitoring once it has started
+        self.wrapper_pid = -1 if pid is None else pid
         self.actualCE = Ganga.Utility.util.hostname()
         return 1
 
@@ -241,22 +249,38 @@ class Localhost(IBackend):
         import signal
 
         job = self.getJobObject()
+        scriptpath = os.path.normpath(job.getInputWorkspace().getPath('__jobscript__'))
+        scheduler = getLocalScheduler()
 
         ok = True
-        try:
-            # kill the wrapper script
-            # bugfix: #18178 - since wrapper script sets a new session and new
-            # group, we can use this to kill all processes in the group
-            os.kill(-self.wrapper_pid, signal.SIGKILL)
-        except OSError as x:
-            logger.warning('while killing wrapper script for job %s: pid=%d, %s', job.getFQID('.'), self.wrapper_pid, str(x))
-            ok = False
+        if scheduler.cancel(scriptpath):
+            # the job was still queued so no process has been started
+            pass
+        elif scheduler.pid(scriptpath) is not None:
+            try:
+                scheduler.kill(scriptpath)
+            except OSError as x:
+                logger.warning('while killing wrapper script for job %s: pid=%d, %s', job.getFQID('.'), scheduler.pid(scriptpath), str(x))
+                ok = False
+        elif self.wrapper_pid > 0:
+            try:
+                # kill the wrapper script
+                # bugfix: #18178 - since wrapper script sets a new session and new
+                # group, we can use this to kill all processes in the group
+                os.kill(-self.wrapper_pid, signal.SIGKILL)
+            except OSError as x:
+                logger.warning('while killing wrapper script for job %s: pid=%d, %s', job.getFQID('.'), self.wrapper_pid, str(x))
+                ok = False
 
-        # waitpid to avoid zombies
-        try:
-            ws = os.waitpid(self.wrapper_pid, 0)
-        except OSError as x:
-            logger.warning('problem while waitpid %s: %s', job.getFQID('.'), x)
+            # waitpid to avoid zombies
+            try:
+                ws = os.waitpid(self.wrapper_pid, 0)
+            except OSError as x:
+                logger.warning('problem while waitpid %s: %s', job.getFQID('.'), x)
+        scheduler.forget(scriptpath)
+
+        from Ganga.Core.MonitoringComponent.StatusFileWatcher import getStatusFileWatcher
+        getStatusFileWatcher().forget(job.getOutputWorkspace().getPath())
 
         from Ganga.Utility.files import recursive_copy
 
@@ -283,46 +307,56 @@ class Localhost(IBackend):
     @staticmethod
     def updateMonitoringInformation(jobs):
 
-        def get_exit_code(f):
-            import re
-            with open(f) as statusfile:
-                stat = statusfile.read()
-            m = re.compile(
-                r'^EXITCODE: (?P<exitcode>-?\d*)', re.M).search(stat)
+        from Ganga.Core.MonitoringComponent.StatusFileWatcher import getStatusFileWatcher
 
-            if m is None:
-                return None
-            else:
-                return int(m.group('exitcode'))
+        repid = re.compile(r'^PID: (?P<pid>\d*)', re.M)
+        reexit = re.compile(r'^EXITCODE: (?P<exitcode>-?\d*)', re.M)
 
-        def get_pid(f):
-            import re
+        def get_status(f):
+            """Give (pid, exit code) for the job from its status file"""
             with open(f) as statusfile:
                 stat = statusfile.read()
-            m = re.compile(r'^PID: (?P<pid>\d*)', re.M).search(stat)
+            logger.debug('status file: %s %s', f, stat)
 
-            if m is None:
-                return None
-            else:
-                return int(m.group('pid'))
+            pid, exitcode = None, None
+            m = repid.search(stat)
+            if m is not None and m.group('pid'):
+                pid = int(m.group('pid'))
+            m = reexit.search(stat)
+            if m is not None and m.group('exitcode') not in ('', '-'):
+                exitcode = int(m.group('exitcode'))
+            return pid, exitcode
 
         logger.debug('local ping: %s', str(jobs))
 
+        watcher = getStatusFileWatcher()
+        scheduler = getLocalScheduler()
+
         for j in jobs:
             outw = j.getOutputWorkspace()
-
-            # try to get the application exit code from the status file
+            exitcode = None
+
+            # a job which was queued by the LocalScheduler may have been started since the last check
+            scriptpath = os.path.normpath(j.getInputWorkspace().getPath('__jobscript__'))
+            backend = stripProxy(j.backend)
+            if backend.wrapper_pid <= 0:
+                pid = scheduler.pid(scriptpath)
+                if pid is not None:
+                    backend.wrapper_pid = pid
+                elif not scheduler.isQueued(scriptpath) and not os.path.exists(os.path.join(outw.getPath(), '__jobstatus__')):
+                    # queued in an earlier session, which ended before the job could be started
+                    logger.debug('queueing job %s again', j.getFQID('.'))
+                    scheduler.submit(scriptpath, ["python", scriptpath, 'subprocess'])
+
+            # try to get the application exit code from the status file, which is only read if it has changed
             try:
                 statusfile = os.path.join(outw.getPath(), '__jobstatus__')
-                if j.status == 'submitted':
-                    pid = get_pid(statusfile)
-                    if pid:
+                if watcher.statusChanged(outw.getPath(), getName(j.backend)):
+                    pid, exitcode = get_status(statusfile)
+                    if j.status == 'submitted' and pid:
                         j.backend.id = pid
                         #logger.info('Local job %s status changed to running, pid=%d',j.getFQID('.'),pid)
                         j.updateStatus('running')  # bugfix: 12194
-                exitcode = get_exit_code(statusfile)
-                with open(statusfile) as status_file:
-                    logger.debug('status file: %s %s', statusfile, status_file.read())
             except IOError as x:
                 logger.debug('problem reading status file: %s (%s)', statusfile, str(x))
                 exitcode = None
@@ -334,18 +368,26 @@ class Localhost(IBackend):
 
             # check if the exit code of the wrapper script is available (non-blocking check)
             # if the wrapper script exited with non zero this is an error
-            try:
-                ws = os.waitpid(stripProxy(j.backend).wrapper_pid, os.WNOHANG)
-                if not Ganga.Utility.logic.implies(ws[0] != 0, ws[1] == 0):
-                    # FIXME: for some strange reason the logger DOES NOT LOG (checked in python 2.3 and 2.5)
-                    # print 'logger problem', logger.name
-                    # print 'logger',logger.getEffectiveLevel()
-                    logger.critical('wrapper script for job %s exit with code %d', str(j.getFQID('.')), ws[1])
+            if backend.wrapper_pid > 0 and scheduler.owns(backend.wrapper_pid):
+                # the process is reaped by the scheduler
+                finished, returncode = scheduler.returncode(backend.wrapper_pid)
+                if finished and returncode != 0:
+                    logger.critical('wrapper script for job %s exit with code %d', str(j.getFQID('.')), returncode)
                     logger.critical('report this as a bug at https://github.com/ganga-devs/ganga/issues/')
                     j.updateStatus('failed')
-            except OSError as x:
-                if x.errno != errno.ECHILD:
-                    logger.warning('cannot do waitpid for %d: %s', stripProxy(j.backend).wrapper_pid, str(x))
+            elif backend.wrapper_pid > 0:
+                try:
+                    ws = os.waitpid(backend.wrapper_pid, os.WNOHANG)
+                    if not Ganga.Utility.logic.implies(ws[0] != 0, ws[1] == 0):
+                        # FIXME: for some strange reason the logger DOES NOT LOG (checked in python 2.3 and 2.5)
+                        # print 'logger problem', logger.name
+                        # print 'logger',logger.getEffectiveLevel()
+                        logger.critical('wrapper script for job %s exit with code %d', str(j.getFQID('.')), ws[1])
+                        logger.critical('report this as a bug at https://github.com/ganga-devs/ganga/issues/')
+                        j.updateStatus('failed')
+                except OSError as x:
+                    if x.errno != errno.ECHILD:
+                        logger.warning('cannot do waitpid for %d: %s', backend.wrapper_pid, str(x))
 
             # if the exit code was collected for the application get the exit
             # code back
@@ -366,3 +408,6 @@ class Localhost(IBackend):
 
                 j.backend.remove_workdir()
 
+            if j.status not in ['submitted', 'running']:
+                watcher.forget(outw.getPath())
+                scheduler.forget(scriptpath)
@@ -0,0 +1,230 @@
+"""
+Incremental merging of the output of subjobs, used by the mergers when their incremental flag is set.
+
+Rather than merging the output of every subjob once the master job has finished, the output of each subjob is folded
+into a partial result, the accumulator, as soon as the subjob completes. When the master job finishes only the subjobs
+which haven't been folded yet (e.g. those which completed while Ganga wasn't running) are folded, and the accumulator
+becomes the merged file.
+
+The accumulators are kept in the .incremental_merge directory of the output directory of the master job, with a
+progress file for each merged file listing the subjobs and files folded so far, so that a new session carries on
+where the last one stopped. A merger either appends to its accumulator (incremental_append, e.g. TextMerger), in which
+case the size of the accumulator is recorded and anything written after it is dropped when the next subjob is folded,
+or merges its accumulator and the new files into the next generation of the accumulator (e.g. RootMerger). In both
+cases a subjob is only recorded as folded once its files are in the accumulator.
+"""
+
+import glob
+import json
+import os
+import threading
+import urllib
+
+from Ganga.GPIDev.Adapters.IPostProcessor import PostProcessException
+from Ganga.Utility.logging import getLogger
+
+logger = getLogger()
+
+_state_dir_name = '.incremental_merge'
+
+_locks_lock = threading.Lock()
+# state directory: lock, subjobs may complete in several monitoring threads at once
+_locks = {}
+
+
+def _lockFor(state_dir):
+    """ The lock of the accumulators in a state directory """
+    with _locks_lock:
+        return _locks.setdefault(state_dir, threading.RLock())
+
+
+class MergeProgress(object):
+
+    """
+    What has been folded into the accumulator of one merged file
+    """
+
+    __slots__ = ('fn', 'subjobs', 'files', 'size', 'generation')
+
+    def __init__(self, state_dir, name):
+        """
+        Args:
+            state_dir (str): The directory of the accumulators
+            name (str): The path of the merged file relative to the output directory
+        """
+        super(MergeProgress, self).__init__()
+        self.fn = os.path.join(state_dir, urllib.quote(name, safe='') + '.progress')
+        # ids of the subjobs folded, in order
+        self.subjobs = []
+        # files folded, in order
+        self.files = []
+        # size of an appended accumulator once the last subjob was folded
+        self.size = 0
+        # the accumulator which was merged into, None until the first subjob is folded
+        self.generation = None
+        if os.path.exists(self.fn):
+            with open(self.fn) as progress_file:
+                progress = json.load(progress_file)
+            self.subjobs = progress['subjobs']
+            self.files = progress['files']
+            self.size = progress['size']
+            self.generation = progress['generation']
+
+    def accumulator(self, generation=None):
+        """
+        The path of the accumulator
+        Args:
+            generation (int): The generation of the accumulator, the current one by default
+        """
+        if generation is None:
+            generation = self.generation
+        # the extension stays last, so that e.g. a merger compressing files ending in .gz writes the accumulator the
+        # same way as the merged file
+        base, ext = os.path.splitext(self.fn[:-len('.progress')])
+        return '%s.%s%s' % (base, generation, ext)
+
+    def save(self):
+        """ Atomically record the progress """
+        new_name = self.fn + '.new'
+        with open(new_name, 'w') as progress_file:
+            json.dump({'subjobs': self.subjobs, 'files': self.files, 'size': self.size,
+                       'generation': self.generation}, progress_file)
+            progress_file.flush()
+            os.fsync(progress_file.fileno())
+        os.rename(new_name, self.fn)
+
+
+def _stateDir(outputdir):
+    """ The directory of the accumulators of the merges into outputdir """
+    return os.path.join(outputdir, _state_dir_name)
+
+
+def _filesOfJob(merger, job, ignorefailed):
+    """
+    Return a dict of the path relative to its output directory: path of the files of a job which are merged
+    Args:
+        merger (IMerger): The merger
+        job (Job): The (sub)job
+        ignorefailed (bool): Whether to carry on when a file pattern isn't found
+    """
+    files = {}
+    for pattern in merger.files:
+        matched = glob.glob(os.path.join(job.outputdir, pattern))
+        if not matched:
+            if ignorefailed:
+                logger.warning('The file pattern %s in Job %s was not found. The file will be ignored.', pattern, job.fqid)
+                continue
+            raise PostProcessException('The file pattern %s in Job %s was not found and so the merge can not continue. '
+                                       'This can be overridden with the ignorefailed flag.' % (pattern, job.fqid))
+        for matchedFile in matched:
+            files[os.path.relpath(matchedFile, job.outputdir)] = matchedFile
+    return files
+
+
+def _fold(merger, progress, subjob_id, file_name):
+    """
+    Fold the file of a subjob into the accumulator then record it
+    Args:
+        merger (IMerger): The merger
+        progress (MergeProgress): What has been folded so far
+        subjob_id (int): The id of the subjob
+        file_name (str): The path of the file to fold
+    """
+    previous = None
+    if merger.incremental_append:
+        if progress.generation is None:
+            progress.generation = 0
+        accumulator = progress.accumulator()
+        if os.path.exists(accumulator) and os.path.getsize(accumulator) != progress.size:
+            # something was appended for a subjob which wasn't recorded, e.g. Ganga stopped during the fold
+            with open(accumulator, 'r+b') as accumulator_file:
+                accumulator_file.truncate(progress.size)
+        merger.appendfiles(accumulator, [file_name])
+        progress.size = os.path.getsize(accumulator)
+    else:
+        previous = None if progress.generation is None else progress.accumulator()
+        generation = 0 if previous is None else progress.generation + 1
+        accumulator = progress.accumulator(generation)
+        merger.mergefiles([file_name] if previous is None else [previous, file_name], accumulator)
+        progress.generation = generation
+    progress.subjobs.append(subjob_id)
+    progress.files.append(file_name)
+    progress.save()
+    if previous is not None:
+        os.remove(previous)
+
+
+def foldJob(merger, job, outputdir, ignorefailed):
+    """
+    Fold the output of a subjob which has completed into the accumulators of the merges into outputdir
+    Args:
+        merger (IMerger): The merger
+        job (Job): The subjob
+        outputdir (str): Where the merged files are written, the output directory of the master job
+        ignorefailed (bool): Whether to carry on when a file pattern isn't found
+    """
+    state_dir = _stateDir(outputdir)
+    files = _filesOfJob(merger, job, ignorefailed)
+    with _lockFor(state_dir):
+        if not os.path.exists(state_dir):
+            os.makedirs(state_dir)
+        for name, file_name in sorted(files.items()):
+            progress = MergeProgress(state_dir, merger.incrementalOutput(name))
+            if job.id in progress.subjobs:
+                continue
+            logger.debug('Folding %s of job %s into its merge', file_name, job.fqid)
+            _fold(merger, progress, job.id, file_name)
+
+
+def finishMerge(merger, jobs, outputdir, ignorefailed, overwrite):
+    """
+    Fold the subjobs which haven't been folded yet, then move the accumulators to outputdir
+    Args:
+        merger (IMerger): The merger
+        jobs (list): The subjobs of the master job
+        outputdir (str): The output directory of the master job
+        ignorefailed (bool): Whether to leave out the failed and killed subjobs and the files which are missing
+        overwrite (bool): Whether to overwrite the merged files which exist already
+    """
+    state_dir = _stateDir(outputdir)
+    with _lockFor(state_dir):
+        for j in jobs:
+            if j.status != 'completed':
+                if j.status in ('failed', 'killed') and ignorefailed:
+                    logger.warning('Job %s has status %s and is being ignored.', j.fqid, j.status)
+                    continue
+                raise PostProcessException('Job %s has status %s and so the merge can not continue. '
+                                           'This can be overridden with the ignorefailed flag.' % (j.fqid, j.status))
+            foldJob(merger, j, outputdir, ignorefailed)
+
+        if not os.path.exists(state_dir):
+            logger.warning('Attempting to merge with no files. Request will be ignored.')
+            return merger.success
+
+        names = sorted(urllib.unquote(fn[:-len('.progress')]) for fn in os.listdir(state_dir) if fn.endswith('.progress'))
+        for name in names:
+            outputfile = os.path.join(outputdir, name)
+            if os.path.exists(outputfile) and not overwrite:
+                raise PostProcessException('The merge process can not continue as it will result in over writing. '
+                                           'Either move the file %s or set the overwrite flag to True.' % outputfile)
+            if not os.path.isdir(os.path.dirname(outputfile)):
+                os.makedirs(os.path.dirname(outputfile))
+
+            progress = MergeProgress(state_dir, name)
+            accumulator = progress.accumulator()
+            if merger.incremental_append:
+                merger.finishfiles(accumulator)
+            os.rename(accumulator, outputfile)
+
+            with open('%s.merge_summary' % outputfile, 'w') as log:
+                log.write('# -- List of files merged -- #\n')
+                for f in progress.files:
+                    log.write('%s\n' % f)
+                log.write('# -- End of list -- #\n')
+            os.remove(progress.fn)
+
+        for fn in os.listdir(state_dir):
+            os.remove(os.path.join(state_dir, fn))
+        os.rmdir(state_dir)
+
+    return merger.success
@@ -0,0 +1,132 @@
+"""
+Helpers for merging the output of jobs with many subjobs.
+
+copyFile streams a file into another in chunks rather than reading it whole, so the memory used by a merge doesn't grow
+with the size of the files.
+
+mergeInTree merges a long list of files hierarchically: the files are split into groups of at most [Mergers]tree_fan_in
+files, the groups are merged at the same time by [Mergers]tree_workers workers into partial results, and the partial
+results are merged in turn until one group is left, which is merged into the output file. The groups are consecutive
+so the order of the files is kept. The workers are threads, each of which runs the merge command (e.g. hadd) of its
+group as a process of its own.
+"""
+
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+
+from Ganga.GPIDev.Adapters.IPostProcessor import PostProcessException
+from Ganga.Utility.Config import getConfig
+from Ganga.Utility.logging import getLogger
+
+logger = getLogger()
+
+# bytes copied at a time
+_chunk_size = 1024 * 1024
+
+
+def copyFile(in_file, out_file, chunk_size=_chunk_size):
+    """
+    Copy the rest of an open file into another in chunks, returns the last byte copied or '' if there wasn't any
+    Args:
+        in_file (file): The file to read, may be a gzip.GzipFile
+        out_file (file): The file to write to
+        chunk_size (int): The number of bytes read at a time
+    """
+    last = ''
+    while True:
+        chunk = in_file.read(chunk_size)
+        if not chunk:
+            return last
+        out_file.write(chunk)
+        last = chunk[-1]
+
+
+def treeWorkers():
+    """ The number of groups merged at once according to the configuration """
+    workers = getConfig('Mergers')['tree_workers']
+    if workers > 0:
+        return workers
+    try:
+        return multiprocessing.cpu_count()
+    except NotImplementedError:
+        return 1
+
+
+def _mergeGroups(mergefiles, groups, output_dir, workers):
+    """
+    Merge each group of files into a partial result in output_dir, returns the list of partial results in order.
+    Raises the first PostProcessException of a failed merge once all of the workers have finished
+    Args:
+        mergefiles (function): Merges a list of files into an output file, mergefiles(file_list, output_file)
+        groups (list): The lists of files to merge together
+        output_dir (str): Where the partial results are written
+        workers (int): The number of groups merged at once
+    """
+    extension = os.path.splitext(groups[0][0])[1]
+    partials = [os.path.join(output_dir, 'partial_%d%s' % (index, extension)) for index in range(len(groups))]
+    lock = threading.Lock()
+    pending = list(range(len(groups)))
+    errors = []
+
+    def work():
+        while True:
+            with lock:
+                if not pending or errors:
+                    return
+                index = pending.pop(0)
+            try:
+                mergefiles(groups[index], partials[index])
+            except Exception as err:
+                with lock:
+                    errors.append(err)
+                return
+
+    threads = [threading.Thread(target=work, name='MergeTree_%d' % i) for i in range(min(workers, len(groups)))]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        if isinstance(errors[0], PostProcessException):
+            raise errors[0]
+        raise PostProcessException('A partial merge failed: %s' % str(errors[0]))
+    return partials
+
+
+def mergeInTree(mergefiles, file_list, output_file, fan_in=None, workers=None):
+    """
+    Merge the files into output_file with mergefiles, merging groups of them at once first if there are many
+    Args:
+        mergefiles (function): Merges a list of files into an output file, mergefiles(file_list, output_file)
+        file_list (list): The paths of the files to merge, in order
+        output_file (str): The path of the merged file
+        fan_in (int): The most files merged together, [Mergers]tree_fan_in by default. Below 2 all of the files are merged at once
+        workers (int): The number of groups merged at once, [Mergers]tree_workers by default
+    """
+    if fan_in is None:
+        fan_in = getConfig('Mergers')['tree_fan_in']
+    if fan_in < 2 or len(file_list) <= fan_in:
+        mergefiles(file_list, output_file)
+        return
+    if workers is None:
+        workers = treeWorkers()
+
+    # the partial results are kept next to the output, which is expected to have the space for them
+    work_dir = tempfile.mkdtemp(prefix='.%s.' % os.path.basename(output_file), dir=os.path.dirname(os.path.abspath(output_file)))
+    try:
+        level = 0
+        while len(file_list) > fan_in:
+            groups = [file_list[i:i + fan_in] for i in range(0, len(file_list), fan_in)]
+            level_dir = os.path.join(work_dir, str(level))
+            os.mkdir(level_dir)
+            logger.debug('Merging %d files in %d groups', len(file_list), len(groups))
+            file_list = _mergeGroups(mergefiles, groups, level_dir, workers)
+            level += 1
+        mergefiles(file_list, output_file)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
@@ -11,6 +11,7 @@ from Ganga.GPIDev.Base.Proxy import isType
 from Ganga.GPIDev.Lib.File.File import File
 from Ganga.GPIDev.Lib.File.LocalFile import LocalFile
 from Ganga.GPIDev.Adapters.IGangaFile import IGangaFile
+from Ganga.Lib.Mergers.MergeTree import copyFile, mergeInTree
 from Ganga.Utility.Config import ConfigError, getConfig
 from Ganga.Utility.Plugin import allPlugins
 from Ganga.Utility.logging import getLogger
@@ -100,6 +101,10 @@ class TextMerger(IMerger):
     '.merge_summary' extension appended and will be placed in the same directory
     as the merge results.
 
+    If the incremental flag is set, the file of each subjob is appended to
+    the merge as soon as the subjob completes, so the files appear in the
+    order in which the subjobs completed.
+
     """
     _category = 'postprocessor'
     _name = 'TextMerger'
@@ -107,20 +112,27 @@ class TextMerger(IMerger):
     _schema.datadict['compress'] = SimpleItem(
         defvalue=False, doc='Output should be compressed with gzip.')
 
-    def mergefiles(self, file_list, output_file):
-
-        import time
+    incremental_append = True
 
+    def _open(self, output_file, mode):
+        """
+        Open the merged file, compressed if compress is set or its name ends with .gz
+        Args:
+            output_file (str): The path of the merged file
+            mode (str): The mode to open it with
+        """
         if self.compress or output_file.lower().endswith('.gz'):
-            # use gzip
             import gzip
-            if not output_file.lower().endswith('.gz'):
-                output_file += '.gz'
-            out_file = gzip.GzipFile(output_file, 'w')
-        else:
-            out_file = open(output_file, 'w')
-
-        out_file.write('# Ganga TextMergeTool - %s #\n' % time.asctime())
+            return gzip.GzipFile(output_file, mode)
+        return open(output_file, mode)
+
+    def _writeFiles(self, out_file, file_list):
+        """
+        Write a section with the contents of each file
+        Args:
+            out_file (file): The merged file
+            file_list (list): The paths of the files to merge
+        """
         for f in file_list:
 
             if not f.lower().endswith('.gz'):
@@ -130,15 +142,48 @@ class TextMerger(IMerger):
                 in_file = gzip.GzipFile(f)
 
             out_file.write('# Start of file %s #\n' % str(f))
-            out_file.write(in_file.read())
+            # streamed in chunks so that large files aren't read into memory
+            copyFile(in_file, out_file)
             out_file.write('\n')
 
             in_file.close()
 
+    def mergefiles(self, file_list, output_file):
+
+        import time
+
+        output_file = self.incrementalOutput(output_file)
+        out_file = self._open(output_file, 'w')
+
+        out_file.write('# Ganga TextMergeTool - %s #\n' % time.asctime())
+        self._writeFiles(out_file, file_list)
+
         out_file.write('# Ganga Merge Ended Successfully #\n')
         out_file.flush()
         out_file.close()
 
+    def appendfiles(self, accumulator, file_list):
+
+        import time
+
+        # each append of a compressed file adds a gzip member, which are read back as one
+        new_file = not os.path.exists(accumulator)
+        out_file = self._open(accumulator, 'ab')
+        if new_file:
+            out_file.write('# Ganga TextMergeTool - %s #\n' % time.asctime())
+        self._writeFiles(out_file, file_list)
+        out_file.close()
+
+    def finishfiles(self, accumulator):
+        out_file = self._open(accumulator, 'ab')
+        out_file.write('# Ganga Merge Ended Successfully #\n')
+        out_file.close()
+
+    def incrementalOutput(self, outputfile):
+        if self.compress and not outputfile.lower().endswith('.gz'):
+            return outputfile + '.gz'
+        return outputfile
+
 
 class RootMerger(IMerger):
 
@@ -188,6 +233,14 @@ class RootMerger(IMerger):
     If outputdir is not specified, the default location specfied
     in the [Mergers] section of the .gangarc file will be used.
 
+    When there are more files than tree_fan_in in the [Mergers] section
+    of the .gangarc file, groups of that many files are merged at the same
+    time by tree_workers hadd processes, then the partial results are
+    merged in turn until the output file is made.
+
+    If the incremental flag is set, the file of each subjob is added with
+    hadd to the result so far as soon as the subjob completes.
+
     """
 
     _category = 'postprocessor'
@@ -197,6 +250,16 @@ class RootMerger(IMerger):
                                           typelist=[str, None])
 
     def mergefiles(self, file_list, output_file):
+        # many files are merged in groups at once, then the partial results are merged, see MergeTree
+        mergeInTree(self._hadd, file_list, output_file)
+
+    def _hadd(self, file_list, output_file):
+        """
+        Merge the files into output_file with a single hadd
+        Args:
+            file_list (list): The paths of the files to merge
+            output_file (str): The path of the merged file
+        """
 
         from Ganga.Utility.root import getrootprefix, checkrootprefix
         rc, rootprefix = getrootprefix()
@@ -49,9 +49,9 @@ def categoryname(obj):
             return ""
 
 def plugins(category=None):
-    """List loaded plugins.
+    """List plugins, including those which are only loaded on first use.
 
-    If no argument is given return a dictionary of all loaded plugins.
+    If no argument is given return a dictionary of all plugins.
     Keys are category name. Values are lists of plugin names in each
     category.
 
@@ -60,11 +60,12 @@ def plugins(category=None):
     """
     from Ganga.Utility.Plugin import allPlugins
     if category:
-        return allPlugins.allClasses(category).keys()
+        return allPlugins.allNames(category)
     else:
         d = {}
-        for c in allPlugins.allCategories():
-            d[c] = allPlugins.allCategories()[c].keys()
+        categories = set(allPlugins.allCategories()) | set(c for c, n in allPlugins.lazyPlugins())
+        for c in categories:
+            d[c] = allPlugins.allNames(c)
         return d
 
 # FIXME: DEPRECATED
@@ -38,6 +38,93 @@ def exportToInterface(myInterface, name, _object, doc_section, docstring=None):
     _addToInterface(myInterface, name, _object)
     adddoc(name, getattr(myInterface, name), doc_section, docstring)
 
+class LazyPluginClass(object):
+
+    """
+    Stands in for the GPI class of a plugin which is loaded on first use, see PluginManager.addLazy.
+    Calling it, looking up one of its attributes or checking an object against it loads the plugin,
+    whose class then replaces the stand-in in the interface.
+    """
+
+    __slots__ = ('_interface', '_category', '_name')
+
+    def __init__(self, interface, category, name):
+        """
+        Args:
+            interface (module): The interface the plugin is exported to, e.g. Ganga.GPI
+            category (str): The category of the plugin, e.g. 'backends'
+            name (str): The name of the plugin
+        """
+        super(LazyPluginClass, self).__init__()
+        self._interface = interface
+        self._category = category
+        self._name = name
+
+    def _load(self):
+        """ Load the plugin, replace the stand-in in the interface and return the GPI class """
+        from Ganga.Utility.Plugin import allPlugins
+        cls = allPlugins.find(self._category, self._name)
+        if getattr(self._interface, self._name, None) is self:
+            exportToInterface(self._interface, self._name, cls, 'Classes')
+        return addProxy(cls)
+
+    def __call__(self, *args, **kwds):
+        return self._load()(*args, **kwds)
+
+    def __getattr__(self, name):
+        return getattr(self._load(), name)
+
+    def __instancecheck__(self, obj):
+        return isinstance(obj, self._load())
+
+    def __subclasscheck__(self, cls):
+        return issubclass(cls, self._load())
+
+    def __repr__(self):
+        return repr(self._load())
+
+    def __str__(self):
+        return str(self._load())
+
+
+# the interfaces with LazyPluginClass stand-ins, which are replaced once their plugins are loaded
+_lazy_interfaces = []
+
+
+def exportPluginToInterface(myInterface, category, name):
+    """
+    Make the plugin 'name' in 'category' available publicly as "name" in the interface module, as a LazyPluginClass
+    if the plugin has only been declared lazily so that it isn't loaded until it is used.
+    Args:
+        myInterface (module): The interface, e.g. Ganga.GPI
+        category (str): The category of the plugin
+        name (str): The name of the plugin
+    """
+    from Ganga.Utility.Plugin import allPlugins
+    if allPlugins.isLoaded(category, name):
+        exportToInterface(myInterface, name, allPlugins.find(category, name), 'Classes')
+        return
+    if myInterface not in _lazy_interfaces:
+        if not _lazy_interfaces:
+            allPlugins.addListener(_exportLoadedPlugins)
+        _lazy_interfaces.append(myInterface)
+    setattr(myInterface, name, LazyPluginClass(myInterface, category, name))
+
+
+def _exportLoadedPlugins(plugins):
+    """
+    Replace the stand-ins of the plugins a lazily declared module has added with their GPI classes
+    Args:
+        plugins (list): (category, name) of the plugins the module has added
+    """
+    from Ganga.Utility.Plugin import allPlugins
+    for myInterface in _lazy_interfaces:
+        for category, name in plugins:
+            stand_in = getattr(myInterface, name, None)
+            if isinstance(stand_in, LazyPluginClass) and stand_in._category == category:
+                exportToInterface(myInterface, name, allPlugins.find(category, name), 'Classes')
+
+
 def exportToGPI(name, _object, doc_section, docstring=None):
     '''
     Make object available publicly as "name" in Ganga.GPI module. Add automatic documentation to gangadoc system.
@@ -24,31 +24,34 @@ import Ganga.Lib.Splitters
 
 logger.debug("Loading Executable")
 import Ganga.Lib.Executable
-logger.debug("Loading Root")
-import Ganga.Lib.Root
-logger.debug("Loading Notebook")
-import Ganga.Lib.Notebook
 
 logger.debug("Loading LocalHost")
 import Ganga.Lib.Localhost
-logger.debug("Loading LCG")
-import Ganga.Lib.LCG
-logger.debug("Loading Condor")
-import Ganga.Lib.Condor
-logger.debug("Loading Interactive")
-import Ganga.Lib.Interactive
-logger.debug("Loading Batch")
-import Ganga.Lib.Batch
-logger.debug("Loading Remote")
-import Ganga.Lib.Remote
 
 logger.debug("Loading Tasks")
 import Ganga.GPIDev.Lib.Tasks
 
-
-logger.debug("Loading Checkers")
-import Ganga.Lib.Checkers
-logger.debug("Loading Notifier")
-import Ganga.Lib.Notifier
+# The plugins of these modules are only loaded when they are first used, e.g. when LCG() is called in the GPI or a
+# job with an LCG backend is loaded. The manifest must list every plugin each module adds.
+PLUGIN_MANIFEST = [
+    ('Ganga.Lib.Root', [('applications', 'Root')]),
+    ('Ganga.Lib.Notebook', [('applications', 'Notebook')]),
+    ('Ganga.Lib.LCG', [('backends', 'LCG'), ('backends', 'CREAM'), ('backends', 'ARC'),
+                       ('LCGRequirements', 'LCGRequirements'),
+                       ('GridSandboxCache', 'GridSandboxCache'), ('GridSandboxCache', 'LCGSandboxCache'),
+                       ('GridSandboxCache', 'GridftpSandboxCache'),
+                       ('GridFileIndex', 'GridFileIndex'), ('GridFileIndex', 'LCGFileIndex'),
+                       ('GridFileIndex', 'GridftpFileIndex')]),
+    ('Ganga.Lib.Condor', [('backends', 'Condor'), ('condor_requirements', 'CondorRequirements')]),
+    ('Ganga.Lib.Interactive', [('backends', 'Interactive')]),
+    ('Ganga.Lib.Batch', [('backends', 'LSF'), ('backends', 'PBS'), ('backends', 'SGE')]),
+    ('Ganga.Lib.Remote', [('backends', 'Remote')]),
+    ('Ganga.Lib.Checkers', [('postprocessor', 'FileChecker'), ('postprocessor', 'RootFileChecker'),
+                            ('postprocessor', 'CustomChecker')]),
+    ('Ganga.Lib.Notifier', [('postprocessor', 'Notifier')]),
+]
+
+from Ganga.Utility.Plugin import allPlugins
+allPlugins.addManifest(PLUGIN_MANIFEST)
 
 logger.debug("Finished Runtime.plugins")
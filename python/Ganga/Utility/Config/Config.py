@@ -92,8 +92,10 @@ There is a GPI wrapper in Ganga.GPIDev.Lib.Config which:
 
 import os
 import re
+import threading
 import traceback
 from collections import defaultdict
+from contextlib import contextmanager
 from functools import reduce
 
 from Ganga.Core.exceptions import GangaException
@@ -182,7 +184,7 @@ def makeConfig(name, docstring, **kwds):
     Create a config package and attach metadata to it. makeConfig() should be called once for each package.
     """
 
-    if _after_bootstrap:
+    if _after_bootstrap and not _late_config:
         raise ConfigError('attempt to create a configuration section [%s] after bootstrap' % name)
 
     try:
@@ -357,6 +359,11 @@ class ConfigOption(object):
 
         super(ConfigOption, self).__setattr__(name, value)
         super(ConfigOption, self).__setattr__('hasModified', True)
+        _bumpGeneration()
+
+    def __delattr__(self, name):
+        super(ConfigOption, self).__delattr__(name)
+        _bumpGeneration()
 
     def check_defined(self):
         return hasattr(self, 'default_value')
@@ -425,6 +432,36 @@ class ConfigOption(object):
 # indicate if the GPI proxies for the configuration have been created
 _after_bootstrap = False
 
+# Bumped whenever an option changes (a value is set or reverted, a default overridden or a config file read), the
+# snapshots of the effective values of the sections taken at an older generation are stale
+_generation = 0
+_generation_lock = threading.Lock()
+
+
+def _bumpGeneration():
+    global _generation
+    with _generation_lock:
+        _generation += 1
+
+
+# the number of lateConfig blocks being run
+_late_config = 0
+
+
+@contextmanager
+def lateConfig():
+    """
+    Allow sections and options to be made after bootstrap inside the with block, e.g. for the default values of a
+    plugin which is only loaded on first use. The GPI proxies of the new sections must be created by the caller.
+    """
+    global _late_config
+    _late_config += 1
+    try:
+        yield
+    finally:
+        _late_config -= 1
+
+
 # Scope used by eval when reading-in the configuration.
 # Symbols defined in this scope will be correctly evaluated. For example, File class adds itself here.
 # This dictionary may also be used by other parts of the system, e.g. XML
@@ -454,7 +491,7 @@ class PackageConfig(object):
 
     """
 
-    __slots__ = ('name', 'options', 'docstring', 'hidden', 'cfile', '_user_handlers', '_session_handlers', 'is_open', '_config_made', 'hasModified', '__dict__')
+    __slots__ = ('name', 'options', 'docstring', 'hidden', 'cfile', '_user_handlers', '_session_handlers', 'is_open', '_config_made', 'hasModified', '_snapshot', '__dict__')
 
     def __init__(self, name, docstring, **meta):
         """ Arguments:
@@ -484,6 +521,9 @@ class PackageConfig(object):
 
         self.hasModified = False
 
+        # (generation, {option name: effective value}), see getEffectiveOption
+        self._snapshot = (-1, {})
+
     def _addOpenOption(self, name, value):
         self.addOption(name, value, "", override=True)
 
@@ -500,7 +540,7 @@ class PackageConfig(object):
         """
         Add a new option to the configuration.
         """
-        if _after_bootstrap and not self.is_open:
+        if _after_bootstrap and not self.is_open and not _late_config:
             raise ConfigError('attempt to add a new option [%s]%s after bootstrap' % (self.name, name))
 
         # has the option already been made
@@ -688,10 +728,32 @@ class PackageConfig(object):
     def getEffectiveOptions(self):
         eff = {}
         for name in self.options:
-            eff[name] = self.options[name].value
+            eff[name] = self.getEffectiveOption(name)
         return eff
 
+    def _takeSnapshot(self):
+        """ Work out the effective value of every option which has one and keep them until an option changes """
+        generation = _generation
+        values = {}
+        for name, option in self.options.items():
+            try:
+                values[name] = option.value
+            except AttributeError:
+                # not defined yet, looked up through the option each time
+                pass
+        self._snapshot = (generation, values)
+        return self._snapshot
+
     def getEffectiveOption(self, name):
+        """ Return the effective value of the option 'name', read from the snapshot of the section which is only
+        worked out again once an option has changed """
+        snapshot = self._snapshot
+        if snapshot[0] != _generation:
+            snapshot = self._takeSnapshot()
+        try:
+            return snapshot[1][name]
+        except KeyError:
+            pass
         try:
             return self.options[name].value
         except KeyError:
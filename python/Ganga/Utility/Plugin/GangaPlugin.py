@@ -1,3 +1,5 @@
+import threading
+
 from Ganga.Utility.logging import getLogger
 from Ganga.Core.exceptions import GangaValueError
 logger = getLogger()
@@ -15,16 +17,24 @@ class PluginManagerError(GangaValueError):
 #
 # If you do not use category all plugins are registered in a flat list. Otherwise
 # there is a list of names for each category seaprately.
+#
+# Plugins may also be declared lazily with the module which adds them (see addLazy),
+# the module is imported the first time one of its plugins is looked up.
 
 
 class PluginManager(object):
 
-    __slots__ = ('all_dict', 'first', '_prev_found')
+    __slots__ = ('all_dict', 'first', '_prev_found', '_lazy', '_lock', '_listeners')
 
     def __init__(self):
         self.all_dict = {}
         self.first = {}
         self._prev_found = {}
+        # category: {name: (module, name of the plugin the module adds)} of the plugins which aren't loaded yet
+        self._lazy = {}
+        self._lock = threading.RLock()
+        # called with the list of (category, name) of the plugins a lazy module has added once it has been imported
+        self._listeners = []
 
     def find(self, category, name):
         """
@@ -42,6 +52,9 @@ class PluginManager(object):
         if key in self._prev_found:
             return self._prev_found[key]
 
+        if self._lazy:
+            self._loadFor(category, name)
+
         try:
             if name is not None:
                 if category in self.first:
@@ -97,8 +110,111 @@ class PluginManager(object):
         cat = self.all_dict.setdefault(category, {})
         self.first.setdefault(category, pluginobj)
         cat[name] = pluginobj
+        if name in self._lazy.get(category, {}) and self._lazy[category][name][1] == name:
+            del self._lazy[category][name]
         logger.debug('adding plugin %s (category "%s") ' % (name, category))
 
+    def addLazy(self, category, name, module, plugin_name=None):
+        """ Declare the plugin 'name' in 'category' without loading it, 'module' is imported
+        the first time the plugin is looked up and must add it.
+        Args:
+            category (str): The category of the plugin, e.g. 'backends'
+            name (str): The name the plugin is found with
+            module (str): The module which adds the plugin when it is imported, e.g. 'Ganga.Lib.LCG'
+            plugin_name (str): The name the module adds the plugin with, if 'name' is an alias
+        """
+        if plugin_name is None:
+            plugin_name = name
+        if plugin_name in self.all_dict.get(category, {}):
+            # loaded already, e.g. an alias of a plugin which is in use
+            if name != plugin_name:
+                self.add(self.all_dict[category][plugin_name], category, name)
+            return
+        with self._lock:
+            self._lazy.setdefault(category, {})[name] = (module, plugin_name)
+            self._prev_found.pop(str(category) + "_" + str(name), None)
+        logger.debug('declaring plugin %s (category "%s") from %s' % (name, category, module))
+
+    def addAlias(self, category, alias, name):
+        """ Make the plugin 'name' in 'category' be found with 'alias' too, without loading it.
+        If the plugin is neither added nor declared lazily PluginManagerError is raised.
+        """
+        if name in self.all_dict.get(category, {}):
+            self.add(self.all_dict[category][name], category, alias)
+        elif name in self._lazy.get(category, {}):
+            self.addLazy(category, alias, self._lazy[category][name][0], self._lazy[category][name][1])
+        else:
+            raise PluginManagerError("cannot find '%s' in a category '%s'" % (name, category))
+
+    def isLoaded(self, category, name):
+        """ Return whether the plugin 'name' in 'category' has been added, rather than declared lazily """
+        return name in self.all_dict.get(category, {})
+
+    def addManifest(self, manifest):
+        """ Declare the plugins of a manifest lazily, see addLazy.
+        Args:
+            manifest (list): (module, [(category, name), ...]) of the plugins each module adds
+        """
+        for module, plugins in manifest:
+            for category, name in plugins:
+                self.addLazy(category, name, module)
+
+    def lazyPlugins(self):
+        """ Return the list of (category, name) of the plugins declared lazily which aren't loaded yet """
+        with self._lock:
+            return [(category, name) for category, names in self._lazy.items() for name in names]
+
+    def addListener(self, listener):
+        """ Call listener with the list of (category, name) of the plugins a lazily declared module
+        has added, each time one has been imported.
+        Args:
+            listener (callable): Called with the list of plugins once the module has been imported
+        """
+        self._listeners.append(listener)
+
+    def load(self, category=None, name=None):
+        """ Load the plugins declared lazily in 'category' with 'name', either may be None to load them all.
+        Args:
+            category (str): The category of the plugins, None for any
+            name (str): The name of the plugins, None for any
+        """
+        with self._lock:
+            wanted = [(category_i, name_i) for category_i, names in self._lazy.items() for name_i in names
+                      if category in (None, category_i) and name in (None, name_i)]
+        for category_i, name_i in wanted:
+            self._loadLazy(category_i, name_i)
+
+    def _loadFor(self, category, name):
+        """ Load what find(category, name) may return if it is declared lazily """
+        if name is None:
+            if category not in self.first:
+                self.load(category)
+        elif name not in self.all_dict.get(category, {}):
+            # the plugin may be found in another category
+            self.load(category if name in self._lazy.get(category, {}) else None, name)
+
+    def _loadLazy(self, category, name):
+        """ Import the module of a plugin declared lazily then tell the listeners what it has added """
+        with self._lock:
+            entry = self._lazy.get(category, {}).get(name)
+            if entry is None:
+                return
+            module, plugin_name = entry
+            before = set(self.lazyPlugins())
+            logger.debug('loading plugin %s (category "%s") from %s' % (name, category, module))
+            try:
+                __import__(module)
+            except ImportError as err:
+                del self._lazy[category][name]
+                logger.warning('cannot load the plugin %s from %s: %s' % (name, module, err))
+                return
+            if name != plugin_name and plugin_name in self.all_dict.get(category, {}):
+                self.add(self.all_dict[category][plugin_name], category, name)
+            self._lazy[category].pop(name, None)
+            added = sorted(before - set(self.lazyPlugins()))
+        for listener in self._listeners:
+            listener(added)
+
     def setDefault(self, category, name):
         """ Make the plugin 'name' be default in a given 'category'.
         You must first add() the plugin object before calling this method. Otherwise
@@ -111,7 +227,14 @@ class PluginManager(object):
     def allCategories(self):
         return self.all_dict
 
+    def allNames(self, category):
+        """ Return the names of the plugins in 'category', including those which aren't loaded yet """
+        with self._lock:
+            return sorted(set(self.all_dict.get(category, {})) | set(self._lazy.get(category, {})))
+
     def allClasses(self, category):
+        if self._lazy.get(category):
+            self.load(category)
         cat = self.all_dict.get(category)
         if cat:
             return cat
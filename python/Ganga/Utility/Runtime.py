@@ -169,6 +169,11 @@ class RuntimePackage(object):
 
     def loadPlugins(self):
         logger.debug("Loading Plugin: %s" % self.name)
+        # the plugins in PLUGIN_MANIFEST of the package are only loaded when they are first used
+        manifest = importName(self.name, 'PLUGIN_MANIFEST')
+        if manifest:
+            from Ganga.Utility.Plugin import allPlugins
+            allPlugins.addManifest(manifest)
         g = importName(self.name, 'loadPlugins')
         if g:
             g(self.config)
@@ -316,16 +321,18 @@ def autoPopulateGPI(my_interface=None):
     if not my_interface:
         import Ganga.GPI
         my_interface = Ganga.GPI
-    from Ganga.Runtime.GPIexport import exportToInterface
+    from Ganga.Runtime.GPIexport import exportToInterface, exportPluginToInterface
     from Ganga.Utility.Plugin import allPlugins
     # make all plugins visible in GPI
-    for k in allPlugins.allCategories():
-        for n in allPlugins.allClasses(k):
-            cls = allPlugins.find(k, n)
+    for k, classes in allPlugins.allCategories().items():
+        for n, cls in classes.items():
             if not cls._declared_property('hidden'):
                 if n != cls.__name__:
                     exportToInterface(my_interface, cls.__name__, cls, 'Classes')
                 exportToInterface(my_interface, n, cls, 'Classes')
+    # those declared lazily are loaded when they are first used
+    for k, n in allPlugins.lazyPlugins():
+        exportPluginToInterface(my_interface, k, n)
 
 def setPluginDefaults(my_interface=None):
     """
@@ -358,17 +365,16 @@ def setPluginDefaults(my_interface=None):
 
     batch_default_name = getConfig('Configuration').getEffectiveOption('Batch')
     try:
-        batch_default = allPlugins.find('backends', batch_default_name)
+        allPlugins.addAlias('backends', 'Batch', batch_default_name)
     except Exception as x:
         from Ganga.Utility.Config import ConfigError
         raise ConfigError('Check configuration. Unable to set default Batch backend alias (%s)' % str(x))
     else:
-        allPlugins.add(batch_default, 'backends', 'Batch')
-        from Ganga.Runtime.GPIexport import exportToInterface
+        from Ganga.Runtime.GPIexport import exportPluginToInterface
         if not my_interface:
             import Ganga.GPI
             my_interface = Ganga.GPI
-        exportToInterface(my_interface, 'Batch', batch_default, 'Classes')
+        exportPluginToInterface(my_interface, 'backends', 'Batch')
 
 
 
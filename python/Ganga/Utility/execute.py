@@ -6,6 +6,7 @@ import cPickle as pickle
 import signal
 from copy import deepcopy
 from Ganga.Core.exceptions import GangaException
+from Ganga.Utility.Config import getConfig
 from Ganga.Utility.logging import getLogger
 logger = getLogger()
 
@@ -116,8 +117,20 @@ def __timeout_func(process, timed_out):
             logger.error("Exception trying to kill process: %s" % e)
 
 
+_env_lock = threading.Lock()
+# The environment of Ganga: the clean copy of it returned by get_env
+_env_cache = {}
+
+
 def get_env():
-    """ Function to return a clean copy of the env that we're currently running in """
+    """ Function to return a clean copy of the env that we're currently running in.
+    The env is only worked out again when the environment of Ganga changes """
+
+    env_key = frozenset(os.environ.iteritems())
+    with _env_lock:
+        env = _env_cache.get(env_key)
+    if env is not None:
+        return dict(env)
 
     # If we're not updating the environment, and the environment ie empty we need to create a new environment to be use by the command
     pipe = subprocess.Popen('python -c "from __future__ import print_function;import os;print(os.environ)"',
@@ -140,6 +153,10 @@ def get_env():
                 final_str += " "
                 env[k] = final_str
 
+        with _env_lock:
+            _env_cache.clear()
+            _env_cache[env_key] = dict(env)
+
     return env
 
 
@@ -186,6 +203,7 @@ def execute(command,
     """
     Execute an external command.
     This will execute an external python command when shell=False or an external bash command when shell=True
+    Python commands which don't update the env are run by long lived worker processes when [Execute]UseWorkers is set
     Args:
         command (str): This is the command that we want to execute in string format
         timeout (int): This is the timeout which we want to assign to a function and it will be killed if it runs for longer than n seconds
@@ -200,6 +218,9 @@ def execute(command,
     if update_env and env is None:
         raise GangaException('Cannot update the environment if None given.')
 
+    if not shell and not update_env and getConfig('Execute')['UseWorkers']:
+        return execute_in_worker(command, timeout, env, cwd, python_setup, eval_includes)
+
     if not shell:
         # We want to run a python command inside a small Python wrapper
         stream_command = 'python -'
@@ -273,6 +294,16 @@ def execute(command,
         if pkl_output_key in thread_output:
             return thread_output[pkl_output_key]
 
+    return parse_stdout(stdout, shell, eval_includes)
+
+
+def parse_stdout(stdout, shell, eval_includes):
+    """ Turn the stdout of a command into a python object if it's a pickle, or can be evaluated, otherwise return it as it is
+    Args:
+        stdout (str): The stdout of the command
+        shell (bool): True if the command was a bash command rather than python
+        eval_includes (str): A string used to construct an environment which, if passed, is used to eval the stdout into a python object
+    """
     stdout_temp = None
     try:
         # If output
@@ -304,3 +335,55 @@ def execute(command,
 
     return stdout
 
+
+def execute_in_worker(command, timeout=None, env=None, cwd=None, python_setup='', eval_includes=None):
+    """
+    Execute a python command in one of the long lived worker processes for the env rather than in a new python.
+    The output of the command is handled in the same way as by execute(command, shell=False, ...)
+    Args:
+        command (str): This is the python command that we want to execute in string format
+        timeout (int): This is the timeout which we want to assign to a function and it will be killed if it runs for longer than n seconds
+        env (dict): This is the environment the command is executed in
+        cwd (str): This is the cwd the command is to be executed within.
+        python_setup (str): A python command to be executed beore the main command is, only once by each worker
+        eval_includes (str): An string used to construct an environment which, if passed, is used to eval the stdout into a python object
+    """
+    from Ganga.Utility.execute_pool import run_command, WorkerDiedError
+
+    if env is None:
+        env = get_env()
+    if cwd is None:
+        cwd = os.getcwd()
+
+    logger.debug("Executing Command in worker:\n'%s'" % str(command))
+    try:
+        response = run_command(command, python_setup, env, cwd, timeout)
+    except WorkerDiedError as err:
+        logger.error("Execute Err: %s", err)
+        return ''
+
+    if response is None:
+        return 'Command timed out!'
+
+    stdout = response['stdout']
+    logger.debug("stdout: %s" % stdout)
+    logger.debug("stderr: %s" % response['stderr'])
+
+    return parse_output(response['output'], stdout, eval_includes)
+
+
+def parse_output(output, stdout, eval_includes=None):
+    """ Return the result of a python command run by a long lived process: the first object it passed to output(), or
+    its stdout, as a python object if possible, if it didn't or eval_includes is given
+    Args:
+        output (str): The pickle of the first object passed to output() by the command, None if it didn't call output()
+        stdout (str): The stdout of the command
+        eval_includes (str): An string used to construct an environment which, if passed, is used to eval the stdout into a python object
+    """
+    if not eval_includes and output is not None:
+        try:
+            return pickle.loads(output)
+        except Exception as err:
+            logger.debug("Error getting output stream from command: %s", err)
+
+    return parse_stdout(stdout, False, eval_includes)
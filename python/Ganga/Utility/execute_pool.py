@@ -0,0 +1,274 @@
+"""
+Long lived worker processes used by Ganga.Utility.execute to run python commands.
+
+Starting a new python for every command, and running the setup code passed with it again (e.g. importing the DIRAC
+API), usually takes far longer than the command itself. Instead each command is sent to a worker process which was
+started in the environment the command is to be run in and which keeps the namespaces its setup code has been run in.
+
+The workers are grouped into a pool for each environment:
+    [Execute]MaxWorkers             largest number of workers, so of commands run at once, for an environment
+    [Execute]MaxEnvironments        number of environments for which idle workers are kept
+    [Execute]MaxCommandsPerWorker   number of commands after which a worker is replaced
+A worker running a command which times out is killed, as is a worker which dies or stops responding, and a new one is
+started for the next command.
+"""
+
+import atexit
+import fcntl
+import os
+import select
+import signal
+import struct
+import subprocess
+import threading
+import time
+import cPickle as pickle
+
+from Ganga.Core.exceptions import GangaException
+from Ganga.Utility.Config import getConfig
+from Ganga.Utility.logging import getLogger
+
+logger = getLogger()
+
+_worker_script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'execute_worker.py')
+# Must match the header used by execute_worker.py
+_header = struct.Struct('!I')
+
+
+class WorkerDiedError(GangaException):
+    """Raised when a worker process exits while running a command"""
+
+
+def _set_cloexec(fd):
+    """ Stop a file descriptor being inherited by other processes started by Ganga so the worker sees its stdin close
+    when Ganga exits
+    Args:
+        fd (int): The file descriptor
+    """
+    flags = fcntl.fcntl(fd, fcntl.F_GETFD)
+    fcntl.fcntl(fd, fcntl.F_SETFD, flags | fcntl.FD_CLOEXEC)
+
+
+class CommandWorker(object):
+
+    """
+    A single worker process running commands in the environment it was started with
+    """
+
+    __slots__ = ('process', 'commands')
+
+    def __init__(self, env):
+        """
+        Args:
+            env (dict): The environment to start the worker in
+        """
+        super(CommandWorker, self).__init__()
+        with open(os.devnull, 'w') as devnull:
+            self.process = subprocess.Popen(['python', '-u', _worker_script], env=env, close_fds=True,
+                                            preexec_fn=os.setsid, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                            stderr=devnull)
+        _set_cloexec(self.process.stdin.fileno())
+        _set_cloexec(self.process.stdout.fileno())
+        # Number of commands the worker has run
+        self.commands = 0
+
+    def run(self, request, timeout=None):
+        """ Send a command to the worker and return its response, None if the command timed out
+        Args:
+            request (dict): The command, python_setup and cwd of the command to run
+            timeout (float): Seconds to wait for the response, None to wait for as long as it takes
+        """
+        data = pickle.dumps(request, 2)
+        try:
+            self.process.stdin.write(_header.pack(len(data)) + data)
+            self.process.stdin.flush()
+        except (IOError, OSError) as err:
+            raise WorkerDiedError('Failed to send a command to worker %s: %s' % (self.process.pid, err))
+
+        deadline = None if timeout is None else time.time() + timeout
+        header = self._read(_header.size, deadline)
+        if header is None:
+            return None
+        size, = _header.unpack(header)
+        data = self._read(size, deadline)
+        if data is None:
+            return None
+        self.commands += 1
+        return pickle.loads(data)
+
+    def _read(self, size, deadline):
+        """ Read size bytes from the worker, None if the deadline passes first
+        Args:
+            size (int): The number of bytes to read
+            deadline (float): The time by which the bytes must have been read, None for no deadline
+        """
+        fd = self.process.stdout.fileno()
+        chunks = []
+        while size:
+            if deadline is not None and not select.select([fd], [], [], max(deadline - time.time(), 0))[0]:
+                return None
+            chunk = os.read(fd, size)
+            if not chunk:
+                raise WorkerDiedError('Worker %s exited with %s' % (self.process.pid, self.process.wait()))
+            chunks.append(chunk)
+            size -= len(chunk)
+        return ''.join(chunks)
+
+    def close(self):
+        """ Stop the worker once it has finished the command it's running """
+        try:
+            self.process.stdin.close()
+            self.process.wait()
+        except (IOError, OSError) as err:
+            logger.debug("Error closing worker %s: %s" % (self.process.pid, err))
+
+    def kill(self):
+        """ Kill the worker and anything it has started straight away """
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except OSError as err:
+            logger.debug("Error killing worker %s: %s" % (self.process.pid, err))
+        self.close()
+
+
+class _WorkerPool(object):
+
+    """
+    The workers for a single environment
+    """
+
+    __slots__ = ('env', 'idle', 'size', 'last_used', '_cond')
+
+    def __init__(self, env):
+        """
+        Args:
+            env (dict): The environment the workers are started in
+        """
+        super(_WorkerPool, self).__init__()
+        self.env = dict(env)
+        self.idle = []
+        # Number of workers, idle or running a command
+        self.size = 0
+        self.last_used = time.time()
+        self._cond = threading.Condition()
+
+    def acquire(self, max_workers):
+        """ Return an idle worker, starting a new one if there are fewer than max_workers, otherwise wait for one
+        Args:
+            max_workers (int): Largest number of workers in the pool
+        """
+        with self._cond:
+            while not self.idle and self.size >= max_workers:
+                self._cond.wait()
+            self.last_used = time.time()
+            while self.idle:
+                worker = self.idle.pop()
+                if worker.process.poll() is None:
+                    return worker
+                # The worker has died while idle, it's replaced by a new one
+                logger.debug("Idle worker %s exited with %s" % (worker.process.pid, worker.process.returncode))
+                self.size -= 1
+            self.size += 1
+        try:
+            return CommandWorker(self.env)
+        except Exception:
+            with self._cond:
+                self.size -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, worker, keep=True):
+        """ Return a worker to the pool once it has finished running a command
+        Args:
+            worker (CommandWorker): The worker
+            keep (bool): Whether the worker can run more commands, it's dropped from the pool if not
+        """
+        with self._cond:
+            if keep:
+                self.idle.append(worker)
+            else:
+                self.size -= 1
+            self._cond.notify()
+
+    def close_idle(self):
+        """ Close the idle workers and return True if there are no workers left """
+        with self._cond:
+            idle, self.idle = self.idle, []
+            self.size -= len(idle)
+            empty = self.size == 0
+        for worker in idle:
+            worker.close()
+        return empty
+
+
+_pools_lock = threading.Lock()
+# environment: _WorkerPool
+_pools = {}
+
+
+def _env_key(env):
+    """ Return a hashable key for an environment
+    Args:
+        env (dict): The environment
+    """
+    return frozenset(env.iteritems())
+
+
+def _getPool(env):
+    """ Return the pool of workers for an environment, the workers of the environments least recently used are closed
+    when there are more than [Execute]MaxEnvironments
+    Args:
+        env (dict): The environment
+    """
+    key = _env_key(env)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is not None:
+            return pool
+        pool = _pools[key] = _WorkerPool(env)
+        stale = sorted(_pools.iteritems(), key=lambda item: item[1].last_used)[:-getConfig('Execute')['MaxEnvironments']]
+    for stale_key, stale_pool in stale:
+        if stale_pool is not pool and stale_pool.close_idle():
+            with _pools_lock:
+                if _pools.get(stale_key) is stale_pool and stale_pool.size == 0:
+                    del _pools[stale_key]
+    return pool
+
+
+def run_command(command, python_setup, env, cwd, timeout=None):
+    """ Run a python command in a worker for the environment.
+    Returns a dict of the 'stdout' and 'stderr' of the command and the pickle of the first object it passed to
+    output(), or None if it didn't. Returns None if the command timed out
+    Args:
+        command (str): The python code to run
+        python_setup (str): Python code run before the command, only run the first time a worker sees it
+        env (dict): The environment to run the command in
+        cwd (str): The directory to run the command in
+        timeout (float): Seconds after which the command is killed, None to let it run for as long as it takes
+    """
+    config = getConfig('Execute')
+    pool = _getPool(env)
+    worker = pool.acquire(config['MaxWorkers'])
+    response = None
+    try:
+        response = worker.run({'command': command, 'python_setup': python_setup, 'cwd': cwd}, timeout)
+    finally:
+        keep = response is not None and worker.commands < config['MaxCommandsPerWorker']
+        pool.release(worker, keep)
+        if response is None:
+            worker.kill()
+        elif not keep:
+            worker.close()
+    return response
+
+
+def shutdown():
+    """ Close all of the workers which are idle """
+    with _pools_lock:
+        pools = _pools.values()
+        _pools.clear()
+    for pool in pools:
+        pool.close_idle()
+
+
+atexit.register(shutdown)
@@ -0,0 +1,143 @@
+"""
+A long lived worker process used by Ganga.Utility.execute_pool to run python commands without starting a new python
+for each of them.
+
+This file is run as a script by the python found in the environment the commands are run in, so it must not import
+anything from Ganga. Requests and responses are pickled dicts, each preceded by its length, sent over what were the
+stdin and stdout of the process. The commands themselves see /dev/null as their stdin and have their stdout and stderr
+captured and sent back with their response.
+"""
+
+import os
+import struct
+import sys
+import tempfile
+import traceback
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+_header = struct.Struct('!I')
+
+# Number of different pieces of setup code whose namespaces are kept by a worker
+_max_setups = 8
+
+
+def read_message(stream):
+    """ Return the next message from the stream, None once the stream has been closed
+    Args:
+        stream (file): The stream to read the message from
+    """
+    header = stream.read(_header.size)
+    if len(header) < _header.size:
+        return None
+    size, = _header.unpack(header)
+    data = stream.read(size)
+    if len(data) < size:
+        return None
+    return pickle.loads(data)
+
+
+def write_message(stream, message):
+    """ Write a message to the stream
+    Args:
+        stream (file): The stream to write the message to
+        message (dict): The message to send
+    """
+    data = pickle.dumps(message, 2)
+    stream.write(_header.pack(len(data)) + data)
+    stream.flush()
+
+
+def _read_capture(capture):
+    """ Return what has been written to a file used to capture the output of a command
+    Args:
+        capture (file): The temporary file the output was written to
+    """
+    capture.seek(0)
+    data = capture.read()
+    capture.close()
+    return data
+
+
+def run_command(request, setups, devnull):
+    """ Run a single command in the same way as the script generated by Ganga.Utility.execute.python_wrapper and return
+    a dict of its stdout, stderr and the first object passed to output() as a pickle
+    Args:
+        request (dict): The command, python_setup and cwd of the command to be run
+        setups (list): List of (setup code, namespace) of the setup code run most recently by this worker
+        devnull (int): File descriptor of /dev/null used as the stdout and stderr between commands
+    """
+    outputs = []
+
+    def output(data):
+        outputs.append(pickle.dumps(data, 2))
+
+    saved_env = dict(os.environ)
+    saved_path = list(sys.path)
+    saved_cwd = os.getcwd()
+
+    capture_out = tempfile.TemporaryFile()
+    capture_err = tempfile.TemporaryFile()
+    sys.stdout.flush()
+    sys.stderr.flush()
+    os.dup2(capture_out.fileno(), 1)
+    os.dup2(capture_err.fileno(), 2)
+    try:
+        os.chdir(request['cwd'])
+
+        # The setup code is only run the first time it's seen, it's usually the slow part of a command
+        setup = request['python_setup'].strip()
+        namespace = None
+        for index, (this_setup, this_namespace) in enumerate(setups):
+            if this_setup == setup:
+                namespace = this_namespace
+                setups.insert(0, setups.pop(index))
+                break
+        if namespace is None:
+            namespace = {'pickle': pickle, 'output': output}
+            exec(setup, namespace)
+            setups.insert(0, (setup, namespace))
+            del setups[_max_setups:]
+
+        # Functions defined by the setup code look up output() in the namespace they were defined in
+        namespace['output'] = output
+        exec(request['command'], dict(namespace))
+    except BaseException:
+        output(traceback.format_exc())
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(devnull, 1)
+        os.dup2(devnull, 2)
+
+        if dict(os.environ) != saved_env:
+            os.environ.clear()
+            os.environ.update(saved_env)
+        sys.path[:] = saved_path
+        os.chdir(saved_cwd)
+
+    return {'stdout': _read_capture(capture_out),
+            'stderr': _read_capture(capture_err),
+            'output': outputs[0] if outputs else None}
+
+
+def main():
+    """ Run the commands sent to this process until its stdin is closed """
+    requests = os.fdopen(os.dup(0), 'rb')
+    responses = os.fdopen(os.dup(1), 'wb')
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+
+    setups = []
+    while True:
+        request = read_message(requests)
+        if request is None:
+            break
+        write_message(responses, run_command(request, setups, devnull))
+
+
+if __name__ == '__main__':
+    main()
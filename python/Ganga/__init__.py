@@ -120,7 +120,7 @@ conf_config.addOption('StartupGPI', '', 'block of GPI commands executed at start
 conf_config.addOption('ReleaseNotes', True, 'Flag to print out the relevent subsection of release notes for each experiment at start up')
 conf_config.addOption('gangadir', expandvars(None, '~/gangadir'),
                  'Location of local job repositories and workspaces. Default is ~/gangadir but in somecases (such as LSF CNAF) this needs to be modified to point to the shared file system directory.', filter=Ganga.Utility.Config.expandvars)
-conf_config.addOption('repositorytype', 'LocalXML', 'Type of the repository.', examples='LocalXML')
+conf_config.addOption('repositorytype', 'LocalXML', 'Type of the repository. LocalBinary stores jobs in a compact binary format which is faster to load, an existing LocalXML repository can be converted with "python -m Ganga.Core.GangaRepository.BinaryStreamer"', examples='LocalXML, LocalBinary')
 conf_config.addOption('lockingStrategy', 'UNIX', 'Type of locking strategy which can be used. UNIX or FIXED . default = UNIX')
 conf_config.addOption('workspacetype', 'LocalFilesystem',
                  'Type of workspace. Workspace is a place where input and output sandbox of jobs are stored. Currently the only supported type is LocalFilesystem.')
@@ -179,6 +179,22 @@ queues_config = makeConfig("Queues", "configuration section for the queues")
 queues_config.addOption('Timeout', None, 'default timeout for queue generated processes')
 queues_config.addOption('NumWorkerThreads', 5, 'default number of worker threads in the queues system')
 
+# ------------------------------------------------
+# Execute
+execute_config = makeConfig('Execute', 'Control of the processes used to run external python commands (Ganga.Utility.execute)')
+execute_config.addOption('UseWorkers', True, 'Run python commands in long lived worker processes for each environment rather than starting a new python for each command')
+execute_config.addOption('MaxWorkers', 4, 'Largest number of worker processes, so of python commands run at once, for each environment')
+execute_config.addOption('MaxEnvironments', 4, 'Number of environments for which idle worker processes are kept running')
+execute_config.addOption('MaxCommandsPerWorker', 1000, 'Number of commands after which a worker process is replaced by a new one')
+
+# ------------------------------------------------
+# Submission
+submission_config = makeConfig('Submission', 'parallel submission of the subjobs of a job (j.parallel_submit = True)')
+submission_config.addOption('MaxThreads', 8, 'Number of threads used to prepare and submit the subjobs of a job in parallel')
+submission_config.addOption('BackendMaxThreads', {}, 'Largest number of subjobs submitted to a backend at once across all jobs, e.g. {"Dirac": 4}. Backends which are not listed are limited to MaxThreads')
+submission_config.addOption('BackendMaxRate', {}, 'Largest number of subjobs submitted to a backend per second across all jobs, e.g. {"LCG": 2.0}. Backends which are not listed are not rate limited')
+submission_config.addOption('ProgressInterval', 10, 'Seconds between progress messages while the subjobs of a job are submitted in parallel')
+
 # ------------------------------------------------
 # MSGMS
 msgms_config = makeConfig('MSGMS', 'Settings for the MSGMS monitoring plugin. Cannot be changed ruding the interactive Ganga session.')
@@ -228,6 +244,10 @@ poll_config.addOption('LSF', 20, 'Poll rate for LSF backend.')
 poll_config.addOption('PBS', 20, 'Poll rate for PBS backend.')
 poll_config.addOption('Dirac', 50, 'Poll rate for Dirac backend.')
 poll_config.addOption('Panda', 50, 'Poll rate for Panda backend.')
+poll_config.addOption('max_backend_poll_rate', 120, 'Longest interval in seconds between checks of a backend whose jobs are not changing status or whose checks are failing.')
+poll_config.addOption('backend_poll_growth', 1.5, 'Factor the interval between checks of a backend grows by after each check which finds no job changing status. 1 keeps the poll rate of the backend fixed.')
+poll_config.addOption('backend_poll_backoff', 2.0, 'Factor the interval between checks of a backend grows by after each check which fails.')
+poll_config.addOption('status_file_events', True, 'Watch the status files of Local and Batch jobs with inotify so that their backend is checked as soon as a job changes, rather than reading every status file at each check. Workspaces on network filesystems, or all of them if inotify is not available, are polled.')
 
 # Note: the rate of this callback is actually
 # MAX(base_poll_rate,callbacks_poll_rate)
@@ -296,6 +316,8 @@ root_config.addOption('version', '6.04.02', 'Version of ROOT')
 local_config = makeConfig('Local', 'parameters of the local backend (jobs in the background on localhost)')
 local_config.addOption('remove_workdir', True, 'remove automatically the local working directory when the job completed')
 local_config.addOption('location', None, 'The location where the workdir will be created. If None it defaults to the value of $TMPDIR')
+local_config.addOption('max_running_jobs', 0, 'The most jobs which run at once, further jobs are queued and reported as submitted until a running job finishes. 0 runs one job per core and a negative value runs every job as soon as it is submitted.')
+local_config.addOption('min_free_memory', 0, 'Memory in MB which must be available on the machine for a queued job to be started while other jobs are running. 0 does not check the memory.')
 
 # ------------------------------------------------
 # LCG
@@ -570,6 +592,8 @@ gangadir = getConfig('Configuration')['gangadir']
 merge_config.addOption('merge_output_dir', gangadir +
                  '/merge_results', "location of the merger's outputdir")
 merge_config.addOption('std_merge', 'TextMerger', 'Standard (default) merger')
+merge_config.addOption('tree_fan_in', 50, 'The most files merged together by one hadd of the RootMerger. More files are merged in groups, then the partial results are merged in turn. Below 2 all of the files are merged at once.')
+merge_config.addOption('tree_workers', 0, 'The number of groups of files merged at the same time when merging in groups, 0 for one per core')
 
 # ------------------------------------------------
 # Preparable
@@ -870,6 +894,7 @@ tasks_config = makeConfig('Tasks', 'Tasks configuration options')
 tasks_config.addOption('TaskLoopFrequency', 60., "Frequency of Task Monitoring loop in seconds")
 tasks_config.addOption('ForceTaskMonitoring', False, "Monitor tasks even if the monitoring loop isn't enabled")
 tasks_config.addOption('disableTaskMon', False, "Should I disable the Task Monitoring loop?")
+tasks_config.addOption('event_driven', False, "Update the units of the tasks when the status of their jobs changes rather than updating every unit each TaskLoopFrequency seconds. The units waiting to submit are still checked every TaskLoopFrequency seconds")
 
 # ------------------------------------------------
 # MonitoringServices
@@ -892,7 +917,15 @@ Executable/* = Ganga.Lib.MonitoringServices.DummyMS.DummyMS
 reg_config = makeConfig('Registry','This config controls the speed of flushing objects to disk')
 reg_config.addOption('AutoFlusherWaitTime', 30, 'Time to wait between auto-flusher runs')
 reg_config.addOption('EnableAutoFlush', True, 'Enable Registry auto-flushing feature')
+reg_config.addOption('EnableIndexStore', True, 'Keep the index of each registry in a single consolidated file which is read in one pass on startup')
+reg_config.addOption('IndexStoreListingCheck', 0, 'Seconds between the checks of the listing of a registry using the index store, 0 to never list it. Sessions not using the store mark the changes they make, so this is only needed when the repository is shared with older versions of Ganga')
+reg_config.addOption('PackedSubjobs', False, 'Store the subjobs of new jobs in a single indexed container file per job rather than a directory per subjob')
+reg_config.addOption('SubjobStatusLog', True, 'Record status changes of subjobs in a small append-only log per job rather than rewriting the data of the subjob and the subjob index')
+reg_config.addOption('FlushThreads', 4, 'Maximum number of threads used to write the dirty objects of a registry when it is flushed as a whole')
+reg_config.addOption('FsyncFlush', False, 'Force the files written when flushing a registry to disk, this is done once for each batch of objects flushed')
 
 cred_config = makeConfig('Credentials', 'This configures the credentials singleton')
 cred_config.addOption('CleanDelay', 1, 'Seconds between auto-clean of credentials when proxy externally destroyed')
 cred_config.addOption('AtomicDelay', 1, 'Seconds between checking credential on disk')
+cred_config.addOption('RefreshInterval', 60, 'Seconds between the background checks of the file of each credential in use, its expiry time is only read again once the file has changed')
+cred_config.addOption('ExpiryWarning', 3600, 'Seconds before a credential expires at which it is reported as expiring')
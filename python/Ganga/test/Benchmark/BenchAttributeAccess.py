@@ -0,0 +1,79 @@
+"""
+Time reading and setting the attributes of jobs through the GPI proxies, as done by scripts which look at many jobs.
+
+Run the full benchmark with:
+    cd python && PYTHONPATH=. python Ganga/test/Benchmark/BenchAttributeAccess.py
+"""
+from __future__ import print_function
+
+from Ganga.testlib.benchmark import time_call, print_table
+
+
+def _make_jobs(n_jobs):
+    from Ganga.GPIDev.Lib.Job.Job import Job
+    from Ganga.GPIDev.Base.Proxy import addProxy
+    return [addProxy(Job()) for _ in range(n_jobs)]
+
+
+def _read_status(jobs):
+    for j in jobs:
+        j.status
+
+
+def _read_nested(jobs):
+    for j in jobs:
+        j.application.exe
+
+
+def _read_list(jobs):
+    for j in jobs:
+        j.inputfiles
+
+
+def _read_deep(jobs):
+    for j in jobs:
+        j.backend.nice
+        j.info.submit_counter
+
+
+def _set_name(jobs):
+    for j in jobs:
+        j.name = 'bench'
+
+
+def _set_nested(jobs):
+    for j in jobs:
+        j.application.args = ['a', 'b']
+
+
+_cases = [('status', _read_status),
+          ('application.exe', _read_nested),
+          ('inputfiles', _read_list),
+          ('backend.nice, info', _read_deep),
+          ('set name', _set_name),
+          ('set application.args', _set_nested)]
+
+
+def test_attribute_access():
+    """Values read back through the proxies are those which were set"""
+    from Ganga.GPIDev.Base.Proxy import isProxy
+    jobs = _make_jobs(3)
+    for name, case in _cases:
+        case(jobs)
+    for j in jobs:
+        assert j.name == 'bench'
+        assert list(j.application.args) == ['a', 'b']
+        assert isProxy(j.application)
+        assert j.application._impl._getRoot() is j._impl
+
+
+def main(sizes=(100, 1000, 10000)):
+    rows = []
+    for n_jobs in sizes:
+        jobs = _make_jobs(n_jobs)
+        rows.append([n_jobs] + [time_call(lambda: case(jobs)) / n_jobs * 1e6 for name, case in _cases])
+    print_table('Attribute access through the GPI (microseconds per job)', ['jobs'] + [name for name, case in _cases], rows)
+
+
+if __name__ == '__main__':
+    main()
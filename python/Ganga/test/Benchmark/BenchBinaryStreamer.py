@@ -0,0 +1,49 @@
+"""
+Compare the size and the time taken to load large jobs stored as XML and in the binary format.
+
+Run the full benchmark with:
+    cd python && PYTHONPATH=. python Ganga/test/Benchmark/BenchBinaryStreamer.py
+"""
+from __future__ import print_function
+
+from cStringIO import StringIO
+
+from Ganga.testlib.benchmark import time_call, print_table, make_job_xml
+
+
+def load_xml(xml):
+    from Ganga.Core.GangaRepository.VStreamer import from_file
+    return from_file(StringIO(xml))
+
+
+def load_binary(binary):
+    from Ganga.Core.GangaRepository.BinaryStreamer import from_file
+    return from_file(StringIO(binary))
+
+
+def test_formats_agree():
+    """Both formats must produce the same job"""
+    from Ganga.Core.GangaRepository.BinaryStreamer import xml_to_binary
+    xml = make_job_xml(50)
+    binary = xml_to_binary(StringIO(xml))
+    xml_obj, xml_errs = load_xml(xml)
+    binary_obj, binary_errs = load_binary(binary)
+    assert xml_errs == binary_errs == []
+    assert len(binary) < len(xml)
+    assert binary_obj == xml_obj
+
+
+def main(sizes=(100, 1000, 10000)):
+    from Ganga.Core.GangaRepository.BinaryStreamer import xml_to_binary
+    rows = []
+    for n_files in sizes:
+        xml = make_job_xml(n_files)
+        binary = xml_to_binary(StringIO(xml))
+        t_xml = time_call(lambda: load_xml(xml))
+        t_binary = time_call(lambda: load_binary(binary))
+        rows.append([n_files, len(xml), len(binary), t_xml, t_binary, t_xml / t_binary])
+    print_table('Job loading (seconds per job)', ['outputfiles', 'XML bytes', 'binary bytes', 'XML', 'binary', 'speedup'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+Compare the number of config lookups per second when the effective value is merged from the user, gangarc, session
+and default values at each lookup, as getConfig(...)[...] did, and when it is read from the snapshot of the section.
+
+Run the full benchmark with:
+    cd python && PYTHONPATH=. python Ganga/test/Benchmark/BenchConfigLookup.py
+"""
+from __future__ import print_function, division
+
+from Ganga.testlib.benchmark import time_call, print_table
+
+_options = [('Configuration', 'gangadir'),
+            ('Configuration', 'RUNTIME_PATH'),
+            ('PollThread', 'default_backend_poll_rate')]
+
+
+def _merged(section, name, n):
+    from Ganga.Utility.Config import getConfig
+    for _ in xrange(n):
+        getConfig(section).options[name].value
+
+
+def _snapshot(section, name, n):
+    from Ganga.Utility.Config import getConfig
+    for _ in xrange(n):
+        getConfig(section)[name]
+
+
+def test_same_values():
+    """The snapshot must give the merged values"""
+    import Ganga
+    from Ganga.Utility.Config import getConfig
+    for section, name in _options:
+        assert getConfig(section)[name] == getConfig(section).options[name].value
+
+
+def main(number=100000):
+    import Ganga
+    rows = []
+    for section, name in _options:
+        t_merged = time_call(lambda: _merged(section, name, number))
+        t_snapshot = time_call(lambda: _snapshot(section, name, number))
+        rows.append(['[%s]%s' % (section, name), number / t_merged, number / t_snapshot, t_merged / t_snapshot])
+    print_table('Config lookups per second', ['option', 'merged', 'snapshot', 'speed-up'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Compare the number of credential validity checks per second when the time left is read by running voms-proxy-info for
+each check and when it is kept by the CredentialService, which only reads it again once the proxy file has changed.
+A fake voms-proxy-info, which only prints the time left, stands in for the real one.
+
+Run the full benchmark with:
+    cd python && PYTHONPATH=. python Ganga/test/Benchmark/BenchCredentialChecks.py
+"""
+from __future__ import print_function, division
+
+import os
+import shutil
+import stat
+import tempfile
+
+from Ganga.testlib.benchmark import time_call, print_table
+
+_fake_command = '#!/bin/sh\ncase "$*" in *-timeleft*) echo 7200 ;; *-vo*) echo some_vo ;; esac\n'
+
+
+class _FakeProxy(object):
+
+    """ A proxy file and a fake voms-proxy-info on the PATH of the shell of the proxy """
+
+    def __init__(self):
+        from Ganga.GPIDev.Credentials.VomsProxy import VomsProxy, VomsProxyInfo
+        from Ganga.Utility.Shell import Shell
+        self.directory = tempfile.mkdtemp()
+        command = os.path.join(self.directory, 'voms-proxy-info')
+        with open(command, 'w') as command_file:
+            command_file.write(_fake_command)
+        os.chmod(command, os.stat(command).st_mode | stat.S_IEXEC)
+        with open(os.path.join(self.directory, 'proxy:some_vo'), 'w') as proxy_file:
+            proxy_file.write('proxy\n')
+        self._environ = os.environ.get('X509_USER_PROXY')
+        os.environ['X509_USER_PROXY'] = os.path.join(self.directory, 'proxy')
+        shell = Shell()
+        shell.env['PATH'] = self.directory + os.pathsep + shell.env.get('PATH', '')
+        self._shell = VomsProxyInfo.__dict__['shell']
+        VomsProxyInfo.shell = shell
+        self.cred = VomsProxyInfo(VomsProxy(vo='some_vo'))
+
+    def close(self):
+        from Ganga.GPIDev.Credentials.VomsProxy import VomsProxyInfo
+        VomsProxyInfo.shell = self._shell
+        if self._environ is None:
+            del os.environ['X509_USER_PROXY']
+        else:
+            os.environ['X509_USER_PROXY'] = self._environ
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def _command(cred, n):
+    from datetime import datetime
+    for _ in xrange(n):
+        cred.clear_cache()
+        cred.expiry_time() > datetime.now()
+
+
+def _service(service, cred, n):
+    for _ in xrange(n):
+        service.is_valid(cred)
+
+
+def test_service_is_valid():
+    """The service must agree with the command"""
+    from Ganga.GPIDev.Credentials.CredentialService import CredentialService
+    proxy = _FakeProxy()
+    try:
+        assert CredentialService(background=False).is_valid(proxy.cred)
+    finally:
+        proxy.close()
+
+
+def main(number=200):
+    from Ganga.GPIDev.Credentials.CredentialService import CredentialService
+    proxy = _FakeProxy()
+    try:
+        service = CredentialService(background=False)
+        t_command = time_call(lambda: _command(proxy.cred, number))
+        t_service = time_call(lambda: _service(service, proxy.cred, number))
+    finally:
+        proxy.close()
+    print_table('Credential checks per second', ['command', 'service', 'speed-up'],
+                [[number / t_command, number / t_service, t_command / t_service]])
+
+
+if __name__ == '__main__':
+    main()
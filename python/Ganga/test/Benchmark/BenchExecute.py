@@ -0,0 +1,47 @@
+"""
+Compare the cost of running a python command with execute in a new python for each command and in the long lived
+worker processes, with and without a slow python_setup (standing in for importing the DIRAC API).
+
+Run the full benchmark with:
+    cd python && PYTHONPATH=. python Ganga/test/Benchmark/BenchExecute.py
+"""
+from __future__ import print_function
+
+import os
+
+from Ganga.testlib.benchmark import time_call, print_table
+
+_slow_setup = 'import time\ntime.sleep(0.2)\n'
+_command = 'import os\noutput(os.getcwd())'
+
+
+def _run(use_workers, python_setup, env):
+    from Ganga.Utility.Config import getConfig
+    from Ganga.Utility.execute import execute
+    config = getConfig('Execute')
+    config.setSessionValue('UseWorkers', use_workers)
+    try:
+        return execute(_command, python_setup=python_setup, env=env, cwd=os.getcwd(), shell=False)
+    finally:
+        config.revertToDefault('UseWorkers')
+
+
+def test_workers_match_new_python():
+    """The workers must return the same output as a new python"""
+    env = dict(os.environ)
+    assert _run(True, _slow_setup, env) == _run(False, _slow_setup, env) == os.getcwd()
+
+
+def main(number=10):
+    rows = []
+    for name, env in [('given env', dict(os.environ)), ('env=None', None)]:
+        for setup_name, setup in [('none', ''), ('0.2s sleep', _slow_setup)]:
+            t_new = time_call(lambda: _run(False, setup, env), repeat=1, number=number)
+            _run(True, setup, env)
+            t_worker = time_call(lambda: _run(True, setup, env), repeat=1, number=number)
+            rows.append([name, setup_name, t_new, t_worker])
+    print_table('Seconds per execute() of a python command', ['env', 'python_setup', 'new python', 'worker'], rows)
+
+
+if __name__ == '__main__':
+    main()
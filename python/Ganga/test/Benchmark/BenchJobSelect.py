@@ -0,0 +1,95 @@
+"""
+Compare selecting jobs from the secondary indexes with checking the index cache of every job,
+for a synthetic repository of jobs which haven't been loaded.
+
+Run the full benchmark with:
+    cd python && PYTHONPATH=. python Ganga/test/Benchmark/BenchJobSelect.py
+"""
+from __future__ import print_function
+
+import re
+import fnmatch
+import datetime
+
+from Ganga.testlib.benchmark import time_call, print_table
+
+_keys = {'status': 'status',
+         'name': 'name',
+         'backend': 'select:backend',
+         'application': 'select:application',
+         'time_created': 'select:time_created'}
+
+_statuses = ['new', 'submitted', 'running', 'completed', 'failed', 'killed']
+_backends = ['Local', 'Dirac', 'LCG', 'Condor']
+
+
+class _Job(object):
+
+    def __init__(self, cache):
+        self._index_cache_dict = cache
+
+
+def _make_jobs(n_jobs):
+    start = datetime.datetime(2016, 1, 1)
+    objects = {}
+    for i in range(n_jobs):
+        objects[i] = _Job({'status': _statuses[i % len(_statuses)],
+                           'name': 'job_%d' % (i % 100),
+                           'select:backend': _backends[i % len(_backends)],
+                           'select:application': 'Executable',
+                           'select:time_created': start + datetime.timedelta(minutes=i)})
+    return objects
+
+
+def _make_index(objects):
+    from Ganga.GPIDev.Lib.Registry.SelectIndex import SelectIndex
+    index = SelectIndex(_keys)
+    index.refresh(objects, lambda obj: False)
+    return index
+
+
+def _scan(objects, criteria):
+    """Check the index cache of every job, the best case for a select which doesn't use the indexes"""
+    selected = []
+    for this_id, obj in objects.iteritems():
+        cache = obj._index_cache_dict
+        for attr, value in criteria.iteritems():
+            found = cache.get(_keys[attr])
+            if hasattr(value, 'match'):
+                if not value.match(str(found)):
+                    break
+            elif found != value:
+                break
+        else:
+            selected.append(this_id)
+    return selected
+
+
+def _criteria():
+    return {'status': 'failed', 'backend': 'Dirac', 'name': re.compile(fnmatch.translate('job_1*'))}
+
+
+def test_select_index_matches_scan():
+    """The indexes must select the same jobs as checking every job"""
+    objects = _make_jobs(1000)
+    index = _make_index(objects)
+    criteria = _criteria()
+    assert sorted(index.select(criteria)) == sorted(_scan(objects, criteria))
+
+
+def main(sizes=(5000, 50000)):
+    rows = []
+    criteria = _criteria()
+    for n_jobs in sizes:
+        objects = _make_jobs(n_jobs)
+        t_build = time_call(lambda: _make_index(objects), repeat=1)
+        index = _make_index(objects)
+        t_scan = time_call(lambda: _scan(objects, criteria))
+        t_refresh = time_call(lambda: index.refresh(objects, lambda obj: False))
+        t_index = time_call(lambda: index.select(criteria))
+        rows.append([n_jobs, t_build, t_scan, t_refresh, t_index])
+    print_table('Seconds per select of status/backend/name', ['jobs', 'build index', 'scan', 'refresh', 'index select'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+"""
+Compare the throughput of running many short Local jobs with every process started at once, as the Local backend did,
+and with the LocalScheduler limiting the number of processes which run at once.
+Each job is a new python which spends 0.1s of CPU, standing in for the job wrapper running a short application.
+
+Run the full benchmark with:
+    cd python && PYTHONPATH=. python Ganga/test/Benchmark/BenchLocalScheduler.py
+"""
+from __future__ import print_function, division
+
+import multiprocessing
+import sys
+import time
+
+from Ganga.testlib.benchmark import print_table
+
+_job = 'import time\nend = time.clock() + 0.1\nwhile time.clock() < end: pass\n'
+
+
+def _run(n_jobs, max_running):
+    """ Return (time taken to submit, time taken to run, most processes at once) for n_jobs jobs """
+    from Ganga.Lib.Localhost.LocalScheduler import LocalScheduler
+    scheduler = LocalScheduler(max_running)
+    keys = ['job%s' % i for i in range(n_jobs)]
+    start = time.time()
+    for key in keys:
+        scheduler.submit(key, [sys.executable, '-c', _job])
+    submitted = time.time() - start
+    most = 0
+    pending = set(keys)
+    while pending:
+        running = 0
+        for key in list(pending):
+            pid = scheduler.pid(key)
+            if pid is None:
+                continue
+            if scheduler.returncode(pid)[0]:
+                pending.discard(key)
+                scheduler.forget(key)
+            else:
+                running += 1
+        most = max(most, running)
+        time.sleep(0.01)
+    return submitted, time.time() - start, most
+
+
+def test_all_jobs_run():
+    """Every job must run, never more at once than the limit"""
+    submitted, taken, most = _run(6, 2)
+    assert most <= 2
+
+
+def main(n_jobs=100):
+    cores = multiprocessing.cpu_count()
+    rows = []
+    for name, limit in [('all at once', None), ('2 x cores', 2 * cores), ('cores', cores)]:
+        submitted, taken, most = _run(n_jobs, limit)
+        rows.append([name, most, submitted, taken, n_jobs / taken])
+    print_table('%s jobs of 0.1s CPU on %s cores' % (n_jobs, cores),
+                ['max running', 'most at once', 'submit (s)', 'total (s)', 'jobs/s'], rows)
+
+
+if __name__ == '__main__':
+    main()
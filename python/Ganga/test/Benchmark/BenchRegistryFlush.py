@@ -0,0 +1,87 @@
+"""
+Compare writing many data files one at a time with writing them as a batch from several threads,
+with and without forcing them to disk.
+
+Run the full benchmark with:
+    cd python && PYTHONPATH=. python Ganga/test/Benchmark/BenchRegistryFlush.py
+"""
+from __future__ import print_function
+
+import os
+import shutil
+import tempfile
+import threading
+import Queue
+
+from Ganga.testlib.benchmark import time_call, print_table, make_job_xml
+
+
+def _write_files(root, n_files, data, n_threads=1, fsync=False):
+    from Ganga.Core.GangaRepository.GangaRepositoryXML import safe_save, fsync_files
+
+    def to_file(obj, fobj, ignore_subs):
+        fobj.write(data)
+
+    def save(fn, written):
+        safe_save(fn, None, to_file, '', written)
+        if fsync and written is None:
+            # sync every file as it's written
+            fsync_files([fn])
+
+    written = [] if fsync and n_threads > 1 else None
+    pending = Queue.Queue()
+    for i in range(n_files):
+        pending.put(os.path.join(root, str(i), 'data'))
+
+    def worker():
+        while True:
+            try:
+                fn = pending.get_nowait()
+            except Queue.Empty:
+                return
+            save(fn, written)
+
+    threads = [threading.Thread(target=worker) for _ in range(n_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if written:
+        fsync_files(written)
+
+
+def _bench(n_files, data, n_threads, fsync):
+    root = tempfile.mkdtemp()
+    try:
+        return time_call(lambda: _write_files(root, n_files, data, n_threads, fsync))
+    finally:
+        shutil.rmtree(root)
+
+
+def test_batch_flush():
+    """Writing a batch from several threads must produce the same files"""
+    data = make_job_xml(10)
+    root = tempfile.mkdtemp()
+    try:
+        _write_files(root, 20, data, n_threads=4, fsync=True)
+        for i in range(20):
+            with open(os.path.join(root, str(i), 'data')) as fobj:
+                assert fobj.read() == data
+    finally:
+        shutil.rmtree(root)
+
+
+def main(sizes=(100, 1000)):
+    data = make_job_xml(100)
+    rows = []
+    for n_files in sizes:
+        t_serial = _bench(n_files, data, 1, False)
+        t_batch = _bench(n_files, data, 4, False)
+        t_serial_sync = _bench(n_files, data, 1, True)
+        t_batch_sync = _bench(n_files, data, 4, True)
+        rows.append([n_files, n_files / t_serial, n_files / t_batch, n_files / t_serial_sync, n_files / t_batch_sync])
+    print_table('Objects flushed per second', ['objects', 'serial', '4 threads', 'serial+fsync', '4 threads+batch fsync'], rows)
+
+
+if __name__ == '__main__':
+    main()
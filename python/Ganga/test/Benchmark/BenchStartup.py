@@ -0,0 +1,91 @@
+"""
+Time the start-up of the ganga command: printing the help, running a script which lists the jobs and running an empty
+script, each in a new process with an empty gangadir. The plugins declared in the manifest of Ganga.Runtime.plugins are
+only loaded when they are first used, so most sessions never import the LCG, Condor or batch backends.
+
+Run the full benchmark with:
+    cd python && PYTHONPATH=. python Ganga/test/Benchmark/BenchStartup.py
+and append the results to a file, to track them over time, with:
+    cd python && PYTHONPATH=. python Ganga/test/Benchmark/BenchStartup.py startup_history.txt
+"""
+from __future__ import print_function
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from Ganga.testlib.benchmark import time_call, print_table
+
+_scripts = {'empty': '',
+            'jobs': 'print(jobs)\n',
+            'modules': 'import sys\n'
+                       'print("before %s" % " ".join(sorted(m for m in sys.modules if m.startswith("Ganga.Lib."))))\n'
+                       'LCG()\n'
+                       'print("after %s" % " ".join(sorted(m for m in sys.modules if m.startswith("Ganga.Lib."))))\n'}
+
+
+class _Session(object):
+
+    """ A home directory with a config file whose gangadir is empty, and the scripts to run """
+
+    def __init__(self):
+        self.home = tempfile.mkdtemp()
+        self.config = os.path.join(self.home, '.gangarc')
+        with open(self.config, 'w') as config_file:
+            config_file.write('[Configuration]\ngangadir = %s\n' % os.path.join(self.home, 'gangadir'))
+        for name, script in _scripts.items():
+            with open(os.path.join(self.home, name + '.py'), 'w') as script_file:
+                script_file.write(script)
+
+    def run(self, *args):
+        """ Run ganga with the arguments, return its output """
+        from Ganga import _gangaPythonPath
+        ganga = os.path.abspath(os.path.join(_gangaPythonPath, '..', 'bin', 'ganga'))
+        env = dict(os.environ, HOME=self.home)
+        return subprocess.check_output([sys.executable, ganga, '--no-mon', '--config=%s' % self.config] + list(args),
+                                       env=env, stderr=subprocess.STDOUT, cwd=self.home)
+
+    def script(self, name):
+        return os.path.join(self.home, name + '.py')
+
+    def close(self):
+        shutil.rmtree(self.home, ignore_errors=True)
+
+
+def _cases(session):
+    return [('ganga --help', lambda: session.run('--help')),
+            ('ganga jobs.py', lambda: session.run(session.script('jobs'))),
+            ('ganga empty.py', lambda: session.run(session.script('empty')))]
+
+
+def test_backends_load_on_first_use():
+    """LCG is only imported once it is used"""
+    session = _Session()
+    try:
+        output = session.run(session.script('modules'))
+    finally:
+        session.close()
+    loaded = dict(line.split(' ', 1) for line in output.splitlines() if line.startswith(('before ', 'after ')))
+    assert 'Ganga.Lib.LCG' not in loaded['before'].split()
+    assert 'Ganga.Lib.LCG' in loaded['after'].split()
+
+
+def main(repeat=5, history=None):
+    session = _Session()
+    try:
+        # the first run writes the gangadir
+        session.run(session.script('empty'))
+        rows = [[name, time_call(case, repeat=repeat)] for name, case in _cases(session)]
+    finally:
+        session.close()
+    print_table('Start-up time of ganga (seconds, best of %s)' % repeat, ['command', 'seconds'], rows)
+    if history:
+        with open(history, 'a') as history_file:
+            history_file.write('\t'.join([time.strftime('%Y-%m-%d %H:%M:%S')] + ['%s=%.3f' % (name, t) for name, t in rows]) + '\n')
+
+
+if __name__ == '__main__':
+    main(history=sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,236 @@
+"""
+Compare the time taken to load large jobs from XML with the original Loader of VStreamer, kept here as the LegacyLoader,
+and the StreamingLoader.
+
+Run the full benchmark with:
+    cd python && PYTHONPATH=. python Ganga/test/Benchmark/BenchXMLLoader.py
+"""
+from __future__ import print_function
+
+import copy
+from cStringIO import StringIO
+
+from Ganga.Core.exceptions import GangaException
+from Ganga.Core.GangaRepository.GangaRepository import SchemaVersionError
+from Ganga.Core.GangaRepository.VStreamer import EmptyGangaObject, unescape
+from Ganga.GPIDev.Base.Objects import GangaObject
+from Ganga.GPIDev.Base.Proxy import getName
+from Ganga.GPIDev.Lib.GangaList.GangaList import makeGangaList
+from Ganga.GPIDev.Schema import Version
+from Ganga.Utility.Config import config_scope
+from Ganga.Utility.Plugin import PluginManagerError, allPlugins
+from Ganga.testlib.benchmark import time_call, print_table, make_job_xml
+
+_cached_eval_strings = {}
+
+
+class LegacyLoader(object):
+
+    """ The Loader which VStreamer used before the StreamingLoader, which eval-s each value and caches it forever """
+
+    def __init__(self):
+        self.stack = None  # we construct object tree using this stack
+        # ignore nested XML elements in case of data errors at a higher level
+        self.ignore_count = 0
+        self.errors = []  # list of exception objects in case of data errors
+        # buffer for <value> elements (evaled as python expressions)
+        self.value_construct = None
+        # buffer for building sequences (FIXME: what about nested sequences?)
+        self.sequence_start = []
+
+    def parse(self, s):
+        """ Parse and load object from string s using internal XML parser (expat).
+        """
+        import xml.parsers.expat
+
+        # 3 handler functions
+        def start_element(name, attrs):
+            #logger.debug('Start element: name=%s attrs=%s', name, attrs) #FIXME: for 2.4 use CurrentColumnNumber and CurrentLineNumber
+            # if higher level element had error, ignore the corresponding part
+            # of the XML tree as we go down
+            if self.ignore_count:
+                self.ignore_count += 1
+                return
+
+            # initialize object stack
+            if name == 'root':
+                assert self.stack is None, "duplicated <root> element"
+                self.stack = []
+                return
+
+            assert not self.stack is None, "missing <root> element"
+
+            # load a class, make empty object and push it as the current object
+            # on the stack
+            if name == 'class':
+                try:
+                    cls = allPlugins.find(attrs['category'], attrs['name'])
+                except PluginManagerError as e:
+                    self.errors.append(e)
+                    #self.errors.append('Unknown class: %(name)s'%attrs)
+                    obj = EmptyGangaObject()
+                    # ignore all elemenents until the corresponding ending
+                    # element (</class>) is reached
+                    self.ignore_count = 1
+                else:
+                    version = Version(*[int(v) for v in attrs['version'].split('.')])
+                    if not cls._schema.version.isCompatible(version):
+                        attrs['currversion'] = '%s.%s' % (cls._schema.version.major, cls._schema.version.minor)
+                        self.errors.append(SchemaVersionError('Incompatible schema of %(name)s, repository is %(version)s currently in use is %(currversion)s' % attrs))
+                        obj = EmptyGangaObject()
+                        # ignore all elemenents until the corresponding ending
+                        # element (</class>) is reached
+                        self.ignore_count = 1
+                    else:
+                        # Initialize and cache a c class instance to use as a classs factory
+                        obj = cls.getNew()
+                self.stack.append(obj)
+
+            # push the attribute name on the stack
+            if name == 'attribute':
+                self.stack.append(attrs['name'])
+
+            # start value_contruct mode and initialize the value buffer
+            if name == 'value':
+                self.value_construct = ''
+
+            # save a marker where the sequence begins on the stack
+            if name == 'sequence':
+                self.sequence_start.append(len(self.stack))
+
+        def end_element(name):
+            #logger.debug('End element: name=%s', name)
+
+            # if higher level element had error, ignore the corresponding part
+            # of the XML tree as we go up
+            if self.ignore_count:
+                self.ignore_count -= 1
+                return
+
+            # when </attribute> is seen the current object, attribute name and
+            # value should be on top of the stack
+            if name == 'attribute':
+                value = self.stack.pop()
+                aname = self.stack.pop()
+                obj = self.stack[-1]
+                # update the object's attribute
+                try:
+                    obj.setSchemaAttribute(aname, value)
+                except:
+                    raise GangaException("ERROR in loading XML, failed to set attribute %s for class %s" % (aname, getName(obj)))
+                #logger.info("Setting: %s = %s" % (aname, value))
+
+            # when </value> is seen the value_construct buffer (CDATA) should
+            # be a python expression (e.g. quoted string)
+            if name == 'value':
+                try:
+                    # unescape the special characters
+                    s = unescape(self.value_construct)
+                    #logger.debug('string value: %s',s)
+                    if s not in _cached_eval_strings:
+                        # This is ugly and classes which use this are bad, but this needs to be fixed in another PR
+                        # TODO Make the scope of objects a lot better than whatever is in the config
+                        # This is a dictionary constructed from eval-ing things in the Config. Why does should it do this?
+                        # Anyway, lets save the result for speed
+                        _cached_eval_strings[s] = eval(s, config_scope)
+                    eval_str = _cached_eval_strings[s]
+                    if not isinstance(eval_str, str):
+                        val = copy.deepcopy(eval_str)
+                    else:
+                        val = eval_str
+                    #logger.debug('evaled value: %s type=%s',repr(val),type(val))
+                    self.stack.append(val)
+                    self.value_construct = None
+                except:
+                    raise GangaException("ERROR in loading XML, failed to correctly parse attribute value: \'%s\'" % str(self.value_construct))
+
+            # when </sequence> is seen we remove last items from stack (as indicated by sequence_start)
+            # we make a GangaList from these items and put it on stack
+            if name == 'sequence':
+                pos = self.sequence_start.pop()
+                try:
+                    alist = makeGangaList(self.stack[pos:])
+                except:
+                    raise GangaException("ERROR in loading XML, failed to construct a sequence(list) properly")
+                del self.stack[pos:]
+                self.stack.append(alist)
+
+            # when </class> is seen we finish initializing the new object
+            # by setting remaining attributes to their default values
+            # the object stays on the stack (will be removed by </attribute> or
+            # is a root object)
+            if name == 'class':
+                obj = self.stack[-1]
+                cls = obj.__class__
+                if isinstance(cls, GangaObject):
+                    for attr, item in cls._schema.allItems():
+                        if attr not in obj._data:
+                            if item.getProperties()['getter'] is None:
+                                try:
+                                    setattr(obj, attr, self._schema.getDefaultValue(attr))
+                                except:
+                                    raise GangaException("ERROR in loading XML, failed to set default attribute %s for class %s" % (attr, getName(obj)))
+                pass
+
+        def char_data(data):
+            # char_data may be called many times in one CDATA section so we need to build up
+            # the full buffer for <value>CDATA</value> section incrementally
+            if self.value_construct is not None:
+                ###logger.debug('char_data: append=%s',data)
+                # FIXME: decode data
+                self.value_construct += data
+
+        # start parsing using callbacks
+        p = xml.parsers.expat.ParserCreate()
+
+        p.StartElementHandler = start_element
+        p.EndElementHandler = end_element
+        p.CharacterDataHandler = char_data
+
+        p.Parse(s)
+
+        if len(self.stack) != 1:
+            self.errors.append(AssertionError('multiple objects inside <root> element'))
+
+        obj = self.stack[-1]
+
+        #logger.info("obj.__dict__: %s" % obj.__dict__)
+
+        # Raise Exception if object is incomplete
+        for attr, item in obj._schema.allItems():
+            if not hasattr(obj, attr):
+                raise AssertionError("incomplete XML file")
+        return obj, self.errors
+
+
+def load_old(xml):
+    return LegacyLoader().parse(xml)
+
+
+def load_new(xml):
+    from Ganga.Core.GangaRepository.VStreamer import StreamingLoader
+    return StreamingLoader().parse_file(StringIO(xml))
+
+
+def test_loaders_agree():
+    """Both loaders must produce the same job"""
+    xml = make_job_xml(50)
+    old_obj, old_errs = load_old(xml)
+    new_obj, new_errs = load_new(xml)
+    assert old_errs == new_errs == []
+    assert len(new_obj.outputfiles) == 50
+    assert new_obj == old_obj
+
+
+def main(sizes=(100, 1000, 10000)):
+    rows = []
+    for n_files in sizes:
+        xml = make_job_xml(n_files)
+        t_old = time_call(lambda: load_old(xml))
+        t_new = time_call(lambda: load_new(xml))
+        rows.append([n_files, len(xml), t_old, t_new, t_old / t_new])
+    print_table('XML job loading (seconds per job)', ['outputfiles', 'bytes', 'LegacyLoader', 'StreamingLoader', 'speedup'], rows)
+
+
+if __name__ == '__main__':
+    main()
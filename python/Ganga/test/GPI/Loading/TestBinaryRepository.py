@@ -0,0 +1,57 @@
+from __future__ import absolute_import
+
+import os
+
+from Ganga.testlib.GangaUnitTest import GangaUnitTest
+
+global_subjob_num = 3
+
+
+def _get_data_file(*ids):
+    from Ganga.Core.GangaRepository import getRegistry
+    repo = getRegistry('jobs').repository
+    return os.path.join(repo.get_fn(ids[0]).rsplit(os.sep, 1)[0], *[str(i) for i in ids[1:]] + [repo.dataFileName])
+
+
+class TestBinaryRepository(GangaUnitTest):
+
+    def setUp(self):
+        """Make sure that the Job objects aren't destroyed between tests and that they are stored as binary"""
+        extra_opts = [('TestingFramework', 'AutoCleanup', 'False'),
+                      ('Configuration', 'repositorytype', 'LocalBinary')]
+        super(TestBinaryRepository, self).setUp(extra_opts=extra_opts)
+
+    def test_a_JobConstruction(self):
+        """ First construct and submit a Job with subjobs"""
+        from Ganga.GPI import Job, jobs, ArgSplitter
+
+        j = Job(name='binary_job')
+        j.splitter = ArgSplitter(args=[['arg_%s' % i] for i in range(global_subjob_num)])
+        j.submit()
+
+        self.assertEqual(len(jobs), 1)
+        self.assertEqual(len(j.subjobs), global_subjob_num)
+
+    def test_b_JobLoaded(self):
+        """ Second check the job and its subjobs were written as binary and load correctly"""
+        from Ganga.GPI import jobs
+        from Ganga.Core.GangaRepository.BinaryStreamer import _magic
+
+        self.assertEqual(len(jobs), 1)
+
+        j = jobs(0)
+        self.assertEqual(j.name, 'binary_job')
+        self.assertEqual(len(j.subjobs), global_subjob_num)
+        for i in range(global_subjob_num):
+            self.assertEqual(list(j.subjobs(i).application.args), ['arg_%s' % i])
+
+        for ids in [(0,)] + [(0, i) for i in range(global_subjob_num)]:
+            with open(_get_data_file(*ids), 'rb') as fobj:
+                self.assertEqual(fobj.read(len(_magic)), _magic)
+
+    def test_c_JobRemoval(self):
+        """ Finally remove the job"""
+        from Ganga.GPI import jobs
+
+        jobs(0).remove()
+        self.assertEqual(len(jobs), 0)
@@ -0,0 +1,150 @@
+from __future__ import absolute_import
+
+import os
+
+from Ganga.testlib.GangaUnitTest import GangaUnitTest
+from Ganga.Utility.Config import getConfig
+
+global_num_jobs = 3
+
+
+def _get_index_store():
+    from Ganga.Core.GangaRepository import getRegistry
+    return getRegistry('jobs').repository._index_store
+
+
+class TestIndexStoreLoading(GangaUnitTest):
+
+    def setUp(self):
+        """Make sure that the Job objects aren't destroyed between tests"""
+        extra_opts = [('TestingFramework', 'AutoCleanup', 'False')]
+        if self._testMethodName == 'test_g_ChangesWithoutStore':
+            extra_opts.append(('Registry', 'EnableIndexStore', False))
+        super(TestIndexStoreLoading, self).setUp(extra_opts=extra_opts)
+
+    def test_a_JobConstruction(self):
+        """ First construct the Job objects"""
+        from Ganga.GPI import Job, jobs
+
+        for i in range(global_num_jobs):
+            j = Job(name='index_store_%s' % i)
+
+        self.assertEqual(len(jobs), global_num_jobs)
+        self.assertTrue(os.path.isfile(_get_index_store().fn))
+
+    def test_b_JobsFromIndexStore(self):
+        """ Second check the jobs are found from the index store without loading them"""
+        from Ganga.GPI import jobs
+        from Ganga.GPIDev.Base.Proxy import stripProxy
+
+        self.assertEqual(len(jobs), global_num_jobs)
+
+        entries = _get_index_store().load()
+        self.assertEqual(sorted(entries.keys()), jobs.ids())
+
+        for i in range(global_num_jobs):
+            raw_j = stripProxy(jobs(i))
+            self.assertFalse(raw_j._getRegistry().has_loaded(raw_j))
+            self.assertEqual(raw_j._index_cache['name'], 'index_store_%s' % i)
+
+        # Remove the store so that the next session has to rebuild it
+        os.unlink(_get_index_store().fn)
+
+    def test_c_IndexStoreRebuilt(self):
+        """ Third check the store is rebuilt from the index files when missing"""
+        from Ganga.GPI import jobs
+
+        self.assertEqual(len(jobs), global_num_jobs)
+        self.assertEqual(sorted(_get_index_store().load().keys()), jobs.ids())
+
+        jobs(0).remove()
+
+    def test_d_RemovedJob(self):
+        """ Fourth check that removed jobs are dropped from the store"""
+        from Ganga.GPI import jobs
+
+        self.assertEqual(len(jobs), global_num_jobs - 1)
+        self.assertEqual(sorted(_get_index_store().load().keys()), jobs.ids())
+        self.assertEqual(jobs.ids(), list(range(1, global_num_jobs)))
+
+        # Leave out the last job, as if the session which created it had stopped before recording it
+        store = _get_index_store()
+        entries = store.load()
+        del entries[global_num_jobs - 1]
+        store.rewrite(entries)
+
+    def test_e_StaleIndexStore(self):
+        """ Check that jobs missing from the store are found and the store is rebuilt"""
+        from Ganga.GPI import jobs
+
+        self.assertEqual(jobs.ids(), list(range(1, global_num_jobs)))
+        self.assertEqual(sorted(_get_index_store().load().keys()), jobs.ids())
+
+    def test_f_JobsWithoutStore(self):
+        """ Check that jobs written without the store are found when asked for and by the listing check"""
+        import shutil
+        from Ganga.GPI import jobs
+        from Ganga.GPIDev.Base.Proxy import stripProxy
+        from Ganga.Core.GangaRepository import getRegistry
+
+        repository = getRegistry('jobs').repository
+        source = jobs.ids()[0]
+        stripProxy(jobs(source))._getRegistry()._flush([stripProxy(jobs(source))])
+
+        # Copy a job on disk, as a session which doesn't write to the store would have written it
+        def copy_job(new_id):
+            shutil.copytree(os.path.dirname(repository.get_fn(source)), os.path.dirname(repository.get_fn(new_id)))
+            shutil.copy(repository.get_idxfn(source), repository.get_idxfn(new_id))
+
+        copy_job(10)
+        repository.update_index(10)
+        self.assertTrue(10 in jobs.ids())
+
+        # Nothing marks the change, only listing the repository finds it
+        copy_job(11)
+        repository.update_index()
+        self.assertFalse(11 in jobs.ids())
+        config = getConfig('Registry')
+        config.setSessionValue('IndexStoreListingCheck', 60)
+        try:
+            repository._last_listing_check = 0
+            repository.update_index()
+        finally:
+            config.revertToDefault('IndexStoreListingCheck')
+        self.assertTrue(11 in jobs.ids())
+
+    def test_g_ChangesWithoutStore(self):
+        """ Change, remove and add jobs from a session not using the store"""
+        from Ganga.GPI import Job, jobs
+
+        self.assertEqual(_get_index_store(), None)
+        self.assertEqual(jobs.ids(), [1, 2, 10, 11])
+        jobs(1).name = 'changed_without_store'
+        jobs(10).remove()
+        Job(name='added_without_store')
+
+    def test_h_ChangesFoundFromStore(self):
+        """ Check the changes made without the store are found on startup and while running"""
+        import shutil
+        from Ganga.GPI import jobs
+        from Ganga.GPIDev.Base.Proxy import stripProxy
+        from Ganga.Core.GangaRepository import getRegistry
+
+        repository = getRegistry('jobs').repository
+        self.assertEqual(jobs.ids(), [1, 2, 3, 11])
+        raw_j = stripProxy(jobs(1))
+        self.assertFalse(raw_j._getRegistry().has_loaded(raw_j))
+        self.assertEqual(raw_j._index_cache['name'], 'changed_without_store')
+        self.assertEqual(jobs(3).name, 'added_without_store')
+
+        # The store was checked and rebuilt, the next session can use it as it is
+        store = _get_index_store()
+        self.assertEqual(sorted(store.load().keys()), jobs.ids())
+        self.assertEqual(store.mark, repository._foreign_token())
+
+        # A job written by a session not using the store while this one runs
+        shutil.copytree(os.path.dirname(repository.get_fn(2)), os.path.dirname(repository.get_fn(13)))
+        shutil.copy(repository.get_idxfn(2), repository.get_idxfn(13))
+        repository._mark_foreign_change()
+        repository.update_index()
+        self.assertTrue(13 in jobs.ids())
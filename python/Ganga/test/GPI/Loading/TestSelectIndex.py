@@ -0,0 +1,68 @@
+from __future__ import absolute_import
+
+import datetime
+
+from Ganga.testlib.GangaUnitTest import GangaUnitTest
+
+job_names = ['sel_a', 'sel_b', 'other', 'sel_c']
+
+
+def _loaded(j):
+    from Ganga.GPIDev.Base.Proxy import stripProxy
+    raw_j = stripProxy(j)
+    return raw_j._getRegistry().has_loaded(raw_j)
+
+
+class TestSelectIndex(GangaUnitTest):
+
+    def setUp(self):
+        """Make sure that the Job objects aren't destroyed between tests"""
+        extra_opts = [('TestingFramework', 'AutoCleanup', 'False')]
+        super(TestSelectIndex, self).setUp(extra_opts=extra_opts)
+
+    def test_a_JobConstruction(self):
+        """ First construct jobs with a mix of names and backends"""
+        from Ganga.GPI import Job, jobs, TestSubmitter
+
+        for i, name in enumerate(job_names):
+            j = Job(name=name)
+            if i % 2:
+                j.backend = TestSubmitter()
+        self.assertEqual(len(jobs), len(job_names))
+
+    def test_b_SelectFromIndex(self):
+        """ Second select the jobs without loading any of them"""
+        from Ganga.GPI import jobs, Executable
+
+        self.assertEqual(sorted(jobs.select(backend='TestSubmitter').ids()), [1, 3])
+        self.assertEqual(sorted(jobs.select(backend='Local', name='sel_*').ids()), [0])
+        self.assertEqual(sorted(jobs.select(status='new', application=Executable).ids()), [0, 1, 2, 3])
+        self.assertEqual(sorted(jobs.select(status='comp*').ids()), [])
+        self.assertEqual(sorted(jobs.select(1, 2, name='*').ids()), [1, 2])
+        self.assertEqual(sorted(jobs.select(created_after=datetime.datetime.utcnow() - datetime.timedelta(days=1)).ids()), [0, 1, 2, 3])
+        self.assertEqual(sorted(jobs.select(created_before=datetime.datetime(2000, 1, 1)).ids()), [])
+
+        for j in jobs:
+            self.assertFalse(_loaded(j))
+
+    def test_c_SelectLoaded(self):
+        """ Third check that jobs which have been loaded and changed are selected by their new values"""
+        from Ganga.GPI import jobs, Local
+
+        jobs(1).name = 'renamed'
+        jobs(1).backend = Local()
+        self.assertTrue(_loaded(jobs(1)))
+        self.assertFalse(_loaded(jobs(0)))
+
+        self.assertEqual(sorted(jobs.select(name='sel_*').ids()), [0, 3])
+        self.assertEqual(sorted(jobs.select(name='renamed', backend='Local').ids()), [1])
+        self.assertEqual(sorted(jobs.select(backend='TestSubmitter').ids()), [3])
+        self.assertFalse(_loaded(jobs(0)))
+
+    def test_d_JobRemoval(self):
+        """ Finally remove the jobs"""
+        from Ganga.GPI import jobs
+
+        for j in jobs:
+            j.remove()
+        self.assertEqual(len(jobs), 0)
@@ -7,8 +7,8 @@ import string
 class TestSubjobs(GangaUnitTest):
 
     def setUp(self):
-        """Make sure that the Job object isn't destroyed between tests"""
-        extra_opts = [ ('TestingFramework', 'AutoCleanup', 'False') ]
+        """Make sure that the Job object isn't destroyed between tests, and that all of the subjobs run at once"""
+        extra_opts = [ ('TestingFramework', 'AutoCleanup', 'False'), ('Local', 'max_running_jobs', '-1') ]
         super(TestSubjobs, self).setUp(extra_opts=extra_opts)
 
     def testLargeJobSubmission(self):
@@ -50,6 +50,25 @@ class TestSubjobs(GangaUnitTest):
         assert j.status == 'killed'
         assert all(sj.status == 'killed' for sj in j.subjobs)
 
+    def testParallelSubmission(self):
+        """
+        Create some subjobs and submit them in parallel
+        """
+        from Ganga.GPI import Job, GenericSplitter, Local
+        j = Job()
+        j.application.exe = "sleep"
+        j.splitter = GenericSplitter()
+        j.splitter.attribute = 'application.args'
+        j.splitter.values = [['400'] for _ in range(0, 10)]
+        j.backend = Local()
+        j.parallel_submit = True
+        j.submit()
+
+        assert len(j.subjobs) == 10
+        assert all(sj.status not in ['new', 'submitting'] for sj in j.subjobs)
+        assert all(sj.application.args == ['400'] for sj in j.subjobs)
+        j.kill()
+
     def testSetParentOnLoad(self):
         """
         Test that the parents are set correctly on load
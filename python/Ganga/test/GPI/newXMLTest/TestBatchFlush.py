@@ -0,0 +1,103 @@
+from __future__ import absolute_import
+
+from Ganga.testlib.GangaUnitTest import GangaUnitTest
+
+from .utilFunctions import getXMLFile
+
+global_num_jobs = 5
+
+
+class TestBatchFlush(GangaUnitTest):
+
+    def setUp(self):
+        """Make sure that the Job objects aren't destroyed between tests and that the batches are synced"""
+        extra_opts = [('TestingFramework', 'AutoCleanup', 'False'),
+                      ('Registry', 'FlushThreads', 3),
+                      ('Registry', 'FsyncFlush', True)]
+        super(TestBatchFlush, self).setUp(extra_opts=extra_opts)
+
+    def test_a_BatchFlush(self):
+        """ First construct some jobs and flush them all as a single batch"""
+        from Ganga.GPI import Job, jobs
+        from Ganga.GPIDev.Base.Proxy import stripProxy
+
+        for i in range(global_num_jobs):
+            Job(name='batch_%s' % i)
+        self.assertEqual(len(jobs), global_num_jobs)
+
+        registry = stripProxy(jobs(0))._getRegistry()
+        before = registry.getFlushMetrics()
+
+        for j in jobs:
+            j.comment = 'flushed'
+            # Objects appearing more than once in a batch are only written once
+            registry._flush([stripProxy(j), stripProxy(j)])
+        registry.flush_all()
+
+        for j in jobs:
+            j.comment = 'flushed_%s' % j.id
+        registry.flush_all()
+
+        after = registry.getFlushMetrics()
+        self.assertEqual(after['objects'] - before['objects'], 2 * global_num_jobs)
+        self.assertEqual(after['batches'] - before['batches'], global_num_jobs + 1)
+        self.assertTrue(after['objects_per_second'] > 0)
+
+        for j in jobs:
+            self.assertFalse(stripProxy(j)._dirty)
+            with open(getXMLFile(j)) as handle:
+                self.assertTrue('flushed_%s' % j.id in handle.read())
+
+    def test_b_JobsLoaded(self):
+        """ Second check the jobs written in parallel load correctly"""
+        from Ganga.GPI import jobs
+
+        self.assertEqual(len(jobs), global_num_jobs)
+        for j in jobs:
+            self.assertEqual(j.name, 'batch_%s' % j.id)
+            self.assertEqual(j.comment, 'flushed_%s' % j.id)
+
+    def test_c_FlushErrors(self):
+        """ Third check that an error in a flushing thread is raised with its traceback"""
+        import sys
+        import traceback
+        from Ganga.GPI import jobs
+        from Ganga.GPIDev.Base.Proxy import stripProxy
+
+        registry = stripProxy(jobs(0))._getRegistry()
+        repository = registry.repository
+        safe_flush = repository._safe_flush_xml
+
+        # Not an IOError, which would be raised as a RepositoryError and shut the repositories down
+        def failing_flush(this_id, written=None):
+            if this_id in (1, 3):
+                raise ValueError('flush of %s failed' % this_id)
+            return safe_flush(this_id, written)
+
+        for j in jobs:
+            j.comment = 'failing'
+        repository._safe_flush_xml = failing_flush
+        try:
+            registry.flush_all()
+        except ValueError:
+            functions = [frame[2] for frame in traceback.extract_tb(sys.exc_info()[2])]
+            self.assertTrue('_flush_worker' in functions)
+            self.assertTrue('failing_flush' in functions)
+        else:
+            self.fail('ValueError not raised')
+        finally:
+            del repository._safe_flush_xml
+
+        for j in jobs:
+            self.assertEqual(stripProxy(j)._dirty, j.id in (1, 3))
+        registry.flush_all()
+        for j in jobs:
+            self.assertFalse(stripProxy(j)._dirty)
+
+    def test_d_JobRemoval(self):
+        """ Finally remove the jobs"""
+        from Ganga.GPI import jobs
+
+        for j in jobs:
+            j.remove()
+        self.assertEqual(len(jobs), 0)
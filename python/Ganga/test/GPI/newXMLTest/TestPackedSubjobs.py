@@ -0,0 +1,79 @@
+from __future__ import absolute_import
+
+from Ganga.testlib.GangaUnitTest import GangaUnitTest
+
+from os import path, listdir
+
+from .utilFunctions import getXMLDir
+
+testArgs = [['arg_%s' % i] for i in range(5)]
+
+
+def getSJContainer(this_job):
+    """ Returns the SubJobContainer holding the subjobs of a job which uses the packed layout
+    Args:
+        this_job (Job, int): The Job or Job_ID of interest
+    """
+    from Ganga.Core.GangaRepository.SubJobXMLList import SubJobXMLList
+    return SubJobXMLList.getContainer(getXMLDir(this_job))
+
+
+class TestPackedSubjobs(GangaUnitTest):
+
+    def setUp(self):
+        """Make sure that the Job object isn't destroyed between tests and that the subjobs are packed"""
+        extra_opts = [('TestingFramework', 'AutoCleanup', 'False'), ('Registry', 'PackedSubjobs', True)]
+        super(TestPackedSubjobs, self).setUp(extra_opts=extra_opts)
+
+    def test_a_JobConstruction(self):
+        """ First construct and submit the Job"""
+        from Ganga.GPI import Job, jobs, ArgSplitter
+        j = Job(splitter=ArgSplitter(args=testArgs))
+        j.submit()
+        assert len(jobs) == 1
+        assert len(j.subjobs) == len(testArgs)
+
+    def test_b_SubJobsPacked(self):
+        """ Second check the subjobs are stored in the container and loaded from it when needed"""
+        from Ganga.GPI import jobs
+        from Ganga.GPIDev.Base.Proxy import stripProxy
+
+        j = jobs(0)
+        container = getSJContainer(j)
+
+        assert container.exists()
+        assert len(container) == len(testArgs)
+        assert not [d for d in listdir(getXMLDir(j)) if d.isdigit()]
+        assert path.isfile(path.join(getXMLDir(j), 'subjobs.idx'))
+
+        raw_sjs = stripProxy(j).subjobs
+        assert raw_sjs.isPacked()
+        assert len(j.subjobs) == len(testArgs)
+        assert not raw_sjs.isLoaded(3)
+        assert list(j.subjobs(3).application.args) == testArgs[3]
+        assert raw_sjs.isLoaded(3)
+        assert not raw_sjs.isLoaded(2)
+
+        j.subjobs(1).comment = 'modified'
+
+    def test_c_DirtySubJobRewritten(self):
+        """ Third check that the modified subjob was written again"""
+        from Ganga.GPI import jobs
+
+        j = jobs(0)
+        container = getSJContainer(j)
+
+        assert j.subjobs(1).comment == 'modified'
+        # The previous data of a rewritten subjob is kept as its backup
+        assert 'modified' not in container.read(1, backup=True)
+
+    def test_d_JobRemoval(self):
+        """ Finally remove the job"""
+        from Ganga.GPI import jobs
+
+        j = jobs(0)
+        container = getSJContainer(j)
+        j.remove()
+
+        assert len(jobs) == 0
+        assert not container.exists()
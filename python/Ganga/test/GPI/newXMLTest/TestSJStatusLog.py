@@ -0,0 +1,108 @@
+from __future__ import absolute_import
+
+from Ganga.testlib.GangaUnitTest import GangaUnitTest
+
+from os import path
+
+from .utilFunctions import getXMLDir, getSJXMLFile, getSJXMLIndex
+
+testArgs = [['arg_%s' % i] for i in range(3)]
+
+
+def getSJStatusLog(this_job):
+    """ Returns the SubJobStatusLog of a job
+    Args:
+        this_job (Job, int): The Job or Job_ID of interest
+    """
+    from Ganga.Core.GangaRepository.SubJobXMLList import SubJobXMLList
+    return SubJobXMLList.getStatusLog(getXMLDir(this_job))
+
+
+class TestSJStatusLog(GangaUnitTest):
+
+    def setUp(self):
+        """Make sure that the Job object isn't destroyed between tests"""
+        extra_opts = [('TestingFramework', 'AutoCleanup', 'False')]
+        super(TestSJStatusLog, self).setUp(extra_opts=extra_opts)
+
+    def test_a_JobConstruction(self):
+        """ First construct and submit a Job which won't finish"""
+        from Ganga.GPI import Job, jobs, ArgSplitter, TestSubmitter
+        j = Job(splitter=ArgSplitter(args=testArgs), backend=TestSubmitter(time=600))
+        j.submit()
+        assert len(jobs) == 1
+        assert [sj.status for sj in j.subjobs] == ['submitted'] * len(testArgs)
+
+    def test_b_StatusRecorded(self):
+        """ Second move a subjob to running and check only the status log is written"""
+        from Ganga.GPI import jobs
+        from Ganga.GPIDev.Base.Proxy import stripProxy
+
+        j = jobs(0)
+        sj = stripProxy(j.subjobs(0))
+        assert not sj._dirty
+
+        index_mtime = path.getmtime(getSJXMLIndex(j))
+        sj.updateStatus('running')
+
+        assert sj.status == 'running'
+        assert not sj._dirty
+        log = getSJStatusLog(j)
+        assert log.exists()
+        status, timestamps, _logged = log.read()[0]
+        assert status == 'running'
+        assert timestamps['running'] == sj.time.timestamps['running']
+
+        stripProxy(j)._getRegistry().flush_all()
+        with open(getSJXMLFile((0, 0))) as handle:
+            assert 'submitted' in handle.read()
+        assert path.getmtime(getSJXMLIndex(j)) == index_mtime
+
+    def test_c_StatusLoaded(self):
+        """ Third check the status is read back from the status log and dropped once the subjob is written"""
+        from Ganga.GPI import jobs
+        from Ganga.GPIDev.Base.Proxy import stripProxy
+
+        j = jobs(0)
+        raw_sjs = stripProxy(j).subjobs
+        assert raw_sjs.getAllSJStatus()[0] == 'running'
+
+        # the timing of the subjobs comes from the index and the status log without loading them
+        statuses = raw_sjs.getAllSJStatus()
+        assert j.time.statistics()['counts'] == dict((status, statuses.count(status)) for status in set(statuses))
+        assert j.time.submitted() is not None
+        assert not any(raw_sjs.isLoaded(i) for i in range(len(testArgs)))
+
+        assert j.subjobs(0).status == 'running'
+        assert 'running' in j.subjobs(0).time.timestamps
+        assert not stripProxy(j.subjobs(0))._dirty
+
+        j.subjobs(0).comment = 'modified'
+        stripProxy(j)._getRegistry().flush_all()
+
+        assert 0 not in getSJStatusLog(j).read()
+        with open(getSJXMLFile((0, 0))) as handle:
+            assert 'running' in handle.read()
+
+    def test_d_StaleEntryIgnored(self):
+        """ Check an entry left in the status log from before the subjob was last written isn't applied"""
+        from Ganga.GPI import jobs
+
+        # As left by a session which stopped between writing subjob 2 and dropping its entries
+        with open(getSJStatusLog(jobs(0)).fn, 'a') as handle:
+            handle.write('2 completing @946684800.000000 completing=2000-01-01T00:00:00.000000\n')
+
+        j = jobs(0)
+        assert 'completing' not in j.subjobs(2).time.timestamps
+        assert j.subjobs(2).status in ('submitted', 'running')
+        assert j.subjobs(0).status == 'running'
+
+    def test_e_JobRemoval(self):
+        """ Finally check the status is still correct and remove the job"""
+        from Ganga.GPI import jobs
+
+        j = jobs(0)
+        assert j.subjobs(0).status == 'running'
+        assert j.subjobs(0).comment == 'modified'
+        j.remove()
+        assert len(jobs) == 0
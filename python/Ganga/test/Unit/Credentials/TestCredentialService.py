@@ -0,0 +1,132 @@
+import os
+import stat
+import time
+from datetime import timedelta
+
+import pytest
+
+from Ganga.GPIDev.Credentials.CredentialService import CredentialService
+from Ganga.GPIDev.Credentials.VomsProxy import VomsProxy, VomsProxyInfo
+from Ganga.Utility.Config import getConfig
+from Ganga.Utility.Shell import Shell
+
+# Stands in for voms-proxy-info, recording its arguments and printing the time left written in the timeleft file
+_fake_command = '''#!/bin/sh
+here=$(dirname "$0")
+echo "$*" >> "$here/calls"
+case "$*" in
+    *-timeleft*) cat "$here/timeleft" ;;
+    *-vo*) echo some_vo ;;
+esac
+'''
+
+
+class FakeProxy(object):
+
+    """ A proxy file and a fake voms-proxy-info which reports the time left on it """
+
+    def __init__(self, directory):
+        self.directory = directory
+        command = os.path.join(directory, 'voms-proxy-info')
+        with open(command, 'w') as command_file:
+            command_file.write(_fake_command)
+        os.chmod(command, os.stat(command).st_mode | stat.S_IEXEC)
+        self.shell = Shell()
+        self.shell.env['PATH'] = directory + os.pathsep + self.shell.env.get('PATH', '')
+
+    def write(self, timeleft):
+        """ Write the proxy file again, with a new time left """
+        with open(os.path.join(self.directory, 'timeleft'), 'w') as timeleft_file:
+            timeleft_file.write('%d\n' % timeleft)
+        with open(self.location, 'a') as proxy_file:
+            proxy_file.write('renewed\n')
+
+    @property
+    def location(self):
+        return os.path.join(self.directory, 'proxy:some_vo')
+
+    def timeleft_calls(self):
+        """ The number of times the time left has been asked for """
+        try:
+            with open(os.path.join(self.directory, 'calls')) as calls:
+                return sum(1 for line in calls if '-timeleft' in line)
+        except IOError:
+            return 0
+
+
+@pytest.fixture
+def proxy(tmpdir, monkeypatch):
+    fake = FakeProxy(str(tmpdir))
+    fake.write(timeleft=7200)
+    monkeypatch.setenv('X509_USER_PROXY', os.path.join(str(tmpdir), 'proxy'))
+    monkeypatch.setattr(VomsProxyInfo, 'shell', fake.shell)
+    return fake
+
+
+def test_checks_read_expiry_once(proxy):
+    """Test that the expiry time is only read again once the proxy file has changed"""
+    service = CredentialService(background=False)
+    cred = VomsProxyInfo(VomsProxy(vo='some_vo'))
+    assert cred.location == proxy.location
+
+    for _ in range(50):
+        assert service.is_valid(cred)
+    assert proxy.timeleft_calls() == 1
+    assert timedelta(seconds=7100) < service.time_left(cred) <= timedelta(seconds=7200)
+
+    proxy.write(timeleft=0)
+    assert not service.is_valid(cred)
+    assert not service.is_valid(cred)
+    assert proxy.timeleft_calls() == 2
+
+    os.remove(proxy.location)
+    assert not service.is_valid(cred)
+    assert proxy.timeleft_calls() == 2
+
+
+def test_events(proxy):
+    """Test that the listeners are told once when a credential is expiring, has expired and has been renewed"""
+    service = CredentialService(background=False)
+    events = []
+    service.addListener(lambda event, cred, time_left: events.append(event))
+    cred = VomsProxyInfo(VomsProxy(vo='some_vo'))
+
+    service.is_valid(cred)
+    assert events == []
+
+    proxy.write(timeleft=100)
+    service.is_valid(cred)
+    service.is_valid(cred)
+    assert events == ['expiring']
+
+    proxy.write(timeleft=0)
+    service.is_valid(cred)
+    assert events == ['expiring', 'expired']
+
+    proxy.write(timeleft=7200)
+    service.is_valid(cred)
+    assert events == ['expiring', 'expired', 'renewed']
+
+
+def test_refresher(proxy):
+    """Test that the refresher thread picks up a credential renewed outside of Ganga"""
+    config = getConfig('Credentials')
+    config.setSessionValue('RefreshInterval', 1)
+    service = CredentialService()
+    try:
+        events = []
+        service.addListener(lambda event, cred, time_left: events.append(event))
+        cred = VomsProxyInfo(VomsProxy(vo='some_vo'))
+        assert service.is_valid(cred)
+        assert service.locations() == [proxy.location]
+
+        proxy.write(timeleft=100)
+        deadline = time.time() + 10
+        while not events and time.time() < deadline:
+            time.sleep(0.1)
+        assert events == ['expiring']
+        assert proxy.timeleft_calls() == 2
+    finally:
+        service.stop()
+        config.setSessionValue('RefreshInterval', 60)
+    assert service.locations() == []
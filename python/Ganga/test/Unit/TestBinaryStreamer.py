@@ -0,0 +1,111 @@
+import datetime
+from cStringIO import StringIO
+
+import pytest
+
+from Ganga.Core.GangaRepository.BinaryStreamer import to_file, from_file, xml_to_binary, convert_repository, BinaryFileError
+from Ganga.Core.GangaRepository import VStreamer
+
+
+def _make_job():
+    from Ganga.GPIDev.Lib.Job.Job import Job
+    from Ganga.GPIDev.Lib.File.LocalFile import LocalFile
+
+    j = Job()
+    j.name = u'binary & <round trip> \xe9'
+    j.comment = 'x' * 200
+    j.application.args = ['a', 'b', 'a']
+    j.outputfiles = [LocalFile('a.root'), LocalFile('b.root')]
+    j.time.timestamps['new'] = datetime.datetime(2016, 1, 1, 0, 0)
+    return j
+
+
+def _to_string(j, to_file_func):
+    sio = StringIO()
+    to_file_func(j, sio, 'subjobs')
+    return sio.getvalue()
+
+
+def test_binary_round_trip():
+    """Test that a job loaded from the binary format matches the job loaded from XML"""
+    j = _make_job()
+
+    binary = _to_string(j, to_file)
+    xml = _to_string(j, VStreamer.to_file)
+    assert len(binary) < len(xml)
+
+    new_obj, errs = from_file(StringIO(binary))
+    xml_obj, xml_errs = VStreamer.from_file(StringIO(xml))
+
+    assert errs == xml_errs == []
+    assert new_obj.name == j.name
+    assert new_obj.comment == j.comment
+    assert [f.namePattern for f in new_obj.outputfiles] == ['a.root', 'b.root']
+    assert new_obj.time.timestamps['new'] == datetime.datetime(2016, 1, 1, 0, 0)
+    assert new_obj == xml_obj
+
+
+def test_binary_transcoded_xml():
+    """Test that XML transcoded to binary loads the same job as the XML"""
+    j = _make_job()
+
+    xml = _to_string(j, VStreamer.to_file)
+    binary = xml_to_binary(StringIO(xml))
+
+    assert binary == _to_string(j, to_file)
+    assert from_file(StringIO(binary))[0] == VStreamer.from_file(StringIO(xml))[0]
+
+
+def test_binary_reads_xml():
+    """Test that XML data files can still be read from a binary repository"""
+    j = _make_job()
+    xml_obj, errs = from_file(StringIO(_to_string(j, VStreamer.to_file)))
+    assert errs == []
+    assert xml_obj.name == j.name
+
+
+def test_binary_schema_version_error():
+    """Test that incompatible schema versions are reported in the same way as for XML"""
+    from Ganga.Core.GangaRepository import SchemaVersionError
+
+    # Bump the major version of the application
+    xml = _to_string(_make_job(), VStreamer.to_file).replace('name="Executable" version="2.', 'name="Executable" version="99.')
+    binary = xml_to_binary(StringIO(xml))
+
+    obj, errs = from_file(StringIO(binary))
+    assert len(errs) == 1
+    assert isinstance(errs[0], SchemaVersionError)
+    assert obj.application._name == 'EmptyGangaObject'
+
+
+def test_binary_corrupt_file():
+    """Test that a damaged file raises an error the repository falls back from"""
+    binary = _to_string(_make_job(), to_file)
+    with pytest.raises(BinaryFileError):
+        from_file(StringIO(binary[:len(binary) // 2]))
+    assert isinstance(BinaryFileError(None, ''), VStreamer.XMLFileError)
+
+
+def test_convert_repository(tmpdir):
+    """Test that the data files of a repository are converted and everything else copied"""
+    src = tmpdir.join('LocalXML', '6.0')
+    job_dir = src.join('jobs', '0xxx', '0')
+    job_dir.ensure(dir=True)
+    job_dir.join('data').write(_to_string(_make_job(), VStreamer.to_file))
+    job_dir.join('data~').write(_to_string(_make_job(), VStreamer.to_file))
+    src.join('jobs', '0xxx', '0.index').write('index')
+    src.join('jobs', 'index.store').write('store')
+    src.join('session.locks').write('lock')
+
+    dest = tmpdir.join('LocalBinary', '6.0')
+    assert convert_repository(str(src), str(dest)) == 2
+
+    new_dir = dest.join('jobs', '0xxx', '0')
+    for fn in ('data', 'data~'):
+        with open(str(new_dir.join(fn))) as fobj:
+            obj, errs = from_file(fobj)
+        assert errs == []
+        assert obj.name == _make_job().name
+    assert dest.join('jobs', '0xxx', '0.index').read() == 'index'
+    assert not dest.join('jobs', 'index.store').check()
+    assert not dest.join('session.locks').check()
@@ -0,0 +1,88 @@
+import os
+
+try:
+    from unittest.mock import patch, Mock
+except ImportError:
+    from mock import patch, Mock
+
+from Ganga.Lib.Condor.CondorStatus import parseJobs, takeSnapshot
+
+_queue = '\n'.join([
+    'schedd#10.0#1 10.0 host=slot1@node1 cpu=12.000000 2',
+    'schedd#11.0#1 11.0 cpu=0.000000 1',
+    'schedd#12.0#1 12.0 5',
+])
+
+_history = 'schedd#13.0#1 13.0 host=slot2@node2 cpu=30.000000 4'
+
+
+def _condor(queue=_queue, history=_history):
+    """ Stands in for commands.getstatusoutput running condor_q and condor_history """
+    def run(command):
+        if command.startswith('condor_q'):
+            return 0, queue
+        return 0, history
+    return Mock(side_effect=run)
+
+
+def test_parseJobs():
+    jobs = parseJobs(_queue + '\n\nnot a job\n')
+    assert [job['id'] for job in jobs] == ['schedd#10.0#1', 'schedd#11.0#1', 'schedd#12.0#1']
+    assert jobs[0] == {'id': 'schedd#10.0#1', 'localId': '10.0', 'status': 'Running', 'cputime': '12.000000', 'host': 'slot1@node1'}
+    assert jobs[1]['host'] == '' and jobs[1]['status'] == 'Idle'
+    assert jobs[2]['cputime'] == '' and jobs[2]['status'] == 'Held'
+
+
+def test_takeSnapshot():
+    """Test that one condor_q and one condor_history are run for all of the jobs"""
+    with patch('commands.getstatusoutput', _condor()) as run:
+        snapshot = takeSnapshot(['schedd#10.0#1', '11.0', 'schedd#13.0#1', '14.0'], True)
+    assert run.call_count == 2
+    assert run.call_args_list[0][0][0].startswith('condor_q -global')
+    assert "-constraint 'ClusterId == 13 || ClusterId == 14'" in run.call_args_list[1][0][0]
+
+    assert snapshot.globalId('schedd#10.0#1') == 'schedd#10.0#1'
+    assert snapshot.globalId('11.0') == 'schedd#11.0#1'
+    assert snapshot.globalId('14.0') is None
+    assert snapshot.globalId('other#11.0#1') is None
+    assert snapshot.finished['schedd#13.0#1']['status'] == 'Completed'
+
+    with patch('commands.getstatusoutput', _condor()) as run:
+        takeSnapshot(['schedd#10.0#1'], False)
+    assert run.call_count == 1
+    assert run.call_args_list[0][0][0].startswith('condor_q -format')
+
+    with patch('commands.getstatusoutput', return_value=(1, 'Failed to connect')):
+        assert takeSnapshot(['schedd#10.0#1'], True) is None
+
+
+def _job(condor_id, outDir):
+    job = Mock(status='submitted', fqid=condor_id)
+    job.backend = Mock(id=condor_id, status='', actualCE='', cputime='', _global_id='', _stdout_check_time=0)
+    job.getOutputWorkspace.return_value.getPath.return_value = outDir
+    return job
+
+
+def test_updateMonitoringInformation(tmpdir):
+    """Test that the jobs are updated from the snapshot, and the global id of a job submitted with its local id is kept"""
+    from Ganga.Lib.Condor.Condor import Condor
+
+    finished = tmpdir.mkdir('finished')
+    finished.join('stdout').write('output\n' * 10000 + 'Exit code: 0\n')
+    running, local, done = _job('schedd#10.0#1', ''), _job('11.0', ''), _job('schedd#13.0#1', str(finished) + os.sep)
+
+    with patch('commands.getstatusoutput', _condor()) as run:
+        Condor.updateMonitoringInformation([running, local, done])
+    assert run.call_count == 2
+
+    running.updateStatus.assert_called_once_with('running')
+    assert running.backend.actualCE == 'slot1@node1'
+    assert running.backend.cputime == '12.000000'
+    assert local.backend.status == 'Idle'
+    assert local.backend._global_id == 'schedd#11.0#1'
+    done.updateStatus.assert_called_once_with('completed')
+    assert done.backend.actualCE == 'slot2@node2'
+
+    with patch('commands.getstatusoutput', _condor(queue=_queue.replace(' 1\n', ' 2\n'))):
+        Condor.updateMonitoringInformation([local])
+    local.updateStatus.assert_called_once_with('running')
@@ -316,3 +316,47 @@ class TestThreadSafeGangaObject(MultiThreadedTestCase):
                     assert o.b.a == num
 
         self.run_threads([change])
+
+
+class TestRoot(unittest.TestCase):
+
+    def test_cached_root(self):
+        """
+        The root of an object is cached, make sure it follows the object when it or one of its parents is given a new parent
+        """
+        o = ThreadedTestGangaObject()
+        o.b = ThreadedTestGangaObject()
+        o.b.b = ThreadedTestGangaObject()
+        leaf = o.b.b.b
+        assert leaf._getRoot() is o
+        assert leaf._getRoot() is o
+
+        other = ThreadedTestGangaObject()
+        o.b._setParent(other)
+        assert leaf._getRoot() is other
+        o.b._setParent(None)
+        assert leaf._getRoot() is o.b
+
+        # the first parent matching the condition is returned
+        assert leaf._getRoot(cond=lambda obj: isinstance(obj, ThreadedTestGangaObject)) is leaf._getParent()
+
+
+class TestProxyList(unittest.TestCase):
+
+    def test_changed_list_read_again(self):
+        """
+        A list attribute read through a proxy and then changed must not hide the stored list on the next read
+        """
+        from Ganga.GPIDev.Base.Proxy import addProxy
+        from Ganga.Lib.Executable.Executable import Executable
+        raw = Executable()
+        raw._data['args'] = ['a', 'b']
+        proxy = addProxy(raw)
+
+        args = proxy.args
+        args.append('c')
+        assert list(proxy.args) == ['a', 'b']
+        assert proxy.args is not args
+
+        raw._data['args'].append('d')
+        assert list(proxy.args) == ['a', 'b', 'd']
@@ -0,0 +1,127 @@
+import gzip
+import os
+
+import pytest
+
+try:
+    from unittest.mock import Mock
+except ImportError:
+    from mock import Mock
+
+from Ganga.GPIDev.Adapters.IPostProcessor import PostProcessException
+from Ganga.Lib.Mergers.IncrementalMerge import MergeProgress, foldJob, finishMerge
+
+
+class _Merger(object):
+
+    """ Stands in for a merger, appending or concatenating the files """
+
+    success = True
+
+    def __init__(self, append):
+        self.files = ['out.txt']
+        self.incremental_append = append
+        self.merges = []
+
+    def appendfiles(self, accumulator, file_list):
+        with open(accumulator, 'a') as out_file:
+            for f in file_list:
+                out_file.write(open(f).read())
+
+    def finishfiles(self, accumulator):
+        with open(accumulator, 'a') as out_file:
+            out_file.write('end\n')
+
+    def mergefiles(self, file_list, output_file):
+        self.merges.append(len(file_list))
+        with open(output_file, 'w') as out_file:
+            for f in file_list:
+                out_file.write(open(f).read())
+
+    def incrementalOutput(self, outputfile):
+        return outputfile
+
+
+def _subjobs(tmpdir, n):
+    jobs = []
+    for i in range(n):
+        outputdir = tmpdir.mkdir('sj%d' % i)
+        outputdir.join('out.txt').write('%d\n' % i)
+        jobs.append(Mock(id=i, fqid='0.%d' % i, status='completed', outputdir=str(outputdir) + os.sep))
+    return jobs
+
+
+@pytest.mark.parametrize('append', [True, False])
+def test_incremental(tmpdir, append):
+    """Test that subjobs are folded once each as they complete, and that finishing folds the rest"""
+    merger = _Merger(append)
+    outputdir = str(tmpdir.mkdir('master'))
+    jobs = _subjobs(tmpdir, 4)
+
+    for j in [jobs[2], jobs[0], jobs[2]]:
+        foldJob(merger, j, outputdir, False)
+    progress = MergeProgress(os.path.join(outputdir, '.incremental_merge'), 'out.txt')
+    assert progress.subjobs == [2, 0]
+    assert open(progress.accumulator()).read() == '2\n0\n'
+
+    assert finishMerge(merger, jobs, outputdir, False, False)
+    expected = '2\n0\n1\n3\n' + ('end\n' if append else '')
+    assert open(os.path.join(outputdir, 'out.txt')).read() == expected
+    assert sorted(os.listdir(outputdir)) == ['out.txt', 'out.txt.merge_summary']
+    if not append:
+        # the partial result and the file of the subjob are merged each time
+        assert merger.merges == [1, 2, 2, 2]
+
+
+def test_resume(tmpdir):
+    """Test that what was appended for a subjob which wasn't recorded is dropped"""
+    merger = _Merger(True)
+    outputdir = str(tmpdir.mkdir('master'))
+    jobs = _subjobs(tmpdir, 2)
+
+    foldJob(merger, jobs[0], outputdir, False)
+    progress = MergeProgress(os.path.join(outputdir, '.incremental_merge'), 'out.txt')
+    with open(progress.accumulator(), 'a') as accumulator:
+        accumulator.write('half written')
+
+    foldJob(merger, jobs[1], outputdir, False)
+    assert open(progress.accumulator()).read() == '0\n1\n'
+
+
+def test_failures(tmpdir):
+    """Test that failed subjobs and an existing output stop the merge unless told otherwise"""
+    merger = _Merger(True)
+    outputdir = str(tmpdir.mkdir('master'))
+    jobs = _subjobs(tmpdir, 2)
+    jobs[1].status = 'failed'
+
+    with pytest.raises(PostProcessException):
+        finishMerge(merger, jobs, outputdir, False, False)
+    tmpdir.join('master', 'out.txt').write('old')
+    with pytest.raises(PostProcessException):
+        finishMerge(merger, jobs, outputdir, True, False)
+    assert finishMerge(merger, jobs, outputdir, True, True)
+    assert tmpdir.join('master', 'out.txt').read() == '0\nend\n'
+
+
+@pytest.mark.parametrize('compress', [True, False])
+def test_text_merger_gzip(tmpdir, compress):
+    """Test that a TextMerger merging incrementally into a compressed file writes gzip"""
+    from Ganga.Lib.Mergers.Merger import TextMerger
+    merger = TextMerger()
+    merger.files = ['out.txt' if compress else 'out.txt.gz']
+    merger.compress = compress
+    outputdir = str(tmpdir.mkdir('master'))
+    jobs = _subjobs(tmpdir, 2)
+    if not compress:
+        for j in jobs:
+            with gzip.open(os.path.join(j.outputdir, 'out.txt.gz'), 'w') as out_file:
+                out_file.write('%d\n' % j.id)
+
+    foldJob(merger, jobs[1], outputdir, False)
+    assert finishMerge(merger, jobs, outputdir, False, False)
+
+    merged = gzip.open(os.path.join(outputdir, 'out.txt.gz')).read()
+    assert merged.startswith('# Ganga TextMergeTool')
+    assert merged.index('\n1\n') < merged.index('\n0\n')
+    assert merged.endswith('# Ganga Merge Ended Successfully #\n')
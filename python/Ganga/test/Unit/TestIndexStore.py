@@ -0,0 +1,127 @@
+from Ganga.Core.GangaRepository.IndexStore import IndexStore
+
+
+def test_index_store_replay(tmpdir):
+    """Test that the last record for each id wins and deletions are honoured"""
+
+    store = IndexStore(str(tmpdir.join('index.store')))
+    assert store.load() is None
+
+    store.append([IndexStore.make_set_record(i, 'jobs', 'Job', {'status': 'new'}, 1.) for i in range(10)])
+    store.append([IndexStore.make_set_record(3, 'jobs', 'Job', {'status': 'completed'}, 2.),
+                  IndexStore.make_del_record(5)])
+
+    entries = IndexStore(store.fn).load()
+
+    assert sorted(entries.keys()) == [0, 1, 2, 3, 4, 6, 7, 8, 9]
+    assert entries[3] == ('jobs', 'Job', {'status': 'completed'}, 2.)
+    assert entries[0] == ('jobs', 'Job', {'status': 'new'}, 1.)
+
+
+def test_index_store_torn_write(tmpdir):
+    """Test that a damaged or incomplete record doesn't lose the other records"""
+
+    store = IndexStore(str(tmpdir.join('index.store')))
+    store.append([IndexStore.make_set_record(i, 'jobs', 'Job', {}, 1.) for i in range(3)])
+
+    with open(store.fn, 'rb') as fobj:
+        data = fobj.read()
+    record_size = len(data) // 3
+
+    # Corrupt the payload of the middle record and add an incomplete record to the end
+    damaged = data[:record_size + 20] + 'X' + data[record_size + 21:] + data[:record_size // 2]
+    with open(store.fn, 'wb') as fobj:
+        fobj.write(damaged)
+
+    entries = store.load()
+    assert sorted(entries.keys()) == [0, 2]
+
+    # Appending after a torn write must still be readable
+    store.append([IndexStore.make_set_record(7, 'jobs', 'Job', {}, 1.)])
+    assert 7 in store.load()
+
+
+def test_index_store_rewrite(tmpdir):
+    """Test that compacting the store keeps only the live entries"""
+
+    store = IndexStore(str(tmpdir.join('index.store')))
+    for i in range(200):
+        store.append([IndexStore.make_set_record(i % 10, 'jobs', 'Job', {'n': i}, 1.)])
+
+    assert store.needs_compacting(10)
+
+    entries = store.load()
+    store.rewrite(entries)
+
+    assert store.n_records == 10
+    assert not store.needs_compacting(10)
+    assert store.load() == entries
+
+
+def test_index_store_read_changes(tmpdir):
+    """Test that a second reader of the store only sees the records appended since it last read"""
+
+    fn = str(tmpdir.join('index.store'))
+    writer = IndexStore(fn)
+    reader = IndexStore(fn)
+
+    writer.append([IndexStore.make_set_record(i, 'jobs', 'Job', {}, 1.) for i in range(5)])
+    assert len(reader.load()) == 5
+    assert reader.read_changes() == []
+
+    writer.append([IndexStore.make_set_record(2, 'jobs', 'Job', {'status': 'running'}, 1.),
+                   IndexStore.make_del_record(4)])
+    changes = reader.read_changes()
+    assert [record[:2] for record in changes] == [('set', 2), ('del', 4)]
+    assert reader.read_changes() == []
+
+    # Once the store has been replaced the reader has to load it again
+    writer.rewrite(writer.load())
+    assert reader.read_changes() is None
+    assert sorted(reader.load().keys()) == [0, 1, 2, 3]
+    assert reader.read_changes() == []
+
+
+def test_index_store_compact(tmpdir):
+    """Test that compacting keeps the records appended by another session and leaves no temporary files"""
+
+    fn = str(tmpdir.join('index.store'))
+    store = IndexStore(fn)
+    other = IndexStore(fn)
+    for i in range(50):
+        store.append([IndexStore.make_set_record(i % 5, 'jobs', 'Job', {'n': i}, 1.)])
+    store.load()
+
+    # Appended after this session last read the store
+    other.append([IndexStore.make_set_record(9, 'jobs', 'Job', {}, 1.)])
+
+    assert store.compact() == 6
+    assert store.n_records == 6
+    assert sorted(IndexStore(fn).load().keys()) == [0, 1, 2, 3, 4, 9]
+    assert sorted(tmpdir.listdir(lambda path: path.basename.endswith('.new'))) == []
+
+
+def test_index_store_mark(tmpdir):
+    """Test that the mark of the store is read back, kept when compacting and doesn't add an entry"""
+
+    fn = str(tmpdir.join('index.store'))
+    store = IndexStore(fn)
+    store.rewrite({1: ('jobs', 'Job', {}, 1.)}, (12, 3))
+
+    reader = IndexStore(fn)
+    assert sorted(reader.load().keys()) == [1]
+    assert reader.mark == (12, 3)
+
+    store.append([IndexStore.make_mark_record((12, 4))])
+    assert reader.read_changes() == [('mark', (12, 4))]
+    assert reader.mark == (12, 4)
+
+    assert reader.compact() == 1
+    assert IndexStore(fn).load() == {1: ('jobs', 'Job', {}, 1.)}
+    store.load()
+    assert store.mark == (12, 4)
+
+    # Rewriting without a mark drops it
+    store.rewrite(store.load())
+    reader.load()
+    assert reader.mark is None
@@ -0,0 +1,78 @@
+import datetime
+
+from Ganga.GPIDev.Lib.Job.JobTimeAggregate import JobTimeAggregate
+
+_start = datetime.datetime(2016, 1, 1)
+
+
+def _at(seconds):
+    return _start + datetime.timedelta(seconds=seconds)
+
+
+def test_update():
+    """Test that the counts, the earliest and latest stamps and the durations follow the status changes of the subjobs"""
+    aggregate = JobTimeAggregate()
+    for i in range(3):
+        aggregate.update(i, 'submitted', {'submitted': _at(i)})
+    aggregate.update(0, 'running', {'backend_running': _at(10)})
+    aggregate.update(1, 'running', {'submitted': _at(1), 'backend_running': _at(20)})
+    aggregate.update(0, 'completed', {'backend_final': _at(40), 'final': _at(41)})
+    aggregate.update(1, 'completed', {'backend_final': _at(80), 'final': _at(81)})
+
+    assert aggregate.counts() == {'completed': 2, 'submitted': 1}
+    assert aggregate.earliest('submitted') == _at(0)
+    assert aggregate.latest('submitted') == _at(2)
+    assert aggregate.latest('final') == _at(81)
+    assert aggregate.total('runtime') == datetime.timedelta(seconds=90)
+    assert aggregate.durationStats('runtime') == {'n': 2, 'min': datetime.timedelta(seconds=30),
+                                                  'mean': datetime.timedelta(seconds=45), 'max': datetime.timedelta(seconds=60)}
+    assert aggregate.durationStats('waittime')['max'] == datetime.timedelta(seconds=19)
+
+    # a subjob run again replaces its durations, updates don't count twice
+    aggregate.update(1, 'running', {'backend_running': _at(100)})
+    aggregate.update(1, 'completed', {'backend_final': _at(105)})
+    aggregate.update(1, 'completed', {'backend_final': _at(105)})
+    assert aggregate.counts() == {'completed': 2, 'submitted': 1}
+    assert aggregate.durationStats('runtime')['min'] == datetime.timedelta(seconds=5)
+    assert aggregate.durationStats('runtime')['max'] == datetime.timedelta(seconds=30)
+    assert aggregate.durationStats('waittime')['n'] == 2
+
+
+def test_resubmit():
+    """Test that the earliest and latest stamps move back with subjobs which are run again"""
+    aggregate = JobTimeAggregate()
+    for i in range(3):
+        aggregate.update(i, 'running', {'submitted': _at(i), 'backend_running': _at(10 + i)})
+    assert aggregate.earliest('submitted') == _at(0)
+    assert aggregate.latest('backend_running') == _at(12)
+
+    aggregate.update(0, 'submitted', {'submitted': _at(50)})
+    aggregate.update(2, 'running', {'backend_running': _at(5)})
+    assert aggregate.earliest('submitted') == _at(1)
+    assert aggregate.latest('submitted') == _at(50)
+    assert aggregate.earliest('backend_running') == _at(5)
+    assert aggregate.latest('backend_running') == _at(11)
+
+    # Many updates of the same subjobs give the same range
+    for n in range(100):
+        for i in range(3):
+            aggregate.update(i, 'submitted', {'submitted': _at(100 + n + i)})
+    assert aggregate.earliest('submitted') == _at(199)
+    assert aggregate.latest('submitted') == _at(201)
+    assert len(aggregate._ranges['submitted']._early) < 50
+
+
+def test_toDict():
+    """Test that an aggregate written to the index reads back the same"""
+    aggregate = JobTimeAggregate()
+    aggregate.update(0, 'completed', {'submitted': _at(0), 'backend_running': _at(5), 'backend_final': _at(9), 'final': _at(10)})
+    aggregate.update(1, 'failed', {'submitted': _at(3), 'final': _at(4)})
+
+    copy = JobTimeAggregate.fromDict(aggregate.toDict())
+    assert copy.toDict() == aggregate.toDict()
+    assert copy.counts() == {'completed': 1, 'failed': 1}
+    assert copy.latest('submitted') == _at(3)
+    assert copy.durationStats('runtime')['n'] == 1
+
+    assert JobTimeAggregate.fromDict({'version': -1}) is None
+    assert JobTimeAggregate.fromDict(None) is None
@@ -0,0 +1,123 @@
+import signal
+import sys
+import threading
+import time
+
+try:
+    from unittest.mock import patch
+except ImportError:
+    from mock import patch
+
+from Ganga.Lib.Localhost.LocalScheduler import LocalScheduler, availableMemory
+
+
+class _Process(object):
+
+    """ Stands in for a subprocess.Popen which runs until finish() is called """
+
+    pids = iter(range(100000, 200000))
+
+    def __init__(self, args):
+        self.args = args
+        self.pid = next(self.pids)
+        self.returncode = None
+        self._finished = threading.Event()
+        self._code = None
+
+    def finish(self, returncode=0):
+        self._code = returncode
+        self._finished.set()
+
+    def wait(self):
+        self._finished.wait()
+        self.returncode = self._code
+        return self.returncode
+
+
+class _Popen(object):
+
+    def __init__(self):
+        self.started = []
+
+    def __call__(self, args):
+        self.started.append(_Process(args))
+        return self.started[-1]
+
+
+def _wait_for(condition, timeout=5.):
+    end = time.time() + timeout
+    while not condition() and time.time() < end:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_slots():
+    """Test that no more than the maximum number of processes run at once and that queued jobs start as slots free"""
+    popen = _Popen()
+    scheduler = LocalScheduler(max_running=2, popen=popen)
+    for i in range(5):
+        scheduler.submit('job%s' % i, ['python', 'job%s' % i])
+    assert len(popen.started) == 2
+    assert len(scheduler) == 5
+    assert scheduler.pid('job1') == popen.started[1].pid
+    assert scheduler.isQueued('job2')
+    assert scheduler.pid('job2') is None
+
+    popen.started[0].finish()
+    assert _wait_for(lambda: len(popen.started) == 3)
+    assert popen.started[2].args == ['python', 'job2']
+    assert scheduler.returncode(popen.started[0].pid) == (True, 0)
+    assert scheduler.returncode(popen.started[1].pid) == (False, None)
+    assert scheduler.owns(popen.started[0].pid)
+
+    # A queued job is removed, a running one is killed
+    assert scheduler.cancel('job3')
+    assert not scheduler.cancel('job1')
+    with patch('os.kill', side_effect=lambda pid, sig: popen.started[1].finish(-sig)) as kill:
+        assert scheduler.kill('job1')
+    kill.assert_called_once_with(-popen.started[1].pid, signal.SIGKILL)
+    assert scheduler.returncode(popen.started[1].pid) == (True, -9)
+    assert _wait_for(lambda: len(popen.started) == 4)
+    assert popen.started[3].args == ['python', 'job4']
+    assert not scheduler.kill('job3')
+
+    # Forgotten processes are dropped once they have finished
+    scheduler.forget('job0')
+    assert not scheduler.owns(popen.started[0].pid)
+    scheduler.forget('job2')
+    assert scheduler.owns(popen.started[2].pid)
+    popen.started[2].finish(1)
+    assert _wait_for(lambda: not scheduler.owns(popen.started[2].pid))
+
+
+def test_memory(tmpdir):
+    """Test that the memory available is read from /proc/meminfo and that jobs wait for enough to be free"""
+    meminfo = tmpdir.join('meminfo')
+    meminfo.write('MemTotal:  8000000 kB\nMemFree:  1000000 kB\nMemAvailable:  2048000 kB\n')
+    assert availableMemory(str(meminfo)) == 2000
+    meminfo.write('MemTotal:  8000000 kB\nMemFree:  1024000 kB\nBuffers: 1024 kB\nCached: 1023 kB\n')
+    assert availableMemory(str(meminfo)) == 1001
+    assert availableMemory(str(tmpdir.join('missing'))) is None
+
+    popen = _Popen()
+    available = availableMemory()
+    if available is None:
+        return
+    # The first job always starts, the others wait for more memory than there is
+    scheduler = LocalScheduler(min_free_memory=available * 10, popen=popen)
+    scheduler.submit('job0', ['job0'])
+    scheduler.submit('job1', ['job1'])
+    assert len(popen.started) == 1
+    popen.started[0].finish()
+    assert _wait_for(lambda: len(popen.started) == 2)
+
+
+def test_processes():
+    """Test that real processes are reaped with their return codes"""
+    scheduler = LocalScheduler(max_running=1)
+    scheduler.submit('ok', [sys.executable, '-c', 'pass'])
+    scheduler.submit('bad', [sys.executable, '-c', 'import sys; sys.exit(3)'])
+    assert _wait_for(lambda: scheduler.pid('bad') is not None)
+    assert _wait_for(lambda: scheduler.returncode(scheduler.pid('bad'))[0])
+    assert scheduler.returncode(scheduler.pid('ok')) == (True, 0)
+    assert scheduler.returncode(scheduler.pid('bad')) == (True, 3)
@@ -0,0 +1,93 @@
+import gzip
+import os
+import threading
+from StringIO import StringIO
+
+import pytest
+
+from Ganga.GPIDev.Adapters.IPostProcessor import PostProcessException
+from Ganga.Lib.Mergers.MergeTree import copyFile, mergeInTree
+
+
+def test_copyFile(tmpdir):
+    in_file = StringIO('a' * 10 + 'b')
+    out_file = StringIO()
+    assert copyFile(in_file, out_file, chunk_size=3) == 'b'
+    assert out_file.getvalue() == 'a' * 10 + 'b'
+    assert copyFile(StringIO(''), out_file) == ''
+
+    compressed = str(tmpdir.join('in.gz'))
+    with gzip.GzipFile(compressed, 'w') as f:
+        f.write('line\n' * 1000)
+    out_file = StringIO()
+    in_file = gzip.GzipFile(compressed)
+    copyFile(in_file, out_file, chunk_size=7)
+    in_file.close()
+    assert out_file.getvalue() == 'line\n' * 1000
+
+
+class _Concatenate(object):
+
+    """ Stands in for hadd, records the size of each merge and the most merges running at once """
+
+    def __init__(self):
+        self.sizes = []
+        self.running = 0
+        self.most_running = 0
+        self.lock = threading.Lock()
+        self.entered = threading.Event()
+
+    def __call__(self, file_list, output_file):
+        with self.lock:
+            self.sizes.append(len(file_list))
+            self.running += 1
+            self.most_running = max(self.most_running, self.running)
+            if self.running > 1:
+                self.entered.set()
+        # give the other workers the chance to start a merge too
+        self.entered.wait(0.1)
+        with open(output_file, 'w') as out_file:
+            for name in file_list:
+                with open(name) as in_file:
+                    copyFile(in_file, out_file)
+        with self.lock:
+            self.running -= 1
+
+
+def _inputs(tmpdir, n_files):
+    names = []
+    for i in range(n_files):
+        f = tmpdir.join('in_%03d.txt' % i)
+        f.write('%d\n' % i)
+        names.append(str(f))
+    return names
+
+
+def test_mergeInTree(tmpdir):
+    """Test that the files are merged in groups at the same time, in order, and that the partial results are removed"""
+    merge = _Concatenate()
+    output_file = str(tmpdir.mkdir('out').join('merged.txt'))
+    mergeInTree(merge, _inputs(tmpdir, 23), output_file, fan_in=4, workers=2)
+
+    assert open(output_file).read() == ''.join('%d\n' % i for i in range(23))
+    # 23 files -> 6 partials -> 2 partials -> output
+    assert sorted(merge.sizes) == sorted([4] * 5 + [3] + [4, 2] + [2])
+    assert merge.most_running == 2
+    assert os.listdir(os.path.dirname(output_file)) == ['merged.txt']
+
+    merge = _Concatenate()
+    mergeInTree(merge, _inputs(tmpdir, 4), output_file, fan_in=4, workers=2)
+    assert merge.sizes == [4]
+    mergeInTree(merge, _inputs(tmpdir, 10), output_file, fan_in=0, workers=2)
+    assert merge.sizes == [4, 10]
+
+
+def test_mergeInTree_failure(tmpdir):
+    """Test that a failed partial merge fails the whole merge"""
+    def merge(file_list, output_file):
+        raise PostProcessException('hadd failed')
+
+    output_file = str(tmpdir.mkdir('out').join('merged.txt'))
+    with pytest.raises(PostProcessException):
+        mergeInTree(merge, _inputs(tmpdir, 10), output_file, fan_in=3, workers=3)
+    assert os.listdir(os.path.dirname(output_file)) == []
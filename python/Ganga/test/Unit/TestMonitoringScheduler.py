@@ -0,0 +1,96 @@
+from Ganga.Core.MonitoringComponent.MonitoringScheduler import ActiveJobs, MonitoringScheduler
+from Ganga.Utility.Config import getConfig
+
+
+class _Clock(object):
+
+    def __init__(self):
+        self.now = 1000.
+
+    def __call__(self):
+        return self.now
+
+
+def test_active_jobs():
+    """Test that jobs are added and removed as they change status"""
+    active = ActiveJobs()
+    active.reset([(0, 'Local', 'running'), (1, 'Dirac', 'completed'), (2, 'Dirac', 'submitted')])
+    assert active.seeded
+    assert active.backends() == {'Local': [0], 'Dirac': [2]}
+
+    active.update(1, 'Dirac', 'submitted')
+    active.update(0, 'Local', 'completed')
+    assert active.backends() == {'Dirac': [1, 2]}
+
+    active.discard(2)
+    assert active.backends() == {'Dirac': [1]}
+    assert len(active) == 1
+
+    active.invalidate()
+    assert not active.seeded
+
+
+def test_scheduler_intervals():
+    """Test that backends are checked at their poll rate, which grows while nothing changes and backs off on failure"""
+    config = getConfig('PollThread')
+    base = config['Local']
+    clock = _Clock()
+    scheduler = MonitoringScheduler(clock)
+
+    # A backend which hasn't been seen is due at once and not again until its check completes
+    assert scheduler.due(['Local']) == ['Local']
+    assert scheduler.due(['Local']) == []
+    assert scheduler.next_check() is None
+
+    # Nothing changed so the interval grows
+    scheduler.completed('Local')
+    assert scheduler.interval('Local') == base * config['backend_poll_growth']
+    assert scheduler.next_check() == clock.now + scheduler.interval('Local')
+    clock.now += base
+    assert scheduler.due(['Local']) == []
+
+    # A job changed status so the interval goes back to the poll rate of the backend
+    clock.now = scheduler.next_check()
+    assert scheduler.due(['Local']) == ['Local']
+    scheduler.changed('Local')
+    scheduler.completed('Local')
+    assert scheduler.interval('Local') == base
+
+    # Failures back off up to the longest interval
+    for _ in range(20):
+        clock.now = scheduler.next_check()
+        assert scheduler.due(['Local']) == ['Local']
+        scheduler.completed('Local', failed=True)
+    assert scheduler.interval('Local') == config['max_backend_poll_rate']
+
+    # Submitting a job brings the next check forward
+    scheduler.changed('Local', reschedule=True)
+    assert scheduler.next_check() == clock.now + base
+
+    # Backends without jobs to check are dropped from the queue
+    clock.now = scheduler.next_check()
+    assert scheduler.due([]) == []
+    assert scheduler.next_check() is None
+
+    # Running the monitoring on demand makes every backend due
+    scheduler.completed('Local')
+    scheduler.reset()
+    assert scheduler.due(['Local']) == ['Local']
+
+
+def test_scheduler_expedite():
+    """Test that a backend whose status files have changed is due at once, or once the check in progress completes"""
+    clock = _Clock()
+    scheduler = MonitoringScheduler(clock)
+    assert scheduler.due(['Local']) == ['Local']
+    scheduler.completed('Local')
+
+    scheduler.expedite('Local')
+    assert scheduler.next_check() == clock.now
+    assert scheduler.due(['Local']) == ['Local']
+
+    scheduler.expedite('Local')
+    assert scheduler.next_check() is None
+    scheduler.completed('Local')
+    assert scheduler.interval('Local') == getConfig('PollThread')['Local']
+    assert scheduler.due(['Local']) == ['Local']
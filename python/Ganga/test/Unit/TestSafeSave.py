@@ -33,3 +33,35 @@ def test_safe_save_threadcalls():
     assert os.path.isfile(testfn+'~')
     os.remove(testfn+'~')
     assert not os.path.isfile(testfn+'.new')
+
+
+def test_safe_save_written_and_fsync():
+    """Test that the names of the files written are collected so a batch can be synced at once"""
+
+    from Ganga.Core.GangaRepository.GangaRepositoryXML import safe_save, fsync_files
+
+    def my_to_file(obj, fhandle, ignore_subs):
+        fhandle.write("!" * 10)
+
+    testdir = '/tmp/xmltest.dir' + str(uuid.uuid4())
+    testfns = [os.path.join(testdir, str(i), 'data') for i in range(10)]
+
+    o = LocalFile()
+    written = []
+    ths = [threading.Thread(target=safe_save, args=(fn, o, my_to_file, '', written)) for fn in testfns]
+
+    for th in ths:
+        th.start()
+
+    for th in ths:
+        th.join()
+
+    assert sorted(written) == sorted(testfns)
+    fsync_files(written + [os.path.join(testdir, 'missing')])
+
+    for fn in testfns:
+        with open(fn) as handle:
+            assert handle.read() == "!" * 10
+        os.remove(fn)
+        os.rmdir(os.path.dirname(fn))
+    os.rmdir(testdir)
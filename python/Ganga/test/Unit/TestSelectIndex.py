@@ -0,0 +1,49 @@
+import re
+import fnmatch
+
+from Ganga.GPIDev.Lib.Registry.SelectIndex import SelectIndex
+
+
+class _Obj(object):
+
+    def __init__(self, cache, loaded=False):
+        self._index_cache_dict = cache
+        self.loaded = loaded
+
+
+def _make_index(objects):
+    index = SelectIndex({'status': 'status', 'backend': 'select:backend', 'time_created': 'select:time_created'})
+    index.refresh(objects, lambda obj: obj.loaded)
+    return index
+
+
+def test_select_index_lookup():
+    """Test that objects are selected from the index and that loaded objects and old caches are left to be checked"""
+    objects = {0: _Obj({'status': 'failed', 'select:backend': 'Dirac', 'select:time_created': 1}),
+               1: _Obj({'status': 'completed', 'select:backend': 'Dirac', 'select:time_created': 2}),
+               2: _Obj({'status': 'failed', 'select:backend': 'Local', 'select:time_created': 3}),
+               3: _Obj({'status': 'failed'}),
+               4: _Obj({}, loaded=True)}
+    index = _make_index(objects)
+
+    assert index.select({'status': 'failed', 'backend': 'Dirac'}) == {0: set(), 3: set(['backend']), 4: set(['status', 'backend'])}
+    assert sorted(index.select({'status': re.compile(fnmatch.translate('*ed'))})) == [0, 1, 2, 3, 4]
+    assert index.select_range('time_created', 2, None) == (set([1, 2]), set([3, 4]))
+
+
+def test_select_index_refresh():
+    """Test that only objects which have changed are indexed again"""
+    objects = {0: _Obj({'status': 'failed'}), 1: _Obj({'status': 'new'})}
+    index = _make_index(objects)
+    assert sorted(index.select({'status': 'failed'})) == [0]
+
+    objects[1]._index_cache_dict = {'status': 'failed'}
+    objects[0].loaded = True
+    objects[2] = _Obj({'status': 'failed'})
+    index.refresh(objects, lambda obj: obj.loaded)
+    assert index.select({'status': 'failed'}) == {0: set(['status']), 1: set(), 2: set()}
+
+    del objects[1]
+    index.refresh(objects, lambda obj: obj.loaded)
+    assert sorted(index.select({'status': 'failed'})) == [0, 2]
+    assert index.select({'status': 'new'}) == {0: set(['status'])}
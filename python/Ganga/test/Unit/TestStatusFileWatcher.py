@@ -0,0 +1,99 @@
+import threading
+
+import pytest
+
+from Ganga.Core.MonitoringComponent.StatusFileWatcher import StatusFileWatcher, _isRemote
+
+
+@pytest.yield_fixture(params=[True, False], ids=['events', 'polling'])
+def watcher(request):
+    this_watcher = StatusFileWatcher(useEvents=request.param)
+    if request.param and not this_watcher.usingEvents:
+        pytest.skip('inotify is not available')
+    yield this_watcher
+    this_watcher.close()
+
+
+def _write(directory, name, text):
+    with open(str(directory.join(name)), 'a') as this_file:
+        this_file.write(text)
+
+
+def test_statusChanged(watcher, tmpdir):
+    """Test that a status file is only reported as changed when it has been written to"""
+    outdir = tmpdir.mkdir('out')
+    changed = threading.Event()
+    watcher.addListener(lambda backend_name: changed.set())
+
+    assert watcher.statusChanged(str(outdir), 'Localhost')
+    assert not watcher.statusChanged(str(outdir), 'Localhost')
+
+    _write(outdir, 'stdout', 'output\n')
+    _write(outdir, '__jobstatus__', 'PID: 1234\n')
+    if watcher.usingEvents:
+        assert changed.wait(5)
+    assert watcher.statusChanged(str(outdir), 'Localhost')
+    assert not watcher.statusChanged(str(outdir), 'Localhost')
+
+    changed.clear()
+    _write(outdir, '__jobstatus__', 'EXITCODE: 0\n')
+    if watcher.usingEvents:
+        assert changed.wait(5)
+    assert watcher.statusChanged(str(outdir), 'Localhost')
+
+    watcher.forget(str(outdir))
+    assert watcher.statusChanged(str(outdir), 'Localhost')
+
+
+def test_lastModified(watcher, tmpdir):
+    outdir = tmpdir.mkdir('out')
+    assert watcher.lastModified(str(outdir)) is None
+    watcher.statusChanged(str(outdir), 'Batch')
+    _write(outdir, '__heartbeat__', '.')
+    assert watcher.lastModified(str(outdir)) is not None
+
+
+def test_listener(tmpdir):
+    """Test that the listeners are called with the backend of a job whose status file has been written"""
+    watcher = StatusFileWatcher()
+    if not watcher.usingEvents:
+        pytest.skip('inotify is not available')
+    try:
+        outdirs = [tmpdir.mkdir('out%s' % i) for i in range(3)]
+        backends = [[], threading.Event()]
+
+        def listener(backend_name):
+            backends[0].append(backend_name)
+            backends[1].set()
+        watcher.addListener(listener)
+        for outdir, backend_name in zip(outdirs, ['Localhost', 'LSF', 'PBS']):
+            watcher.statusChanged(str(outdir), backend_name)
+
+        _write(outdirs[0], '__heartbeat__', '.')
+        _write(outdirs[1], '__jobstatus__', 'EXITCODE: 0\n')
+        assert backends[1].wait(5)
+        assert backends[0] == ['LSF']
+
+        # The watch is dropped along with the workspace
+        outdirs[2].remove()
+        outdirs[1].remove()
+        for _ in range(50):
+            if not watcher._directories.get(str(outdirs[2])):
+                break
+            threading.Event().wait(0.1)
+        assert str(outdirs[2]) not in watcher._directories
+    finally:
+        watcher.close()
+
+
+def test_isRemote(tmpdir):
+    mounts = tmpdir.join('mounts')
+    mounts.write('\n'.join(['/dev/sda1 / ext4 rw 0 0',
+                            'server:/home /home nfs4 rw 0 0',
+                            '/dev/sdb1 /home/local xfs rw 0 0',
+                            'sshfs#host: /mnt/remote fuse.sshfs rw 0 0']))
+    assert not _isRemote('/data/gangadir', str(mounts))
+    assert _isRemote('/home/user/gangadir', str(mounts))
+    assert not _isRemote('/home/local/gangadir', str(mounts))
+    assert _isRemote('/mnt/remote/gangadir', str(mounts))
+    assert _isRemote('/data', str(tmpdir.join('missing')))
@@ -0,0 +1,64 @@
+import pytest
+
+from Ganga.Core.GangaRepository.SubJobContainer import SubJobContainer, SubJobContainerError
+
+
+def test_container_write_read(tmpdir):
+    """Test that only the written subjobs change and that the previous data is kept as a backup"""
+
+    container = SubJobContainer(str(tmpdir.join('subjobs.pack')))
+    assert not container.exists()
+    assert len(container) == 0
+
+    container.write(dict((i, 'subjob %s' % i) for i in range(5)))
+    assert len(container) == 5
+
+    size = tmpdir.join('subjobs.pack').size()
+    container.write({2: 'subjob 2 updated'})
+    # Only the record of the one subjob and the offset table are added
+    assert tmpdir.join('subjobs.pack').size() - size < 200
+
+    reader = SubJobContainer(container.fn)
+    assert [reader.read(i) for i in range(5)] == ['subjob 0', 'subjob 1', 'subjob 2 updated', 'subjob 3', 'subjob 4']
+    assert reader.read(2, backup=True) == 'subjob 2'
+
+    with pytest.raises(SubJobContainerError):
+        reader.read(0, backup=True)
+    with pytest.raises(SubJobContainerError):
+        reader.read(5)
+
+
+def test_container_damaged_table(tmpdir):
+    """Test that the subjobs can still be found if the offset table is damaged"""
+
+    container = SubJobContainer(str(tmpdir.join('subjobs.pack')))
+    container.write(dict((i, 'subjob %s' % i) for i in range(3)))
+    container.write({1: 'subjob 1 updated'})
+
+    # Damage the last byte of the offset table
+    with open(container.fn, 'r+b') as fobj:
+        fobj.seek(-1, 2)
+        fobj.write('X')
+
+    reader = SubJobContainer(container.fn)
+    assert len(reader) == 3
+    assert reader.read(1) == 'subjob 1 updated'
+    assert reader.read(1, backup=True) == 'subjob 1'
+
+
+def test_container_truncate_and_compact(tmpdir):
+    """Test that compacting drops superseded records and truncating drops subjobs"""
+
+    container = SubJobContainer(str(tmpdir.join('subjobs.pack')))
+    container.write(dict((i, 'x' * 1000) for i in range(10)))
+    for _ in range(5):
+        container.write(dict((i, 'y' * 1000) for i in range(10)))
+    size = tmpdir.join('subjobs.pack').size()
+
+    container.compact()
+    assert tmpdir.join('subjobs.pack').size() < size / 3
+    assert [container.read(i) for i in range(10)] == ['y' * 1000] * 10
+
+    container.truncate(4)
+    assert len(container) == 4
+    assert container.read(3) == 'y' * 1000
@@ -0,0 +1,102 @@
+import datetime
+import threading
+import time
+
+from Ganga.Core.GangaRepository.SubJobStatusLog import SubJobStatusLog
+
+
+def _states(entries):
+    """ The status and timestamps of the entries, without the time they were logged """
+    return dict((index, entry[:2]) for index, entry in entries.iteritems())
+
+
+def test_status_log_append_read(tmpdir):
+    """Test that the latest status of each subjob is read back, including lines appended after the first read"""
+
+    t0 = datetime.datetime(2016, 1, 1, 12, 0, 0, 123456)
+    t1 = datetime.datetime(2016, 1, 1, 13, 0, 0)
+
+    log = SubJobStatusLog(str(tmpdir.join('subjobs.status')))
+    assert not log.exists()
+    assert log.read() == {}
+
+    log.append(0, 'running', {'running': t0, 'backend_running': t0})
+    log.append(1, 'running', {'running': t0})
+
+    reader = SubJobStatusLog(log.fn)
+    assert _states(reader.read()) == {0: ('running', {'running': t0, 'backend_running': t0}), 1: ('running', {'running': t0})}
+
+    log.append(0, 'completing', {'completing': t1})
+    assert reader.read()[0][:2] == ('completing', {'running': t0, 'backend_running': t0, 'completing': t1})
+
+    # A partially written line is ignored until it is complete
+    with open(log.fn, 'a') as fobj:
+        fobj.write('1 completing')
+    assert reader.read()[1][:2] == ('running', {'running': t0})
+    with open(log.fn, 'a') as fobj:
+        fobj.write('\n')
+    assert reader.read()[1][:2] == ('completing', {'running': t0})
+
+
+def test_status_log_discard(tmpdir):
+    """Test that the entries of subjobs which have been written in full are dropped"""
+
+    t0 = datetime.datetime(2016, 1, 1, 12, 0, 0)
+
+    log = SubJobStatusLog(str(tmpdir.join('subjobs.status')))
+    for i in range(3):
+        log.append(i, 'running', {'running': t0})
+        log.append(i, 'completing', {})
+
+    log.discard([1, 5])
+    assert _states(SubJobStatusLog(log.fn).read()) == {0: ('completing', {'running': t0}), 2: ('completing', {'running': t0})}
+    assert len(tmpdir.join('subjobs.status').readlines()) == 2
+
+    log.discard([0, 2])
+    assert not log.exists()
+    assert log.read() == {}
+
+
+def test_status_log_discard_before(tmpdir):
+    """Test that entries logged after the subjobs were written are kept, and that lines without a logged time are read"""
+
+    t0 = datetime.datetime(2016, 1, 1, 12, 0, 0)
+
+    log = SubJobStatusLog(str(tmpdir.join('subjobs.status')))
+    with open(log.fn, 'a') as fobj:
+        fobj.write('0 running running=2016-01-01T12:00:00.000000\n')
+    assert log.read() == {0: ('running', {'running': t0}, 0.)}
+
+    log.append(1, 'running', {'running': t0})
+    written = time.time()
+    log.append(2, 'running', {'running': t0})
+    assert written <= log.read()[2][2]
+
+    log.discard([0, 1, 2], before=written)
+    assert _states(SubJobStatusLog(log.fn).read()) == {2: ('running', {'running': t0})}
+
+
+def test_status_log_concurrent_discard(tmpdir):
+    """Test that no change appended while the log is being rewritten is lost"""
+
+    fn = str(tmpdir.join('subjobs.status'))
+    n = 200
+
+    def append(first):
+        log = SubJobStatusLog(fn)
+        for index in range(first, first + n):
+            log.append(index, 'running', {})
+
+    writers = [threading.Thread(target=append, args=(first,)) for first in (1, 1 + n)]
+    for writer in writers:
+        writer.start()
+    # Another session rewrites the log while the changes are appended
+    log = SubJobStatusLog(fn)
+    while any(writer.is_alive() for writer in writers):
+        log.append(0, 'running', {})
+        log.discard([0])
+    for writer in writers:
+        writer.join()
+
+    assert sorted(SubJobStatusLog(fn).read()) == range(1, 1 + 2 * n)
+    assert [name.basename for name in tmpdir.listdir()] == ['subjobs.status']
@@ -0,0 +1,97 @@
+import threading
+import time
+
+from Ganga.GPIDev.Adapters.SubmissionEngine import SubmissionEngine
+from Ganga.Utility.Config import getConfig
+
+
+def test_results_in_order():
+    """Test that the results come back in the order of the tasks whatever order they finish in"""
+    def task(i):
+        def run():
+            time.sleep(0.01 * (5 - i))
+            if i == 3:
+                raise ValueError('bad subjob')
+            return i != 2
+        return run
+
+    tasks = [(str(i), task(i)) for i in range(5)]
+    results = SubmissionEngine('Test', num_threads=5, progress_interval=0).run(tasks, keep_going=True)
+
+    assert [r.name for r in results] == ['0', '1', '2', '3', '4']
+    assert all(r.attempted for r in results)
+    assert [r.result for r in results] == [True, True, False, None, True]
+    assert isinstance(results[3].error, ValueError)
+    assert all(r.error is None for r in results if r.name != '3')
+
+
+def test_stop_on_failure():
+    """Test that no further tasks are started once one fails unless keep_going is set"""
+    started = []
+
+    def task(i):
+        def run():
+            started.append(i)
+            return i != 1
+        return run
+
+    tasks = [(str(i), task(i)) for i in range(10)]
+    results = SubmissionEngine('Test', num_threads=1, progress_interval=0).run(tasks, keep_going=False)
+
+    assert started == [0, 1]
+    assert [r.attempted for r in results] == [True, True] + [False] * 8
+
+
+def test_backend_limits():
+    """Test that the tasks against a backend share its limit on threads and rate across engines"""
+    config = getConfig('Submission')
+    config.setSessionValue('BackendMaxThreads', {'TestLimitedBackend': 2})
+    config.setSessionValue('BackendMaxRate', {'TestLimitedBackend': 50.})
+    try:
+        lock = threading.Lock()
+        running = [0]
+        most_running = [0]
+        start_times = []
+
+        def run():
+            with lock:
+                start_times.append(time.time())
+                running[0] += 1
+                most_running[0] = max(most_running[0], running[0])
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+            return True
+
+        tasks = [(str(i), run) for i in range(10)]
+        engines = [SubmissionEngine('Test', 'TestLimitedBackend', num_threads=4, progress_interval=0) for _ in range(2)]
+        threads = [threading.Thread(target=engine.run, args=(tasks,)) for engine in engines]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(start_times) == 20
+        assert most_running[0] <= 2
+        # 20 tasks at no more than 50 per second take at least 19 intervals of 0.02s
+        assert max(start_times) - min(start_times) >= 19 * 0.02 * 0.9
+    finally:
+        config.revertToDefault('BackendMaxThreads')
+        config.revertToDefault('BackendMaxRate')
+
+
+def test_no_progress_waits(monkeypatch):
+    """Test that the threads are waited for without a timeout when there's no progress to report"""
+    timeouts = []
+    join = threading.Thread.join
+
+    def recording_join(thread, timeout=None):
+        timeouts.append(timeout)
+        return join(thread, timeout)
+
+    monkeypatch.setattr(threading.Thread, 'join', recording_join)
+    tasks = [(str(i), lambda: time.sleep(0.05) or True) for i in range(2)]
+    results = SubmissionEngine('Test', num_threads=2, progress_interval=0).run(tasks)
+
+    assert all(r.result for r in results)
+    assert timeouts == [None, None]
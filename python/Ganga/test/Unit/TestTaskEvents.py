@@ -0,0 +1,81 @@
+try:
+    from unittest.mock import patch, Mock
+except ImportError:
+    from mock import patch, Mock
+
+from Ganga.GPIDev.Lib.Tasks.TaskEvents import TaskEvents
+
+
+class _Node(object):
+
+    """ Stands in for a task, transform or unit """
+
+    def __init__(self, node_id, parent=None, **attrs):
+        self.id = node_id
+        self.parent = parent
+        self.__dict__.update(attrs)
+
+    def _getParent(self):
+        return self.parent
+
+    def getID(self):
+        return self.id
+
+
+def _transform():
+    task = _Node(3)
+    trf = _Node(0, task)
+    trf.units = [_Node(0, trf, status='hold', active=True, active_job_ids=[]),
+                 _Node(1, trf, status='running', active=True, active_job_ids=[10]),
+                 _Node(2, trf, status='completed', active=True, active_job_ids=[11])]
+    return trf
+
+
+def _job_status(statuses):
+    return patch('Ganga.GPIDev.Lib.Tasks.TaskEvents._jobStatus', side_effect=lambda jid: statuses[jid])
+
+
+def test_scan():
+    """Test that the units of a transform are counted and those waiting to submit are pending"""
+    events = TaskEvents()
+    trf = _transform()
+    assert not events.isIdle(3, 0)
+    with _job_status({10: 'running', 11: 'completed'}):
+        events.scan(trf)
+    assert events.counts(3, 0) == {'hold': 1, 'running': 1, 'completed': 1}
+    assert events.pendingUnits(3, 0) == set([0])
+
+    trf.units[0].active = False
+    with _job_status({10: 'running', 11: 'completed'}):
+        events.unitUpdated(trf.units[0])
+    assert events.isIdle(3, 0)
+
+    events.unitStatusChanged(trf.units[1], 'running', 'completed')
+    assert events.counts(3, 0) == {'hold': 1, 'completed': 2}
+
+
+def test_jobStatusChanged():
+    """Test that a status change of the job of a unit marks the unit dirty and wakes the task loop"""
+    events = TaskEvents()
+    trf = _transform()
+    with _job_status({10: 'running', 11: 'completed'}):
+        events.scan(trf)
+    assert not events.wait(0)
+
+    events.jobStatusChanged(Mock(id=10, master=Mock()))
+    events.jobStatusChanged(Mock(id=12, master=None))
+    assert not events.wait(0)
+
+    events.jobStatusChanged(Mock(id=10, master=None))
+    assert events.wait(0)
+    assert events.takeDirty() == ({3: {0: set([1])}}, set())
+    assert events.takeDirty() == ({}, set())
+
+    # a unit whose job has finished stays pending until it has completed
+    with _job_status({10: 'failed', 11: 'completed'}):
+        events.unitUpdated(trf.units[1])
+    assert events.pendingUnits(3, 0) == set([0, 1])
+
+    events.requeue(3, 0, [2])
+    events.touchTask(4)
+    assert events.takeDirty() == ({3: {0: set([2])}}, set([4]))
@@ -0,0 +1,61 @@
+from cStringIO import StringIO
+
+from Ganga.Core.GangaRepository.VStreamer import ValueDecoder, StreamingLoader, to_file
+
+
+def test_value_decoder_literals():
+    """Test that literals are decoded safely and only immutable values are shared"""
+    decoder = ValueDecoder()
+
+    assert decoder.decode("'some_file.root'") == 'some_file.root'
+    assert decoder.decode("None") is None
+    assert decoder.decode("42") == 42
+
+    first = decoder.decode("['a', 'b']")
+    second = decoder.decode("['a', 'b']")
+    assert first == second == ['a', 'b']
+    assert first is not second
+
+
+def test_value_decoder_eval_fallback():
+    """Test that non-literal values are still evaluated in the config scope"""
+    import datetime
+    # datetime is added to the config scope by JobTime
+    import Ganga.GPIDev.Lib.Job.JobTime
+    decoder = ValueDecoder()
+
+    value = decoder.decode("datetime.datetime(2016, 1, 1, 0, 0)")
+    assert value == datetime.datetime(2016, 1, 1, 0, 0)
+
+
+def test_value_decoder_bounded_cache():
+    """Test that the cache of decoded values doesn't grow without bound"""
+    decoder = ValueDecoder(max_cache_size=10, max_cached_length=20)
+
+    for i in range(100):
+        decoder.decode("'value_%s'" % i)
+        assert len(decoder._cache) <= 10
+
+    decoder.decode(repr('x' * 100))
+    assert repr('x' * 100) not in decoder._cache
+
+
+def test_streaming_loader_round_trip():
+    """Test that the streaming loader constructs the object which was written"""
+    from Ganga.GPIDev.Lib.Job.Job import Job
+    from Ganga.GPIDev.Lib.File.LocalFile import LocalFile
+
+    j = Job()
+    j.name = 'streaming & <loading>'
+    j.outputfiles = [LocalFile('a.root'), LocalFile('b.root')]
+
+    sio = StringIO()
+    to_file(j, sio, 'subjobs')
+    sio.seek(0)
+    new_obj, new_errs = StreamingLoader().parse_file(sio)
+
+    assert new_errs == []
+    assert new_obj.name == 'streaming & <loading>'
+    assert [f.namePattern for f in new_obj.outputfiles] == ['a.root', 'b.root']
+    assert new_obj.application == j.application
+    assert new_obj.backend == j.backend
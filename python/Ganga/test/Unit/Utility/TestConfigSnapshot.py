@@ -0,0 +1,40 @@
+import pytest
+
+from Ganga.Utility.Config import makeConfig, ConfigError
+from Ganga.Utility.Config.Config import lateConfig
+
+
+@pytest.fixture
+def section():
+    with lateConfig():
+        section = makeConfig('TestConfigSnapshot', 'options for TestConfigSnapshot')
+        section.addOption('number', 1, 'a number')
+        section.addOption('SEARCH_PATH', 'a', 'a path')
+    return section
+
+
+def test_snapshot(section):
+    """Test that the snapshot is kept while nothing changes and follows every change"""
+    assert section['number'] == 1
+    snapshot = section._snapshot
+    assert section['number'] == 1
+    assert section._snapshot is snapshot
+
+    section.setSessionValue('number', 2)
+    assert section['number'] == 2
+    section.setUserValue('number', '3')
+    assert section['number'] == 3
+    section.revertToSession('number')
+    assert section['number'] == 2
+    section.revertToDefault('number')
+    assert section['number'] == 1
+    section.overrideDefaultValue('number', 4)
+    assert section.getEffectiveOptions()['number'] == 4
+
+    section.setSessionValue('SEARCH_PATH', 'b')
+    section.setUserValue('SEARCH_PATH', 'c')
+    assert section['SEARCH_PATH'] == section.options['SEARCH_PATH'].value
+    assert section['SEARCH_PATH'].startswith('c:b:')
+
+    with pytest.raises(ConfigError):
+        section['missing']
@@ -0,0 +1,83 @@
+import sys
+import types
+
+import pytest
+
+from Ganga.Utility.Plugin.GangaPlugin import PluginManager, PluginManagerError
+
+_plugin_module = '''
+import lazy_plugin_manager
+
+
+class Foo(object):
+    pass
+
+
+class Bar(object):
+    pass
+
+lazy_plugin_manager.manager.add(Foo, 'things', 'Foo')
+lazy_plugin_manager.manager.add(Bar, 'things', 'Bar')
+'''
+
+
+@pytest.fixture
+def manager(tmpdir, monkeypatch):
+    tmpdir.join('lazy_plugin_module.py').write(_plugin_module)
+    monkeypatch.syspath_prepend(str(tmpdir))
+    manager = PluginManager()
+    holder = types.ModuleType('lazy_plugin_manager')
+    holder.manager = manager
+    monkeypatch.setitem(sys.modules, 'lazy_plugin_manager', holder)
+    yield manager
+    sys.modules.pop('lazy_plugin_module', None)
+
+
+def test_lazy(manager):
+    """Test that a module declared lazily is only imported once one of its plugins is looked up"""
+    loaded = []
+    manager.addListener(loaded.append)
+    manager.addManifest([('lazy_plugin_module', [('things', 'Foo'), ('things', 'Bar')])])
+    manager.addAlias('things', 'Baz', 'Bar')
+
+    assert 'lazy_plugin_module' not in sys.modules
+    assert manager.allNames('things') == ['Bar', 'Baz', 'Foo']
+    assert not manager.isLoaded('things', 'Foo')
+
+    bar = manager.find('things', 'Bar')
+    assert bar.__name__ == 'Bar'
+    assert 'lazy_plugin_module' in sys.modules
+    assert loaded == [[('things', 'Bar'), ('things', 'Foo')]]
+    assert manager.find('things', None).__name__ == 'Foo'
+    assert manager.find('things', 'Baz') is bar
+    assert manager.lazyPlugins() == []
+    assert sorted(manager.allClasses('things')) == ['Bar', 'Baz', 'Foo']
+
+    with pytest.raises(PluginManagerError):
+        manager.find('things', 'Missing')
+    with pytest.raises(PluginManagerError):
+        manager.addAlias('things', 'Other', 'Missing')
+
+
+def test_load_by_category(manager):
+    """Test that the default and the classes of a category load the plugins declared in it"""
+    manager.addLazy('things', 'Foo', 'lazy_plugin_module')
+    assert manager.allClasses('other') == {}
+    assert 'lazy_plugin_module' not in sys.modules
+    assert manager.find('things', None).__name__ == 'Foo'
+
+
+def test_manifest():
+    """Test that the manifest of the core plugins lists exactly the plugins each module adds"""
+    from Ganga.Runtime.plugins import PLUGIN_MANIFEST
+    from Ganga.Utility.Plugin import allPlugins
+    for module, plugins in PLUGIN_MANIFEST:
+        __import__(module)
+        added = set((category, name) for category, classes in allPlugins.allCategories().items()
+                    for name, cls in classes.items()
+                    if cls.__module__.startswith(module + '.') and name == cls._name)
+        assert added == set(plugins)
+        for category, name in plugins:
+            cls = allPlugins.find(category, name)
+            assert cls.__name__ == name
+            assert not cls._declared_property('hidden')
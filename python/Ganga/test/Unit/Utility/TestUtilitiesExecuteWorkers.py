@@ -0,0 +1,63 @@
+import os
+import threading
+
+from Ganga.Utility.Config import getConfig
+from Ganga.Utility.execute import execute
+
+# This file tests the long lived workers which run python commands for execute
+
+
+def test_setup_run_once():
+    """Test that the python_setup is only run the first time a worker sees it"""
+    setup = 'import time\nSTARTED = time.time()'
+    first = execute('output(STARTED)', python_setup=setup, shell=False)
+    second = execute('output(STARTED)', python_setup=setup, shell=False)
+    assert isinstance(first, float)
+    assert first == second
+
+    # Names defined by a command don't leak into the next one
+    execute('LEAKED = True', python_setup=setup, shell=False)
+    assert execute('output("LEAKED" in globals())', python_setup=setup, shell=False) is False
+
+
+def test_worker_state_restored():
+    """Test that the environment, path and cwd of a worker are restored after each command"""
+    env = dict(os.environ)
+    execute('import os, sys\nos.environ["WORKERTEST"] = "1"\nsys.path.append("/worker/test")\nos.chdir("/")',
+            env=env, cwd=os.getcwd(), shell=False)
+    assert execute('import os\noutput(os.environ.get("WORKERTEST"))', env=env, shell=False) is None
+    assert execute('import sys\noutput("/worker/test" in sys.path)', env=env, shell=False) is False
+    assert execute('import os\noutput(os.getcwd())', env=env, shell=False) == os.getcwd()
+
+
+def test_worker_restarted():
+    """Test that a worker which times out or dies is replaced"""
+    assert execute('while True: pass', timeout=1, shell=False) == 'Command timed out!'
+    assert execute('output("alive")', shell=False) == 'alive'
+
+    assert execute('import os\nos._exit(1)', shell=False) == ''
+    assert execute('output("alive")', shell=False) == 'alive'
+
+
+def test_max_workers():
+    """Test that no more than MaxWorkers commands run at once for an environment"""
+    config = getConfig('Execute')
+    config.setSessionValue('MaxWorkers', 2)
+    try:
+        env = dict(os.environ)
+        env['WORKERTEST'] = 'max_workers'
+        pids = []
+
+        def run():
+            pids.append(execute('import os, time\ntime.sleep(0.2)\noutput(os.getpid())', env=env, shell=False))
+
+        threads = [threading.Thread(target=run) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(pids) == 6
+        assert len(set(pids)) <= 2
+    finally:
+        config.revertToDefault('MaxWorkers')
@@ -0,0 +1,62 @@
+from __future__ import print_function, division
+
+import time
+from cStringIO import StringIO
+
+
+def time_call(func, repeat=3, number=1):
+    """
+    Return the best wall-clock time (in seconds) for a single call of func
+    Args:
+        func (callable): function to time, called without arguments
+        repeat (int): number of independent measurements, the fastest is kept
+        number (int): number of calls per measurement
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.time()
+        for _ in range(number):
+            func()
+        elapsed = (time.time() - start) / number
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def print_table(title, header, rows):
+    """
+    Print the results of a benchmark as a simple aligned table
+    Args:
+        title (str): title printed above the table
+        header (list): column names
+        rows (list): list of rows, each a list with one entry per column
+    """
+    rows = [[('%.4g' % cell) if isinstance(cell, float) else str(cell) for cell in row] for row in rows]
+    widths = [max(len(str(col)), *[len(row[i]) for row in rows]) if rows else len(str(col)) for i, col in enumerate(header)]
+    print()
+    print(title)
+    print('  '.join(str(col).rjust(width) for col, width in zip(header, widths)))
+    print('  '.join('-' * width for width in widths))
+    for row in rows:
+        print('  '.join(cell.rjust(width) for cell, width in zip(row, widths)))
+
+
+def make_job_xml(n_files):
+    """
+    Return the XML of a job with n_files LocalFile outputfiles
+    Args:
+        n_files (int): number of output files to add to the job
+    """
+    from Ganga.GPIDev.Lib.Job.Job import Job
+    from Ganga.GPIDev.Lib.File.LocalFile import LocalFile
+    from Ganga.GPIDev.Lib.GangaList.GangaList import makeGangaListByRef
+    from Ganga.Core.GangaRepository.VStreamer import to_file
+
+    j = Job()
+    # Bypass the attribute filters, assigning thousands of files through them is slow
+    outputfiles = [LocalFile('output_%s.root' % i, localDir='/some/dir/%s' % (i % 10)) for i in range(n_files)]
+    j.setSchemaAttribute('outputfiles', makeGangaListByRef(outputfiles))
+    j.application.args = ['arg_%s' % i for i in range(n_files)]
+    sio = StringIO()
+    to_file(j, sio, 'subjobs')
+    return sio.getvalue()
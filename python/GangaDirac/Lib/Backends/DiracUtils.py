@@ -3,6 +3,7 @@ import itertools
 from Ganga.Core.exceptions import GangaException, BackendError
 #from GangaDirac.BOOT       import dirac_ganga_server
 from GangaDirac.Lib.Utilities.DiracUtilities import execute, GangaDiracError
+from GangaDirac.Lib.Utilities.ReplicaCache import lookUpReplicas
 from Ganga.Utility.logging import getLogger
 from Ganga.GPIDev.Base.Proxy import stripProxy
 logger = getLogger()
@@ -150,7 +151,7 @@ def getAccessURLs(lfns, defaultSE = '', protocol = '', credential_requirements=N
         logger.error("Provided list does not have LFNs or DiracFiles in it")
         return
     # Get all the replicas
-    reps = execute('getReplicas(%s)' % lfnList, cred_req=credential_requirements)
+    reps = lookUpReplicas(lfnList, credential_requirements)
     # Get the SEs
     SEs = []
     for lf in reps['Successful']:
@@ -23,6 +23,7 @@ from GangaDirac.Lib.Credentials.DiracProxy import DiracProxy, DiracProxyInfo
 from Ganga.Utility.Config import getConfig
 from Ganga.Utility.logging import getLogger
 from GangaDirac.Lib.Backends.DiracUtils import getAccessURLs
+from GangaDirac.Lib.Utilities.ReplicaCache import lookUpReplicas, invalidateReplicas
 configDirac = getConfig('DIRAC')
 logger = getLogger()
 regex = re.compile('[*?\[\]]')
@@ -397,6 +398,7 @@ class DiracFile(IGangaFile):
             raise GangaFileError('Can\'t remove a  file from DIRAC SE without an LFN.')
         logger.info('Removing file %s' % self.lfn)
         stdout = execute('removeFile("%s")' % self.lfn, cred_req=self.credential_requirements)
+        invalidateReplicas([self.lfn])
 
         self.lfn = ""
         self.locations = []
@@ -468,6 +470,7 @@ class DiracFile(IGangaFile):
         """
         Get the list of all SE where this file has a replica
         This relies on an internally stored list of replicas, (SE and  unless forceRefresh = True
+        Replicas are otherwise taken from the replica cache shared with the splitters when they're known
         """
 
         if self.lfn == '':
@@ -493,7 +496,7 @@ class DiracFile(IGangaFile):
             if (self._storedReplicas == {} and len(self.subfiles) == 0) or forceRefresh:
 
                 try:
-                    self._storedReplicas = execute('getReplicas("%s")' % self.lfn, cred_req=self.credential_requirements)
+                    self._storedReplicas = lookUpReplicas([self.lfn], self.credential_requirements, forceRefresh)
                 except GangaDiracError as err:
                     logger.error("Couldn't find replicas for: %s" % str(self.lfn))
                     self._storedReplicas = {}
@@ -616,6 +619,7 @@ class DiracFile(IGangaFile):
 
         logger.info("Replicating file %s to %s" % (self.lfn, destSE))
         stdout = execute('replicateFile("%s", "%s", "%s")' % (self.lfn, destSE, sourceSE), cred_req=self.credential_requirements)
+        invalidateReplicas([self.lfn])
 
         if destSE not in self.locations:
             self.locations.append(destSE)
@@ -0,0 +1,180 @@
+"""
+A long running server for the DIRAC commands used by Ganga.
+
+This is started by GangaDirac.Lib.Utilities.DiracServerClient with the python of the DIRAC environment, so it must not
+import anything from Ganga. The DIRAC command files are loaded once when the server starts, rather than for every
+command, and the commands are then run by a pool of threads as they arrive on a local socket.
+
+Usage:
+    python DiracServer.py <socket path> <number of threads> <command file> [<command file> ...]
+
+Each request and response is a pickled dict preceded by a header of (request id, size). Requests contain the python
+'command' to run, responses contain the 'output' passed to output() by the command, as a pickle, and its 'stdout'.
+Many requests can be sent without waiting for their responses, which are sent back as each command finishes.
+'READY' is written to stdout once the server is accepting connections. The server exits when its stdin is closed.
+"""
+
+from __future__ import print_function
+
+import os
+import socket
+import struct
+import sys
+import threading
+import traceback
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from io import StringIO
+
+# (request id, size of the pickle which follows)
+_header = struct.Struct('!II')
+
+_local = threading.local()
+
+
+def output(data):
+    """ Send data back to Ganga as the result of the command being run by this thread
+    Args:
+        data (object): The result, anything which can be pickled
+    """
+    _local.outputs.append(pickle.dumps(data, 2))
+
+
+class _ThreadStream(object):
+
+    """ Sends what is printed by a command to the stdout of its request, anything else to the stream given """
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def write(self, data):
+        getattr(_local, 'stdout', self._stream).write(data)
+
+    def flush(self):
+        self._stream.flush()
+
+
+def _recv_exactly(connection, size):
+    """ Read size bytes from the connection, None if it's closed first """
+    chunks = []
+    while size:
+        chunk = connection.recv(size)
+        if not chunk:
+            return None
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b''.join(chunks)
+
+
+class _Connection(object):
+
+    """ A client of the server, responses can be sent by any of the threads """
+
+    def __init__(self, connection):
+        self.socket = connection
+        self.send_lock = threading.Lock()
+
+    def send(self, request_id, response):
+        data = pickle.dumps(response, 2)
+        with self.send_lock:
+            self.socket.sendall(_header.pack(request_id, len(data)) + data)
+
+
+def _run_command(namespace, command):
+    """ Run a command in a copy of the namespace the command files were loaded into and return its response """
+    _local.outputs = []
+    _local.stdout = StringIO()
+    try:
+        exec(command, dict(namespace))
+    except BaseException:
+        output(traceback.format_exc())
+    finally:
+        outputs, stdout = _local.outputs, _local.stdout
+        del _local.outputs
+        del _local.stdout
+    return {'output': outputs[0] if outputs else None, 'stdout': stdout.getvalue()}
+
+
+def _handle_requests(namespace, requests):
+    """ Run the requests from the queue for as long as the server is running """
+    while True:
+        connection, request_id, request = requests.get()
+        response = _run_command(namespace, request['command'])
+        try:
+            connection.send(request_id, response)
+        except (IOError, OSError, socket.error) as err:
+            print("Failed to send the response to request %s: %s" % (request_id, err), file=sys.stderr)
+
+
+def _read_requests(connection, requests):
+    """ Queue the requests sent over a connection until it's closed """
+    while True:
+        header = _recv_exactly(connection.socket, _header.size)
+        if header is None:
+            break
+        request_id, size = _header.unpack(header)
+        data = _recv_exactly(connection.socket, size)
+        if data is None:
+            break
+        requests.put((connection, request_id, pickle.loads(data)))
+    connection.socket.close()
+
+
+def _exit_when_parent_exits():
+    """ Exit once the stdin of the server, which is held by the Ganga which started it, is closed """
+    while sys.stdin.read(1):
+        pass
+    os._exit(0)
+
+
+def _start_thread(target, args=()):
+    thread = threading.Thread(target=target, args=args)
+    thread.daemon = True
+    thread.start()
+    return thread
+
+
+def main(argv):
+    socket_path, num_threads, command_files = argv[1], int(argv[2]), argv[3:]
+
+    # The command files parse the command line for DIRAC options, which it doesn't have
+    del sys.argv[1:]
+    namespace = {'pickle': pickle, 'output': output}
+    for command_file in command_files:
+        with open(command_file) as this_file:
+            exec(compile(this_file.read(), command_file, 'exec'), namespace)
+
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    old_umask = os.umask(0o077)
+    try:
+        server.bind(socket_path)
+    finally:
+        os.umask(old_umask)
+    server.listen(5)
+
+    requests = queue.Queue()
+    for _ in range(max(num_threads, 1)):
+        _start_thread(_handle_requests, (namespace, requests))
+    _start_thread(_exit_when_parent_exits)
+
+    ready = sys.stdout
+    sys.stdout = _ThreadStream(sys.stderr)
+    print('READY', file=ready)
+    ready.flush()
+
+    while True:
+        connection, _ = server.accept()
+        _start_thread(_read_requests, (_Connection(connection), requests))
+
+
+if __name__ == '__main__':
+    main(sys.argv)
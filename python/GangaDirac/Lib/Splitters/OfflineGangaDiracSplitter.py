@@ -6,19 +6,13 @@ from Ganga.Utility.logging import getLogger
 from GangaDirac.Lib.Utilities.DiracUtilities import execute, GangaDiracError
 from Ganga.Core.GangaThread.WorkerThreads import getQueues
 from GangaDirac.Lib.Files.DiracFile import DiracFile
-from copy import deepcopy
-import random
+from GangaDirac.Lib.Utilities.ReplicaCache import requestReplicas
 import time
 import math
 
 configDirac = getConfig('DIRAC')
 logger = getLogger()
 
-global_random = random
-
-LFN_parallel_limit = 250
-limit_divide_one = 1. / float(LFN_parallel_limit)
-
 def wrapped_execute(command, expected_type):
     """
     A wrapper around execute to protect us from commands which had errors
@@ -36,30 +30,6 @@ def wrapped_execute(command, expected_type):
     return result
 
 
-def find_random_site(original_SE_list, banned_SE):
-    """
-    Find a random element from a python list that isn't in a given banned list
-    This is used for selecting a site element but it doesn't matter which is used
-
-    Args:
-        original_SE_list (list): This is a list of given 'SE'. The same SE may appear more than once!
-        banned_SE (list): This is a list of SE which are 'banned' from being selected
-    """
-    input_list = deepcopy(original_SE_list)
-    chosen_element = ""
-
-    while chosen_element == "" and len(input_list) > 0:
-        global global_random
-        this_element = global_random.sample(input_list, 1)[0]
-        if not this_element in banned_SE:
-            chosen_element = this_element
-            break
-        else:
-            input_list.remove(this_element)
-
-    return chosen_element
-
-
 def addToMapping(SE, site_to_SE_mapping):
     """
     This function is used for adding all of the known site for a given SE
@@ -72,78 +42,6 @@ def addToMapping(SE, site_to_SE_mapping):
     site_to_SE_mapping[SE] = result
 
 
-def getLFNReplicas(allLFNs, index, allLFNData):
-    """
-    This method gets the location of all replicas for 'allLFNs' and stores the infomation in 'allLFNData'
-
-    This is a 'static' method which is called multiple times with the same 'allLFNs' and 'allLFNData' and different index.
-    e.g. This allows Dirac to determine the replicas for ~250LFN all at once rather than for ~40,000 all at once which risks timeouts and other errors
-
-    Args:
-        allLFNs (list): This is a list of all LFN which have replicas on the grid
-        index (int): This is used to determine which slice of LFNs we want to look at
-        allLFNData (dict): This is a dict where the replica information is to be stored temporarily
-    """
-    output = None
-
-    global LFN_parallel_limit
-
-    this_min = index * LFN_parallel_limit
-
-    if (index + 1) * LFN_parallel_limit > len(allLFNs):
-        this_max = len(allLFNs)
-    else:
-        this_max = (index + 1) * LFN_parallel_limit
-
-    try:
-        output = wrapped_execute('getReplicas(%s)' % str(allLFNs[this_min:this_max]), dict)
-    except SplittingError:
-        logger.error("Failed to Get Replica Info: [%s:%s] of %s" % (str(this_min), str(this_max), len(allLFNs)))
-        raise
-
-    import Ganga.Runtime.Repository_runtime
-    Ganga.Runtime.Repository_runtime.updateLocksNow()
-
-    allLFNData[index] = output
-
-    logger.info("Got Replica Info: [%s:%s] of %s" % (str(this_min), str(this_max), len(allLFNs)))
-
-
-def generate_site_selection(input_site, wanted_common_site, uniqueSE, site_to_SE_mapping, SE_to_site_mapping):
-    """
-    Return a set of sites which are a subset of the given input_site.
-    The size of the returned set is determined by 'wanted_common_site'.
-    'uniqueSE' governs if all elements in the returned set should be accessing uniqueSE or not.
-
-    Args:
-        input_site (list): list of input sites
-        wanted_common_site (int): the size of the subset we want
-        uniqueSE (bool): Should returned sites be able to share the same SE
-        site_to_SE_mapping (dict): Dict which has sites as keys and SE as values
-        SE_to_site_mapping (dict): Dict which has sites as values and SE as keys
-    """
-
-    req_sitez = set([])
-    if len(input_site) > wanted_common_site:
-        used_site = set([])
-        for se in range(wanted_common_site):
-            this_site = find_random_site(input_site, used_site)
-            req_sitez.add(this_site)
-            if uniqueSE:
-
-                these_SE = SE_to_site_mapping[this_site]
-                for this_SE in these_SE:
-
-                    for site in site_to_SE_mapping[this_SE]:
-                        used_site.add(site)
-            else:
-                used_site.add(this_site)
-    else:
-        for s in input_site:
-            req_sitez.add(s)
-    return req_sitez
-
-
 def calculateSiteSEMapping(file_replicas, uniqueSE, site_to_SE_mapping, SE_to_site_mapping, bannedSites, ignoremissing):
     """
     If uniqueSE:
@@ -231,32 +129,37 @@ def calculateSiteSEMapping(file_replicas, uniqueSE, site_to_SE_mapping, SE_to_si
 
 def lookUpLFNReplicas(inputs, ignoremissing):
     """
-    This method launches several worker threads to collect the replica information for all LFNs which are given as inputs and stores this in allLFNData
+    This method requests the replica information for all LFNs which are given as inputs, from the replica cache or from DIRAC in chunks on
+    the worker threads, and stores this in the DiracFiles
     Args:
         inputs (list): This is a list of input DiracFile which are 
     Returns:
         allLFNs (list): List of all of the LFNs in the inputs
         LFNdict (dict): dict of LFN to DiracFiles
     """
-    allLFNData = {}
     # Build a useful dictionary and list
     allLFNs = [_lfn.lfn for _lfn in inputs]
     LFNdict = dict.fromkeys(allLFNs)
     for _lfn in inputs:
         LFNdict[_lfn.lfn] = _lfn
 
-    # Request the replicas for all LFN 'LFN_parallel_limit' at a time to not overload the
+    # Request the replicas for all LFN a chunk at a time to not overload the
     # server and give some feedback as this is going on
-    global limit_divide_one
-    for i in range(int(math.ceil(float(len(allLFNs)) * limit_divide_one))):
-
-        getQueues()._monitoring_threadpool.add_function(getLFNReplicas, (allLFNs, i, allLFNData))
-
-    while len(allLFNData) != int(math.ceil(float(len(allLFNs)) * limit_divide_one)):
-        time.sleep(1.)
-        # This can take a while so lets protect any repo locks
-        import Ganga.Runtime.Repository_runtime
-        Ganga.Runtime.Repository_runtime.updateLocksNow()
+    completions = requestReplicas(allLFNs)
+
+    allLFNData = []
+    found = 0
+    for completion in completions:
+        while not completion.wait(1.):
+            # This can take a while so lets protect any repo locks
+            import Ganga.Runtime.Repository_runtime
+            Ganga.Runtime.Repository_runtime.updateLocksNow()
+        if completion.error is not None or completion.cancelled:
+            logger.error("Failed to Get Replica Info: %s" % str(completion.error))
+            raise SplittingError("Error getting Replica information from Dirac: %s" % str(completion.error))
+        allLFNData.append(completion.result)
+        found += len(completion.result.get('Successful', {})) + len(completion.result.get('Failed', {}))
+        logger.info("Got Replica Info: %s of %s" % (found, len(allLFNs)))
 
     bad_lfns = []
 
@@ -280,42 +183,20 @@ def badLFNCheck(bad_lfns, allLFNs, LFNdict, ignoremissing, allLFNData):
         allLFNs (list): List of all of the LFNs in the inputs which have accessible replicas
         LFNdict (dict): dict of LFN to DiracFiles
         ignoremissing (bool): Check if we have any bad lfns
-        allLFNData (dict): All LFN replica data
+        allLFNData (list): All LFN replica data, the output of each getReplicas lookup
     """
 
-    # FIXME here to keep the repo settings as they were before we changed the
-    # flush count
-    original_write_perm = {}
-
-    global LFN_parallel_limit
-    global limit_divide_one
-
-    for i in range(int(math.ceil(float(len(allLFNs)) * limit_divide_one))):
-        output = allLFNData.get(i)
-
-        if output is None:
-            msg = "Error getting Replica information from Dirac: [%s,%s]" % ( str(i * LFN_parallel_limit), str((i + 1) * LFN_parallel_limit))
-            raise SplittingError(msg)
+    for output in allLFNData:
 
         # Identify files which have Failed to be found by DIRAC
-        results = output
-        values = results.get('Successful')
-
-        upper_limit = (i+1)*LFN_parallel_limit
-        if upper_limit > len(allLFNs):
-            upper_limit = len(allLFNs)
-
-        #logger.debug("Updating LFN Physical Locations: [%s:%s] of %s" % (str(i * LFN_parallel_limit), str(upper_limit), str(len(allLFNs))))
+        values = output.get('Successful', {})
 
         for this_lfn in values.keys():
-            #logger.debug("LFN: %s" % str(this_lfn))
             this_dict = {}
             this_dict[this_lfn] = values.get(this_lfn)
 
             if this_lfn in LFNdict:
-                #logger.debug("Updating RemoteURLs")
                 LFNdict[this_lfn]._updateRemoteURLs(this_dict)
-                #logger.debug("This_dict: %s" % str(this_dict))
             else:
                 logger.error("Error updating remoteURLs for: %s" % str(this_lfn))
 
@@ -323,12 +204,16 @@ def badLFNCheck(bad_lfns, allLFNs, LFNdict, ignoremissing, allLFNData):
             if this_dict[this_lfn].keys() == []:
                 bad_lfns.append(this_lfn)
 
-        for this_lfn in bad_lfns:
-            logger.warning("LFN: %s was either unknown to DIRAC or unavailable, Ganga is ignoring it!" % str(this_lfn))
-            if this_lfn in LFNdict:
-                del LFNdict[this_lfn]
-            if this_lfn in allLFNs:
-                allLFNs.remove(this_lfn)
+        for this_lfn in output.get('Failed', {}):
+            bad_lfns.append(this_lfn)
+
+    bad_set = set(bad_lfns)
+    for this_lfn in bad_set:
+        logger.warning("LFN: %s was either unknown to DIRAC or unavailable, Ganga is ignoring it!" % str(this_lfn))
+        if this_lfn in LFNdict:
+            del LFNdict[this_lfn]
+    if bad_set:
+        allLFNs[:] = [this_lfn for this_lfn in allLFNs if this_lfn not in bad_set]
 
 
 # Actually Do the work of the splitting
@@ -396,20 +281,11 @@ def OfflineGangaDiracSplitter(_inputs, filesPerJob, maxFiles, ignoremissing, ban
     site_dict = calculateSiteSEMapping(file_replicas, uniqueSE, site_to_SE_mapping, SE_to_site_mapping, bannedSites, ignoremissing)
 
 
-    allChosenSets = {}
-    # Now select a set of site to use as a seed for constructing a subset of
-    # LFN
-    for lfn in site_dict.keys():
-        allChosenSets[lfn] = generate_site_selection(site_dict[lfn], wanted_common_site, uniqueSE, site_to_SE_mapping, SE_to_site_mapping)
-
-    logger.debug("Found all SE in use")
-
-
     # BELOW IS WHERE THE ACTUAL SPLITTING IS DONE
 
     logger.info("Calculating best data subsets")
 
-    allSubSets = performSplitting(site_dict, filesPerJob, allChosenSets, wanted_common_site, uniqueSE, site_to_SE_mapping, SE_to_site_mapping)
+    allSubSets = performSplitting(site_dict, filesPerJob, wanted_common_site, uniqueSE, site_to_SE_mapping, SE_to_site_mapping)
 
     avg = 0.
     for this_set in allSubSets:
@@ -436,105 +312,177 @@ def OfflineGangaDiracSplitter(_inputs, filesPerJob, maxFiles, ignoremissing, ban
     for dataset in allSubSets:
         yield dataset
 
-def performSplitting(site_dict, filesPerJob, allChosenSets, wanted_common_site, uniqueSE, site_to_SE_mapping, SE_to_site_mapping):
+
+def performSplitting(site_dict, filesPerJob, wanted_common_site, uniqueSE, site_to_SE_mapping, SE_to_site_mapping):
     """
-    This is the main method which loops through the LFNs and creates subsets which are returned a list of list of LFNs
+    This is the main method which groups the LFNs into subsets which are returned a list of list of DiracFiles
 
     Args:
         site_dict (dict): This is a dict with LFNs as keys and sites for each LFN as value
         filesPerJob (int): Max files per jobs as defined by splitter
-        allChosenSets (dict): A dict with LFNs as keys and a sub-set of sites where each LFN is replicated
         wanted_common_site (int): Number of sites which we want to have in common for each LFN
-
         uniqueSE (bool): Should we check to make sure sites don't share an SE
         site_to_SE_mapping (dict): Dict which has sites as keys and SE as values
         SE_to_site_mapping (dict): Dict which has sites as values and SE as keys
 
     Returns:
-        allSubSets (list): Return a list of subsets each subset being a list of LFNs
+        allSubSets (list): Return a list of subsets each subset being a list of DiracFiles
     """
 
-    good_fraction = configDirac['OfflineSplitterFraction']
-    iterative_limit = configDirac['OfflineSplitterLimit']
+    site_conflicts = None
+    if uniqueSE:
+        # Sites sharing an SE shouldn't both be counted as one of the common sites of a subset
+        site_conflicts = {}
+        for site, these_SE in SE_to_site_mapping.iteritems():
+            site_conflicts[site] = set([site])
+            for this_SE in these_SE:
+                site_conflicts[site].update(site_to_SE_mapping.get(this_SE, []))
 
-    allSubSets = []
+    allSubSets = packSubsets(site_dict, filesPerJob, wanted_common_site, configDirac['OfflineSplitterFraction'], site_conflicts)
 
-    iterations = 0
-    # Loop over all LFNs
-    while len(site_dict.keys()) > 0:
+    # Can take a while so lets not let threads become un-locked
+    import Ganga.Runtime.Repository_runtime
+    Ganga.Runtime.Repository_runtime.updateLocksNow()
 
-        # LFN left to be used
-        # NB: Can't modify this list and iterate over it directly in python
-        LFN_instances = site_dict.keys()
-        # Already used LFN
-        chosen_lfns = set()
+    ## Construct DiracFile here as we want to keep the above combination
+    return [[DiracFile(lfn=str(this_LFN)) for this_LFN in this_subset] for this_subset in allSubSets]
 
-        for iterating_LFN in LFN_instances:
 
-            # If this has previously been selected lets ignore it and move on
-            if iterating_LFN in chosen_lfns:
-                continue
+def _siteBits(signature):
+    """
+    Return the bits which are set in a signature, one per site
+    Args:
+        signature (int): The sites of an LFN as a bitmask
+    """
+    bits = []
+    while signature:
+        bit = signature & -signature
+        bits.append(bit)
+        signature ^= bit
+    return bits
 
-            # Use this seed to try and construct a subset
-            req_sitez = allChosenSets[iterating_LFN]
-            _this_subset = []
 
-            #logger.debug("find common LFN for: " + str(allChosenSets[iterating_LFN]))
+def _chooseCommonSites(signature, common_sites, rank, conflict_bits):
+    """
+    Choose the sites, as a bitmask, which all LFNs in a subset seeded with this signature must be at.
+    The sites holding the most LFNs are chosen first so that LFNs with different signatures end up with the same choice.
+    If there are no more sites than wanted they are all used, as for a single seed in the old splitter.
 
-            # Construct subset
-            # Starting with i, populate subset with LFNs which have an
-            # overlap of at least 2 SE
-            for this_LFN in LFN_instances:
-                if this_LFN in chosen_lfns:
-                    continue
-                if req_sitez.issubset(site_dict[this_LFN]):
-                    if len(_this_subset) >= filesPerJob:
-                        break
-                    _this_subset.append(this_LFN)
+    Args:
+        signature (int): The sites of an LFN as a bitmask
+        common_sites (int): The number of sites wanted
+        rank (dict): The position of each site bit when ordered by the number of LFNs at the site
+        conflict_bits (dict): The sites, as a bitmask, which can't be chosen along with each site bit
+    """
+    bits = _siteBits(signature)
+    if len(bits) <= common_sites:
+        return signature
+    bits.sort(key=rank.__getitem__)
+    chosen = 0
+    banned = 0
+    count = 0
+    for bit in bits:
+        if bit & banned:
+            continue
+        chosen |= bit
+        banned |= conflict_bits.get(bit, bit)
+        count += 1
+        if count == common_sites:
+            break
+    return chosen
 
-            limit = int(math.floor(float(filesPerJob) * good_fraction))
 
-            #logger.debug("Size limit: %s" % str(limit))
+def packSubsets(site_dict, filesPerJob, wanted_common_site, good_fraction, site_conflicts=None):
+    """
+    Group LFNs into subsets of at most filesPerJob LFNs which are all available at at least one common site.
 
-            # If subset is too small throw it away
-            if len(_this_subset) < limit:
-                #logger.debug("%s < %s" % (str(len(_this_subset)), str(limit)))
-                allChosenSets[iterating_LFN] = generate_site_selection(site_dict[iterating_LFN], wanted_common_site, uniqueSE, site_to_SE_mapping, SE_to_site_mapping)
-                continue
-            else:
-                logger.debug("found common LFN for: " + str(allChosenSets[iterating_LFN]))
-                logger.debug("%s > %s" % (str(len(_this_subset)), str(limit)))
-                # else Dataset was large enough to be considered useful
-                logger.debug("Generating Dataset of size: %s" % str(len(_this_subset)))
-                ## Construct DiracFile here as we want to keep the above combination
-                allSubSets.append([DiracFile(lfn=str(this_LFN)) for this_LFN in _this_subset])
-
-                for lfn in _this_subset:
-                    site_dict.pop(lfn)
-                    allChosenSets.pop(lfn)
-                    chosen_lfns.add(lfn)
-
-        # Lets keep track of how many times we've tried this
-        iterations = iterations + 1
-
-        # Can take a while so lets not let threads become un-locked
-        import Ganga.Runtime.Repository_runtime
-        Ganga.Runtime.Repository_runtime.updateLocksNow()
-
-        # If on final run, will exit loop after this so lets try and cleanup
-        if iterations >= iterative_limit:
-
-            if good_fraction < 0.5:
-                good_fraction = good_fraction * 0.75
-                iterations = 0
-            elif wanted_common_site > 1:
-                logger.debug("Reducing Common Site Size")
-                wanted_common_site = wanted_common_site - 1
-                iterations = 0
-                good_fraction = 0.75
-            else:
-                good_fraction = good_fraction * 0.75
+    Every LFN gets a signature, a bitmask of the sites it's available at, and LFNs are only handled a signature at a time:
+        1) LFNs with the same signature share all of their sites, so are packed together first.
+        2) The LFNs left over are grouped by the wanted_common_site sites chosen from their signatures, preferring the sites
+           with the most LFNs, and packed again. This is repeated for one fewer common site each time down to a single
+           common site, after which every LFN has been placed.
+    At each step a subset smaller than good_fraction * filesPerJob is only kept on the last step, otherwise its LFNs are
+    tried again with fewer common sites. This takes time linear in the number of LFNs, rather than the quadratic search
+    for subsets around random seed LFNs it replaces.
+
+    Args:
+        site_dict (dict): This is a dict with LFNs as keys and sites for each LFN as value
+        filesPerJob (int): Max files per subset
+        wanted_common_site (int): Number of sites which we want to have in common for each LFN
+        good_fraction (float): Subsets are kept if above good_fraction * filesPerJob in size
+        site_conflicts (dict): Dict of sites which can't be counted as a common site along with each site, e.g. as they
+                               share an SE. Only the site itself if None
+
+    Returns:
+        allSubSets (list): Return a list of subsets each subset being a list of LFNs
+    """
+
+    filesPerJob = max(int(filesPerJob), 1)
+    limit = int(math.floor(float(filesPerJob) * good_fraction))
+
+    # Give every site a bit and group the LFNs by their signature
+    site_bits = {}
+    groups = {}
+    for lfn, sites in site_dict.iteritems():
+        signature = 0
+        for site in sites:
+            bit = site_bits.get(site)
+            if bit is None:
+                bit = site_bits[site] = 1 << len(site_bits)
+            signature |= bit
+        if not signature:
+            raise SplitterError('LFN %s has no site available to split it with' % str(lfn))
+        groups.setdefault(signature, []).append(lfn)
+
+    conflict_bits = {}
+    if site_conflicts:
+        for site, bit in site_bits.iteritems():
+            conflict_bits[bit] = bit
+            for other in site_conflicts.get(site, []):
+                conflict_bits[bit] |= site_bits.get(other, 0)
+
+    allSubSets = []
+
+    def pack(lfns, keep_all):
+        """ Add the subsets of these LFNs which are big enough and return the LFNs left over """
+        for start in xrange(0, len(lfns), filesPerJob):
+            this_subset = lfns[start:start + filesPerJob]
+            if len(this_subset) < limit and not keep_all:
+                return this_subset
+            allSubSets.append(this_subset)
+        return []
+
+    last_step = max(int(wanted_common_site), 1)
+    signatures = {}
+    for signature, lfns in groups.iteritems():
+        for lfn in pack(lfns, False):
+            signatures[lfn] = signature
+
+    for common_sites in range(last_step, 0, -1):
+        if not signatures:
+            break
+
+        groups = {}
+        for lfn, signature in signatures.iteritems():
+            groups.setdefault(signature, []).append(lfn)
+
+        # Prefer the sites which hold the most of the LFNs left
+        popularity = {}
+        for signature, lfns in groups.iteritems():
+            for bit in _siteBits(signature):
+                popularity[bit] = popularity.get(bit, 0) + len(lfns)
+        rank = dict((bit, i) for i, bit in enumerate(sorted(popularity, key=lambda bit: (-popularity[bit], bit))))
+
+        chosen = {}
+        for signature, lfns in groups.iteritems():
+            chosen.setdefault(_chooseCommonSites(signature, common_sites, rank, conflict_bits), []).extend(lfns)
+
+        logger.debug("Packing %s LFNs into subsets with %s common sites" % (len(signatures), common_sites))
 
-            logger.debug("good_fraction: %s" % str(good_fraction))
+        left = {}
+        for lfns in chosen.itervalues():
+            for lfn in pack(lfns, common_sites == 1):
+                left[lfn] = signatures[lfn]
+        signatures = left
 
     return allSubSets
@@ -0,0 +1,284 @@
+"""
+Client for the long running DIRAC command servers (GangaDirac/Lib/Server/DiracServer.py).
+
+A server is started, the first time it's needed, for each DIRAC environment, which includes the proxy the commands
+are run with, so each credential has its own server. It loads the DIRAC command files once and then runs the
+commands sent to it in parallel. Each client keeps a single connection to its server. Many commands can be in
+progress over that connection at once, each waited on through its own TaskCompletion.
+
+A server which exits is started again for the next command. A command which times out is left running, as there's
+no other way of stopping it, and its server is restarted once the other commands it's running have finished. If a server can't be started, the commands are run in
+the one-shot way for [DIRAC]DiracServerRetryInterval seconds before starting it is tried again.
+"""
+
+import atexit
+import fcntl
+import itertools
+import os
+import select
+import shutil
+import signal
+import socket
+import struct
+import subprocess
+import tempfile
+import threading
+import time
+import cPickle as pickle
+
+from Ganga.Core.GangaThread.WorkerThreads.WorkerThreadPool import TaskCompletion
+from Ganga.Core.exceptions import GangaException
+from Ganga.Utility.Config import getConfig
+from Ganga.Utility.logging import getLogger
+
+logger = getLogger()
+
+_server_script = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Server', 'DiracServer.py')
+# Must match the header used by DiracServer.py: (request id, size of the pickle which follows)
+_header = struct.Struct('!II')
+
+
+class DiracServerError(GangaException):
+    """Raised when a command can't be run by a DIRAC server, e.g. it couldn't be started or it exited"""
+
+
+def _set_cloexec(fd):
+    flags = fcntl.fcntl(fd, fcntl.F_GETFD)
+    fcntl.fcntl(fd, fcntl.F_SETFD, flags | fcntl.FD_CLOEXEC)
+
+
+class DiracServerClient(object):
+
+    """
+    Runs commands on a DIRAC server for one environment, starting the server when needed
+    """
+
+    __slots__ = ('_env', '_command_files', '_num_threads', '_lock', '_send_lock', '_process', '_socket', '_socket_dir',
+                 '_pending', '_request_ids', '_failed_at', '_restart_when_idle')
+
+    def __init__(self, env, command_files, num_threads):
+        """
+        Args:
+            env (dict): The DIRAC environment to run the server in
+            command_files (list): The files defining the DIRAC commands, loaded by the server when it starts
+            num_threads (int): The number of commands the server runs at once
+        """
+        super(DiracServerClient, self).__init__()
+        self._env = dict(env)
+        self._command_files = list(command_files)
+        self._num_threads = num_threads
+        self._lock = threading.RLock()
+        self._send_lock = threading.Lock()
+        self._process = None
+        self._socket = None
+        self._socket_dir = None
+        # request id: TaskCompletion of the requests waiting for a response
+        self._pending = {}
+        self._request_ids = itertools.count(1)
+        # The time the server last failed to start
+        self._failed_at = None
+        # Set when a command has timed out, the server is restarted once no requests are waiting for it
+        self._restart_when_idle = False
+
+    def available(self):
+        """ Return False if the server failed to start less than [DIRAC]DiracServerRetryInterval seconds ago """
+        with self._lock:
+            return self._failed_at is None or time.time() - self._failed_at > getConfig('DIRAC')['DiracServerRetryInterval']
+
+    def _start(self):
+        """ Start the server and connect to it, the lock must be held """
+        config = getConfig('DIRAC')
+        self._socket_dir = tempfile.mkdtemp(prefix='ganga_dirac_server_')
+        socket_path = os.path.join(self._socket_dir, 'socket')
+        with open(os.path.join(self._socket_dir, 'server.log'), 'w') as log_file:
+            self._process = subprocess.Popen(['python', '-u', _server_script, socket_path, str(self._num_threads)] + self._command_files,
+                                             env=self._env, close_fds=True, preexec_fn=os.setsid,
+                                             stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=log_file)
+        _set_cloexec(self._process.stdin.fileno())
+        _set_cloexec(self._process.stdout.fileno())
+
+        ready = ''
+        deadline = time.time() + config['DiracServerStartTimeout']
+        fd = self._process.stdout.fileno()
+        while not ready.endswith('\n'):
+            if not select.select([fd], [], [], max(deadline - time.time(), 0))[0]:
+                break
+            chunk = os.read(fd, 64)
+            if not chunk:
+                break
+            ready += chunk
+        if ready.strip() != 'READY':
+            self._stop()
+            raise DiracServerError('DIRAC server failed to start (%s)' % (ready.strip() or 'no response'))
+
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.connect(socket_path)
+        _set_cloexec(self._socket.fileno())
+        reader = threading.Thread(target=self._read_responses, args=(self._socket,), name='DiracServer_reader')
+        reader.daemon = True
+        reader.start()
+        logger.debug("Started DIRAC server %s" % self._process.pid)
+
+    def _stop(self):
+        """ Kill the server and fail the requests waiting for it, the lock must be held """
+        if self._socket is not None:
+            try:
+                self._socket.shutdown(socket.SHUT_RDWR)
+            except socket.error:
+                pass
+            self._socket.close()
+            self._socket = None
+        if self._process is not None:
+            try:
+                os.killpg(self._process.pid, signal.SIGKILL)
+            except OSError as err:
+                logger.debug("Error killing DIRAC server %s: %s" % (self._process.pid, err))
+            self._process.stdin.close()
+            self._process.wait()
+            self._process = None
+        if self._socket_dir is not None:
+            shutil.rmtree(self._socket_dir, ignore_errors=True)
+            self._socket_dir = None
+        self._restart_when_idle = False
+        pending, self._pending = self._pending, {}
+        for completion in pending.itervalues():
+            completion._finish(error=DiracServerError('The DIRAC server exited while running the command'))
+
+    def _read_responses(self, connection):
+        """ Pass the responses from the server to the requests waiting for them until the connection is closed
+        Args:
+            connection (socket): The connection to the server
+        """
+        try:
+            while True:
+                header = self._recv(connection, _header.size)
+                if header is None:
+                    break
+                request_id, size = _header.unpack(header)
+                data = self._recv(connection, size)
+                if data is None:
+                    break
+                with self._lock:
+                    completion = self._pending.pop(request_id, None)
+                    if self._restart_when_idle and not self._pending and self._socket is connection:
+                        logger.debug("Restarting the DIRAC server now the commands running with the one which timed out have finished")
+                        self._stop()
+                if completion is not None:
+                    completion._finish(result=pickle.loads(data))
+        except (socket.error, IOError) as err:
+            logger.debug("Error reading from the DIRAC server: %s" % err)
+        with self._lock:
+            if self._socket is connection:
+                logger.warning("The DIRAC server has exited, it will be started again for the next command")
+                self._stop()
+
+    @staticmethod
+    def _recv(connection, size):
+        chunks = []
+        while size:
+            chunk = connection.recv(size)
+            if not chunk:
+                return None
+            chunks.append(chunk)
+            size -= len(chunk)
+        return ''.join(chunks)
+
+    def submit(self, command):
+        """ Send a command to the server without waiting for it to finish.
+        Returns a TaskCompletion whose result is a dict of the 'output' of the command, the pickle of the first object
+        it passed to output() or None, and its 'stdout'
+        Args:
+            command (str): The python command to run on the server
+        """
+        completion = TaskCompletion()
+        with self._lock:
+            if self._process is None:
+                try:
+                    self._start()
+                except (DiracServerError, OSError, socket.error) as err:
+                    self._failed_at = time.time()
+                    self._stop()
+                    raise DiracServerError(str(err))
+                self._failed_at = None
+            request_id = next(self._request_ids)
+            self._pending[request_id] = completion
+            connection = self._socket
+
+        data = pickle.dumps({'command': command}, 2)
+        try:
+            with self._send_lock:
+                connection.sendall(_header.pack(request_id, len(data)) + data)
+        except socket.error as err:
+            with self._lock:
+                self._pending.pop(request_id, None)
+                if self._socket is connection:
+                    self._stop()
+            raise DiracServerError('Failed to send the command to the DIRAC server: %s' % err)
+        return completion
+
+    def wait(self, completion, timeout=None):
+        """ Wait for a command sent with submit() and return its response, None if the command timed out.
+        A command which times out keeps running on the server, as there's no other way of stopping it, so the server is
+        restarted once the other commands it's running have finished
+        Args:
+            completion (TaskCompletion): The completion returned by submit()
+            timeout (float): Seconds to wait for the command, None to wait for as long as it takes
+        """
+        if not completion.wait(timeout):
+            with self._lock:
+                if not completion.done():
+                    logger.warning("DIRAC command timed out, the DIRAC server will be restarted once it is idle")
+                    for request_id, this_completion in self._pending.items():
+                        if this_completion is completion:
+                            del self._pending[request_id]
+                    completion._finish(error=DiracServerError('The DIRAC command timed out'))
+                    self._restart_when_idle = True
+                    if not self._pending:
+                        self._stop()
+                    return None
+        if completion.error is not None:
+            raise completion.error
+        return completion.result
+
+    def call(self, command, timeout=None):
+        """ Run a command on the server and return its response, see submit() and wait()
+        Args:
+            command (str): The python command to run on the server
+            timeout (float): Seconds to wait for the command, None to wait for as long as it takes
+        """
+        return self.wait(self.submit(command), timeout)
+
+    def shutdown(self):
+        """ Stop the server """
+        with self._lock:
+            self._stop()
+
+
+_clients_lock = threading.Lock()
+# environment: DiracServerClient
+_clients = {}
+
+
+def getDiracServer(env):
+    """ Return the client for the DIRAC server of the environment
+    Args:
+        env (dict): The DIRAC environment, including the X509_USER_PROXY of the credential
+    """
+    key = frozenset(env.iteritems())
+    with _clients_lock:
+        if key not in _clients:
+            config = getConfig('DIRAC')
+            _clients[key] = DiracServerClient(env, config['DiracCommandFiles'], config['DiracServerThreads'])
+        return _clients[key]
+
+
+def shutdownDiracServers():
+    """ Stop all of the DIRAC servers """
+    with _clients_lock:
+        clients = _clients.values()
+        _clients.clear()
+    for client in clients:
+        client.shutdown()
+
+
+atexit.register(shutdownDiracServers)
@@ -12,6 +12,7 @@ from Ganga.Core.exceptions import GangaException
 from Ganga.GPIDev.Base.Proxy import isType
 from Ganga.GPIDev.Credentials import credential_store
 import Ganga.Utility.execute as gexecute
+from GangaDirac.Lib.Utilities.DiracServerClient import getDiracServer, DiracServerError
 
 logger = getLogger()
 
@@ -200,6 +201,9 @@ def execute(command,
         cred_req (ICredentialRequirement): What credentials does this call need
     """
 
+    # Commands which only need the DIRAC command files can be run by a DIRAC server, which has loaded them already
+    use_server = python_setup == '' and cwd is None and not shell and not update_env and getConfig('DIRAC')['UseDiracServer']
+
     if env is None:
         if cred_req is None:
             env = getDiracEnv()
@@ -211,6 +215,23 @@ def execute(command,
     if cred_req is not None:
         env['X509_USER_PROXY'] = credential_store[cred_req].location
 
+    if use_server:
+        server = getDiracServer(env)
+        if server.available():
+            try:
+                completion = server.submit(command)
+            except DiracServerError as err:
+                logger.warning("Failed to start the DIRAC server, running DIRAC commands directly: %s" % err)
+            else:
+                try:
+                    response = server.wait(completion, timeout)
+                except DiracServerError as err:
+                    raise GangaDiracError(str(err))
+                if response is None:
+                    raise GangaDiracError("DIRAC command timed out")
+                returnable = gexecute.parse_output(response['output'], response['stdout'], eval_includes)
+                return _parse_dirac_output(returnable, return_raw_dict)
+
     if cwd is None:
         # We can in all likelyhood be in a temp folder on a shared (SLOW) filesystem
         # If we are we do NOT want to execute commands which will involve any I/O on the system that isn't needed
@@ -238,6 +259,16 @@ def execute(command,
     if cwd is None:
         shutil.rmtree(cwd_, ignore_errors=True)
 
+    return _parse_dirac_output(returnable, return_raw_dict)
+
+
+def _parse_dirac_output(returnable, return_raw_dict=False):
+    """
+    Turn what was returned by a DIRAC command into the value returned by execute()
+    Args:
+        returnable (object): The object returned by the command
+        return_raw_dict(bool): Should we return the raw dict from the DIRAC interface or parse it here
+    """
     if isinstance(returnable, dict) and not return_raw_dict:
         # If the output is a dictionary allow for automatic error detection
         if returnable['OK']:
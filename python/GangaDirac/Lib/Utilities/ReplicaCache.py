@@ -0,0 +1,257 @@
+"""
+Cache of the replicas of LFNs found with the DIRAC getReplicas command.
+
+The replicas are shared by DiracFile.getReplicas(), the DIRAC splitters and getAccessURLs, and are stored in the
+gangadir so that splitting a dataset again, in this or a later session, doesn't ask DIRAC for the replicas of every LFN
+again. The cache is an append-only file using the same framing as the repository IndexStore, so several sessions can
+share it. An LFN's replicas are reused for [DIRAC]ReplicaCacheTTL seconds and are forgotten when the file is replicated
+or removed through a DiracFile.
+
+The replicas which aren't cached are looked up by requestReplicas() in chunks of LFNs, returning a TaskCompletion for
+each chunk so that the caller can wait for them rather than polling. Only lookups of several chunks, as made by the
+splitters, are spread over the monitoring thread pool. A single chunk, e.g. for DiracFile.getReplicas(), is looked up in
+the calling thread so an interactive call doesn't wait behind the monitoring and a worker of the pool never waits on it.
+"""
+
+import os
+import threading
+import time
+
+from Ganga.Core.GangaRepository.IndexStore import IndexStore, IndexStoreError, SET_RECORD, DEL_RECORD
+from Ganga.Core.GangaThread.WorkerThreads.WorkerThreadPool import TaskCompletion
+from Ganga.Utility.Config import getConfig
+from Ganga.Utility.files import expandfilename
+from Ganga.Utility.logging import getLogger
+from GangaDirac.Lib.Utilities.DiracUtilities import execute, GangaDiracError
+
+logger = getLogger()
+
+# Number of LFNs asked for in each getReplicas command
+LFN_chunk_size = 250
+
+
+class _ReplicaStore(IndexStore):
+
+    """
+    Append-only store of (lfn, replicas, time the replicas were found) entries
+    """
+
+    _magic = 'GRC1'
+
+    __slots__ = ()
+
+    @staticmethod
+    def make_set_record(lfn, replicas, found):
+        """
+        Construct a record which (re-)defines the replicas of an LFN
+        Args:
+            lfn (str): The LFN
+            replicas (dict): The replicas of the LFN, a dict of SE: PFN
+            found (float): The time the replicas were found
+        """
+        return (SET_RECORD, lfn, replicas, found)
+
+    @staticmethod
+    def make_del_record(lfn):
+        """
+        Construct a record which forgets the replicas of an LFN
+        Args:
+            lfn (str): The LFN
+        """
+        return (DEL_RECORD, lfn)
+
+
+class ReplicaCache(object):
+
+    """
+    The replicas of LFNs, loaded from the store the first time they're needed and kept in step with any other sessions
+    writing to it
+    """
+
+    __slots__ = ('_store', '_entries', '_lock')
+
+    def __init__(self, fn):
+        """
+        Args:
+            fn (str): Full path of the file backing this cache
+        """
+        super(ReplicaCache, self).__init__()
+        self._store = _ReplicaStore(fn)
+        # lfn: (replicas, found), None until loaded
+        self._entries = None
+        self._lock = threading.Lock()
+
+    def _sync(self):
+        """ Load the store, or the records other sessions have appended since it was last read, the lock must be held """
+        try:
+            changes = None if self._entries is None else self._store.read_changes()
+            if changes is None:
+                self._entries = self._store.load() or {}
+            else:
+                self._store.apply(changes, self._entries)
+        except IndexStoreError as err:
+            logger.debug("Failed to read the replica cache: %s" % err)
+            if self._entries is None:
+                self._entries = {}
+
+    def _append(self, records):
+        """ Append records to the store, rewriting it if most records are out of date, the lock must be held """
+        try:
+            self._store.append(records)
+            if self._store.needs_compacting(len(self._entries)):
+                self._store.rewrite(self._entries)
+        except IndexStoreError as err:
+            logger.warning("Failed to update the replica cache: %s" % err)
+
+    def get(self, lfns, ttl):
+        """
+        Return a dict of LFN: replicas for the LFNs whose replicas were found less than ttl seconds ago
+        Args:
+            lfns (list): The LFNs
+            ttl (float): The age in seconds after which replicas are no longer used
+        """
+        if ttl <= 0:
+            return {}
+        oldest = time.time() - ttl
+        found = {}
+        with self._lock:
+            self._sync()
+            for lfn in lfns:
+                entry = self._entries.get(lfn)
+                if entry is not None and entry[1] > oldest:
+                    found[lfn] = entry[0]
+        return found
+
+    def update(self, replicas):
+        """
+        Store the replicas of LFNs which have just been found, LFNs without replicas are not stored
+        Args:
+            replicas (dict): dict of LFN: replicas as in the 'Successful' dict returned by getReplicas
+        """
+        found = time.time()
+        records = [self._store.make_set_record(lfn, reps, found) for lfn, reps in replicas.iteritems() if reps]
+        if not records:
+            return
+        with self._lock:
+            self._sync()
+            self._store.apply(records, self._entries)
+            self._append(records)
+
+    def invalidate(self, lfns):
+        """
+        Forget the replicas of LFNs, e.g. as they've been replicated or removed
+        Args:
+            lfns (list): The LFNs
+        """
+        with self._lock:
+            self._sync()
+            records = [self._store.make_del_record(lfn) for lfn in lfns if lfn in self._entries]
+            self._store.apply(records, self._entries)
+            self._append(records)
+
+
+_caches_lock = threading.Lock()
+# file name: ReplicaCache
+_caches = {}
+
+
+def getReplicaCache():
+    """ Return the replica cache stored in the gangadir """
+    config = getConfig('Configuration')
+    fn = os.path.join(expandfilename(config['gangadir'], True), 'dirac', config['user'], 'replicas.cache')
+    with _caches_lock:
+        if fn not in _caches:
+            _caches[fn] = ReplicaCache(fn)
+        return _caches[fn]
+
+
+def _lookUpReplicas(lfns, cred_req):
+    """
+    Ask DIRAC for the replicas of LFNs and store those found in the cache.
+    Returns the dict returned by getReplicas, with the 'Successful' and 'Failed' LFNs
+    Args:
+        lfns (list): The LFNs
+        cred_req (ICredentialRequirement): The credential to run the command with
+    """
+    output = execute('getReplicas(%s)' % str(lfns), cred_req=cred_req)
+    if not isinstance(output, dict):
+        raise GangaDiracError("Output from DIRAC expected to be of type: '%s', we got the following: '%s'" % (dict, output))
+    if getConfig('DIRAC')['ReplicaCacheTTL'] > 0:
+        getReplicaCache().update(output.get('Successful', {}))
+    return output
+
+
+def requestReplicas(lfns, cred_req=None, forceRefresh=False):
+    """
+    Start looking up the replicas of LFNs, taking those already known from the cache.
+    Returns a list of TaskCompletion whose results are dicts of the 'Successful' and 'Failed' LFNs as returned by the
+    getReplicas command, one for the cached LFNs and one for each chunk of LFNs which DIRAC is asked about
+    Args:
+        lfns (list): The LFNs
+        cred_req (ICredentialRequirement): The credential to run the commands with
+        forceRefresh (bool): Ask DIRAC for the replicas of all of the LFNs, even if they're cached
+    """
+    cached = {}
+    if not forceRefresh:
+        cached = getReplicaCache().get(lfns, getConfig('DIRAC')['ReplicaCacheTTL'])
+    missing = [lfn for lfn in lfns if lfn not in cached]
+
+    completions = []
+    if cached:
+        completion = TaskCompletion()
+        completion._finish(result={'Successful': cached, 'Failed': {}})
+        completions.append(completion)
+
+    if missing:
+        logger.debug("Looking up the replicas of %s LFNs, %s were cached" % (len(missing), len(cached)))
+    pool = None
+    if len(missing) > LFN_chunk_size:
+        from Ganga.Core.GangaThread.WorkerThreads import getQueues
+        queues = getQueues()
+        # A worker of the pool waiting for lookups queued behind it could wait for ever
+        if queues is not None and threading.current_thread() not in queues._monitoring_threadpool.threads_matching(''):
+            pool = queues._monitoring_threadpool
+    for start in xrange(0, len(missing), LFN_chunk_size):
+        chunk = missing[start:start + LFN_chunk_size]
+        completion = None
+        if pool is not None:
+            completion = pool.add_function(_lookUpReplicas, (chunk, cred_req))
+        if completion is None:
+            # No thread pool is accepting work, e.g. outside of a session or while Ganga is shutting down
+            completion = TaskCompletion()
+            try:
+                completion._finish(result=_lookUpReplicas(chunk, cred_req))
+            except Exception as err:
+                completion._finish(error=err)
+        completions.append(completion)
+    return completions
+
+
+def lookUpReplicas(lfns, cred_req=None, forceRefresh=False):
+    """
+    Return the replicas of LFNs as a dict of the 'Successful' and 'Failed' LFNs, as returned by the getReplicas command,
+    raising the first error of any lookup which failed. See requestReplicas
+    Args:
+        lfns (list): The LFNs
+        cred_req (ICredentialRequirement): The credential to run the commands with
+        forceRefresh (bool): Ask DIRAC for the replicas of all of the LFNs, even if they're cached
+    """
+    replicas = {'Successful': {}, 'Failed': {}}
+    for completion in requestReplicas(lfns, cred_req, forceRefresh):
+        completion.wait()
+        if completion.error is not None:
+            raise completion.error
+        if completion.cancelled:
+            raise GangaDiracError("The replica lookup was cancelled")
+        for key in replicas:
+            replicas[key].update(completion.result.get(key, {}))
+    return replicas
+
+
+def invalidateReplicas(lfns):
+    """
+    Forget the cached replicas of LFNs
+    Args:
+        lfns (list): The LFNs
+    """
+    getReplicaCache().invalidate(lfns)
@@ -34,6 +34,10 @@ if not _after_bootstrap:
     configDirac.addOption('DiracCommandFiles', [os.path.join(os.path.dirname(__file__), 'Lib/Server/DiracDefinition.py'),
                                                 os.path.join(os.path.dirname(__file__), 'Lib/Server/DiracCommands.py')],
                       'The file containing the python commands that the local DIRAC server can execute. The default DiracCommands.py is added automatically')
+    configDirac.addOption('UseDiracServer', True, 'Run DIRAC commands on a long running DIRAC server for each proxy, which loads the DiracCommandFiles once, rather than in a new python for each command')
+    configDirac.addOption('DiracServerThreads', 8, 'Number of DIRAC commands run at once by each DIRAC server')
+    configDirac.addOption('DiracServerStartTimeout', 120, 'Seconds to wait for a DIRAC server to load the DIRAC API before running the commands directly')
+    configDirac.addOption('DiracServerRetryInterval', 300, 'Seconds for which DIRAC commands are run directly after a DIRAC server has failed to start')
 
     configDirac.addOption('noInputDataBannedSites', [],
                       'List of sites to ban when a user job has no input data (this is meant to reduce the load on these sites)')
@@ -58,11 +62,14 @@ if not _after_bootstrap:
 
     configDirac.addOption('DiracFileAutoGet', True, 'Should the DiracFile object automatically poll the Dirac backend for missing information on an lfn?')
 
+    configDirac.addOption('ReplicaCacheTTL', 24 * 3600,
+                      'Seconds for which the replicas of an LFN found with DIRAC are reused by DiracFile.getReplicas() and the splitters. They are stored in the gangadir and forgotten when the file is replicated or removed through Ganga. 0 to always ask DIRAC.')
+
     configDirac.addOption('OfflineSplitterFraction', 0.75, 'If subset is above OfflineSplitterFraction*filesPerJob then keep the subset')
     configDirac.addOption('OfflineSplitterMaxCommonSites', 3, 'Maximum number of storage sites all LFN should share in the same dataset. This is reduced to 1 as the splitter gets more desperate to group the data.')
     configDirac.addOption('OfflineSplitterUniqueSE', True, 'Should the Sites chosen be accessing different Storage Elements.')
     configDirac.addOption('OfflineSplitterLimit', 50,
-                      'Number of iterations of selecting random Sites that are performed before the spliter reduces the OfflineSplitter fraction by raising it by 1 power and reduces OfflineSplitterMaxCommonSites by 1. Smaller number makes the splitter accept many smaller subsets higher means keeping more subsets but takes much more CPU to match files accordingly.')
+                      'No longer used, the OfflineGangaDiracSplitter now groups files by the sites they share rather than by repeatedly selecting random Sites.')
 
     configDirac.addOption('RequireDefaultSE', True, 'Do we require the user to configure a defaultSE in some way?')
 
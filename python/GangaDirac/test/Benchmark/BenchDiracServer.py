@@ -0,0 +1,101 @@
+"""
+Compare the number of DIRAC commands per second which can be run in a new python for each command, by the long lived
+execute() workers and by a DIRAC server, one at a time and with many commands in progress at once.
+The DIRAC command files are replaced by one which takes 0.5s to load, standing in for importing the DIRAC API, and a
+command which takes 10ms, standing in for a round trip to the DIRAC services.
+
+Run the full benchmark with:
+    cd python && PYTHONPATH=. python GangaDirac/test/Benchmark/BenchDiracServer.py
+"""
+from __future__ import print_function
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+import cPickle as pickle
+from textwrap import dedent
+
+from Ganga.testlib.benchmark import print_table
+
+_commands = dedent('''
+    import time
+    time.sleep(0.5)
+
+    def monitorJobs(ids):
+        time.sleep(0.01)
+        output({'OK': True, 'Value': ids})
+    ''')
+
+_command = 'monitorJobs([1, 2, 3])'
+
+
+def _one_shot(command_file, use_workers):
+    from Ganga.Utility.Config import getConfig
+    from Ganga.Utility.execute import execute
+    with open(command_file) as this_file:
+        setup = this_file.read()
+    config = getConfig('Execute')
+    config.setSessionValue('UseWorkers', use_workers)
+    try:
+        return execute(_command, python_setup=setup, env=dict(os.environ), shell=False)
+    finally:
+        config.revertToDefault('UseWorkers')
+
+
+def _rate(func, number, threads=1):
+    """ Calls of func per second when called number times from the given number of threads """
+    def run():
+        for _ in range(number // threads):
+            func()
+    workers = [threading.Thread(target=run) for _ in range(threads)]
+    start = time.time()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return number / (time.time() - start)
+
+
+def _setup():
+    tmpdir = tempfile.mkdtemp()
+    command_file = os.path.join(tmpdir, 'BenchCommands.py')
+    with open(command_file, 'w') as this_file:
+        this_file.write(_commands)
+    return tmpdir, command_file
+
+
+def test_server_matches_one_shot():
+    """The server must return the same result as running the command directly"""
+    from GangaDirac.Lib.Utilities.DiracServerClient import DiracServerClient
+    tmpdir, command_file = _setup()
+    client = DiracServerClient(dict(os.environ), [command_file], 4)
+    try:
+        assert pickle.loads(client.call(_command)['output']) == _one_shot(command_file, False)
+    finally:
+        client.shutdown()
+        shutil.rmtree(tmpdir)
+
+
+def main(number=40):
+    from GangaDirac.Lib.Utilities.DiracServerClient import DiracServerClient
+    tmpdir, command_file = _setup()
+    client = DiracServerClient(dict(os.environ), [command_file], 8)
+    try:
+        # Start the server and enough workers for every thread first
+        client.call(_command)
+        _rate(lambda: _one_shot(command_file, True), 4, 4)
+        rows = [['new python', 1, _rate(lambda: _one_shot(command_file, False), 4)],
+                ['execute() worker', 1, _rate(lambda: _one_shot(command_file, True), number)],
+                ['execute() worker', 4, _rate(lambda: _one_shot(command_file, True), number, 4)],
+                ['DIRAC server', 1, _rate(lambda: client.call(_command), number)],
+                ['DIRAC server', 8, _rate(lambda: client.call(_command), number * 4, 8)]]
+    finally:
+        client.shutdown()
+        shutil.rmtree(tmpdir)
+    print_table('DIRAC commands per second', ['run by', 'threads', 'calls/s'], rows)
+
+
+if __name__ == '__main__':
+    main()
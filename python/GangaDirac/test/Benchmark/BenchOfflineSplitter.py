@@ -0,0 +1,70 @@
+"""
+Time the OfflineGangaDiracSplitter packing of LFNs into subsets for synthetic replica maps of 10k, 100k and 1M LFNs.
+Each LFN is replicated at 1 to 4 of 100 sites, the first 10 of which (standing in for the Tier1s) hold most replicas.
+
+Run the full benchmark with:
+    cd python && PYTHONPATH=. python GangaDirac/test/Benchmark/BenchOfflineSplitter.py
+"""
+from __future__ import print_function
+
+import random
+
+from Ganga.testlib.benchmark import time_call, print_table
+
+
+def _splitter():
+    from Ganga.Utility.Config import setSessionValue
+    # Checked when the DIRAC plugins are imported
+    setSessionValue('defaults_DiracProxy', 'group', 'benchmark_user')
+    import GangaDirac.Lib.Splitters.OfflineGangaDiracSplitter as splitter
+    return splitter
+
+
+def make_replica_map(num_lfns, num_sites=100, seed=1):
+    """ Return a dict of LFN: set of sites
+    Args:
+        num_lfns (int): The number of LFNs
+        num_sites (int): The number of sites
+        seed (int): The seed for the random choice of sites
+    """
+    rand = random.Random(seed)
+    tier1s = ['Tier1_%s' % i for i in range(10)]
+    tier2s = ['Tier2_%s' % i for i in range(num_sites - 10)]
+    site_dict = {}
+    for i in xrange(num_lfns):
+        sites = set(rand.sample(tier1s, rand.randint(1, 2)))
+        if rand.random() < 0.5:
+            sites.update(rand.sample(tier2s, rand.randint(1, 2)))
+        site_dict['/lhcb/MC/2016/ALLSTREAMS.DST/%08d/%08d_1.allstreams.dst' % (i // 1000, i)] = sites
+    return site_dict
+
+
+def _check(site_dict, subsets, filesPerJob):
+    assert sum(len(subset) for subset in subsets) == len(site_dict)
+    assert len(set(lfn for subset in subsets for lfn in subset)) == len(site_dict)
+    for subset in subsets:
+        assert len(subset) <= filesPerJob
+        assert set.intersection(*[site_dict[lfn] for lfn in subset])
+
+
+def test_packSubsets():
+    site_dict = make_replica_map(10000)
+    _check(site_dict, _splitter().packSubsets(site_dict, 100, 3, 0.75), 100)
+
+
+def main(sizes=(10000, 100000, 1000000), filesPerJob=100):
+    splitter = _splitter()
+    rows = []
+    for size in sizes:
+        site_dict = make_replica_map(size)
+        subsets = []
+        t = time_call(lambda: subsets.__setitem__(slice(None), splitter.packSubsets(site_dict, filesPerJob, 3, 0.75)), repeat=1)
+        _check(site_dict, subsets, filesPerJob)
+        full = sum(1 for subset in subsets if len(subset) == filesPerJob)
+        rows.append([size, t, len(subsets), float(size) / len(subsets), 100. * full / len(subsets)])
+    print_table('OfflineGangaDiracSplitter packing, %s files per job' % filesPerJob,
+                ['LFNs', 'time (s)', 'subsets', 'avg size', '% full'], rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+import random
+
+import pytest
+
+from Ganga.Core.exceptions import SplitterError
+from Ganga.testlib.GangaUnitTest import load_config_files, clear_config
+
+
+@pytest.yield_fixture(scope='function')
+def splitter():
+    """Provides the OfflineGangaDiracSplitter module, which needs the config to be loaded"""
+    load_config_files()
+    import GangaDirac.Lib.Splitters.OfflineGangaDiracSplitter as splitter
+    yield splitter
+    clear_config()
+
+
+def _replica_map(num_lfns, num_sites, seed=1):
+    """ LFNs each replicated at between 1 and 4 random sites """
+    rand = random.Random(seed)
+    sites = ['Site%s' % i for i in range(num_sites)]
+    return dict(('/lhcb/data/%s.dst' % i, set(rand.sample(sites, rand.randint(1, min(4, num_sites))))) for i in range(num_lfns))
+
+
+def _check_subsets(site_dict, subsets, filesPerJob):
+    """ Every LFN is placed once, no subset is too big and the LFNs of each subset share a site """
+    placed = [lfn for subset in subsets for lfn in subset]
+    assert sorted(placed) == sorted(site_dict)
+    for subset in subsets:
+        assert 0 < len(subset) <= filesPerJob
+        assert set.intersection(*[site_dict[lfn] for lfn in subset])
+
+
+def test_packSubsets(splitter):
+    for num_sites in (1, 5, 50):
+        site_dict = _replica_map(2000, num_sites)
+        for filesPerJob in (1, 7, 100):
+            _check_subsets(site_dict, splitter.packSubsets(site_dict, filesPerJob, 3, 0.75), filesPerJob)
+
+
+def test_packSubsets_common_sites(splitter):
+    """Test that LFNs at the same sites are packed into full subsets which keep all of the sites in common"""
+    site_dict = dict(('/a/%s' % i, set(['A', 'B', 'C'])) for i in range(20))
+    site_dict.update(('/b/%s' % i, set(['A', 'D', 'E'])) for i in range(20))
+    subsets = splitter.packSubsets(site_dict, 10, 3, 0.75)
+    _check_subsets(site_dict, subsets, 10)
+    assert len(subsets) == 4
+    assert all(len(set(lfn[:2] for lfn in subset)) == 1 for subset in subsets)
+
+    # The files left over are only grouped with a single site in common once there's no better choice
+    site_dict['/a/20'] = set(['A', 'B', 'C'])
+    site_dict['/b/20'] = set(['A', 'D', 'E'])
+    subsets = splitter.packSubsets(site_dict, 10, 3, 0.75)
+    _check_subsets(site_dict, subsets, 10)
+    assert sorted(len(subset) for subset in subsets) == [2, 10, 10, 10, 10]
+
+
+def test_chooseCommonSites_uniqueSE(splitter):
+    """Test that sites sharing an SE aren't both chosen as common sites"""
+    rank = {1: 0, 2: 1, 4: 2, 8: 3}
+    assert splitter._chooseCommonSites(15, 2, rank, {}) == 3
+    assert splitter._chooseCommonSites(15, 2, rank, {1: 3, 2: 3}) == 5
+    assert splitter._chooseCommonSites(3, 3, rank, {}) == 3
+
+
+def test_packSubsets_no_site(splitter):
+    with pytest.raises(SplitterError):
+        splitter.packSubsets({'/a/0': set(['A']), '/a/1': set()}, 10, 3, 0.75)
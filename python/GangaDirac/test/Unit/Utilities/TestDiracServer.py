@@ -0,0 +1,133 @@
+import os
+import time
+import cPickle as pickle
+from textwrap import dedent
+
+import pytest
+
+from Ganga.Utility.Config import getConfig
+from GangaDirac.Lib.Utilities.DiracServerClient import DiracServerClient, DiracServerError, shutdownDiracServers
+
+# Stands in for the DIRAC command files, which need DIRAC
+_commands = dedent('''
+    import os
+    import sys
+    import threading
+    import time
+
+    if os.environ.get('GANGA_TEST_SERVER_FAILS') and 'DiracServer' in sys.argv[0]:
+        raise RuntimeError('Failed to load the commands')
+
+    LOADED_AT = time.time()
+
+    def diracCommand(f):
+        def wrapper(*args):
+            output({'OK': True, 'Value': f(*args)})
+        return wrapper
+
+    @diracCommand
+    def echo(value):
+        return value
+
+    @diracCommand
+    def slow(seconds):
+        time.sleep(seconds)
+        return threading.current_thread().name
+
+    def crash():
+        os._exit(1)
+    ''')
+
+
+@pytest.yield_fixture
+def command_file(tmpdir):
+    this_file = tmpdir.join('TestCommands.py')
+    this_file.write(_commands)
+    yield str(this_file)
+    shutdownDiracServers()
+
+
+def _value(response):
+    return pickle.loads(response['output'])['Value']
+
+
+def test_commands(command_file):
+    """Test that the commands are run by a server which loads the command files once"""
+    client = DiracServerClient(dict(os.environ), [command_file], 4)
+    try:
+        assert _value(client.call('echo(5)')) == 5
+        loaded_at = pickle.loads(client.call('output(LOADED_AT)')['output'])
+        assert pickle.loads(client.call('output(LOADED_AT)')['output']) == loaded_at
+        assert client.call('print("hello")')['stdout'] == 'hello\n'
+        assert 'ZeroDivisionError' in pickle.loads(client.call('1/0')['output'])
+    finally:
+        client.shutdown()
+
+
+def test_pipelining(command_file):
+    """Test that many commands can be sent at once and are run in parallel"""
+    client = DiracServerClient(dict(os.environ), [command_file], 4)
+    try:
+        client.call('echo(0)')
+        start = time.time()
+        completions = [client.submit('slow(0.5)') for _ in range(8)]
+        threads = set(_value(client.wait(completion)) for completion in completions)
+        assert time.time() - start < 2.
+        assert len(threads) == 4
+    finally:
+        client.shutdown()
+
+
+def test_restart(command_file):
+    """Test that a server which exits is started again"""
+    client = DiracServerClient(dict(os.environ), [command_file], 4)
+    try:
+        with pytest.raises(DiracServerError):
+            client.call('crash()')
+        assert _value(client.call('echo(1)')) == 1
+    finally:
+        client.shutdown()
+
+
+def test_timeout(command_file):
+    """Test that a command which times out doesn't fail the others and the server is restarted once they've finished"""
+    client = DiracServerClient(dict(os.environ), [command_file], 4)
+    try:
+        loaded_at = pickle.loads(client.call('output(LOADED_AT)')['output'])
+        running = client.submit('slow(1)')
+        assert client.call('slow(10)', timeout=0.2) is None
+        assert pickle.loads(client.call('output(LOADED_AT)')['output']) == loaded_at
+        assert _value(client.wait(running)) != 'MainThread'
+
+        # The server was restarted once idle, rather than waiting for the command which timed out
+        assert pickle.loads(client.call('output(LOADED_AT)')['output']) != loaded_at
+        assert _value(client.call('echo(2)')) == 2
+    finally:
+        client.shutdown()
+
+
+def test_failed_start(command_file):
+    """Test that a server which fails to start isn't tried again straight away"""
+    env = dict(os.environ)
+    env['GANGA_TEST_SERVER_FAILS'] = '1'
+    client = DiracServerClient(env, [command_file], 4)
+    with pytest.raises(DiracServerError):
+        client.submit('echo(1)')
+    assert not client.available()
+
+
+def test_execute(command_file, monkeypatch):
+    """Test that execute uses the server, and falls back to running the command directly if the server can't start"""
+    import GangaDirac.Lib.Utilities.DiracUtilities as DiracUtilities
+    monkeypatch.setattr(DiracUtilities, 'DIRAC_INCLUDE', '')
+    config = getConfig('DIRAC')
+    config.setSessionValue('DiracCommandFiles', [command_file])
+    try:
+        env = dict(os.environ)
+        assert DiracUtilities.execute('slow(0)', env=env) != 'MainThread'
+        assert DiracUtilities.execute('echo(3)', env=env) == 3
+
+        env['GANGA_TEST_SERVER_FAILS'] = '1'
+        assert DiracUtilities.execute('slow(0)', env=env) == 'MainThread'
+    finally:
+        config.revertToDefault('DiracCommandFiles')
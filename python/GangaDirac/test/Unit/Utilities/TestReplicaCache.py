@@ -0,0 +1,118 @@
+import threading
+
+import pytest
+
+try:
+    from unittest.mock import patch, MagicMock
+except ImportError:
+    from mock import patch, MagicMock
+
+from Ganga.Utility.Config import getConfig
+from GangaDirac.Lib.Utilities.DiracUtilities import GangaDiracError
+from GangaDirac.Lib.Utilities.ReplicaCache import ReplicaCache, requestReplicas, lookUpReplicas, invalidateReplicas
+
+
+def _replicas(lfns):
+    return dict((lfn, {'SE-%s' % lfn[-1]: 'root://%s' % lfn}) for lfn in lfns)
+
+
+def _getReplicas(command, cred_req=None):
+    """ Stands in for running getReplicas with DIRAC, /bad LFNs aren't known """
+    lfns = eval(command[len('getReplicas'):])
+    return {'Successful': _replicas([lfn for lfn in lfns if not lfn.startswith('/bad')]),
+            'Failed': dict((lfn, 'No such file') for lfn in lfns if lfn.startswith('/bad'))}
+
+
+@pytest.yield_fixture
+def cache(tmpdir):
+    this_cache = ReplicaCache(str(tmpdir.join('replicas.cache')))
+    with patch('GangaDirac.Lib.Utilities.ReplicaCache.getReplicaCache', return_value=this_cache):
+        yield this_cache
+
+
+def test_cache(tmpdir):
+    """Test that the replicas are stored on disk, shared between sessions and expire"""
+    fn = str(tmpdir.join('replicas.cache'))
+    first = ReplicaCache(fn)
+    first.update(_replicas(['/a/1', '/a/2']))
+    first.update({'/a/3': {}})
+    assert first.get(['/a/1', '/a/2', '/a/3'], 100) == _replicas(['/a/1', '/a/2'])
+
+    second = ReplicaCache(fn)
+    assert second.get(['/a/1', '/a/2'], 100) == _replicas(['/a/1', '/a/2'])
+    first.invalidate(['/a/1'])
+    first.update(_replicas(['/a/4']))
+    assert second.get(['/a/1', '/a/2', '/a/4'], 100) == _replicas(['/a/2', '/a/4'])
+
+    assert second.get(['/a/2'], 0) == {}
+    with patch('time.time', return_value=second._entries['/a/2'][1] + 101):
+        assert second.get(['/a/2'], 100) == {}
+
+
+def test_compact(tmpdir):
+    """Test that the store is rewritten when most of its records are out of date"""
+    fn = str(tmpdir.join('replicas.cache'))
+    this_cache = ReplicaCache(fn)
+    for _ in range(200):
+        this_cache.update(_replicas(['/a/1']))
+    assert this_cache._store.n_records < 200
+    assert ReplicaCache(fn).get(['/a/1'], 100) == _replicas(['/a/1'])
+
+
+def test_lookUpReplicas(cache):
+    """Test that DIRAC is only asked for the replicas which aren't cached, a chunk of LFNs at a time"""
+    lfns = ['/a/%s' % i for i in range(600)]
+    with patch('GangaDirac.Lib.Utilities.ReplicaCache.execute', side_effect=_getReplicas) as execute:
+        replicas = lookUpReplicas(lfns[:300] + ['/bad/1'])
+        assert execute.call_count == 2
+        assert replicas['Successful'] == _replicas(lfns[:300])
+        assert replicas['Failed'].keys() == ['/bad/1']
+
+        completions = requestReplicas(lfns)
+        assert all(completion.done() for completion in completions)
+        assert execute.call_count == 4
+        assert len(completions) == 3
+        assert sum(len(completion.result['Successful']) for completion in completions) == 600
+
+        invalidateReplicas(['/a/1'])
+        assert lookUpReplicas(lfns)['Successful'] == _replicas(lfns)
+        assert execute.call_count == 5
+        execute.assert_called_with("getReplicas(['/a/1'])", cred_req=None)
+
+        lookUpReplicas(['/a/2'], forceRefresh=True)
+        assert execute.call_count == 6
+
+        getConfig('DIRAC').setSessionValue('ReplicaCacheTTL', 0)
+        try:
+            lookUpReplicas(['/a/2'])
+            assert execute.call_count == 7
+        finally:
+            getConfig('DIRAC').revertToDefault('ReplicaCacheTTL')
+
+
+def test_lookUpReplicas_threads(cache):
+    """Test that only lookups of several chunks are queued on the monitoring thread pool"""
+    queues = MagicMock()
+    queues._monitoring_threadpool.add_function.return_value = None
+    queues._monitoring_threadpool.threads_matching.return_value = []
+    lfns = ['/a/%s' % i for i in range(600)]
+    with patch('GangaDirac.Lib.Utilities.ReplicaCache.execute', side_effect=_getReplicas), \
+            patch('Ganga.Core.GangaThread.WorkerThreads.getQueues', return_value=queues):
+        assert lookUpReplicas(lfns[:1])['Successful'] == _replicas(lfns[:1])
+        assert queues._monitoring_threadpool.add_function.call_count == 0
+
+        # Run in the calling thread as the pool doesn't take them here
+        assert len(requestReplicas(lfns)) == 4
+        assert queues._monitoring_threadpool.add_function.call_count == 3
+
+        # Nor from one of the workers of the pool
+        queues._monitoring_threadpool.threads_matching.return_value = [threading.current_thread()]
+        requestReplicas(['/b/%s' % i for i in range(600)])
+        assert queues._monitoring_threadpool.add_function.call_count == 3
+
+
+def test_lookUpReplicas_error(cache):
+    with patch('GangaDirac.Lib.Utilities.ReplicaCache.execute', side_effect=GangaDiracError('DIRAC is down')):
+        with pytest.raises(GangaDiracError):
+            lookUpReplicas(['/a/1'])
+    assert cache.get(['/a/1'], 100) == {}